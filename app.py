@@ -12,8 +12,11 @@ from typing import Dict, Any, List
 # 读取.env文件
 from dotenv import load_dotenv
 import os
+from datalake.utils.log import get_logger
 load_dotenv()
 
+logger = get_logger("app")
+
 # 大模型配置
 DASHSCOPE_API_KEY = os.getenv("ALIYUN_KEY")
 DASHSCOPE_API_URL = "https://dashscope.aliyuncs.com/api/v1/services/aigc/text-generation/generation"
@@ -36,7 +39,7 @@ def call_llm(prompt: str) -> str:
     
     # 检查API密钥是否存在
     if not DASHSCOPE_API_KEY:
-        print("大模型API密钥未配置，使用模拟响应")
+        logger.warning("大模型API密钥未配置，使用模拟响应")
         # 返回模拟的大模型响应
         return "{\n  \"nodes\": [\"page_submit\", \"table_check\", \"llm\", \"sql_generate\", \"integration_task_generate\", \"sql_execute\", \"integration_task_deploy\", \"artifact_generate\"],\n  \"edges\": [{\n    \"start\": \"page_submit\",\n    \"end\": \"table_check\"\n  }, {\n    \"start\": \"table_check\",\n    \"end\": \"llm\",\n    \"condition\": {\n      \"type\": \"table_check_failed\"\n    }\n  }, {\n    \"start\": \"table_check\",\n    \"end\": \"sql_generate\",\n    \"condition\": {\n      \"type\": \"table_check_passed\"\n    }\n  }, {\n    \"start\": \"table_check\",\n    \"end\": \"integration_task_generate\",\n    \"condition\": {\n      \"type\": \"table_check_passed\"\n    }\n  }, {\n    \"start\": \"llm\",\n    \"end\": \"table_check\"\n  }, {\n    \"start\": \"sql_generate\",\n    \"end\": \"sql_execute\"\n  }, {\n    \"start\": \"integration_task_generate\",\n    \"end\": \"integration_task_deploy\"\n  }, {\n    \"start\": \"sql_execute\",\n    \"end\": \"artifact_generate\"\n  }, {\n    \"start\": \"integration_task_deploy\",\n    \"end\": \"artifact_generate\"\n  }],\n  \"node_configs\": {\n    \"table_check\": {\n      \"table_check_rules\": [\"not_null\", \"data_type\", \"primary_key\", \"unique_constraint\"],\n      \"parallelism\": 2\n    },\n    \"sql_generate\": {\n      \"generate_ddl\": true,\n      \"generate_dml\": true,\n      \"target_engine\": \"doris\",\n      \"parallelism\": 2\n    },\n    \"integration_task_generate\": {\n      \"parallelism\": 2,\n      \"source_connector\": \"jdbc\",\n      \"target_connector\": \"doris\"\n    },\n    \"llm\": {\n      \"model_name\": \"qwen-plus-latest\"\n    }\n  }\n}"
     
@@ -66,19 +69,18 @@ def call_llm(prompt: str) -> str:
         response.raise_for_status()
         result = response.json()
         llm_text = result["output"]["text"]
-        print(f"\n=== 大模型调用成功，返回结果 ===")
-        print(f"{llm_text}")
-        print(f"=== 大模型响应结束 ===\n")
+        logger.info("大模型调用成功")
+        logger.debug("大模型返回结果: %s", llm_text)
         return llm_text
     except Exception as e:
-        print(f"大模型调用失败: {e}")
+        logger.warning("大模型调用失败: %s", e)
         if 'response' in locals():
-            print(f"响应状态码: {response.status_code}")
-            print(f"响应内容: {response.text}")
+            logger.warning("响应状态码: %s", response.status_code)
+            logger.debug("响应内容: %s", response.text)
         else:
-            print(f"没有收到响应")
+            logger.warning("没有收到响应")
         # 返回模拟的大模型响应
-        print("使用模拟的大模型响应")
+        logger.info("使用模拟的大模型响应")
         return "{\n  \"nodes\": [\"page_submit\", \"table_check\", \"llm\", \"sql_generate\", \"integration_task_generate\", \"sql_execute\", \"integration_task_deploy\", \"artifact_generate\"],\n  \"edges\": [{\n    \"start\": \"page_submit\",\n    \"end\": \"table_check\"\n  }, {\n    \"start\": \"table_check\",\n    \"end\": \"llm\",\n    \"condition\": {\n      \"type\": \"table_check_failed\"\n    }\n  }, {\n    \"start\": \"table_check\",\n    \"end\": \"sql_generate\",\n    \"condition\": {\n      \"type\": \"table_check_passed\"\n    }\n  }, {\n    \"start\": \"table_check\",\n    \"end\": \"integration_task_generate\",\n    \"condition\": {\n      \"type\": \"table_check_passed\"\n    }\n  }, {\n    \"start\": \"llm\",\n    \"end\": \"table_check\"\n  }, {\n    \"start\": \"sql_generate\",\n    \"end\": \"sql_execute\"\n  }, {\n    \"start\": \"integration_task_generate\",\n    \"end\": \"integration_task_deploy\"\n  }, {\n    \"start\": \"sql_execute\",\n    \"end\": \"artifact_generate\"\n  }, {\n    \"start\": \"integration_task_deploy\",\n    \"end\": \"artifact_generate\"\n  }],\n  \"node_configs\": {\n    \"table_check\": {\n      \"table_check_rules\": [\"not_null\", \"data_type\", \"primary_key\", \"unique_constraint\"],\n      \"parallelism\": 2\n    },\n    \"sql_generate\": {\n      \"generate_ddl\": true,\n      \"generate_dml\": true,\n      \"target_engine\": \"doris\",\n      \"parallelism\": 2\n    },\n    \"integration_task_generate\": {\n      \"parallelism\": 2,\n      \"source_connector\": \"jdbc\",\n      \"target_connector\": \"doris\"\n    },\n    \"llm\": {\n      \"model_name\": \"qwen-plus-latest\"\n    }\n  }\n}"
 
 app = Flask(__name__)
@@ -213,12 +215,12 @@ def validate_workflow(config: WorkflowConfig, acceptance_criteria: List[str] = N
             "工作流必须生成最终制品"
         ]
     
-    print(f"验证智能体：调用大模型验证工作流配置...")
-    print(f"工作流名称: {config.name}")
-    print(f"验收标准: {acceptance_criteria}")
+    logger.info("验证智能体：调用大模型验证工作流配置...")
+    logger.info("工作流名称: %s", config.name)
+    logger.debug("验收标准: %s", acceptance_criteria)
     
     # 1. 生成验证计划
-    print("\n验证智能体：生成验证计划...")
+    logger.info("验证智能体：生成验证计划...")
     validation_plan = {
         "steps": [],
         "tools": [],
@@ -252,7 +254,7 @@ def validate_workflow(config: WorkflowConfig, acceptance_criteria: List[str] = N
         validation_plan["steps"].append(step)
     
     # 2. 执行验证计划
-    print("\n验证智能体：执行验证计划...")
+    logger.info("验证智能体：执行验证计划...")
     validation_results = []
     all_passed = True
     
@@ -362,7 +364,7 @@ def validate_workflow(config: WorkflowConfig, acceptance_criteria: List[str] = N
     }
     
     # 5. 调用大模型分析验证结果
-    print("\n验证智能体：调用大模型分析验证结果...")
+    logger.info("验证智能体：调用大模型分析验证结果...")
     
     # 构建大模型提示词
     validation_issues = []
@@ -423,7 +425,7 @@ def validate_workflow(config: WorkflowConfig, acceptance_criteria: List[str] = N
     
     # 调用大模型
     llm_response = call_llm(prompt)
-    print(f"大模型验证分析: {llm_response}")
+    logger.debug("大模型验证分析: %s", llm_response)
     
     # 6. 解析大模型响应
     llm_analysis = {
@@ -441,11 +443,11 @@ def validate_workflow(config: WorkflowConfig, acceptance_criteria: List[str] = N
         if llm_response.strip():
             parsed_analysis = json.loads(llm_response)
             llm_analysis.update(parsed_analysis)
-            print("\n验证智能体：成功解析大模型验证分析")
+            logger.info("验证智能体：成功解析大模型验证分析")
     except json.JSONDecodeError as e:
-        print(f"\n验证智能体：无法解析大模型验证分析，使用默认分析结果: {e}")
+        logger.warning("验证智能体：无法解析大模型验证分析，使用默认分析结果: %s", e)
     except Exception as e:
-        print(f"\n验证智能体：处理大模型验证分析时出错，使用默认分析结果: {e}")
+        logger.warning("验证智能体：处理大模型验证分析时出错，使用默认分析结果: %s", e)
     
     # 7. 模拟调用SQL执行工具和任务查询工具
     sql_result = mock_sql_execution("SELECT * FROM lake_table_1 LIMIT 5")
@@ -475,7 +477,7 @@ def validate_workflow(config: WorkflowConfig, acceptance_criteria: List[str] = N
                 "step_id": issue["step_id"]
             })
     
-    print(f"\n验证智能体：验证完成，结果: {validation_result['status']}")
+    logger.info("验证智能体：验证完成，结果: %s", validation_result["status"])
     return {
         "validation_result": validation_result,
         "execution_result": execution_result
@@ -492,7 +494,7 @@ def adjust_workflow(config: WorkflowConfig, validation_result: Dict[str, Any]) -
     Returns:
         调整后的工作流配置
     """
-    print(f"编排智能体：根据大模型分析结果调整工作流配置...")
+    logger.info("编排智能体：根据大模型分析结果调整工作流配置...")
     
     # 复制配置
     from copy import deepcopy
@@ -505,7 +507,7 @@ def adjust_workflow(config: WorkflowConfig, validation_result: Dict[str, Any]) -
             llm_analysis = validation_result["llm_analysis"]
             fix_actions = llm_analysis.get("fix_actions", {})
             
-            print(f"根据大模型分析调整工作流，fix_actions: {fix_actions}")
+            logger.debug("根据大模型分析调整工作流，fix_actions: %s", fix_actions)
             
             # 1. 添加新节点
             nodes_to_add = fix_actions.get("nodes_to_add", [])
@@ -526,7 +528,7 @@ def adjust_workflow(config: WorkflowConfig, validation_result: Dict[str, Any]) -
                 adjusted_config.node_configs[node_name].update(config_updates)
         else:
             # 如果没有大模型分析结果，使用默认调整逻辑
-            print("没有大模型分析结果，使用默认调整逻辑...")
+            logger.info("没有大模型分析结果，使用默认调整逻辑...")
             for issue in validation_result["issues"]:
                 if issue.get("message") and "并行度" in issue["message"]:
                     # 降低并行度
@@ -556,7 +558,7 @@ def adjust_workflow(config: WorkflowConfig, validation_result: Dict[str, Any]) -
         current_parallelism = adjusted_config.node_configs["integration_task_generate"].get("integration_parallelism", 1)
         if current_parallelism > 4:
             adjusted_config.node_configs["integration_task_generate"]["integration_parallelism"] = 2
-            print(f"调整并行度：从 {current_parallelism} 降低到 2")
+            logger.info("调整并行度：从 %s 降低到 2", current_parallelism)
     
     return adjusted_config
 
@@ -571,12 +573,12 @@ def orchestration_agent(business_requirement: str, acceptance_criteria: List[str
     Returns:
         生成的工作流配置
     """
-    print(f"编排智能体：调用大模型分析业务需求...")
-    print(f"业务需求: {business_requirement}")
-    print(f"验收标准: {acceptance_criteria}")
+    logger.info("编排智能体：调用大模型分析业务需求...")
+    logger.debug("业务需求: %s", business_requirement)
+    logger.debug("验收标准: %s", acceptance_criteria)
     
     # 1. 调用大模型生成工作流配置
-    print("\n编排智能体：调用大模型生成工作流配置...")
+    logger.info("编排智能体：调用大模型生成工作流配置...")
     
     # 构建JSON格式的示例输出，避免在f-string中嵌套太多大括号
     json_example = '''
@@ -624,9 +626,7 @@ def orchestration_agent(business_requirement: str, acceptance_criteria: List[str
     
     # 调用大模型
     llm_response = call_llm(prompt)
-    print(f"\n=== 大模型完整响应开始 ===")
-    print(f"{llm_response}")
-    print(f"=== 大模型完整响应结束 ===\n")
+    logger.debug("大模型完整响应: %s", llm_response)
     
     # 2. 解析大模型响应
     workflow_config_data = {
@@ -667,15 +667,15 @@ def orchestration_agent(business_requirement: str, acceptance_criteria: List[str
                 workflow_config_data["edges"] = parsed_response["edges"]
             if "node_configs" in parsed_response:
                 workflow_config_data["node_configs"] = parsed_response["node_configs"]
-            print("\n成功解析大模型响应，使用生成的工作流配置")
+            logger.info("成功解析大模型响应，使用生成的工作流配置")
     except json.JSONDecodeError as e:
-        print(f"\n无法解析大模型响应，使用默认配置: {e}")
+        logger.warning("无法解析大模型响应，使用默认配置: %s", e)
     except Exception as e:
-        print(f"\n处理大模型响应时出错，使用默认配置: {e}")
+        logger.warning("处理大模型响应时出错，使用默认配置: %s", e)
     
-    print(f"最终节点配置: {workflow_config_data['nodes']}")
-    print(f"最终边配置: {workflow_config_data['edges']}")
-    print(f"最终节点配置: {workflow_config_data['node_configs']}")
+    logger.debug("最终节点配置: %s", workflow_config_data["nodes"])
+    logger.debug("最终边配置: %s", workflow_config_data["edges"])
+    logger.debug("最终节点配置: %s", workflow_config_data["node_configs"])
     
     # 3. 生成完整的工作流配置
     workflow_name = f"ai_generated_workflow_{str(uuid.uuid4())[:8]}"
@@ -691,7 +691,7 @@ def orchestration_agent(business_requirement: str, acceptance_criteria: List[str
         llm_response=workflow_config_data.get("llm_response")  # 添加大模型响应
     )
     
-    print(f"\n编排智能体：生成工作流配置完成！")
+    logger.info("编排智能体：生成工作流配置完成！")
     return workflow_config
 
 
@@ -713,23 +713,23 @@ def ai_orchestrate():
     current_config = None
     
     while iteration_count <= max_iterations and not validation_passed:
-        print(f"\n=== AI编排迭代 {iteration_count} ===")
+        logger.info("AI编排迭代 %s", iteration_count)
         
         # 1. 编排智能体：生成/调整工作流配置
         if iteration_count == 1:
             # 第一次迭代：生成初始工作流配置
-            print("\n1. 编排智能体：生成初始工作流配置...")
+            logger.info("1. 编排智能体：生成初始工作流配置...")
             current_config = orchestration_agent(
                 ai_request.business_requirement,
                 ai_request.acceptance_criteria
             )
         else:
             # 后续迭代：根据验证结果调整工作流配置
-            print("\n1. 编排智能体：根据验证结果调整工作流配置...")
+            logger.info("1. 编排智能体：根据验证结果调整工作流配置...")
             current_config = adjust_workflow(current_config, previous_validation_result)
         
         # 2. 验证智能体：根据验收标准验证工作流配置
-        print("\n2. 验证智能体：开始验证工作流配置...")
+        logger.info("2. 验证智能体：开始验证工作流配置...")
         validation_output = validate_workflow(current_config, ai_request.acceptance_criteria)
         validation_result = validation_output["validation_result"]
         execution_result = validation_output["execution_result"]
@@ -748,25 +748,23 @@ def ai_orchestrate():
         iterations.append(iteration)
         
         # 4. 检查验证结果
-        print(f"\n3. 验证结果：{validation_result['status']}")
-        print(f"   反馈：{validation_result['feedback']}")
+        logger.info("3. 验证结果：%s，反馈：%s", validation_result["status"], validation_result["feedback"])
         
         if validation_result["status"] == "valid":
             validation_passed = True
-            print(f"\n=== 迭代 {iteration_count}：验证通过！ ===")
+            logger.info("迭代 %s：验证通过！", iteration_count)
             break
         else:
             # 打印详细问题
-            print("\n   详细问题：")
             for issue in validation_result["issues"]:
-                print(f"   - {issue['message']} (节点: {issue.get('node', '全局')})")
+                logger.info("详细问题：%s (节点: %s)", issue["message"], issue.get("node", "全局"))
             
-            print(f"\n=== 迭代 {iteration_count}：验证失败，准备调整... ===")
+            logger.info("迭代 %s：验证失败，准备调整...", iteration_count)
             iteration_count += 1
     
     # 如果超过最大迭代次数仍未通过，使用最后一次调整的配置
     if not validation_passed:
-        print(f"\n=== 超过最大迭代次数 {max_iterations}，使用最后一次调整的配置 ===")
+        logger.warning("超过最大迭代次数 %s，使用最后一次调整的配置", max_iterations)
     
     # 注册生成的工作流
     workflow_manager.register_workflow(current_config)
@@ -804,7 +802,7 @@ def get_nodes_metadata():
         metadata_dict = {name: metadata.model_dump() for name, metadata in NODE_METADATA.items()}
         return jsonify(metadata_dict)
     except Exception as e:
-        print(f"获取节点元数据失败: {e}")
+        logger.error("获取节点元数据失败: %s", e)
         return jsonify({"error": str(e)}), 500
 
 
@@ -1,8 +1,15 @@
 # 工作流编排智能体
-from .workflow_agent import WorkflowAgent, workflow_agent, get_workflow_agent
+from .workflow_agent import WorkflowAgent, get_workflow_agent
 
 __all__ = [
     "WorkflowAgent",
     "workflow_agent",
     "get_workflow_agent"
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name):
+    # 智能体实例在首次访问时创建
+    if name == "workflow_agent":
+        return get_workflow_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
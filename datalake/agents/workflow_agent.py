@@ -8,8 +8,7 @@
 from typing import Dict, Any, List
 import json
 import os
-from langchain_community.chat_models import ChatOpenAI
-from langchain_core.messages import HumanMessage
+import threading
 from dotenv import load_dotenv
 
 # 导入节点注册表
@@ -33,6 +32,8 @@ class WorkflowAgent:
         api_key = os.getenv("ALIYUN_KEY")
         
         # 使用阿里云的大模型配置
+        from langchain_community.chat_models import ChatOpenAI
+        
         self.llm = ChatOpenAI(
             model_name=model_name,
             temperature=temperature,
@@ -54,6 +55,8 @@ class WorkflowAgent:
         prompt_template = self._build_prompt_template(user_requirement)
         
         # 调用大模型生成流程图JSON
+        from langchain_core.messages import HumanMessage
+        
         messages = [HumanMessage(content=prompt_template)]
         response = self.llm.invoke(messages)
         
@@ -81,7 +84,9 @@ class WorkflowAgent:
         Returns:
             完整的提示词
         """
-        # 获取所有注册节点的元数据信息
+        # 获取所有注册节点的元数据信息（节点模块按需导入，先全部加载）
+        from datalake.core.nodes import NODE_MAPPING
+        NODE_MAPPING.load_all()
         available_nodes = []
         for node_name, node_info in node_registry.items():
             metadata = node_info["metadata"]
@@ -227,8 +232,9 @@ class WorkflowAgent:
         
         return True
 
-# 创建全局的工作流编排智能体实例
-workflow_agent = WorkflowAgent()
+# 全局的工作流编排智能体实例，在首次调用 get_workflow_agent 时创建
+_workflow_agent = None
+_workflow_agent_lock = threading.Lock()
 
 def get_workflow_agent() -> WorkflowAgent:
     """
@@ -237,4 +243,14 @@ def get_workflow_agent() -> WorkflowAgent:
     Returns:
         工作流编排智能体实例
     """
-    return workflow_agent
\ No newline at end of file
+    global _workflow_agent
+    if _workflow_agent is None:
+        with _workflow_agent_lock:
+            if _workflow_agent is None:
+                _workflow_agent = WorkflowAgent()
+    return _workflow_agent
+
+def __getattr__(name: str):
+    if name == "workflow_agent":
+        return get_workflow_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -3,13 +3,22 @@
 # Copyright (c) VernonSong. All rights reserved.
 # ======================================================================================================================
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from datalake.core.workflow.workflow_manager import WorkflowManager
-from datalake.core.workflow.models import WorkflowConfig, LakeIngestionRequest
-from typing import List, Dict, Any
+from datalake.core.workflow.models import (
+    WorkflowConfig, LakeIngestionRequest, BulkTaskRequest, JobStatusCallback, WaitApproval, WaitEvent
+)
+from datalake.core.workflow.tracing import tracer
+from datalake.core.nodes.artifact_generate import artifact_store_for
+from datalake.services.artifact_store import ArtifactStore, get_artifact_store
+from datalake.services.job_tracker import notify_job_status
+from datalake.services.task_templates import TaskTemplate
+from typing import List, Dict, Any, Optional
 
 router = APIRouter()
 
-# 工作流管理器实例
+# 工作流管理器实例；设置 DATALAKE_WORKFLOW_REGISTRY 时各 worker 共享同一个注册表
 workflow_manager = WorkflowManager()
 
 
@@ -25,7 +34,8 @@ async def register_workflow(config: WorkflowConfig):
         注册结果
     """
     try:
-        workflow_name = workflow_manager.register_workflow(config)
+        # 编译在线程池中进行，不阻塞事件循环
+        workflow_name = await run_in_threadpool(workflow_manager.register_workflow, config)
         return {"message": "Workflow registered successfully", "workflow_name": workflow_name}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -43,7 +53,133 @@ async def execute_workflow(request: LakeIngestionRequest):
         执行结果
     """
     try:
-        result = workflow_manager.execute_workflow(request)
+        # 在线程池中执行，避免阻塞事件循环，也使重复请求可以合并到进行中的执行
+        result = await run_in_threadpool(workflow_manager.execute_workflow, request)
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/workflows/runs/{request_id}/resume", response_model=Dict[str, Any])
+async def resume_workflow(request_id: str, from_node: Optional[str] = None):
+    """
+    从检查点续跑工作流，只重新执行失败节点及其下游节点
+    
+    Args:
+        request_id: 原执行的请求ID
+        from_node: 续跑起始节点，默认取最早失败的节点
+        
+    Returns:
+        执行结果
+    """
+    try:
+        result = await run_in_threadpool(workflow_manager.resume_workflow, request_id, from_node)
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/workflows/runs/{request_id}", response_model=Dict[str, Any])
+async def get_run(request_id: str):
+    """
+    查询执行状态，挂起等待中的执行 status 为 waiting
+    
+    Args:
+        request_id: 执行的请求ID
+        
+    Returns:
+        执行结果
+    """
+    try:
+        return await run_in_threadpool(workflow_manager.get_run, request_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.post("/workflows/runs/{request_id}/approve", response_model=Dict[str, Any])
+async def approve_run(request_id: str, approval: WaitApproval):
+    """
+    审批挂起在 manual_approval 等待网关的执行
+    
+    Args:
+        request_id: 执行的请求ID
+        approval: 审批结果
+        
+    Returns:
+        恢复后的执行结果
+    """
+    try:
+        return await run_in_threadpool(workflow_manager.approve, request_id, approval.approved, approval.approver,
+                                       approval.comment)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.post("/workflows/runs/{request_id}/cancel", response_model=Dict[str, Any])
+async def cancel_run_wait(request_id: str):
+    """
+    取消执行的等待，等待网关以 cancelled 结束
+    
+    Args:
+        request_id: 执行的请求ID
+        
+    Returns:
+        恢复后的执行结果
+    """
+    results = await run_in_threadpool(workflow_manager.cancel_wait, request_id)
+    if not results:
+        raise HTTPException(status_code=404, detail=f"Request is not waiting: {request_id}")
+    return results[-1]
+
+
+@router.post("/waits/events/{event}", response_model=Dict[str, Any])
+async def signal_event(event: str, body: WaitEvent):
+    """
+    发送外部事件，恢复所有挂起在等待该事件的 external_event 等待网关的执行
+    
+    Args:
+        event: 事件名
+        body: 事件内容
+        
+    Returns:
+        恢复的执行ID与各自的状态
+    """
+    results = await run_in_threadpool(workflow_manager.signal, event, body.payload)
+    return {"event": event, "resumed": {result["request_id"]: result["status"] for result in results}}
+
+
+@router.post("/jobs/callback", response_model=Dict[str, Any])
+async def job_status_callback(callback: JobStatusCallback):
+    """
+    上游部署任务状态回调，任务到达终态时立即恢复等待该任务的工作流
+    
+    Args:
+        callback: 任务状态
+        
+    Returns:
+        是否有工作流在等待该任务
+    """
+    watched = notify_job_status(callback.jobid, {"status": callback.status, "message": callback.message})
+    return {"jobid": callback.jobid, "watched": watched}
+
+
+@router.post("/workflows/execute/pipeline", response_model=Dict[str, Any])
+async def execute_pipeline(request: LakeIngestionRequest):
+    """
+    以流水线模式执行多表建表（sql_generate → sql_execute）
+
+    Args:
+        request: 入湖请求，source_data.tables 为表列表
+
+    Returns:
+        执行结果
+    """
+    try:
+        result = await run_in_threadpool(workflow_manager.execute_pipeline, request)
         return result
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -63,23 +199,41 @@ async def list_workflows():
 
 
 @router.get("/workflows/{workflow_name}", response_model=WorkflowConfig)
-async def get_workflow(workflow_name: str):
+async def get_workflow(workflow_name: str, version: Optional[int] = None):
     """
     获取工作流配置
     
     Args:
         workflow_name: 工作流名称
+        version: 历史版本号，默认返回当前版本
         
     Returns:
         工作流配置
     """
     try:
-        config = workflow_manager.get_workflow_config(workflow_name)
+        config = workflow_manager.get_workflow_config(workflow_name, version)
         return config
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 
+@router.get("/workflows/{workflow_name}/versions", response_model=List[int])
+async def list_workflow_versions(workflow_name: str):
+    """
+    列出工作流的全部版本号
+    
+    Args:
+        workflow_name: 工作流名称
+        
+    Returns:
+        按时间顺序的版本号列表
+    """
+    try:
+        return workflow_manager.list_workflow_versions(workflow_name)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
 @router.put("/workflows/update", response_model=Dict[str, Any])
 async def update_workflow(config: WorkflowConfig):
     """
@@ -92,7 +246,8 @@ async def update_workflow(config: WorkflowConfig):
         更新结果
     """
     try:
-        workflow_name = workflow_manager.update_workflow(config)
+        # 新版本在线程池中编译，完成后原子切换，进行中的执行在旧版本上完成
+        workflow_name = await run_in_threadpool(workflow_manager.update_workflow, config)
         return {"message": "Workflow updated successfully", "workflow_name": workflow_name}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -116,4 +271,86 @@ async def delete_workflow(workflow_name: str):
         else:
             raise HTTPException(status_code=404, detail="Workflow not found")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/integration/tasks/bulk")
+async def generate_bulk_tasks(request: BulkTaskRequest):
+    """
+    批量生成集成任务
+    
+    Args:
+        request: 批量任务请求，tasks 中的每项按同一个模板渲染
+        
+    Returns:
+        NDJSON 流，每行一个任务 {"index", "task_name", "task_directory", "upstream_api_json"}，
+        无法解析的项为 {"index", "error"}
+    """
+    template = TaskTemplate(
+        username=request.username,
+        integration_type=request.integration_type,
+        parallelism=request.parallelism,
+        audit_template_name=request.audit_template_name
+    )
+    # 同步生成器由 StreamingResponse 在线程池中迭代，边渲染边发送
+    return StreamingResponse(template.render_chunks(request.tasks), media_type="application/x-ndjson")
+
+
+def _run_artifact_store(run_id: str) -> ArtifactStore:
+    """执行写入制品的存储：按执行所用工作流版本的配置选择，找不到执行时使用默认位置"""
+    try:
+        return artifact_store_for(workflow_manager.get_run_config(run_id))
+    except ValueError:
+        return get_artifact_store()
+
+
+@router.get("/artifacts/runs/{run_id}", response_model=Dict[str, Any])
+async def get_artifact_manifest(run_id: str):
+    """
+    查询执行的制品清单
+    
+    Args:
+        run_id: 执行的请求ID
+        
+    Returns:
+        清单，未物化的制品 materialized 为 false
+    """
+    store = await run_in_threadpool(_run_artifact_store, run_id)
+    manifest = await run_in_threadpool(store.read_manifest, run_id)
+    if manifest is None:
+        raise HTTPException(status_code=404, detail=f"Manifest not found: {run_id}")
+    for entry in manifest["artifacts"]:
+        entry.pop("recipe", None)
+    return manifest
+
+
+@router.get("/artifacts/runs/{run_id}/{name}")
+async def get_artifact(run_id: str, name: str):
+    """
+    读取制品内容，未物化的制品在此时物化
+    
+    Args:
+        run_id: 执行的请求ID
+        name: 制品名称
+        
+    Returns:
+        解压后的制品内容（流式）
+    """
+    store = await run_in_threadpool(_run_artifact_store, run_id)
+    try:
+        entry = await run_in_threadpool(store.materialize, run_id, name)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return StreamingResponse(store.iter_content(entry["digest"], entry["codec"]), media_type=entry["media_type"],
+                             headers={"ETag": f'"{entry["digest"]}"'})
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus 文本格式的节点执行指标
+    
+    Returns:
+        按工作流、节点划分的延迟直方图、失败次数与状态大小
+    """
+    return PlainTextResponse(tracer.render_prometheus(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,7 @@
+# 欲买桂花同载酒，
+# 终不似、少年游。
+# Copyright (c) VernonSong. All rights reserved.
+# ======================================================================================================================
+"""
+性能基准测试
+"""
@@ -0,0 +1,9 @@
+# 欲买桂花同载酒，
+# 终不似、少年游。
+# Copyright (c) VernonSong. All rights reserved.
+# ======================================================================================================================
+import sys
+
+from datalake.bench.workflows import main
+
+sys.exit(main())
@@ -0,0 +1,113 @@
+# 欲买桂花同载酒，
+# 终不似、少年游。
+# Copyright (c) VernonSong. All rights reserved.
+# ======================================================================================================================
+"""
+冷启动导入耗时基准测试
+
+在独立子进程中以 python -X importtime 导入目标模块，统计累计导入耗时、最耗时的依赖，
+以及 langchain / 大模型客户端是否在导入阶段就被加载。
+
+用法：
+    python -m datalake.bench.import_time
+    python -m datalake.bench.import_time --modules datalake.server,datalake.core.nodes --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, Any, List
+
+# 默认测量的模块
+DEFAULT_MODULES = [
+    "datalake.server",
+    "datalake.core.nodes",
+    "datalake.core.workflow",
+    "datalake.core.agents.validation_agent",
+    "datalake.core.agents.workflow_agent"
+]
+
+# 需要确认是否被导入的重量级依赖
+HEAVY_MODULES = ["langchain_openai", "langchain_community", "langchain", "openai"]
+
+
+def parse_importtime(stderr: str) -> Dict[str, int]:
+    """解析 -X importtime 输出，返回 模块名 -> 累计耗时（微秒）"""
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        cumulative[parts[2].strip()] = int(parts[1])
+    return cumulative
+
+
+def measure(module: str) -> Dict[str, Any]:
+    """在新解释器中导入一次模块"""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env
+    )
+    cumulative = parse_importtime(process.stderr)
+    return {
+        "ok": process.returncode == 0,
+        "total_us": cumulative.get(module, 0),
+        "cumulative": cumulative,
+        "error": process.stderr.strip().splitlines()[-1] if process.returncode != 0 and process.stderr.strip() else None
+    }
+
+
+def benchmark_module(module: str, repeat: int, top: int) -> Dict[str, Any]:
+    """
+    多次测量模块导入耗时
+
+    Args:
+        module: 模块名
+        repeat: 测量次数，取中位数
+        top: 输出的最耗时依赖数量
+
+    Returns:
+        中位数耗时（毫秒）、各次耗时、最耗时依赖与重量级依赖的加载情况
+    """
+    runs = [measure(module) for _ in range(repeat)]
+    totals = [run["total_us"] for run in runs]
+    last = runs[-1]
+    heaviest = sorted(
+        ((name, us) for name, us in last["cumulative"].items() if name != module),
+        key=lambda item: item[1], reverse=True
+    )[:top]
+    return {
+        "ok": all(run["ok"] for run in runs),
+        "error": next((run["error"] for run in runs if run["error"]), None),
+        "median_ms": statistics.median(totals) / 1000,
+        "runs_ms": [total / 1000 for total in totals],
+        "heavy_modules_loaded": [name for name in HEAVY_MODULES if name in last["cumulative"]],
+        "heaviest": [{"module": name, "cumulative_ms": us / 1000} for name, us in heaviest]
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m datalake.bench.import_time", description="Cold import time benchmark")
+    parser.add_argument("--modules", default=",".join(DEFAULT_MODULES), help="comma separated module names")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    modules = [name.strip() for name in args.modules.split(",") if name.strip()]
+    report = {module: benchmark_module(module, args.repeat, args.top) for module in modules}
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    return 0 if all(result["ok"] for result in report.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
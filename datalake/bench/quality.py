@@ -0,0 +1,160 @@
+# 欲买桂花同载酒，
+# 终不似、少年游。
+# Copyright (c) VernonSong. All rights reserved.
+# ======================================================================================================================
+"""
+数据质量规则引擎基准测试
+
+以固定种子逐批生成带有空值、重复主键与类型错误的合成表（默认 5000 万行），分别以单遍扫描执行全部规则、
+以及每条规则各扫描一遍（逐条规则查询的做法）两种方式检查，输出耗时、吞吐量、违规行数与峰值内存。
+--source sqlite 时先把合成表写入临时 SQLite 文件，再通过数据源逐批读取，计入读取开销。
+--mode approximate 时唯一性与主键规则使用固定内存的近似检查（HyperLogLog + 布隆过滤器 + 可疑键复核）。
+--sample-rows 大于 0 且 --source sqlite 时另以抽样模式（下推 random() 过滤）检查一次，不升级为全量检查。
+
+用法：
+    python -m datalake.bench.quality --rows 50000000 --batch-size 100000
+    python -m datalake.bench.quality --rows 2000000 --source sqlite --sample-rows 10000
+    python -m datalake.bench.quality --rows 50000000 --mode approximate --skip-per-rule
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Any, Dict, Iterator, List
+
+import numpy as np
+
+from datalake.bench.workflows import peak_rss_mb
+from datalake.core.quality.engine import QualityEngine, build_rules, check_source
+from datalake.core.quality.sampling import sample_check
+
+# 合成表结构
+TABLE_SCHEMA = {
+    "columns": [
+        {"name": "id", "type": "bigint", "primary_key": True},
+        {"name": "name", "type": "string", "not_null": True},
+        {"name": "amount", "type": "double"},
+        {"name": "code", "type": "varchar(8)", "unique": True}
+    ]
+}
+RULES = ["not_null", "data_type", "primary_key", "unique_constraint"]
+
+
+def rule_configs(mode: str) -> List[Any]:
+    """基准测试的规则配置，mode 为 approximate 时唯一性与主键规则使用近似检查"""
+    return [{"rule": rule, "mode": mode} if rule in ("primary_key", "unique_constraint") else rule for rule in RULES]
+
+
+def synthetic_batches(rows: int, batch_size: int, seed: int) -> Iterator[Dict[str, np.ndarray]]:
+    """逐批生成合成表数据：约 0.1% 空值、0.01% 重复主键、0.1% 非数值金额，同一种子每次生成的数据相同"""
+    rng = np.random.default_rng(seed)
+    for start in range(0, rows, batch_size):
+        size = min(batch_size, rows - start)
+        ids = np.arange(start, start + size, dtype=np.int64)
+        duplicates = rng.random(size) < 0.0001
+        ids[duplicates] = rng.integers(0, max(start, 1), duplicates.sum())
+        names = np.full(size, "name", dtype=object)
+        names[rng.random(size) < 0.001] = None
+        amounts = rng.gamma(2.0, 50.0, size).astype(object)
+        amounts[rng.random(size) < 0.001] = "n/a"
+        codes = np.char.add("c", ids.astype(str)).astype(object)
+        yield {"id": ids, "name": names, "amount": amounts, "code": codes}
+
+
+def write_sqlite(path: str, rows: int, batch_size: int, seed: int):
+    """把合成表写入 SQLite 文件"""
+    connection = sqlite3.connect(path)
+    try:
+        connection.execute("CREATE TABLE quality_bench (id INTEGER, name TEXT, amount, code TEXT)")
+        for batch in synthetic_batches(rows, batch_size, seed):
+            connection.executemany("INSERT INTO quality_bench VALUES (?, ?, ?, ?)",
+                                   zip(batch["id"].tolist(), batch["name"], batch["amount"], batch["code"]))
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def _summary(report: Dict[str, Any], elapsed: float) -> Dict[str, Any]:
+    return {
+        "rows": report["rows"],
+        "elapsed": elapsed,
+        "rows_per_second": report["rows"] / elapsed if elapsed > 0 else 0.0,
+        "violations": {f"{rule['rule']}({','.join(rule['columns'])})": rule["violations"] for rule in report["rules"]}
+    }
+
+
+def run_check(configs: List[Any], args: argparse.Namespace, database: str = None) -> Dict[str, Any]:
+    """执行一次检查，返回耗时与违规行数"""
+    start_time = time.perf_counter()
+    if database:
+        source = {"type": "database", "connection_string": database, "query": "SELECT * FROM quality_bench",
+                  "batch_size": args.batch_size}
+        report = check_source(source, configs, TABLE_SCHEMA)
+    else:
+        engine = QualityEngine(build_rules(configs, TABLE_SCHEMA))
+        report = engine.run(synthetic_batches(args.rows, args.batch_size, args.seed),
+                            rescan=lambda: synthetic_batches(args.rows, args.batch_size, args.seed))
+    return {**_summary(report, time.perf_counter() - start_time), "passes": report["passes"]}
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m datalake.bench.quality", description="Quality rule engine benchmark")
+    parser.add_argument("--rows", type=int, default=50_000_000)
+    parser.add_argument("--batch-size", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--source", choices=["synthetic", "sqlite"], default="synthetic")
+    parser.add_argument("--mode", choices=["exact", "approximate"], default="exact",
+                        help="check mode of the uniqueness and primary key rules")
+    parser.add_argument("--sample-rows", type=int, default=0, help="also run a sampled check (sqlite source only)")
+    parser.add_argument("--skip-per-rule", action="store_true", help="skip the one-pass-per-rule comparison")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = None
+        report: Dict[str, Any] = {"config": vars(args)}
+        if args.source == "sqlite":
+            database = os.path.join(directory, "quality_bench.db")
+            start_time = time.perf_counter()
+            write_sqlite(database, args.rows, args.batch_size, args.seed)
+            report["load_seconds"] = time.perf_counter() - start_time
+
+        configs = rule_configs(args.mode)
+        report["single_pass"] = run_check(configs, args, database)
+        if not args.skip_per_rule:
+            per_rule = {rule: run_check([config], args, database) for rule, config in zip(RULES, configs)}
+            elapsed = sum(result["elapsed"] for result in per_rule.values())
+            report["per_rule"] = {"elapsed": elapsed, "rules": per_rule}
+            report["speedup"] = elapsed / report["single_pass"]["elapsed"] if report["single_pass"]["elapsed"] else None
+        if database and args.sample_rows > 0:
+            source = {"type": "database", "connection_string": database, "query": "SELECT * FROM quality_bench",
+                      "batch_size": args.batch_size}
+            start_time = time.perf_counter()
+            sampled = sample_check(source, configs, TABLE_SCHEMA,
+                                   {"sample_rows": args.sample_rows, "seed": args.seed, "escalate": False})
+            elapsed = time.perf_counter() - start_time
+            report["sampled"] = {
+                "elapsed": elapsed,
+                "rows_read": sampled["rows"],
+                "pushdown": sampled["pushdown"],
+                "speedup": report["single_pass"]["elapsed"] / elapsed if elapsed else None,
+                "rules": {f"{rule['rule']}({','.join(rule['columns'])})": {
+                    "verdict": rule["verdict"], "violation_rate": rule["violation_rate"],
+                    "confidence_interval": rule["confidence_interval"]
+                } for rule in sampled["rules"]}
+            }
+    report["peak_rss_mb"] = peak_rss_mb()
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+# 欲买桂花同载酒，
+# 终不似、少年游。
+# Copyright (c) VernonSong. All rights reserved.
+# ======================================================================================================================
+"""
+批量集成任务生成基准测试
+
+生成一批合成的表映射（默认 10000 张表，每张 20 个字段，其中 5% 带覆盖项），比较：
+- per_run：逐个任务从头构造 upstream_api_json 并序列化（原集成任务生成节点每次运行的做法）
+- template_dict：预编译模板渲染字典后序列化
+- template_json：预编译模板直接拼接 JSON
+- ndjson_file：端到端写入 NDJSON 文件（含解析每一项）
+
+用法：
+    python -m datalake.bench.task_render --tasks 10000 --fields 20
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+from datalake.bench.workflows import peak_rss_mb
+from datalake.services.task_templates import TaskTemplate, parse_item
+
+
+def synthetic_tasks(count: int, fields: int, override_ratio: float) -> List[tuple]:
+    """合成批量任务：(源表, 目标表, 字段映射[, 覆盖项])"""
+    override_every = int(1 / override_ratio) if override_ratio > 0 else 0
+    tasks = []
+    for index in range(count):
+        mapping = [{"source": f"col_{field}", "target": f"col_{field}"} for field in range(fields)]
+        task = (f"mysql_db.sales.orders_{index}", f"hive_db.ods.ods_orders_{index}", mapping)
+        if override_every and index % override_every == 0:
+            task += ({"advanced_settings": {"parallelism": 8}, "schedule": {"expression": "0 2 * * *"}},)
+        tasks.append(task)
+    return tasks
+
+
+def per_run_payload(item: Dict[str, Any], username: str, integration_type: str, parallelism: int,
+                    audit_template_name: str) -> Dict[str, Any]:
+    """原节点逐个任务从头构造 upstream_api_json"""
+    source_db, source_schema, source_table = item["source_db"], item["source_schema"], item["source_table"]
+    target_db, target_schema, target_table = item["target_db"], item["target_schema"], item["target_table"]
+    task_name = f"{source_db}_{source_schema}_{source_table}_to_{target_db}_{target_schema}_{target_table}_{integration_type}"
+    task_description = f"从{source_db}.{source_schema}.{source_table}到{target_db}.{target_schema}.{target_table}的{integration_type}集成任务"
+    payload = {
+        "task_info": {
+            "name": task_name,
+            "description": task_description,
+            "type": integration_type,
+            "create_by": username,
+            "create_time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "update_time": time.strftime("%Y-%m-%d %H:%M:%S")
+        },
+        "source": {"db": source_db, "schema": source_schema, "table": source_table, "type": "mysql"},
+        "target": {"db": target_db, "schema": target_schema, "table": target_table, "type": "hive"},
+        "field_mapping": item["field_mapping"],
+        "advanced_settings": {
+            "parallelism": parallelism,
+            "retry_count": 3,
+            "timeout": 3600,
+            "audit_template": audit_template_name
+        },
+        "schedule": {"type": "cron", "expression": "0 0 * * *", "start_time": "2024-01-01 00:00:00"},
+        "tags": [f"source:{source_db}", f"target:{target_db}", f"type:{integration_type}"]
+    }
+    overrides = item.get("overrides")
+    if overrides:
+        for key, value in overrides.items():
+            payload[key] = {**payload.get(key, {}), **value}
+    return payload
+
+
+def measure(fn: Callable[[], int], repeat: int) -> Dict[str, float]:
+    """取 repeat 次中最快的一次"""
+    best, count = float("inf"), 0
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        count = fn()
+        best = min(best, time.perf_counter() - start_time)
+    return {"tasks": count, "elapsed": best, "tasks_per_second": count / best if best > 0 else 0.0}
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m datalake.bench.task_render",
+                                     description="Bulk integration task rendering benchmark")
+    parser.add_argument("--tasks", type=int, default=10_000)
+    parser.add_argument("--fields", type=int, default=20)
+    parser.add_argument("--override-ratio", type=float, default=0.05)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    tasks = synthetic_tasks(args.tasks, args.fields, args.override_ratio)
+    items = [parse_item(task) for task in tasks]
+    common = {"username": "bench", "integration_type": "full", "parallelism": 4, "audit_template_name": "default_audit"}
+    template = TaskTemplate(**common)
+
+    def per_run() -> int:
+        for item in items:
+            json.dumps(per_run_payload(item, **common), ensure_ascii=False)
+        return len(items)
+
+    def template_dict() -> int:
+        for item in items:
+            json.dumps(template.render(item), ensure_ascii=False)
+        return len(items)
+
+    def template_json() -> int:
+        for item in items:
+            template.render_json(item)
+        return len(items)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "tasks.ndjson")
+
+        def ndjson_file() -> int:
+            with open(path, "w", encoding="utf-8") as output:
+                return template.write_ndjson(tasks, output)["rendered"]
+
+        results = {
+            "per_run": measure(per_run, args.repeat),
+            "template_dict": measure(template_dict, args.repeat),
+            "template_json": measure(template_json, args.repeat),
+            "ndjson_file": measure(ndjson_file, args.repeat)
+        }
+        output_bytes = os.path.getsize(path)
+
+    baseline = results["per_run"]["tasks_per_second"]
+    report: Dict[str, Any] = {
+        "config": vars(args),
+        "results": results,
+        "speedup": {
+            name: result["tasks_per_second"] / baseline if baseline else None
+            for name, result in results.items() if name != "per_run"
+        },
+        "ndjson_bytes": output_bytes,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
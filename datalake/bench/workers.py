@@ -0,0 +1,155 @@
+# 欲买桂花同载酒，
+# 终不似、少年游。
+# Copyright (c) VernonSong. All rights reserved.
+# ======================================================================================================================
+"""
+多 worker 服务吞吐量基准测试
+
+依次以 1、2、4、8 个 worker 启动服务（共享同一个SQLite工作流注册表），通过一个 worker 注册标准入湖图后，
+并发发送执行请求，统计各 worker 数下的吞吐量与延迟分位数。节点使用固定种子的模拟延迟。
+
+用法：
+    python -m datalake.bench.workers --workers 1,2,4,8 --requests 400 --concurrency 64
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List
+
+import httpx
+
+from datalake.bench.workflows import GRAPHS, build_config, build_source_data, percentile
+from datalake.core.workflow.registry import REGISTRY_ENV
+from datalake.core.workflow.simulation import SIMULATION_ENV
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(base_url: str, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/api/workflows", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not become ready in {timeout}s")
+
+
+def run_workers(workers: int, graph_name: str, requests: int, concurrency: int, simulation_config: Dict[str, Any],
+                startup_timeout: float = 60.0) -> Dict[str, Any]:
+    """
+    以指定 worker 数启动服务并压测
+
+    Returns:
+        吞吐量、延迟分位数与状态统计
+    """
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(
+            os.environ,
+            **{
+                REGISTRY_ENV: os.path.join(directory, "workflows.db"),
+                SIMULATION_ENV: json.dumps(simulation_config),
+                "DATALAKE_LOG_LEVEL": "WARNING"
+            }
+        )
+        process = subprocess.Popen(
+            [sys.executable, "-m", "datalake.server", "--host", "127.0.0.1", "--port", str(port),
+             "--workers", str(workers), "--no-reload"],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            _wait_ready(base_url, startup_timeout)
+            config = build_config(graph_name)
+            httpx.post(f"{base_url}/api/workflows/register", json=json.loads(config.model_dump_json()),
+                       timeout=30.0).raise_for_status()
+
+            with httpx.Client(base_url=base_url, timeout=120.0,
+                              limits=httpx.Limits(max_connections=concurrency)) as client:
+                def run_one(index: int):
+                    payload = {"workflow_name": config.name, "source_data": build_source_data(index), "dedupe": False}
+                    start = time.perf_counter()
+                    response = client.post("/api/workflows/execute", json=payload)
+                    status = response.json().get("status") if response.status_code == 200 else f"http_{response.status_code}"
+                    return time.perf_counter() - start, status
+
+                # 预热：每个 worker 首次执行时从注册表读取配置并编译图
+                with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                    list(executor.map(run_one, range(-concurrency, 0)))
+
+                start_time = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                    outcomes = list(executor.map(run_one, range(requests)))
+                elapsed = time.perf_counter() - start_time
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    latencies = [latency for latency, _ in outcomes]
+    status_counts: Dict[str, int] = {}
+    for _, status in outcomes:
+        status_counts[status] = status_counts.get(status, 0) + 1
+    return {
+        "workers": workers,
+        "elapsed": elapsed,
+        "throughput": requests / elapsed if elapsed > 0 else 0.0,
+        "latency": {q: percentile(latencies, int(q[1:])) for q in ("p50", "p95", "p99")},
+        "status": status_counts
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m datalake.bench.workers", description="Multi-worker throughput benchmark")
+    parser.add_argument("--workers", default="1,2,4,8", help="comma separated worker counts")
+    parser.add_argument("--graph", default="full", choices=list(GRAPHS))
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--llm-latency", type=float, default=0.02)
+    parser.add_argument("--sql-latency", type=float, default=0.005)
+    parser.add_argument("--deploy-latency", type=float, default=0.01)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    simulation_config = {
+        "seed": args.seed,
+        "latencies": {"llm": args.llm_latency, "sql": args.sql_latency, "deploy": args.deploy_latency},
+        "failure_rates": {"llm": 0.0, "sql": 0.0, "deploy": 0.0, "table_check": 0.0}
+    }
+    results = [
+        run_workers(int(workers), args.graph, args.requests, args.concurrency, simulation_config)
+        for workers in args.workers.split(",") if workers.strip()
+    ]
+    report = {
+        "config": {**vars(args), "simulation": simulation_config},
+        "results": results,
+        "speedup": {
+            str(result["workers"]): result["throughput"] / results[0]["throughput"] for result in results
+        } if results and results[0]["throughput"] else {}
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,288 @@
+# 欲买桂花同载酒，
+# 终不似、少年游。
+# Copyright (c) VernonSong. All rights reserved.
+# ======================================================================================================================
+"""
+标准入湖工作流基准测试
+
+以固定种子的模拟延迟（大模型、SQL执行、任务部署）执行标准入湖图，输出吞吐量、端到端延迟分位数、
+峰值内存与按节点的耗时分解，并可与保存的基线对比以发现性能回退。
+
+用法：
+    python -m datalake.bench --requests 50 --concurrency 8 --seed 42
+    python -m datalake.bench --save-baseline datalake/bench/baseline.json
+    python -m datalake.bench --baseline datalake/bench/baseline.json --tolerance 0.2
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+
+from datalake.core.workflow.models import WorkflowConfig, LakeIngestionRequest
+from datalake.core.workflow.workflow_manager import WorkflowManager
+from datalake.core.workflow.simulation import simulation
+from datalake.core.workflow.tracing import NodeTracer
+
+# 默认基线文件
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+_PREPARE = ["page_submit", "db_type_query", "table_field_query"]
+_DDL = ["sql_generate", "sql_execute"]
+_INTEGRATION = ["integration_task_generate", "integration_task_deploy"]
+
+# 标准入湖图：按顺序串联的节点列表
+GRAPHS: Dict[str, List[str]] = {
+    "ddl": _PREPARE + _DDL + ["artifact_generate"],
+    "integration": _PREPARE + _INTEGRATION,
+    "full": _PREPARE + _DDL + _INTEGRATION + ["artifact_generate"]
+}
+
+# 越大越好的指标，其余指标越小越好
+_HIGHER_IS_BETTER = {"throughput"}
+
+
+def build_config(graph_name: str, node_cache: bool = False) -> WorkflowConfig:
+    """构造标准入湖图的工作流配置，node_cache 为 False 时关闭节点结果缓存与部署台账以测量冷路径"""
+    nodes = GRAPHS[graph_name]
+    node_configs = {} if node_cache else {node: {"cacheable": False} for node in nodes}
+    if not node_cache and "integration_task_deploy" in node_configs:
+        node_configs["integration_task_deploy"]["idempotent"] = False
+    return WorkflowConfig(
+        name=f"bench_{graph_name}",
+        description=f"benchmark graph: {graph_name}",
+        nodes=nodes,
+        edges=[{"start": start, "end": end} for start, end in zip(nodes, nodes[1:])],
+        node_configs=node_configs
+    )
+
+
+def build_source_data(index: int) -> Dict[str, Any]:
+    """第 index 个请求的源数据，各请求互不相同，保证不被合并且随机序列互相独立"""
+    return {
+        "user_input": f"将 source_db_1.source_schema_1.table_{index} 入湖",
+        "username": "bench",
+        "source_db": "source_db_1",
+        "source_schema": "source_schema_1",
+        "source_table": f"table_{index}",
+        "target_db": "lake_db_1",
+        "target_schema": "lake_schema_1",
+        "target_table": f"table_{index}",
+        "field_mapping": [{"source_field": "id", "target_field": "id"}]
+    }
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """最近秩法分位数，q 取 0~100"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(-(-q * len(ordered) // 100)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def peak_rss_mb() -> float:
+    """进程峰值常驻内存（MB）"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _latency_summary(values: List[float]) -> Dict[str, Any]:
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else None,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None
+    }
+
+
+def run_graph(graph_name: str, requests: int, concurrency: int, node_cache: bool = False) -> Dict[str, Any]:
+    """
+    执行一个标准入湖图的基准测试
+
+    Args:
+        graph_name: GRAPHS 中的图名称
+        requests: 请求数
+        concurrency: 并发执行的请求数
+        node_cache: 是否开启节点结果缓存
+
+    Returns:
+        吞吐量、端到端延迟、状态统计与按节点的耗时分解
+    """
+    tracer = NodeTracer(measure_state_size=False)
+    manager = WorkflowManager(tracer=tracer)
+    config = build_config(graph_name, node_cache)
+    manager.register_workflow(config)
+
+    def run_one(index: int):
+        request = LakeIngestionRequest(workflow_name=config.name, source_data=build_source_data(index), dedupe=False)
+        start = time.perf_counter()
+        result = manager.execute_workflow(request)
+        failed_nodes = sorted(
+            node for node, node_result in result.get("results", {}).items()
+            if isinstance(node_result, dict) and node_result.get("status") == "failed"
+        )
+        return time.perf_counter() - start, result.get("status"), failed_nodes
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(run_one, range(requests)))
+    elapsed = time.perf_counter() - start_time
+
+    status_counts: Dict[str, int] = {}
+    for _, status, failed_nodes in outcomes:
+        key = "failed" if status == "failed" or failed_nodes else "completed"
+        status_counts[key] = status_counts.get(key, 0) + 1
+
+    node_durations: Dict[str, List[float]] = {}
+    for span in tracer.spans:
+        node_durations.setdefault(span["node"], []).append(span["duration"])
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "elapsed": elapsed,
+        "throughput": requests / elapsed if elapsed > 0 else 0.0,
+        "latency": _latency_summary([duration for duration, _, _ in outcomes]),
+        "status": status_counts,
+        "nodes": {
+            node: {**_latency_summary(durations), "total": sum(durations)}
+            for node, durations in ((node, node_durations[node]) for node in GRAPHS[graph_name] if node in node_durations)
+        }
+    }
+
+
+def run_suite(graphs: List[str], requests: int, concurrency: int, seed: int, latencies: Dict[str, float],
+              failure_rates: Dict[str, float] = None, jitter: float = 0.2, time_scale: float = 1.0,
+              node_cache: bool = False) -> Dict[str, Any]:
+    """
+    以固定种子的模拟配置依次执行多个标准图
+
+    Returns:
+        基准测试报告
+    """
+    simulation.configure(
+        seed=seed,
+        latencies={kind: {"mean": mean, "jitter": jitter} for kind, mean in latencies.items()},
+        failure_rates=failure_rates,
+        time_scale=time_scale
+    )
+    try:
+        report = {
+            "config": {
+                "graphs": graphs,
+                "requests": requests,
+                "concurrency": concurrency,
+                "seed": seed,
+                "latencies": latencies,
+                "failure_rates": failure_rates or {},
+                "jitter": jitter,
+                "time_scale": time_scale,
+                "node_cache": node_cache
+            },
+            "graphs": {graph_name: run_graph(graph_name, requests, concurrency, node_cache) for graph_name in graphs}
+        }
+    finally:
+        simulation.reset()
+    report["peak_rss_mb"] = peak_rss_mb()
+    return report
+
+
+def compare_with_baseline(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> Dict[str, Any]:
+    """
+    与基线对比吞吐量与延迟分位数
+
+    吞吐量下降或 p50/p95/p99 上升超过 tolerance（相对比例）即判定为回退。
+
+    Returns:
+        各图各指标的基线值、当前值、变化比例与是否回退，以及回退列表
+    """
+    comparison: Dict[str, Any] = {}
+    regressions = []
+    for graph_name, current in report["graphs"].items():
+        base = baseline.get("graphs", {}).get(graph_name)
+        if base is None:
+            continue
+        metrics = {
+            "throughput": (base.get("throughput"), current.get("throughput")),
+            **{
+                f"latency_{q}": (base.get("latency", {}).get(q), current["latency"].get(q))
+                for q in ("p50", "p95", "p99")
+            }
+        }
+        graph_comparison = {}
+        for metric, (base_value, current_value) in metrics.items():
+            if not base_value or current_value is None:
+                continue
+            change = (current_value - base_value) / base_value
+            regression = -change > tolerance if metric in _HIGHER_IS_BETTER else change > tolerance
+            graph_comparison[metric] = {
+                "baseline": base_value,
+                "current": current_value,
+                "change": change,
+                "regression": regression
+            }
+            if regression:
+                regressions.append(f"{graph_name}.{metric}")
+        comparison[graph_name] = graph_comparison
+    return {"tolerance": tolerance, "graphs": comparison, "regressions": regressions}
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m datalake.bench", description="Standard ingestion workflow benchmark")
+    parser.add_argument("--graphs", default=",".join(GRAPHS), help="comma separated graph names")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--sql-latency", type=float, default=0.05)
+    parser.add_argument("--deploy-latency", type=float, default=0.1)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--llm-failure", type=float, default=0.0)
+    parser.add_argument("--sql-failure", type=float, default=0.0)
+    parser.add_argument("--deploy-failure", type=float, default=0.0)
+    parser.add_argument("--time-scale", type=float, default=1.0, help="scale real sleeping time of fake latencies")
+    parser.add_argument("--node-cache", action="store_true", help="keep node result caching enabled")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--baseline", help="compare against this baseline report")
+    parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE, help="store the report as baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="relative change treated as regression")
+    args = parser.parse_args(argv)
+
+    graphs = [name.strip() for name in args.graphs.split(",") if name.strip()]
+    unknown = [name for name in graphs if name not in GRAPHS]
+    if unknown:
+        parser.error(f"unknown graphs: {', '.join(unknown)}")
+
+    report = run_suite(
+        graphs,
+        requests=args.requests,
+        concurrency=args.concurrency,
+        seed=args.seed,
+        latencies={"llm": args.llm_latency, "sql": args.sql_latency, "deploy": args.deploy_latency},
+        failure_rates={"llm": args.llm_failure, "sql": args.sql_failure, "deploy": args.deploy_failure,
+                       "table_check": 0.0},
+        jitter=args.jitter,
+        time_scale=args.time_scale,
+        node_cache=args.node_cache
+    )
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            report["comparison"] = compare_with_baseline(report, json.load(f), args.tolerance)
+        if report["comparison"]["regressions"]:
+            exit_code = 1
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    print(output)
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    return exit_code
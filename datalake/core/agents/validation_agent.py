@@ -7,7 +7,10 @@
 from typing import Dict, Any, List, Optional
 from datalake.services.validation_tools import tool_registry
 import json
-from langchain_openai import ChatOpenAI
+import threading
+from datalake.utils.log import get_logger
+
+logger = get_logger(__name__)
 
 class ValidationAgent:
     """
@@ -22,6 +25,8 @@ class ValidationAgent:
             model_name: 使用的大模型名称
             temperature: 大模型的温度参数，控制生成结果的随机性
         """
+        from langchain_openai import ChatOpenAI
+        
         self.llm = ChatOpenAI(
             model=model_name,
             temperature=temperature,
@@ -59,10 +64,10 @@ class ValidationAgent:
             
             # 构建当前提示
             current_prompt = self._build_react_prompt(conversation_history)
-            print("当前提示词:", current_prompt)
+            logger.debug("当前提示词: %s", current_prompt)
             # 调用大模型
             response = self.llm.invoke(current_prompt)
-            print("大模型响应:", response.content)
+            logger.debug("大模型响应: %s", response.content)
             # 添加大模型响应到对话历史
             conversation_history.append(response.content)
             
@@ -216,7 +221,7 @@ class ValidationAgent:
             
             return None
         except Exception as e:
-            print(f"解析工具调用失败：{e}")
+            logger.warning("解析工具调用失败：%s", e)
             return None
         
     def _call_tool(self, tool_call: Dict[str, Any]) -> str:
@@ -281,15 +286,16 @@ class ValidationAgent:
             
             return result
         except Exception as e:
-            print(f"解析最终结果失败：{e}")
+            logger.warning("解析最终结果失败：%s", e)
             return {
                 "status": "error",
                 "message": "解析验证结果失败",
                 "details": str(e)
             }
 
-# 创建全局的验证智能体实例
-validation_agent = ValidationAgent()
+# 全局的验证智能体实例，首次访问时创建（避免导入模块时就加载大模型客户端）
+_validation_agent = None
+_validation_agent_lock = threading.Lock()
 
 def get_validation_agent() -> ValidationAgent:
     """
@@ -298,4 +304,15 @@ def get_validation_agent() -> ValidationAgent:
     Returns:
         验证智能体实例
     """
-    return validation_agent
\ No newline at end of file
+    global _validation_agent
+    if _validation_agent is None:
+        with _validation_agent_lock:
+            if _validation_agent is None:
+                _validation_agent = ValidationAgent()
+    return _validation_agent
+
+def __getattr__(name: str):
+    # 兼容 from ... import validation_agent
+    if name == "validation_agent":
+        return get_validation_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
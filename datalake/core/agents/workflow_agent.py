@@ -7,8 +7,7 @@
 
 from typing import Dict, Any, List
 import json
-from langchain_openai import ChatOpenAI
-from langchain.messages import HumanMessage
+import threading
 from datalake.core.workflow.models import NodeMetadata
 from datalake.core.nodes import NODE_MAPPING
 
@@ -23,6 +22,8 @@ class WorkflowAgent:
             model_name: 使用的大模型名称
             temperature: 大模型的温度参数，控制生成结果的随机性
         """
+        from langchain_openai import ChatOpenAI
+        
         self.llm = ChatOpenAI(
             model=model_name,
             temperature=temperature,
@@ -45,6 +46,8 @@ class WorkflowAgent:
         
         from datalake.core.workflow.models import node_registry
         
+        # 节点模块按需导入，这里需要全部节点的元数据
+        NODE_MAPPING.load_all()
         for node_type in NODE_MAPPING.keys():
             # 从节点注册表中获取节点元数据
             if node_type in node_registry:
@@ -94,6 +97,8 @@ class WorkflowAgent:
         prompt_template = self._build_prompt_template(user_requirement)
         
         # 调用大模型生成流程图JSON
+        from langchain.messages import HumanMessage
+        
         messages = [HumanMessage(content=prompt_template)]
         response = self.llm.invoke(messages)
         
@@ -250,8 +255,9 @@ class WorkflowAgent:
         # 目前暂时返回原始的流程图JSON
         return workflow_json
 
-# 创建全局的工作流编排智能体实例
-workflow_agent = WorkflowAgent()
+# 全局的工作流编排智能体实例，延迟到首次使用时创建
+_workflow_agent = None
+_workflow_agent_lock = threading.Lock()
 
 def get_workflow_agent() -> WorkflowAgent:
     """
@@ -260,4 +266,15 @@ def get_workflow_agent() -> WorkflowAgent:
     Returns:
         工作流编排智能体实例
     """
-    return workflow_agent
\ No newline at end of file
+    global _workflow_agent
+    if _workflow_agent is None:
+        with _workflow_agent_lock:
+            if _workflow_agent is None:
+                _workflow_agent = WorkflowAgent()
+    return _workflow_agent
+
+def __getattr__(name: str):
+    # 兼容 from ... import workflow_agent
+    if name == "workflow_agent":
+        return get_workflow_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
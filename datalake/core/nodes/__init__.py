@@ -3,40 +3,173 @@
 # Copyright (c) VernonSong. All rights reserved.
 # ======================================================================================================================
 
-# 导入所有节点
-from .page_submit import page_submit_node
-from .table_check import table_check_node, table_check_metadata
-from .llm import llm_node
-from .sql_generate import sql_generate_node, sql_generate_metadata
-from .sql_execute import sql_execute_node, sql_execute_metadata
-from .integration_task_generate import integration_task_generate_node, integration_task_generate_metadata
-from .integration_task_deploy import integration_task_deploy_node, integration_task_deploy_metadata
-from .artifact_generate import artifact_generate_node, artifact_generate_metadata
-from .example_node import example_node
-from .data_processing import data_processing_node, InputData, ProcessingConfig, DataSourceConfig, ProcessingResult
-from .db_type_query import db_type_query_node
-from .table_field_query import table_field_query_node
-
-# 创建节点映射
-try:
-    NODE_MAPPING = {
-        "page_submit": page_submit_node,
-        "table_check": table_check_node,
-        "llm": llm_node,
-        "sql_generate": sql_generate_node,
-        "sql_execute": sql_execute_node,
-        "integration_task_generate": integration_task_generate_node,
-        "integration_task_deploy": integration_task_deploy_node,
-        "artifact_generate": artifact_generate_node,
-        "example": example_node,
-        "db_type_query": db_type_query_node,
-        "table_field_query": table_field_query_node,
-        "data_processing": data_processing_node,
-        "db_type_query": db_type_query_node
-    }
-except Exception as e:
-    print(f"Error creating NODE_MAPPING: {e}")
-    NODE_MAPPING = {}
+import importlib
+import threading
+from collections.abc import MutableMapping
+from importlib import metadata as importlib_metadata
+from typing import Any, Callable, Dict, Iterator, Tuple
+
+from datalake.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# 节点名称 -> (模块路径, 节点函数名)，节点模块在首次使用时才导入
+NODE_MODULES: Dict[str, Tuple[str, str]] = {
+    "page_submit": ("datalake.core.nodes.page_submit", "page_submit_node"),
+    "table_check": ("datalake.core.nodes.table_check", "table_check_node"),
+    "llm": ("datalake.core.nodes.llm", "llm_node"),
+    "sql_generate": ("datalake.core.nodes.sql_generate", "sql_generate_node"),
+    "sql_execute": ("datalake.core.nodes.sql_execute", "sql_execute_node"),
+    "integration_task_generate": ("datalake.core.nodes.integration_task_generate", "integration_task_generate_node"),
+    "integration_task_deploy": ("datalake.core.nodes.integration_task_deploy", "integration_task_deploy_node"),
+    "artifact_generate": ("datalake.core.nodes.artifact_generate", "artifact_generate_node"),
+    "example": ("datalake.core.nodes.example_node", "example_node"),
+    "db_type_query": ("datalake.core.nodes.db_type_query", "db_type_query_node"),
+    "table_field_query": ("datalake.core.nodes.table_field_query", "table_field_query_node"),
+    "data_processing": ("datalake.core.nodes.data_processing", "data_processing_node"),
+    "wait_gateway": ("datalake.core.nodes.wait_gateway", "wait_gateway_node")
+}
+
+# 第三方包通过该入口点组声明节点，如 my_node = "my_package.nodes:my_node"
+ENTRY_POINT_GROUP = "datalake.nodes"
+
+# 包级导出名称 -> 所在模块，按需导入
+_EXPORTS = {
+    "page_submit_node": ".page_submit",
+    "table_check_node": ".table_check",
+    "table_check_metadata": ".table_check",
+    "llm_node": ".llm",
+    "sql_generate_node": ".sql_generate",
+    "sql_generate_metadata": ".sql_generate",
+    "sql_execute_node": ".sql_execute",
+    "sql_execute_metadata": ".sql_execute",
+    "integration_task_generate_node": ".integration_task_generate",
+    "integration_task_generate_metadata": ".integration_task_generate",
+    "integration_task_deploy_node": ".integration_task_deploy",
+    "integration_task_deploy_metadata": ".integration_task_deploy",
+    "artifact_generate_node": ".artifact_generate",
+    "artifact_generate_metadata": ".artifact_generate",
+    "example_node": ".example_node",
+    "data_processing_node": ".data_processing",
+    "InputData": ".data_processing",
+    "ProcessingConfig": ".data_processing",
+    "DataSourceConfig": ".data_processing",
+    "ProcessingResult": ".data_processing",
+    "db_type_query_node": ".db_type_query",
+    "table_field_query_node": ".table_field_query",
+    "wait_gateway_node": ".wait_gateway",
+    "wait_gateway_metadata": ".wait_gateway"
+}
+
+
+class LazyNodeMapping(MutableMapping):
+    """
+    惰性节点映射
+
+    节点名称来自模块路径声明（NODE_MODULES）与入口点（ENTRY_POINT_GROUP），读取某个节点时才导入其模块，
+    模块导入时通过 register_node 完成元数据注册。直接赋值的节点函数优先于声明。
+    """
+
+    def __init__(self, modules: Dict[str, Tuple[str, str]]):
+        self._modules = dict(modules)
+        self._loaded: Dict[str, Callable] = {}
+        self._entry_points_loaded = False
+        self._lock = threading.RLock()
+
+    def declare(self, name: str, module_path: str, attr: str):
+        """声明节点所在的模块与函数名"""
+        with self._lock:
+            self._modules[name] = (module_path, attr)
+            self._loaded.pop(name, None)
+
+    def _load_entry_points(self):
+        if self._entry_points_loaded:
+            return
+        self._entry_points_loaded = True
+        try:
+            entry_points = importlib_metadata.entry_points(group=ENTRY_POINT_GROUP)
+        except Exception as e:
+            logger.warning("Failed to read node entry points: %s", e)
+            return
+        for entry_point in entry_points:
+            module_path, _, attr = entry_point.value.partition(":")
+            self._modules.setdefault(entry_point.name, (module_path.strip(), attr.strip()))
+
+    def __getitem__(self, name: str) -> Callable:
+        node_fn = self._loaded.get(name)
+        if node_fn is not None:
+            return node_fn
+        with self._lock:
+            if name in self._loaded:
+                return self._loaded[name]
+            if name not in self._modules:
+                self._load_entry_points()
+            if name not in self._modules:
+                raise KeyError(name)
+            module_path, attr = self._modules[name]
+            node_fn = getattr(importlib.import_module(module_path), attr)
+            if module_path == f"{__name__}.{attr}":
+                # 子模块与节点函数同名（example_node），导入子模块会把包属性覆盖为模块本身
+                globals()[attr] = node_fn
+            self._loaded[name] = node_fn
+            return node_fn
+
+    def __setitem__(self, name: str, node_fn: Callable):
+        with self._lock:
+            self._loaded[name] = node_fn
+
+    def __delitem__(self, name: str):
+        with self._lock:
+            found = self._loaded.pop(name, None) is not None
+            if self._modules.pop(name, None) is None and not found:
+                raise KeyError(name)
+
+    def __contains__(self, name: object) -> bool:
+        if name in self._loaded or name in self._modules:
+            return True
+        with self._lock:
+            self._load_entry_points()
+            return name in self._modules
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            self._load_entry_points()
+            names = list(self._modules)
+            names.extend(name for name in self._loaded if name not in self._modules)
+        return iter(names)
+
+    def __len__(self) -> int:
+        return len(list(iter(self)))
+
+    def load_all(self) -> Dict[str, Callable]:
+        """导入全部节点模块（需要完整的节点元数据时使用）"""
+        return {name: self[name] for name in self}
+
+
+# 节点映射
+NODE_MAPPING = LazyNodeMapping(NODE_MODULES)
+
+
+def register_node_module(name: str, module_path: str, attr: str):
+    """
+    以模块路径声明节点，节点模块在首次使用时导入
+
+    Args:
+        name: 节点名称
+        module_path: 节点模块路径
+        attr: 节点函数名
+    """
+    NODE_MAPPING.declare(name, module_path, attr)
+
+
+def __getattr__(name: str) -> Any:
+    module_path = _EXPORTS.get(name)
+    if module_path is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_path, __name__), name)
+    globals()[name] = value
+    return value
+
 
 # 导出所有节点
 __all__ = [
@@ -83,6 +216,15 @@ __all__ = [
     # 数据库类型查询节点
     "db_type_query_node",
     
+    # 表字段查询节点
+    "table_field_query_node",
+    
+    # 等待网关节点
+    "wait_gateway_node",
+    "wait_gateway_metadata",
+    
     # 节点映射
-    "NODE_MAPPING"
+    "NODE_MAPPING",
+    "NODE_MODULES",
+    "register_node_module"
 ]
\ No newline at end of file
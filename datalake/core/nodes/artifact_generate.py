@@ -1,5 +1,64 @@
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
 from datalake.core.workflow.models import NodeMetadata, NodeInputParameter, NodeOutputParameter, register_node
+from datalake.services.artifact_store import ArtifactStore, get_artifact_store
+from datalake.services.deploy_ledger import stable_definition
+from datalake.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+def _artifact_config(state: dict) -> Dict[str, Any]:
+    """node_configs.artifact_generate：store（目录或 s3://bucket/prefix）、codec、eager（立即物化的制品类型）"""
+    workflow_config = state.get("workflow_config") or {}
+    if hasattr(workflow_config, "node_configs"):
+        return workflow_config.node_configs.get("artifact_generate", {})
+    return workflow_config.get("node_configs", {}).get("artifact_generate", {})
+
+
+def artifact_store_for(workflow_config: Any) -> ArtifactStore:
+    """工作流写入制品的存储，按 node_configs.artifact_generate 的 store 与 codec 选择"""
+    config = _artifact_config({"workflow_config": workflow_config})
+    return get_artifact_store(config.get("store"), config.get("codec"))
+
+
+def _collect_artifacts(state: dict) -> Tuple[str, str, List[Dict[str, Any]]]:
+    """
+    从上游节点结果收集本次执行的制品
+
+    Returns:
+        (task_id, task_name, 制品列表)；制品为 {"name", "type", "media_type", "recipe"}
+    """
+    results = state.get("results", {})
+    generate_result = results.get("integration_task_generate", {})
+    deploy_result = results.get("integration_task_deploy", {})
+    sql_generate_result = results.get("sql_generate", {})
+    sql_execute_result = results.get("sql_execute", {})
+
+    task_name = generate_result.get("task_name") or state.get("request_id")
+    # 部署后以上游任务ID标识，未部署时退回任务名称
+    task_id = deploy_result.get("jobid") or task_name
+
+    artifacts = []
+    if sql_generate_result.get("generated_sql"):
+        artifacts.append({"name": f"{task_name}_ddl.sql", "type": "sql", "media_type": "application/sql",
+                          "recipe": {"text": sql_generate_result["generated_sql"]}})
+    if sql_execute_result.get("execution_log"):
+        artifacts.append({"name": f"{task_name}_execution.log", "type": "log", "media_type": "text/plain",
+                          "recipe": {"text": sql_execute_result["execution_log"]}})
+    # 元数据不含请求ID、时间等每次执行都不同的字段，相同任务的元数据只保存一份
+    metadata = {
+        "task_name": generate_result.get("task_name"),
+        "task_description": generate_result.get("task_description"),
+        "task_directory": generate_result.get("task_directory"),
+        "task_definition": stable_definition(generate_result["upstream_api_json"])
+        if generate_result.get("upstream_api_json") else None,
+        "sql_type": sql_generate_result.get("sql_type")
+    }
+    if any(value is not None for value in metadata.values()):
+        artifacts.append({"name": f"{task_name}_metadata.json", "type": "json", "media_type": "application/json",
+                          "recipe": {"json": metadata}})
+    return task_id, task_name, artifacts
+
 
 # 制品生成节点元数据
 artifact_generate_metadata = NodeMetadata(
@@ -61,53 +120,38 @@ artifact_generate_metadata = NodeMetadata(
 # 制品生成节点
 @register_node(artifact_generate_metadata)
 def artifact_generate_node(state: dict) -> Dict[str, Any]:
-    print(f"Executing Artifact Generate Node for request: {state.get('request_id')}")
-    
-    # 从集成任务生成结果中获取任务信息
-    integration_task_generate_result = state.get("results", {}).get("integration_task_generate", {})
-    task_id = integration_task_generate_result.get("task_id")
-    task_name = integration_task_generate_result.get("task_name")
-    task_parameters = integration_task_generate_result.get("task_parameters", {})
-    
-    # 从SQL执行结果中获取执行结果
-    sql_execute_result = state.get("results", {}).get("sql_execute", {})
-    execution_result = sql_execute_result.get("execution_result", {})
-    
-    # 模拟制品生成
-    # 随机生成制品列表
-    import random
+    """
+    制品生成
+
+    把 DDL、执行日志与任务元数据登记到内容寻址的制品存储，并写入本次执行的清单 manifests/{request_id}.json。
+    DDL 与执行日志立即压缩写入并跨执行去重；元数据默认只登记，第一次读取时才物化，
+    node_configs.artifact_generate.eager 中的类型立即物化。
+    """
+    logger.info("Executing Artifact Generate Node for request: %s", state.get("request_id"))
+
+    config = _artifact_config(state)
+    store = artifact_store_for(state.get("workflow_config"))
+    task_id, task_name, artifacts = _collect_artifacts(state)
+    run_id = state.get("request_id")
+
+    manifest = store.write_manifest(run_id, artifacts, eager=config.get("eager", ()))
+    storage_location = store.manifest_uri(run_id)
     artifacts = [
-        {
-            "name": f"{task_name}_ddl.sql",
-            "type": "sql",
-            "size": random.randint(1000, 10000),
-            "created_time": "2024-01-01 10:00:00"
-        },
-        {
-            "name": f"{task_name}_execution.log",
-            "type": "log",
-            "size": random.randint(5000, 50000),
-            "created_time": "2024-01-01 10:01:00"
-        },
-        {
-            "name": f"{task_name}_metadata.json",
-            "type": "json",
-            "size": random.randint(1000, 5000),
-            "created_time": "2024-01-01 10:02:00"
-        }
+        {key: entry[key] for key in ("name", "type", "media_type", "digest", "size", "codec", "materialized")}
+        for entry in manifest["artifacts"]
     ]
-    
-    storage_location = f"s3://datalake-artifacts/{task_id}/"
-    
+
     artifact_info = {
         "task_id": task_id,
         "task_name": task_name,
+        "run_id": run_id,
         "artifact_count": len(artifacts),
-        "total_size": sum(artifact["size"] for artifact in artifacts),
+        "materialized_count": sum(1 for artifact in artifacts if artifact["materialized"]),
+        "total_size": sum(artifact["size"] or 0 for artifact in artifacts),
         "storage_location": storage_location,
-        "created_time": "2024-01-01 10:00:00"
+        "created_time": manifest["created_time"]
     }
-    
+
     return {
         "request_id": state.get('request_id'),
         "workflow_config": state.get('workflow_config'),
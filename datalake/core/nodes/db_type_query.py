@@ -1,6 +1,9 @@
 from typing import Dict, Any, Optional
 from pydantic import BaseModel, Field
 from datalake.core.workflow.models import register_node, NodeOutputParameter
+from datalake.utils.log import get_logger
+
+logger = get_logger(__name__)
 
 # 定义输入参数结构
 class DBInfo(BaseModel):
@@ -13,6 +16,25 @@ class DBTypeResult(BaseModel):
     source_db: str = Field(..., description="源数据库名称")
     db_type: str = Field(..., description="数据库类型")
 
+def _resolve_source_db(state: Dict[str, Any]) -> str:
+    """从状态中解析源数据库名称，优先使用之前节点传递的数据库信息"""
+    results = state.get("results", {})
+    
+    # 尝试从不同节点获取数据库信息
+    db_info = None
+    for node_name in ["page_submit", "table_check", "table_field_query"]:
+        if node_name in results:
+            node_result = results[node_name]
+            if "source_db" in node_result:
+                db_info = node_result
+                break
+    
+    # 如果没有从results中获取到，尝试从source_data中获取
+    if not db_info:
+        db_info = state.get("source_data", {})
+    
+    return db_info.get("source_db", "")
+
 @register_node(
     name="db_type_query",
     description="查询上游系统，返回数据库类型",
@@ -27,7 +49,10 @@ class DBTypeResult(BaseModel):
             data_type="string"
         )
     ],
-    category="metadata"
+    category="metadata",
+    # 数据库类型只取决于源数据库名称，结果可缓存
+    cacheable=True,
+    cache_key=_resolve_source_db
 )
 def db_type_query_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """数据库类型查询节点实现
@@ -45,32 +70,15 @@ def db_type_query_node(state: Dict[str, Any]) -> Dict[str, Any]:
     Returns:
         更新后的状态字典，包含数据库类型信息
     """
-    print(f"Executing DB Type Query Node for request: {state.get('request_id')}")
+    logger.info("Executing DB Type Query Node for request: %s", state.get("request_id"))
     
     # 从状态中获取输入参数
-    # 优先从results中获取之前节点传递的数据库信息
     results = state.get("results", {})
-    
-    # 尝试从不同节点获取数据库信息
-    db_info = None
-    for node_name in ["page_submit", "table_check", "table_field_query"]:
-        if node_name in results:
-            node_result = results[node_name]
-            if "source_db" in node_result:
-                db_info = node_result
-                break
-    
-    # 如果没有从results中获取到，尝试从source_data中获取
-    if not db_info:
-        source_data = state.get("source_data", {})
-        db_info = source_data
-    
-    # 提取数据库信息
-    source_db = db_info.get("source_db", "")
+    source_db = _resolve_source_db(state)
     
     # 模拟查询上游系统的逻辑
     # 在实际应用中，这里会调用真实的上游系统API或数据库连接来获取数据库类型
-    print(f"Querying type for database {source_db} from upstream system...")
+    logger.debug("Querying type for database %s from upstream system...", source_db)
     
     # 模拟数据库类型数据
     # 根据不同的数据库名称返回不同的数据库类型，增加模拟的真实感
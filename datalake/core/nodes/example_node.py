@@ -1,5 +1,8 @@
 from typing import Dict, Any
 from datalake.core.workflow.models import NodeInputParameter, NodeOutputParameter, register_node
+from datalake.utils.log import get_logger
+
+logger = get_logger(__name__)
 
 # 示例节点 - 使用注解方式注册元数据
 @register_node(
@@ -47,7 +50,7 @@ def example_node(state: Dict[str, Any]) -> Dict[str, Any]:
     Returns:
         处理后的结果字典
     """
-    print(f"Executing Example Node for request: {state.get('request_id')}")
+    logger.info("Executing Example Node for request: %s", state.get("request_id"))
     
     # 从状态中获取输入参数
     results = state.get("results", {})
@@ -1,5 +1,56 @@
-from typing import Dict, Any
+import json
+from typing import Dict, Any, List, Optional
 from datalake.core.workflow.models import NodeMetadata, NodeInputParameter, NodeOutputParameter, register_node
+from datalake.core.workflow.simulation import simulation
+from datalake.services.deploy_client import deploy_url_from_env, get_deploy_client
+from datalake.services.deploy_ledger import (
+    IdempotentDeployer, deploy_actions, get_deploy_ledger, ledger_entry, skipped_result, task_hash, task_identity
+)
+from datalake.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# 部署客户端参数，可在 node_configs.integration_task_deploy 中配置
+CLIENT_OPTIONS = ("timeout", "max_connections", "batch_size", "max_attempts", "backoff_base")
+
+
+def _deploy_config(state: dict) -> Dict[str, Any]:
+    """集成任务部署节点在 node_configs 中的配置"""
+    workflow_config = state.get("workflow_config") or {}
+    if hasattr(workflow_config, "node_configs"):
+        return workflow_config.node_configs.get("integration_task_deploy", {})
+    return workflow_config.get("node_configs", {}).get("integration_task_deploy", {})
+
+
+def resolve_deploy_url(state: dict) -> Optional[str]:
+    """上游部署接口地址，依次取 source_data.deploy_url、node_configs 中的 deploy_url 与 DATALAKE_DEPLOY_URL"""
+    return (state.get("source_data") or {}).get("deploy_url") or _deploy_config(state).get("deploy_url") \
+        or deploy_url_from_env()
+
+
+def _idempotent(state: dict) -> bool:
+    """是否按部署台账跳过未变化的任务，node_configs 中 idempotent 为 false 时每次都重新部署"""
+    return _deploy_config(state).get("idempotent", True)
+
+
+def _deploy_target(state: dict) -> str:
+    """部署请求的下游目标，用于按目标熔断"""
+    return state.get("source_data", {}).get("deploy_endpoint") or resolve_deploy_url(state) or "integration_api"
+
+
+def _remote_policy(state: dict) -> Optional[Dict[str, Any]]:
+    """
+    部署到上游接口时不按节点策略超时与重试
+
+    新建任务的 POST 不是幂等的：响应丢失或节点超时后请求可能已被上游处理，超时的尝试也无法终止，
+    节点重试会重复部署同一批任务；部署客户端只重试确定未被处理的请求，其余失败记入结果。
+    模拟部署没有副作用，仍按节点策略重试。
+    """
+    generate_result = (state.get("results") or {}).get("integration_task_generate") or {}
+    if generate_result.get("mode") == "bulk" or resolve_deploy_url(state):
+        return {"max_attempts": 1, "timeout": None}
+    return None
+
 
 # 集成任务部署节点元数据
 integration_task_deploy_metadata = NodeMetadata(
@@ -31,14 +82,115 @@ integration_task_deploy_metadata = NodeMetadata(
             data_type="string"
         )
     ],
-    category="integration"
+    category="integration",
+    # 偶发失败重试3次，对同一上游连续失败5次后熔断30秒；部署到上游接口时不超时、不重试（见 _remote_policy）
+    policy={
+        "max_attempts": 3,
+        "backoff_base": 0.5,
+        "timeout": 30,
+        "circuit_breaker": {"failure_threshold": 5, "reset_timeout": 30}
+    },
+    circuit_target=_deploy_target,
+    policy_override=_remote_policy
 )
 
 
+def _read_bulk_tasks(path: str) -> List[Dict[str, Any]]:
+    """读取批量生成的 NDJSON 文件，跳过生成失败的行"""
+    tasks = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if "upstream_api_json" in record:
+                tasks.append(record)
+    return tasks
+
+
+def _deploy_bulk(state: dict, url: str, path: str) -> Dict[str, Any]:
+    """
+    批量部署 integration_task_generate 写出的全部任务
+
+    单个任务失败不重试整个节点：全部失败时 status 为 failed，部分失败时为 partial。
+    """
+    records = _read_bulk_tasks(path)
+    deployed = _deployer(state, url).deploy_many([record["upstream_api_json"] for record in records])
+    jobids = {record["task_name"]: result["jobid"] for record, result in zip(records, deployed)
+              if result["status"] == "success"}
+    failures = {record["task_name"]: result["deploy_message"] for record, result in zip(records, deployed)
+                if result["status"] != "success"}
+    status = "success" if not failures else ("failed" if not jobids else "partial")
+    logger.info("Bulk deployment to %s: %d deployed, %d failed", url, len(jobids), len(failures))
+    return {
+        "status": status,
+        "mode": "bulk",
+        "deployed_count": len(jobids),
+        "failed_count": len(failures),
+        "jobids": jobids,
+        "failures": failures,
+        "actions": deploy_actions(deployed),
+        "deploy_message": f"Deployed {len(jobids)} of {len(records)} tasks"
+    }
+
+
+def _deployer(state: dict, url: str) -> Any:
+    """上游的部署客户端；启用台账时包装为 IdempotentDeployer"""
+    options = {key: value for key, value in _deploy_config(state).items() if key in CLIENT_OPTIONS}
+    client = get_deploy_client(url, **options)
+    return IdempotentDeployer(client) if _idempotent(state) else client
+
+
+def _deploy_remote(state: dict, url: str, upstream_api_json: Dict[str, Any]) -> Dict[str, Any]:
+    """通过部署客户端部署单个任务"""
+    return _deployer(state, url).deploy_many([upstream_api_json])[0]
+
+
+def _deploy_simulated(state: dict, upstream_api_json: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    未配置上游部署接口时模拟部署
+
+    有任务名的任务同样记入部署台账：定义未变化时直接返回已有的 jobid，变化时保留原 jobid。
+    """
+    ledger = key = entry = None
+    if _idempotent(state) and (upstream_api_json.get("task_info") or {}).get("name"):
+        ledger = get_deploy_ledger()
+        key = f"simulated|{task_identity(upstream_api_json)}"
+        entry = ledger.get(key)
+        if entry is not None and entry["hash"] == task_hash(upstream_api_json):
+            return skipped_result(entry["jobid"])
+
+    random = simulation.rng("integration_task_deploy", state)
+    
+    # 模拟API调用延迟
+    simulation.sleep(simulation.latency("deploy", random, lambda rng: 0.5))
+    
+    # 随机生成部署结果，95%概率成功
+    is_success = not simulation.failed("deploy", random, 0.05)
+    
+    if is_success:
+        status = "success"
+        # 生成随机的jobid
+        jobid = f"JOB-{random.randint(10000000, 99999999)}"
+        deploy_message = f"Task deployed successfully, Job ID: {jobid}"
+    else:
+        status = "failed"
+        jobid = ""
+        deploy_message = f"Task deployment failed: {random.choice(['API connection error', 'Invalid JSON format', 'Permission denied', 'Server error'])}"
+    if ledger is None:
+        return {"status": status, "jobid": jobid, "deploy_message": deploy_message}
+
+    action = "created" if entry is None else "updated"
+    if is_success:
+        if entry is not None:
+            jobid = entry["jobid"]
+            deploy_message = f"Task updated, Job ID: {jobid}"
+        ledger.put(key, ledger_entry(jobid, task_hash(upstream_api_json), upstream_api_json))
+    return {"status": status, "jobid": jobid, "deploy_message": deploy_message, "action": action}
+
+
 # 集成任务部署节点
 @register_node(integration_task_deploy_metadata)
 def integration_task_deploy_node(state: dict) -> Dict[str, Any]:
-    print(f"Executing Integration Task Deploy Node for request: {state.get('request_id')}")
+    logger.info("Executing Integration Task Deploy Node for request: %s", state.get("request_id"))
     
     # 获取输入参数
     source_data = state.get("source_data", {})
@@ -52,30 +204,18 @@ def integration_task_deploy_node(state: dict) -> Dict[str, Any]:
     if not upstream_api_json:
         upstream_api_json = source_data.get("upstream_api_json", {})
     
-    print(f"Deploying task with JSON: {upstream_api_json}")
-    print(f"Task Name: {upstream_api_json.get('task_info', {}).get('name')}")
-    
-    # 模拟调用上游接口部署任务
-    import random
-    import time
-    
-    # 模拟API调用延迟
-    time.sleep(0.5)
-    
-    # 随机生成部署结果，95%概率成功
-    is_success = random.choice([True] * 19 + [False])
-    
-    if is_success:
-        status = "success"
-        # 生成随机的jobid
-        jobid = f"JOB-{random.randint(10000000, 99999999)}"
-        deploy_message = f"Task deployed successfully, Job ID: {jobid}"
+    url = resolve_deploy_url(state)
+    if integration_task_generate_result.get("mode") == "bulk":
+        if url:
+            deploy_result = _deploy_bulk(state, url, integration_task_generate_result["output_path"])
+        else:
+            deploy_result = {"status": "failed", "jobid": "",
+                             "deploy_message": "Bulk deployment requires deploy_url or DATALAKE_DEPLOY_URL"}
     else:
-        status = "failed"
-        jobid = ""
-        deploy_message = f"Task deployment failed: {random.choice(['API connection error', 'Invalid JSON format', 'Permission denied', 'Server error'])}"
-    
-    print(f"Deployment Result: {status}, JobID: {jobid}")
+        logger.debug("Deploying task with JSON: %s", upstream_api_json)
+        logger.info("Task Name: %s", upstream_api_json.get("task_info", {}).get("name"))
+        deploy_result = _deploy_remote(state, url, upstream_api_json) if url else _deploy_simulated(state, upstream_api_json)
+        logger.info("Deployment Result: %s, JobID: %s", deploy_result["status"], deploy_result["jobid"])
     
     return {
         "request_id": state.get('request_id'),
@@ -83,11 +223,7 @@ def integration_task_deploy_node(state: dict) -> Dict[str, Any]:
         "source_data": state.get('source_data'),
         "results": {
             **results,
-            "integration_task_deploy": {
-                "status": status,
-                "jobid": jobid,
-                "deploy_message": deploy_message
-            }
+            "integration_task_deploy": deploy_result
         },
         "current_node": "integration_task_deploy"
-    }
\ No newline at end of file
+    }
@@ -1,5 +1,46 @@
-from typing import Dict, Any, List
+import time
+from typing import Dict, Any, Optional
 from datalake.core.workflow.models import NodeMetadata, NodeInputParameter, NodeOutputParameter, register_node
+from datalake.services.task_templates import TaskTemplate, default_output_path
+from datalake.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+def _task_generate_config(state: dict) -> Dict[str, Any]:
+    """集成任务生成节点在 node_configs 中的配置"""
+    workflow_config = state.get("workflow_config") or {}
+    if hasattr(workflow_config, "node_configs"):
+        return workflow_config.node_configs.get("integration_task_generate", {})
+    return workflow_config.get("node_configs", {}).get("integration_task_generate", {})
+
+
+def _resolve_task_inputs(state: dict) -> Dict[str, Any]:
+    """从source_data或results中解析集成任务生成的全部输入参数"""
+    source_data = state.get("source_data", {})
+    table_check_result = state.get("results", {}).get("table_check", {})
+    return {
+        "source_db": source_data.get("source_db") or table_check_result.get("source_db", ""),
+        "source_schema": source_data.get("source_schema") or table_check_result.get("source_schema", ""),
+        "source_table": source_data.get("source_table") or table_check_result.get("source_table", ""),
+        "target_db": source_data.get("target_db") or table_check_result.get("target_db", ""),
+        "target_schema": source_data.get("target_schema") or table_check_result.get("target_schema", ""),
+        "target_table": source_data.get("target_table") or table_check_result.get("target_table", ""),
+        "field_mapping": source_data.get("field_mapping", []),
+        "username": source_data.get("username", "default_user"),
+        "integration_type": source_data.get("integration_type", "full"),
+        # 未在请求中指定时使用 node_configs 中的并行度
+        "parallelism": source_data.get("parallelism") or _task_generate_config(state).get("parallelism", 1),
+        "audit_template_name": source_data.get("audit_template_name", "default_audit")
+    }
+
+
+def _task_cache_key(state: dict) -> Optional[Dict[str, Any]]:
+    """生成任务用到的输入与 source_data.overrides；批量模式的结果是写出的文件，不缓存"""
+    source_data = state.get("source_data") or {}
+    if isinstance(source_data.get("tasks"), list):
+        return None
+    return {**_resolve_task_inputs(state), "overrides": source_data.get("overrides")}
+
 
 # 集成任务生成节点元数据
 integration_task_generate_metadata = NodeMetadata(
@@ -101,84 +142,83 @@ integration_task_generate_metadata = NodeMetadata(
             data_type="dict"
         )
     ],
-    category="integration"
+    category="integration",
+    # 任务定义只取决于输入参数，结果可缓存
+    cacheable=True,
+    cache_key=_task_cache_key
 )
 
 
+def _generate_bulk(state: dict, inputs: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    批量模式：source_data.tasks 中的每一项按同一个预编译模板渲染，逐行写入 NDJSON 文件
+
+    Args:
+        state: 工作流状态
+        inputs: 公共输入参数（创建人、集成类型、并行度、审计模板）
+
+    Returns:
+        节点结果
+    """
+    source_data = state.get("source_data", {})
+    tasks = source_data["tasks"]
+    output_path = source_data.get("output_path") or default_output_path(state.get("request_id") or "bulk")
+    template = TaskTemplate.from_inputs(inputs)
+
+    start_time = time.perf_counter()
+    with open(output_path, "w", encoding="utf-8") as output:
+        counts = template.write_ndjson(tasks, output)
+    elapsed = time.perf_counter() - start_time
+    logger.info("Rendered %d integration tasks (%d failed) to %s in %.3fs",
+                counts["rendered"], counts["failed"], output_path, elapsed)
+    return {
+        "status": "success",
+        "mode": "bulk",
+        "task_count": counts["rendered"],
+        "failed_count": counts["failed"],
+        "output_path": output_path,
+        "elapsed": elapsed,
+        "tasks_per_second": len(tasks) / elapsed if elapsed > 0 else 0.0
+    }
+
+
 # 集成任务生成节点
 @register_node(integration_task_generate_metadata)
 def integration_task_generate_node(state: dict) -> Dict[str, Any]:
-    print(f"Executing Integration Task Generate Node for request: {state.get('request_id')}")
+    logger.info("Executing Integration Task Generate Node for request: %s", state.get("request_id"))
     
     # 获取输入参数
-    source_data = state.get("source_data", {})
     results = state.get("results", {})
+    inputs = _resolve_task_inputs(state)
+    source_db = inputs["source_db"]
+    source_schema = inputs["source_schema"]
+    source_table = inputs["source_table"]
+    target_db = inputs["target_db"]
+    target_schema = inputs["target_schema"]
+    target_table = inputs["target_table"]
+    field_mapping = inputs["field_mapping"]
+    integration_type = inputs["integration_type"]
+    parallelism = inputs["parallelism"]
     
-    # 从source_data或results中获取参数
-    source_db = source_data.get("source_db") or results.get("table_check", {}).get("source_db", "")
-    source_schema = source_data.get("source_schema") or results.get("table_check", {}).get("source_schema", "")
-    source_table = source_data.get("source_table") or results.get("table_check", {}).get("source_table", "")
-    target_db = source_data.get("target_db") or results.get("table_check", {}).get("target_db", "")
-    target_schema = source_data.get("target_schema") or results.get("table_check", {}).get("target_schema", "")
-    target_table = source_data.get("target_table") or results.get("table_check", {}).get("target_table", "")
-    field_mapping = source_data.get("field_mapping", [])
-    username = source_data.get("username", "default_user")
-    integration_type = source_data.get("integration_type", "full")
-    parallelism = source_data.get("parallelism", 1)
-    audit_template_name = source_data.get("audit_template_name", "default_audit")
-    
-    print(f"Source: {source_db}.{source_schema}.{source_table}")
-    print(f"Target: {target_db}.{target_schema}.{target_table}")
-    print(f"Integration Type: {integration_type}, Parallelism: {parallelism}")
-    print(f"Field Mapping: {field_mapping}")
-    
-    # 生成集成任务
-    task_name = f"{source_db}_{source_schema}_{source_table}_to_{target_db}_{target_schema}_{target_table}_{integration_type}"
-    task_description = f"从{source_db}.{source_schema}.{source_table}到{target_db}.{target_schema}.{target_table}的{integration_type}集成任务"
-    task_directory = f"/integration_tasks/{source_db}/{source_schema}/{source_table}/{target_db}/{target_schema}/{target_table}"
+    if isinstance(state.get("source_data", {}).get("tasks"), list):
+        return {
+            "request_id": state.get('request_id'),
+            "workflow_config": state.get('workflow_config'),
+            "source_data": state.get('source_data'),
+            "results": {**results, "integration_task_generate": _generate_bulk(state, inputs)},
+            "current_node": "integration_task_generate"
+        }
+
+    logger.debug("Source: %s.%s.%s", source_db, source_schema, source_table)
+    logger.debug("Target: %s.%s.%s", target_db, target_schema, target_table)
+    logger.debug("Integration Type: %s, Parallelism: %s", integration_type, parallelism)
+    logger.debug("Field Mapping: %s", field_mapping)
     
-    # 生成调用上游接口的JSON
-    import random
-    import time
-    upstream_api_json = {
-        "task_info": {
-            "name": task_name,
-            "description": task_description,
-            "type": integration_type,
-            "create_by": username,
-            "create_time": time.strftime("%Y-%m-%d %H:%M:%S"),
-            "update_time": time.strftime("%Y-%m-%d %H:%M:%S")
-        },
-        "source": {
-            "db": source_db,
-            "schema": source_schema,
-            "table": source_table,
-            "type": "mysql"
-        },
-        "target": {
-            "db": target_db,
-            "schema": target_schema,
-            "table": target_table,
-            "type": "hive"
-        },
-        "field_mapping": field_mapping,
-        "advanced_settings": {
-            "parallelism": parallelism,
-            "retry_count": 3,
-            "timeout": 3600,
-            "audit_template": audit_template_name
-        },
-        "schedule": {
-            "type": "cron",
-            "expression": "0 0 * * *",
-            "start_time": "2024-01-01 00:00:00"
-        },
-        "tags": [
-            f"source:{source_db}",
-            f"target:{target_db}",
-            f"type:{integration_type}"
-        ]
-    }
+    # 生成集成任务与调用上游接口的JSON
+    template = TaskTemplate.from_inputs(inputs)
+    item = {**inputs, "overrides": state.get("source_data", {}).get("overrides")}
+    task_name, task_description, task_directory = template.names(item)
+    upstream_api_json = template.render(item)
     
     return {
         "request_id": state.get('request_id'),
@@ -1,5 +1,9 @@
 from typing import Dict, Any
 from datalake.core.workflow.models import NodeInputParameter, NodeOutputParameter, register_node
+from datalake.core.workflow.simulation import simulation
+from datalake.utils.log import get_logger
+
+logger = get_logger(__name__)
 
 # LLM节点 - 使用新的装饰器语法直接注册元数据
 @register_node(
@@ -41,7 +45,7 @@ from datalake.core.workflow.models import NodeInputParameter, NodeOutputParamete
     category="ai"
 )
 def llm_node(state: dict) -> Dict[str, Any]:
-    print(f"Executing LLM Node for request: {state.get('request_id')}")
+    logger.info("Executing LLM Node for request: %s", state.get("request_id"))
     
     # 从状态中获取输入参数
     results = state.get("results", {})
@@ -67,6 +71,7 @@ def llm_node(state: dict) -> Dict[str, Any]:
     model_name = node_config.get("model_name", "gpt-4")
     
     # 模拟LLM调用
+    simulation.sleep(simulation.latency("llm", simulation.rng("llm", state), lambda rng: 0))
     response = f"This is a mock response from {model_name} for prompt: '{prompt}'"
     tokens_used = len(prompt) + len(response)
     
@@ -1,6 +1,9 @@
 from typing import Dict, Any
 from pydantic import BaseModel, Field
 from datalake.core.workflow.models import register_node, NodeOutputParameter
+from datalake.utils.log import get_logger
+
+logger = get_logger(__name__)
 
 # 定义输入参数结构
 class InputData(BaseModel):
@@ -78,7 +81,7 @@ def page_submit_node(state: Dict[str, Any]) -> Dict[str, Any]:
     Returns:
         更新后的状态字典，包含提取的入湖信息
     """
-    print(f"Executing Page Submit Node for request: {state.get('request_id')}")
+    logger.info("Executing Page Submit Node for request: %s", state.get("request_id"))
     
     # 从状态中获取输入参数
     source_data = state.get("source_data", {})
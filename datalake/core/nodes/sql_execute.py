@@ -1,5 +1,9 @@
 from typing import Dict, Any
 from datalake.core.workflow.models import NodeMetadata, NodeInputParameter, NodeOutputParameter, register_node
+from datalake.core.workflow.simulation import simulation
+from datalake.utils.log import get_logger
+
+logger = get_logger(__name__)
 
 # SQL执行节点元数据
 sql_execute_metadata = NodeMetadata(
@@ -71,7 +75,7 @@ sql_execute_metadata = NodeMetadata(
 # SQL执行节点
 @register_node(sql_execute_metadata)
 def sql_execute_node(state: dict) -> Dict[str, Any]:
-    print(f"Executing SQL Execute Node for request: {state.get('request_id')}")
+    logger.info("Executing SQL Execute Node for request: %s", state.get("request_id"))
     
     # 获取输入参数
     source_data = state.get("source_data", {})
@@ -94,21 +98,21 @@ def sql_execute_node(state: dict) -> Dict[str, Any]:
     if not database_type:
         database_type = sql_generate_result.get("database_type", "hive")
     
-    print(f"Database: {database_name} ({database_type})")
-    print(f"SQL to execute: {sql[:100]}..." if sql and len(sql) > 100 else f"SQL to execute: {sql}")
+    logger.debug("Database: %s (%s)", database_name, database_type)
+    logger.debug("SQL to execute: %s", sql)
     
     # 模拟SQL执行
     # 随机生成执行结果，95%概率成功
-    import random
     import time
-    is_success = random.choice([True] * 19 + [False])
+    random = simulation.rng("sql_execute", state)
+    is_success = not simulation.failed("sql", random, 0.05)
     
     # 记录执行开始时间
     start_time = time.time()
     
     # 模拟执行延迟
-    execution_delay = random.randint(100, 5000) / 1000  # 转换为秒
-    time.sleep(execution_delay)
+    execution_delay = simulation.latency("sql", random, lambda rng: rng.randint(100, 5000) / 1000)  # 秒
+    simulation.sleep(execution_delay)
     
     # 记录执行结束时间
     end_time = time.time()
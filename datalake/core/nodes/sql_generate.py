@@ -1,16 +1,23 @@
 from typing import Dict, Any, List, Optional
 from pydantic import BaseModel, Field
 from datalake.core.workflow.models import register_node, NodeOutputParameter, NodeInputParameter, NodeMetadata
+from datalake.core.workflow.simulation import simulation
 import os
 from dotenv import load_dotenv
 from typing import Any, Dict, List, Optional
-from langchain_openai import OpenAI
-from langchain_core.prompts import PromptTemplate
 import json
+from datalake.utils.log import get_logger
+
+logger = get_logger(__name__)
 
 # 加载环境变量
 load_dotenv()
 
+# 大模型默认温度
+DEFAULT_TEMPERATURE = 0.3
+# 温度不高于该值时生成结果可缓存
+CACHEABLE_TEMPERATURE = 0.3
+
 # 定义输入参数结构
 class SourceField(BaseModel):
     """源表字段信息"""
@@ -39,46 +46,17 @@ class SQLGenerateResult(BaseModel):
     execution_plan: Optional[str] = Field(None, description="执行计划")
 
 
-# SQL生成节点
-@register_node(
-    name="sql_generate",
-    description="SQL生成节点，根据源表信息和湖库信息生成湖表的建表DDL",
-    type="task",
-    inputs=[
-        {"name": "source_db_type", "description": "源表数据库类型", "data_type": "string", "required": True},
-        {"name": "source_fields", "description": "源表字段列表", "data_type": "list", "required": True},
-        {"name": "lake_db_type", "description": "湖库类型", "data_type": "string", "required": True},
-        {"name": "lake_schema", "description": "湖库schema", "data_type": "string", "required": True},
-        {"name": "lake_table", "description": "湖库表名", "data_type": "string", "required": True},
-    ],
-    outputs=[
-        NodeOutputParameter(
-            name="status",
-            description="生成状态",
-            data_type="string"
-        ),
-        NodeOutputParameter(
-            name="generated_sql",
-            description="生成的SQL语句",
-            data_type="string"
-        ),
-        NodeOutputParameter(
-            name="sql_type",
-            description="SQL类型",
-            data_type="string"
-        ),
-        NodeOutputParameter(
-            name="execution_plan",
-            description="执行计划",
-            data_type="string"
-        )
-    ],
-    category="transformation"
-)
-def sql_generate_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    print(f"Executing SQL Generate Node for request: {state.get('request_id')}")
-    
-    # 从状态中获取输入参数
+def _sql_generate_config(state: Dict[str, Any]) -> Dict[str, Any]:
+    """获取sql_generate节点配置"""
+    workflow_config = state.get("workflow_config") or {}
+    # 检查workflow_config是否为Pydantic模型
+    if hasattr(workflow_config, "node_configs"):
+        return workflow_config.node_configs.get("sql_generate", {})
+    return workflow_config.get("node_configs", {}).get("sql_generate", {})
+
+
+def _collect_inputs(state: Dict[str, Any]) -> Dict[str, Any]:
+    """从不同节点的结果和源数据中收集SQL生成的输入参数"""
     results = state.get("results", {})
     source_data = state.get("source_data", {})
     
@@ -128,12 +106,126 @@ def sql_generate_node(state: Dict[str, Any]) -> Dict[str, Any]:
             {"name": "create_time", "type": "datetime", "length": None, "precision": None, "nullable": False, "primary_key": False, "comment": "创建时间"}
         ]
     
+    return {
+        "source_db_type": source_db_type,
+        "source_fields": source_fields,
+        "lake_db_type": lake_db_type,
+        "lake_schema": lake_schema,
+        "lake_table": lake_table
+    }
+
+
+def _sql_generate_cache_key(state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """温度不高于 CACHEABLE_TEMPERATURE 时，生成结果视为由输入决定，可缓存"""
+    temperature = _sql_generate_config(state).get("temperature", DEFAULT_TEMPERATURE)
+    if temperature > CACHEABLE_TEMPERATURE:
+        return None
+    return {**_collect_inputs(state), "temperature": temperature}
+
+
+# SQL生成节点
+def _invoke_llm(prompt: str, temperature: float) -> str:
+    """调用阿里云大模型，返回响应文本"""
+    # 准备大模型调用参数
+    aliyun_key = os.getenv("ALIYUN_KEY")
+    if not aliyun_key:
+        raise ValueError("ALIYUN_KEY not found in environment variables")
+    
+    from langchain_openai import ChatOpenAI
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.messages import HumanMessage
+    
+    # 初始化ChatOpenAI客户端
+    llm = ChatOpenAI(
+        model="qwen-plus",
+        api_key=aliyun_key,
+        base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
+        temperature=temperature,
+        max_tokens=1000
+    )
+    
+    # 直接使用HumanMessage创建提示，避免模板变量解析问题
+    messages = [HumanMessage(content=prompt)]
+    prompt_template = ChatPromptTemplate.from_messages(messages)
+    
+    # 构建chain
+    chain = prompt_template | llm
+    
+    # 调用模型生成SQL
+    logger.debug("调用langchain生成SQL，模型: qwen-plus...")
+    response = chain.invoke({})
+    
+    # 查看完整响应内容
+    logger.debug("大模型完整响应: %s", response)
+    return response.content
+
+
+def _simulate_llm(state: Dict[str, Any], lake_schema: str, lake_table: str, source_fields: List[Dict[str, Any]]) -> str:
+    """模拟大模型调用：等待模拟延迟，按模拟失败率返回空结果，否则返回与真实响应同格式的建表语句"""
+    random = simulation.rng("sql_generate", state)
+    simulation.sleep(simulation.latency("llm", random, lambda rng: 0))
+    if simulation.failed("llm", random, 0):
+        return ""
+    columns = ", ".join(f"{field['name']} {field['type']}" for field in source_fields) or "id INT"
+    return json.dumps({
+        "generated_sql": f"CREATE TABLE {lake_schema}.{lake_table} ({columns})",
+        "sql_type": "create_table",
+        "execution_plan": "simulated"
+    }, ensure_ascii=False)
+
+
+@register_node(
+    name="sql_generate",
+    description="SQL生成节点，根据源表信息和湖库信息生成湖表的建表DDL",
+    type="task",
+    inputs=[
+        {"name": "source_db_type", "description": "源表数据库类型", "data_type": "string", "required": True},
+        {"name": "source_fields", "description": "源表字段列表", "data_type": "list", "required": True},
+        {"name": "lake_db_type", "description": "湖库类型", "data_type": "string", "required": True},
+        {"name": "lake_schema", "description": "湖库schema", "data_type": "string", "required": True},
+        {"name": "lake_table", "description": "湖库表名", "data_type": "string", "required": True},
+    ],
+    outputs=[
+        NodeOutputParameter(
+            name="status",
+            description="生成状态",
+            data_type="string"
+        ),
+        NodeOutputParameter(
+            name="generated_sql",
+            description="生成的SQL语句",
+            data_type="string"
+        ),
+        NodeOutputParameter(
+            name="sql_type",
+            description="SQL类型",
+            data_type="string"
+        ),
+        NodeOutputParameter(
+            name="execution_plan",
+            description="执行计划",
+            data_type="string"
+        )
+    ],
+    category="transformation",
+    cacheable=True,
+    cache_key=_sql_generate_cache_key,
+    # 大模型调用可能长时间无响应：单次最多等待120秒，失败后重试一次
+    policy={"max_attempts": 2, "backoff_base": 1.0, "timeout": 120}
+)
+def sql_generate_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    logger.info("Executing SQL Generate Node for request: %s", state.get("request_id"))
+    
+    # 从状态中获取输入参数
+    inputs = _collect_inputs(state)
+    source_db_type = inputs["source_db_type"]
+    source_fields = inputs["source_fields"]
+    lake_db_type = inputs["lake_db_type"]
+    lake_schema = inputs["lake_schema"]
+    lake_table = inputs["lake_table"]
+    temperature = _sql_generate_config(state).get("temperature", DEFAULT_TEMPERATURE)
+    
     try:
-        # 准备大模型调用参数
-        aliyun_key = os.getenv("ALIYUN_KEY")
-        if not aliyun_key:
-            raise ValueError("ALIYUN_KEY not found in environment variables")
-        
         # 构建大模型提示词
         fields_str = "\n".join([
             f"- {field['name']} {field['type']} {field.get('length', '')} {field.get('precision', '')} {field.get('comment', '')}{' 主键' if field.get('primary_key') else ''}"
@@ -171,47 +263,24 @@ def sql_generate_node(state: Dict[str, Any]) -> Dict[str, Any]:
 }}
 """
         
-        print("调用阿里云大模型生成SQL...")
-        print(f"提示词：{prompt[:200]}...")
+        logger.info("调用阿里云大模型生成SQL...")
+        logger.debug("提示词：%s", prompt)
         
-        # 调用阿里云大模型API
-        # 使用langchain调用阿里云大模型
+        # 调用阿里云大模型API；模拟模式下按配置的延迟返回模拟结果
         try:
-            from langchain_openai import ChatOpenAI
-            from langchain_core.prompts import ChatPromptTemplate
-            from langchain_core.messages import HumanMessage
-            
-            # 初始化ChatOpenAI客户端
-            llm = ChatOpenAI(
-                model="qwen-plus",
-                api_key=aliyun_key,
-                base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
-                temperature=0.3,
-                max_tokens=1000
-            )
-            
-            # 直接使用HumanMessage创建提示，避免模板变量解析问题
-            messages = [HumanMessage(content=prompt)]
-            prompt_template = ChatPromptTemplate.from_messages(messages)
-            
-            # 构建chain
-            chain = prompt_template | llm
-            
-            # 调用模型生成SQL
-            print(f"调用langchain生成SQL，模型: qwen-plus...")
-            response = chain.invoke({})
-            
-            # 查看完整响应内容
-            print(f"大模型完整响应: {response}")
+            if simulation.enabled:
+                response_content = _simulate_llm(state, lake_schema, lake_table, source_fields)
+            else:
+                response_content = _invoke_llm(prompt, temperature)
             
             # 处理模型响应
             generated_sql = None
             sql_type = "create_table"
             execution_plan = None
             
-            if response.content:
+            if response_content:
                 try:
-                    response_content = response.content.strip()
+                    response_content = response_content.strip()
                     # 移除可能的代码块标记
                     if response_content.startswith('```json'):
                         response_content = response_content[7:]
@@ -223,8 +292,8 @@ def sql_generate_node(state: Dict[str, Any]) -> Dict[str, Any]:
                     sql_type = model_result.get("sql_type", "insert")
                     execution_plan = model_result.get("execution_plan")
                 except json.JSONDecodeError as e:
-                    print(f"JSON解析异常: {e}")
-                    print(f"响应内容: {repr(response.content)}")
+                    logger.warning("JSON解析异常: %s", e)
+                    logger.debug("响应内容: %r", response_content)
             
             if generated_sql is None or generated_sql.strip() == "":
                 # 大模型调用失败，直接抛出异常
@@ -254,7 +323,7 @@ def sql_generate_node(state: Dict[str, Any]) -> Dict[str, Any]:
         }
         
     except Exception as e:
-        print(f"SQL生成失败: {str(e)}")
+        logger.error("SQL生成失败: %s", e)
         return {
             "request_id": state.get('request_id'),
             "workflow_config": state.get('workflow_config'),
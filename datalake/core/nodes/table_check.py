@@ -1,5 +1,20 @@
 from typing import Dict, Any
 from datalake.core.workflow.models import NodeMetadata, NodeInputParameter, NodeOutputParameter, register_node
+from datalake.core.quality.engine import check_source
+from datalake.core.quality.incremental import incremental_check
+from datalake.core.quality.sampling import sample_check
+from datalake.core.workflow.simulation import simulation
+from datalake.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# 未配置表结构时使用的默认列
+DEFAULT_COLUMNS = [
+    {"name": "id", "type": "int", "primary_key": True},
+    {"name": "name", "type": "string", "not_null": True},
+    {"name": "value", "type": "float"},
+    {"name": "create_time", "type": "timestamp"}
+]
 
 # 表检查节点元数据
 table_check_metadata = NodeMetadata(
@@ -73,7 +88,17 @@ table_check_metadata = NodeMetadata(
 # 入湖表检查节点
 @register_node(table_check_metadata)
 def table_check_node(state: dict) -> Dict[str, Any]:
-    print(f"Executing Table Check Node for request: {state.get('request_id')}")
+    """
+    入湖表检查
+
+    配置了数据源（source_data.check_source 或 node_configs.table_check.source）时，
+    由数据质量引擎读取一遍源表数据并执行全部规则，返回各规则的违规行数与违规样本；
+    配置 node_configs.table_check.sampling 时只检查样本，给出违规率的置信区间，无法判定的规则再全量检查；
+    配置 node_configs.table_check.incremental（partition_column、watermark_column）时只检查新增或变化的分区，
+    与缓存的其他分区结果合并。
+    未配置数据源时按模拟结果返回。表结构取 node_configs.table_check.columns。
+    """
+    logger.info("Executing Table Check Node for request: %s", state.get("request_id"))
     
     # 获取检查规则配置
     workflow_config = state.get("workflow_config", {})
@@ -95,26 +120,6 @@ def table_check_node(state: dict) -> Dict[str, Any]:
     lake_schema = page_submit_result.get("lake_schema")
     lake_table = page_submit_result.get("lake_table")
     
-    # 模拟表检查逻辑
-    # 随机生成检查结果，50%概率通过
-    import random
-    is_passed = random.choice([True, False])
-    
-    check_results = {
-        source_table: {
-            "passed": is_passed,
-            "checks": []
-        }
-    }
-    
-    for rule in check_rules:
-        status = "passed" if is_passed else "failed"
-        check_results[source_table]["checks"].append({
-            "rule": rule,
-            "status": status,
-            "message": f"{rule} check {status} for table {source_table}"
-        })
-    
     # 定义表结构
     table_schema = {
         "source_db": source_db,
@@ -123,13 +128,69 @@ def table_check_node(state: dict) -> Dict[str, Any]:
         "lake_db": lake_db,
         "lake_schema": lake_schema,
         "lake_table": lake_table,
-        "columns": [
-            {"name": "id", "type": "int", "primary_key": True},
-            {"name": "name", "type": "string", "not_null": True},
-            {"name": "value", "type": "float"},
-            {"name": "create_time", "type": "timestamp"}
-        ]
+        "columns": node_config.get("columns", DEFAULT_COLUMNS)
     }
+
+    source = (state.get("source_data") or {}).get("check_source") or node_config.get("source")
+    error_message = ""
+    if source:
+        try:
+            sampling = node_config.get("sampling")
+            incremental = node_config.get("incremental")
+            if incremental:
+                report = incremental_check(source, check_rules, table_schema, incremental,
+                                           sample_size=node_config.get("sample_size", 5))
+            elif sampling:
+                report = sample_check(source, check_rules, table_schema,
+                                      sampling if isinstance(sampling, dict) else None,
+                                      sample_size=node_config.get("sample_size", 5))
+            else:
+                report = check_source(source, check_rules, table_schema, sample_size=node_config.get("sample_size", 5))
+            is_passed = report["passed"]
+            checks = report["rules"]
+            check_results = {
+                source_table: {
+                    "passed": is_passed,
+                    "rows_checked": report["rows"],
+                    "elapsed": report["elapsed"],
+                    "checks": checks
+                }
+            }
+            if incremental:
+                check_results[source_table].update(
+                    {key: report.get(key) for key in ("checked_partitions", "cached_partitions", "watermark",
+                                                       "escalated")})
+            elif sampling:
+                check_results[source_table].update(sample_rows=report["sample_rows"], escalated=report["escalated"])
+            if not is_passed:
+                failed_rules = sorted({check["rule"] for check in checks if check["status"] != "passed"})
+                error_message = f"Table {source_table} failed check: {', '.join(failed_rules)}"
+        except Exception as e:
+            logger.exception("Table check failed for table %s: %s", source_table, e)
+            is_passed = False
+            check_results = {source_table: {"passed": False, "checks": []}}
+            error_message = f"Table {source_table} check error: {e}"
+    else:
+        # 模拟表检查逻辑
+        # 随机生成检查结果，50%概率通过
+        is_passed = not simulation.failed("table_check", simulation.rng("table_check", state), 0.5)
+
+        check_results = {
+            source_table: {
+                "passed": is_passed,
+                "checks": []
+            }
+        }
+
+        for rule in check_rules:
+            status = "passed" if is_passed else "failed"
+            check_results[source_table]["checks"].append({
+                "rule": rule,
+                "status": status,
+                "message": f"{rule} check {status} for table {source_table}"
+            })
+        if not is_passed:
+            error_message = f"Table {source_table} failed check"
     
     return {
         "request_id": state.get('request_id'),
@@ -140,9 +201,9 @@ def table_check_node(state: dict) -> Dict[str, Any]:
             "table_check": {
                 "status": "success" if is_passed else "failed",
                 "check_result": check_results,
-                "error_message": f"Table {source_table} failed check" if not is_passed else "",
+                "error_message": error_message,
                 "table_schema": table_schema
             }
         },
         "current_node": "table_check"
-    }
\ No newline at end of file
+    }
@@ -1,6 +1,9 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from pydantic import BaseModel, Field
 from datalake.core.workflow.models import register_node, NodeOutputParameter
+from datalake.utils.log import get_logger
+
+logger = get_logger(__name__)
 
 # 定义输入参数结构
 class TableInfo(BaseModel):
@@ -29,6 +32,29 @@ class TableFieldResult(BaseModel):
     fields: List[FieldInfo] = Field(..., description="字段列表")
     total_fields: int = Field(..., description="字段总数")
 
+def _resolve_table_info(state: Dict[str, Any]) -> Tuple[str, str, str]:
+    """从状态中解析源表信息（库、schema、表），优先使用之前节点传递的表信息"""
+    results = state.get("results", {})
+    
+    # 尝试从不同节点获取表信息
+    table_info = None
+    for node_name in ["page_submit", "table_check"]:
+        if node_name in results:
+            node_result = results[node_name]
+            if all(key in node_result for key in ["source_db", "source_schema", "source_table"]):
+                table_info = node_result
+                break
+    
+    # 如果没有从results中获取到，尝试从source_data中获取
+    if not table_info:
+        table_info = state.get("source_data", {})
+    
+    return (
+        table_info.get("source_db", ""),
+        table_info.get("source_schema", ""),
+        table_info.get("source_table", "")
+    )
+
 @register_node(
     name="table_field_query",
     description="查询上游系统，返回表的字段信息",
@@ -50,7 +76,10 @@ class TableFieldResult(BaseModel):
             data_type="integer"
         )
     ],
-    category="metadata"
+    category="metadata",
+    # 字段信息只取决于源表，结果可缓存
+    cacheable=True,
+    cache_key=_resolve_table_info
 )
 def table_field_query_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """表字段查询节点实现
@@ -68,34 +97,15 @@ def table_field_query_node(state: Dict[str, Any]) -> Dict[str, Any]:
     Returns:
         更新后的状态字典，包含表的字段信息
     """
-    print(f"Executing Table Field Query Node for request: {state.get('request_id')}")
+    logger.info("Executing Table Field Query Node for request: %s", state.get("request_id"))
     
     # 从状态中获取输入参数
-    # 优先从results中获取之前节点传递的表信息
     results = state.get("results", {})
-    
-    # 尝试从不同节点获取表信息
-    table_info = None
-    for node_name in ["page_submit", "table_check"]:
-        if node_name in results:
-            node_result = results[node_name]
-            if all(key in node_result for key in ["source_db", "source_schema", "source_table"]):
-                table_info = node_result
-                break
-    
-    # 如果没有从results中获取到，尝试从source_data中获取
-    if not table_info:
-        source_data = state.get("source_data", {})
-        table_info = source_data
-    
-    # 提取表信息
-    source_db = table_info.get("source_db", "")
-    source_schema = table_info.get("source_schema", "")
-    source_table = table_info.get("source_table", "")
+    source_db, source_schema, source_table = _resolve_table_info(state)
     
     # 模拟查询上游系统的逻辑
     # 在实际应用中，这里会调用真实的上游系统API或数据库连接来获取字段信息
-    print(f"Querying fields for table {source_db}.{source_schema}.{source_table} from upstream system...")
+    logger.debug("Querying fields for table %s.%s.%s from upstream system...", source_db, source_schema, source_table)
     
     # 模拟字段数据
     # 根据不同的表名返回不同的字段列表，增加模拟的真实感
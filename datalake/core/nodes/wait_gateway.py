@@ -0,0 +1,158 @@
+import datetime
+import time
+from typing import Dict, Any, List, Optional
+from langgraph.types import interrupt
+from datalake.core.workflow.models import NodeMetadata, NodeInputParameter, NodeOutputParameter, register_node
+from datalake.core.nodes.integration_task_deploy import resolve_deploy_url
+from datalake.core.workflow.waits import WAIT_TYPES
+from datalake.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+def _wait_config(state: dict) -> Dict[str, Any]:
+    """等待配置：source_data.wait_config 覆盖 node_configs.wait_gateway"""
+    workflow_config = state.get("workflow_config") or {}
+    if hasattr(workflow_config, "node_configs"):
+        node_config = workflow_config.node_configs.get("wait_gateway", {})
+    else:
+        node_config = workflow_config.get("node_configs", {}).get("wait_gateway", {})
+    return {**node_config, **((state.get("source_data") or {}).get("wait_config") or {})}
+
+
+def _deployed_jobids(state: dict) -> List[str]:
+    """integration_task_deploy 部署的 jobid（单个任务或批量部署）"""
+    deploy_result = state.get("results", {}).get("integration_task_deploy", {})
+    if deploy_result.get("jobids"):
+        return sorted(deploy_result["jobids"].values())
+    return [deploy_result["jobid"]] if deploy_result.get("jobid") else []
+
+
+def _wait_until(wait_type: str, wait_config: Dict[str, Any], wait_condition: Dict[str, Any]) -> Optional[float]:
+    """
+    定时器的触发时间戳
+
+    time_delay 取 condition.seconds（相对）或 condition.until（ISO 时间）；
+    其他类型取 timeout（秒），到期后以超时结束等待。
+    """
+    if wait_type == "time_delay":
+        if wait_condition.get("until"):
+            return datetime.datetime.fromisoformat(wait_condition["until"]).timestamp()
+        return time.time() + float(wait_condition.get("seconds", 0))
+    timeout = wait_condition.get("timeout", wait_config.get("timeout"))
+    return time.time() + float(timeout) if timeout else None
+
+
+def _wait_result(wait_type: str, value: Dict[str, Any]) -> Dict[str, Any]:
+    """根据恢复时 interrupt 的返回值整理等待结果"""
+    if value.get("cancelled"):
+        return {"status": "cancelled", "wait_completed": False}
+    if value.get("timed_out"):
+        return {"status": "failed", "wait_completed": False, "error_message": f"Wait for {wait_type} timed out"}
+    if wait_type == "manual_approval":
+        approved = bool(value.get("approved"))
+        return {
+            "status": "completed" if approved else "failed",
+            "wait_completed": True,
+            "approved": approved,
+            "approver": value.get("approver", ""),
+            "comment": value.get("comment", "")
+        }
+    if wait_type == "external_event":
+        return {"status": "completed", "wait_completed": True, "event": value.get("event"),
+                "event_payload": value.get("payload", {})}
+    return {"status": "completed", "wait_completed": True, "fired_at": value.get("fired_at")}
+
+
+# 等待网关节点元数据
+wait_gateway_metadata = NodeMetadata(
+    name="wait_gateway",
+    description="等待网关节点，挂起工作流直到等待条件满足",
+    type="gateway",
+    inputs=[
+        NodeInputParameter(
+            name="wait_config",
+            description="等待配置 {type, condition, timeout}，type 为 manual_approval、external_event、time_delay 或 job_status",
+            data_type="dict",
+            required=False
+        )
+    ],
+    outputs=[
+        NodeOutputParameter(
+            name="status",
+            description="等待结果",
+            data_type="string"
+        ),
+        NodeOutputParameter(
+            name="job_statuses",
+            description="各部署任务的终态",
+            data_type="dict"
+        )
+    ],
+    category="gateway"
+)
+
+
+# 等待网关节点
+@register_node(wait_gateway_metadata)
+def wait_gateway_node(state: dict) -> Dict[str, Any]:
+    """
+    等待网关
+
+    以 interrupt 挂起工作流直到等待条件满足，挂起期间不占用线程，执行状态保存在检查点中：
+
+    - manual_approval：等待审批，WorkflowManager.approve 恢复，未通过时 status 为 failed
+    - external_event：等待 condition.event 指定的事件（默认以 request_id 为事件名），WorkflowManager.signal 恢复
+    - time_delay：等待 condition.seconds 秒或到 condition.until，由定时器恢复
+    - job_status：等待 integration_task_deploy 部署的任务结束，由任务状态跟踪器恢复，任一任务未成功时 status 为 failed
+
+    除 time_delay 外都可以配置 timeout（秒），超时后 status 为 failed；取消等待时 status 为 cancelled。
+    """
+    logger.info("Executing Wait Gateway Node for request: %s", state.get("request_id"))
+
+    wait_config = _wait_config(state)
+    wait_type = wait_config.get("type", "manual_approval")
+    wait_condition = wait_config.get("condition", {})
+    result = {"wait_type": wait_type, "wait_condition": wait_condition}
+
+    if wait_type == "job_status":
+        jobids = _deployed_jobids(state)
+        url = resolve_deploy_url(state) if jobids else None
+        if url:
+            job_statuses = interrupt({"type": "job_status", "jobids": jobids, "deploy_url": url})
+            if job_statuses.get("cancelled") is True:
+                result.update(_wait_result(wait_type, job_statuses))
+            else:
+                failed = sorted(jobid for jobid, status in job_statuses.items()
+                                if status.get("status") != "succeeded")
+                result.update({
+                    "status": "failed" if failed else "completed",
+                    "job_statuses": job_statuses,
+                    "failed_jobs": failed,
+                    "wait_completed": True
+                })
+        else:
+            # 没有可等待的任务（或模拟部署）时直接通过
+            result.update({"status": "completed", "wait_completed": True})
+    else:
+        if wait_type not in WAIT_TYPES:
+            raise ValueError(f"Unsupported wait type: {wait_type}")
+        wait_until = _wait_until(wait_type, wait_config, wait_condition)
+        if wait_type == "time_delay" and wait_until <= time.time():
+            result.update({"status": "completed", "wait_completed": True})
+        else:
+            event = (wait_condition.get("event") or state.get("request_id")) if wait_type == "external_event" else None
+            value = interrupt({"type": wait_type, "condition": wait_condition, "event": event,
+                               "wait_until": wait_until, "node": "wait_gateway"})
+            result.update(_wait_result(wait_type, value))
+
+    return {
+        "request_id": state.get('request_id'),
+        "workflow_config": state.get('workflow_config'),
+        "source_data": state.get('source_data'),
+        "results": {
+            **state.get('results', {}),
+            "wait_gateway": result
+        },
+        "current_node": "wait_gateway"
+    }
@@ -0,0 +1,6 @@
+# 欲买桂花同载酒，
+# 终不似、少年游。
+# Copyright (c) VernonSong. All rights reserved.
+# ======================================================================================================================
+from datalake.core.processing.engine import *
+from datalake.core.processing.sources import *
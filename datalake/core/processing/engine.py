@@ -0,0 +1,448 @@
+# 欲买桂花同载酒，
+# 终不似、少年游。
+# Copyright (c) VernonSong. All rights reserved.
+# ======================================================================================================================
+"""
+向量化数据处理引擎
+
+数据按批加载为 (行数, 列数) 的 float64 矩阵，逐批做向量化变换：
+
+- min_max：按全局最小/最大值缩放到 feature_range
+- z_score：按全局均值/标准差标准化
+- log：log(x + offset)
+- batch_normalization：按当前批的均值/方差归一化，同时以 momentum 更新滑动均值/方差
+
+全局统计量（数量、均值、M2、最小值、最大值）以批为单位流式合并（Welford / Chan 合并公式），只需遍历一遍数据；
+min_max 与 z_score 依赖全局统计量，因此先统计一遍再变换一遍，其余算法统计与变换在同一遍中完成。
+缺失值（None / NaN）不参与统计，变换后仍为 NaN。
+"""
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# 一批数据：列名 -> 列值，或记录列表
+Batch = Union[Mapping[str, Sequence[Any]], Sequence[Mapping[str, Any]]]
+
+# 算法别名 -> 标准名称；feature_scaling 按 parameters.method 选择具体算法
+_ALGORITHMS = {
+    "min_max": "min_max",
+    "min-max": "min_max",
+    "minmax": "min_max",
+    "min_max_scaling": "min_max",
+    "z_score": "z_score",
+    "z-score": "z_score",
+    "zscore": "z_score",
+    "standard": "z_score",
+    "standardization": "z_score",
+    "log": "log",
+    "log_scaling": "log",
+    "log_transform": "log",
+    "batch_normalization": "batch_normalization",
+    "batch_norm": "batch_normalization"
+}
+
+# 需要先得到全局统计量才能变换的算法
+_NEEDS_GLOBAL_STATS = {"min_max", "z_score"}
+
+
+def resolve_algorithm(algorithm: str, parameters: Mapping[str, Any] = None) -> str:
+    """
+    解析算法名称
+
+    Args:
+        algorithm: 算法名称或别名
+        parameters: 算法参数，feature_scaling 的 method 参数决定具体算法（默认 min-max）
+
+    Returns:
+        标准算法名称
+
+    Raises:
+        ValueError: 不支持的算法
+    """
+    name = algorithm.strip().lower()
+    if name == "feature_scaling":
+        name = str((parameters or {}).get("method", "min-max")).strip().lower()
+    if name not in _ALGORITHMS:
+        raise ValueError(f"Unsupported processing algorithm: {algorithm}")
+    return _ALGORITHMS[name]
+
+
+def batch_rows(batch: Batch) -> int:
+    """一批数据的行数"""
+    if isinstance(batch, Mapping):
+        return max((len(values) for values in batch.values() if values is not None), default=0)
+    return len(batch)
+
+
+def to_matrix(batch: Batch, columns: Sequence[str], out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    把一批数据转换为 (行数, 列数) 的 float64 矩阵
+
+    Args:
+        batch: 列名 -> 列值（list 或 ndarray），或记录（字典）列表，或已经是矩阵
+        columns: 目标列
+        out: 写入的目标矩阵（如共享内存上的视图），形状须为 (行数, 列数)
+
+    Returns:
+        按 columns 顺序排列的矩阵，缺失值为 NaN
+    """
+    if isinstance(batch, np.ndarray):
+        matrix = np.asarray(batch, dtype=np.float64).reshape(len(batch), len(columns))
+        if out is None:
+            return matrix
+        np.copyto(out, matrix)
+        return out
+    if isinstance(batch, Mapping):
+        arrays = [_column(batch.get(column)) for column in columns]
+        rows = max((len(array) for array in arrays), default=0)
+        matrix = np.empty((rows, len(columns)), dtype=np.float64) if out is None else out
+        for index, array in enumerate(arrays):
+            if len(array) != rows:
+                raise ValueError(f"Column {columns[index]} has {len(array)} values, expected {rows}")
+            matrix[:, index] = array
+        return matrix
+    matrix = np.empty((len(batch), len(columns)), dtype=np.float64) if out is None else out
+    for index, column in enumerate(columns):
+        matrix[:, index] = _column([record.get(column) for record in batch])
+    return matrix
+
+
+def _column(values: Optional[Sequence[Any]]) -> np.ndarray:
+    if values is None:
+        return np.empty(0, dtype=np.float64)
+    if isinstance(values, np.ndarray) and values.dtype.kind in "fiub":
+        return values.astype(np.float64, copy=False)
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+
+class ColumnStats:
+    """
+    按列的流式统计量
+
+    每批先算出批内的数量、均值、M2（离差平方和）、最小值、最大值，再用 Chan 并行合并公式并入累计值，
+    与逐行 Welford 更新结果一致，但计算全部是向量化的。两个 ColumnStats 同样可以精确合并。
+    """
+
+    def __init__(self, width: int):
+        self.count = np.zeros(width, dtype=np.int64)
+        self.mean = np.zeros(width, dtype=np.float64)
+        self.m2 = np.zeros(width, dtype=np.float64)
+        self.min = np.full(width, np.inf, dtype=np.float64)
+        self.max = np.full(width, -np.inf, dtype=np.float64)
+
+    @classmethod
+    def of(cls, matrix: np.ndarray) -> "ColumnStats":
+        """计算一批数据的统计量"""
+        stats = cls(matrix.shape[1])
+        if matrix.shape[0] == 0:
+            return stats
+        missing = np.isnan(matrix)
+        if missing.any():
+            count = matrix.shape[0] - missing.sum(axis=0)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = np.where(count > 0, np.nansum(matrix, axis=0) / count, 0.0)
+            m2 = np.nansum((matrix - mean) ** 2, axis=0)
+        else:
+            count = np.full(matrix.shape[1], matrix.shape[0], dtype=np.int64)
+            mean = matrix.mean(axis=0)
+            centered = matrix - mean
+            m2 = np.einsum("ij,ij->j", centered, centered)
+        stats.count = count.astype(np.int64)
+        stats.mean = mean
+        stats.m2 = m2
+        # fmin / fmax 忽略 NaN
+        stats.min = np.fmin.reduce(matrix, axis=0, initial=np.inf)
+        stats.max = np.fmax.reduce(matrix, axis=0, initial=-np.inf)
+        return stats
+
+    def update(self, matrix: np.ndarray) -> "ColumnStats":
+        """并入一批数据"""
+        return self.merge(ColumnStats.of(matrix))
+
+    def merge(self, other: "ColumnStats") -> "ColumnStats":
+        """并入另一组统计量（Chan 合并公式）"""
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        with np.errstate(invalid="ignore", divide="ignore"):
+            weight = np.where(total > 0, other.count / np.maximum(total, 1), 0.0)
+        self.mean = self.mean + delta * weight
+        self.m2 = self.m2 + other.m2 + delta ** 2 * self.count * weight
+        self.count = total
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        return self
+
+    def variance(self, ddof: int = 0) -> np.ndarray:
+        """方差，数据不足时为 NaN"""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.count > ddof, self.m2 / (self.count - ddof), np.nan)
+
+    def std(self, ddof: int = 0) -> np.ndarray:
+        """标准差"""
+        return np.sqrt(self.variance(ddof))
+
+    def to_dict(self, columns: Sequence[str]) -> Dict[str, Dict[str, float]]:
+        """按列输出统计量"""
+        std = self.std()
+        return {
+            column: {
+                "count": int(self.count[index]),
+                "mean": float(self.mean[index]) if self.count[index] else None,
+                "std": float(std[index]) if self.count[index] else None,
+                "min": float(self.min[index]) if self.count[index] else None,
+                "max": float(self.max[index]) if self.count[index] else None
+            }
+            for index, column in enumerate(columns)
+        }
+
+
+def min_max_scale(matrix: np.ndarray, stats: ColumnStats, feature_range: Sequence[float] = (0.0, 1.0)) -> np.ndarray:
+    """按全局最小/最大值原地缩放，最大值等于最小值的列缩放为区间下限"""
+    low, high = feature_range
+    span = stats.max - stats.min
+    scale = np.where(span > 0, (high - low) / np.where(span > 0, span, 1.0), 0.0)
+    matrix -= stats.min
+    matrix *= scale
+    matrix += low
+    return matrix
+
+
+def z_score_scale(matrix: np.ndarray, stats: ColumnStats, ddof: int = 0) -> np.ndarray:
+    """按全局均值/标准差原地标准化，标准差为 0 的列结果为 0"""
+    std = stats.std(ddof)
+    matrix -= stats.mean
+    matrix *= np.where(std > 0, 1.0 / np.where(std > 0, std, 1.0), 0.0)
+    return matrix
+
+
+def log_scale(matrix: np.ndarray, offset: float = 1.0, base: Optional[float] = None) -> np.ndarray:
+    """原地计算 log(x + offset)，x + offset <= 0 时为 NaN"""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if offset == 1.0:
+            np.log1p(matrix, out=matrix)
+        else:
+            matrix += offset
+            np.log(matrix, out=matrix)
+        matrix[~np.isfinite(matrix)] = np.nan
+    if base:
+        matrix /= np.log(base)
+    return matrix
+
+
+class BatchNorm:
+    """批归一化：按当前批统计量归一化，并以 momentum 更新滑动均值/方差"""
+
+    def __init__(self, width: int, momentum: float = 0.9, epsilon: float = 1e-5, gamma: float = 1.0,
+                 beta: float = 0.0):
+        self.momentum = momentum
+        self.epsilon = epsilon
+        self.gamma = gamma
+        self.beta = beta
+        self.running_mean = np.zeros(width, dtype=np.float64)
+        self.running_var = np.ones(width, dtype=np.float64)
+        self.batches = 0
+
+    def normalize(self, matrix: np.ndarray, stats: ColumnStats) -> np.ndarray:
+        """原地归一化一批数据，stats 为该批的统计量；不修改滑动统计量，可在任意进程中执行"""
+        var = np.nan_to_num(stats.variance(), nan=0.0)
+        matrix -= stats.mean
+        matrix *= self.gamma / np.sqrt(var + self.epsilon)
+        matrix += self.beta
+        return matrix
+
+    def update(self, stats: ColumnStats):
+        """按批的顺序更新滑动均值/方差"""
+        mean = stats.mean
+        var = np.nan_to_num(stats.variance(), nan=0.0)
+        if self.batches == 0:
+            self.running_mean, self.running_var = mean.copy(), var.copy()
+        else:
+            self.running_mean = self.momentum * self.running_mean + (1 - self.momentum) * mean
+            self.running_var = self.momentum * self.running_var + (1 - self.momentum) * var
+        self.batches += 1
+
+
+class ProcessingEngine:
+    """
+    按批执行向量化处理
+
+    使用方式::
+
+        engine = ProcessingEngine("feature_scaling", {"method": "z-score"}, ["age", "income"])
+        output = engine.run(lambda: iter_batches(records, 1000), sink=print)
+
+    parallelism 大于 1 时各批交给进程池处理，见 datalake.core.processing.parallel。
+    """
+
+    def __init__(self, algorithm: str, parameters: Mapping[str, Any], columns: Sequence[str], parallelism: int = 1):
+        """
+        初始化处理引擎
+
+        Args:
+            algorithm: 算法名称，见 resolve_algorithm
+            parameters: 算法参数，如 feature_range、ddof、offset、base、momentum、epsilon、gamma、beta
+            columns: 目标列
+            parallelism: 并行处理的进程数，1 表示在当前进程中处理
+
+        Raises:
+            ValueError: 不支持的算法或没有目标列
+        """
+        if not columns:
+            raise ValueError("target_columns must not be empty")
+        self.parameters = dict(parameters or {})
+        self.algorithm = resolve_algorithm(algorithm, self.parameters)
+        self.columns = list(columns)
+        self.parallelism = max(1, int(parallelism))
+        self.batch_norm = self.new_batch_norm() if self.algorithm == "batch_normalization" else None
+
+    @property
+    def passes(self) -> int:
+        """需要遍历数据的次数"""
+        return 2 if self.algorithm in _NEEDS_GLOBAL_STATS else 1
+
+    @property
+    def needs_global_stats(self) -> bool:
+        """变换是否依赖全局统计量"""
+        return self.algorithm in _NEEDS_GLOBAL_STATS
+
+    def new_batch_norm(self) -> BatchNorm:
+        """按参数创建批归一化状态"""
+        return BatchNorm(
+            len(self.columns),
+            momentum=float(self.parameters.get("momentum", 0.9)),
+            epsilon=float(self.parameters.get("epsilon", 1e-5)),
+            gamma=float(self.parameters.get("gamma", 1.0)),
+            beta=float(self.parameters.get("beta", 0.0))
+        )
+
+    def apply(self, matrix: np.ndarray, global_stats: Optional[ColumnStats]) -> Tuple[np.ndarray, Optional[ColumnStats]]:
+        """
+        原地变换一批数据
+
+        只依赖参数与传入的统计量，不修改引擎状态，因此可以在工作进程中执行。
+
+        Args:
+            matrix: 一批数据
+            global_stats: 全局统计量，min_max / z_score 必须提供
+
+        Returns:
+            (变换后的矩阵, 该批变换前的统计量)；全局统计量已知时不计算批内统计量，返回 None
+        """
+        batch_stats = ColumnStats.of(matrix) if global_stats is None else None
+        parameters = self.parameters
+        if self.algorithm == "min_max":
+            output = min_max_scale(matrix, global_stats, tuple(parameters.get("feature_range", (0.0, 1.0))))
+        elif self.algorithm == "z_score":
+            output = z_score_scale(matrix, global_stats, int(parameters.get("ddof", 0)))
+        elif self.algorithm == "log":
+            output = log_scale(matrix, float(parameters.get("offset", 1.0)), parameters.get("base"))
+        else:
+            output = self.batch_norm.normalize(matrix, batch_stats)
+        return output, batch_stats
+
+    def run(self, batches: Callable[[], Iterable[Batch]], sink: Callable[[np.ndarray], None] = None) -> Dict[str, Any]:
+        """
+        执行处理
+
+        Args:
+            batches: 返回批数据迭代器的函数，min_max / z_score 会调用两次（统计一遍、变换一遍）
+            sink: 接收每批变换结果（行数 × 列数矩阵）的回调，按批的顺序调用；
+                并行处理时矩阵位于共享内存中，回调返回后即被释放，需要保留时应复制
+
+        Returns:
+            行数、批数、各阶段耗时、每批耗时、变换前各列统计量，batch_normalization 另含滑动均值/方差
+        """
+        if self.batch_norm is not None:
+            self.batch_norm = self.new_batch_norm()
+        if self.parallelism > 1:
+            from datalake.core.processing.parallel import run_parallel
+            return run_parallel(self, batches, sink)
+
+        timings = {}
+        chunks = []
+        pid = os.getpid()
+        global_stats = None
+        if self.needs_global_stats:
+            start_time = time.perf_counter()
+            global_stats = ColumnStats(len(self.columns))
+            for index, batch in enumerate(batches()):
+                chunk_start = time.perf_counter()
+                matrix = to_matrix(batch, self.columns)
+                global_stats.merge(ColumnStats.of(matrix))
+                chunks.append(chunk_timing("stats", index, matrix.shape[0], pid, time.perf_counter() - chunk_start))
+            timings["stats"] = time.perf_counter() - start_time
+
+        stats = ColumnStats(len(self.columns)) if global_stats is None else None
+        rows = batch_count = 0
+        start_time = time.perf_counter()
+        for index, batch in enumerate(batches()):
+            chunk_start = time.perf_counter()
+            matrix = to_matrix(batch, self.columns)
+            output, batch_stats = self.apply(matrix, global_stats)
+            self.absorb(stats, batch_stats)
+            chunks.append(chunk_timing("transform", index, matrix.shape[0], pid, time.perf_counter() - chunk_start))
+            rows += matrix.shape[0]
+            batch_count += 1
+            if sink is not None:
+                sink(output)
+        timings["transform"] = time.perf_counter() - start_time
+        return self.report(rows, batch_count, timings, chunks, global_stats or stats)
+
+    def absorb(self, stats: Optional[ColumnStats], batch_stats: Optional[ColumnStats]):
+        """按批的顺序并入批内统计量并更新批归一化的滑动统计量"""
+        if batch_stats is None:
+            return
+        stats.merge(batch_stats)
+        if self.batch_norm is not None:
+            self.batch_norm.update(batch_stats)
+
+    def report(self, rows: int, batch_count: int, timings: Dict[str, float], chunks: List[Dict[str, Any]],
+               stats: ColumnStats) -> Dict[str, Any]:
+        """整理处理结果"""
+        result = {
+            "algorithm": self.algorithm,
+            "rows": rows,
+            "batches": batch_count,
+            "passes": self.passes,
+            "parallelism": self.parallelism,
+            "timings": timings,
+            "chunks": chunks,
+            "stats": stats.to_dict(self.columns)
+        }
+        if self.batch_norm is not None:
+            result["running_mean"] = dict(zip(self.columns, self.batch_norm.running_mean.tolist()))
+            result["running_var"] = dict(zip(self.columns, self.batch_norm.running_var.tolist()))
+        return result
+
+
+def chunk_timing(phase: str, index: int, rows: int, pid: int, seconds: float, **extra) -> Dict[str, Any]:
+    """单批处理耗时记录"""
+    return {"phase": phase, "chunk": index, "rows": rows, "pid": pid, "seconds": seconds, **extra}
+
+
+def iter_batches(data: Union[Batch, Iterable[Mapping[str, Any]]], batch_size: int) -> Iterator[Batch]:
+    """
+    把内存中的数据切分为 batch_size 大小的批
+
+    Args:
+        data: 列名 -> 列值，或记录列表 / 记录迭代器
+        batch_size: 每批行数
+
+    Yields:
+        列字典（按切片）或记录列表
+    """
+    if isinstance(data, Mapping):
+        rows = max((len(values) for values in data.values()), default=0)
+        for start in range(0, rows, batch_size):
+            yield {column: values[start:start + batch_size] for column, values in data.items()}
+        return
+    batch: List[Mapping[str, Any]] = []
+    for record in data:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,213 @@
+# 欲买桂花同载酒，
+# 终不似、少年游。
+# Copyright (c) VernonSong. All rights reserved.
+# ======================================================================================================================
+"""
+多进程分批处理
+
+主进程把每批数据直接写入一块共享内存，只把共享内存名称与形状交给进程池，工作进程在共享内存上原地计算，
+数据本身不经过 pickle。工作进程返回批内统计量（数量、均值、M2、最小值、最大值），主进程按批的顺序归并，
+与单进程路径的合并顺序相同，因此结果一致。
+
+同时在途的批数不超过 2 × parallelism，内存占用与数据总量无关。进程池按 parallelism 复用，使用 spawn 启动，
+在多线程的服务进程中同样安全。
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from datalake.core.processing.engine import (
+    Batch, ColumnStats, ProcessingEngine, batch_rows, chunk_timing, to_matrix
+)
+from datalake.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# parallelism -> 进程池
+_pools: Dict[int, ProcessPoolExecutor] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(parallelism: int) -> ProcessPoolExecutor:
+    """获取（必要时创建）指定大小的进程池"""
+    with _pools_lock:
+        pool = _pools.get(parallelism)
+        if pool is None:
+            pool = _pools[parallelism] = ProcessPoolExecutor(
+                max_workers=parallelism, mp_context=multiprocessing.get_context("spawn")
+            )
+        return pool
+
+
+def _discard_pool(parallelism: int, pool: ProcessPoolExecutor):
+    with _pools_lock:
+        if _pools.get(parallelism) is pool:
+            del _pools[parallelism]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+@atexit.register
+def shutdown_pools():
+    """关闭全部进程池"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _process_chunk(name: str, shape: Tuple[int, int], phase: str, spec: Tuple[str, Dict[str, Any], List[str]],
+                   global_stats: Optional[ColumnStats]) -> Tuple[Optional[ColumnStats], float, int]:
+    """
+    工作进程：在共享内存上处理一批数据
+
+    Args:
+        name: 共享内存名称
+        shape: 矩阵形状
+        phase: stats 只计算统计量；transform 原地变换
+        spec: (算法, 参数, 目标列)
+        global_stats: 全局统计量
+
+    Returns:
+        (批内统计量, 耗时, 进程号)
+    """
+    start_time = time.perf_counter()
+    block = shared_memory.SharedMemory(name=name, track=False)
+    try:
+        matrix = np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+        if phase == "stats":
+            batch_stats = ColumnStats.of(matrix)
+        else:
+            algorithm, parameters, columns = spec
+            _, batch_stats = ProcessingEngine(algorithm, parameters, columns).apply(matrix, global_stats)
+        del matrix
+    finally:
+        block.close()
+    return batch_stats, time.perf_counter() - start_time, os.getpid()
+
+
+class _Chunk:
+    """一批在途数据"""
+
+    __slots__ = ("index", "block", "matrix", "future", "submitted_at")
+
+    def __init__(self, index: int, block: shared_memory.SharedMemory, matrix: np.ndarray, future: Future,
+                 submitted_at: float):
+        self.index = index
+        self.block = block
+        self.matrix = matrix
+        self.future = future
+        self.submitted_at = submitted_at
+
+    def release(self):
+        self.matrix = None
+        self.block.close()
+        self.block.unlink()
+
+
+def _load_chunk(batch: Batch, columns: List[str]) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    """把一批数据直接写入新的共享内存"""
+    shape = (batch_rows(batch), len(columns))
+    block = shared_memory.SharedMemory(create=True, size=max(shape[0] * shape[1] * 8, 1))
+    try:
+        matrix = to_matrix(batch, columns, out=np.ndarray(shape, dtype=np.float64, buffer=block.buf))
+    except BaseException:
+        block.close()
+        block.unlink()
+        raise
+    return block, matrix
+
+
+def _run_phase(engine: ProcessingEngine, batches: Iterable[Batch], phase: str, global_stats: Optional[ColumnStats],
+               on_chunk: Callable[[_Chunk, Optional[ColumnStats]], None], chunks: List[Dict[str, Any]]):
+    """把各批提交到进程池，按批的顺序完成回调"""
+    pool = get_pool(engine.parallelism)
+    spec = (engine.algorithm, engine.parameters, engine.columns)
+    pending: Deque[_Chunk] = deque()
+
+    def finish(chunk: _Chunk):
+        try:
+            try:
+                batch_stats, seconds, pid = chunk.future.result()
+            except BrokenProcessPool:
+                # 工作进程异常退出后进程池不可再用，下次处理时重新创建
+                _discard_pool(engine.parallelism, pool)
+                raise
+            chunks.append(chunk_timing(
+                phase, chunk.index, chunk.matrix.shape[0], pid, seconds,
+                wall=time.perf_counter() - chunk.submitted_at
+            ))
+            on_chunk(chunk, batch_stats)
+        finally:
+            chunk.release()
+
+    try:
+        for index, batch in enumerate(batches):
+            block, matrix = _load_chunk(batch, engine.columns)
+            try:
+                future = pool.submit(_process_chunk, block.name, matrix.shape, phase, spec, global_stats)
+            except BaseException:
+                block.close()
+                block.unlink()
+                raise
+            pending.append(_Chunk(index, block, matrix, future, time.perf_counter()))
+            if len(pending) >= 2 * engine.parallelism:
+                finish(pending.popleft())
+        while pending:
+            finish(pending.popleft())
+    finally:
+        # 出错时等待在途的批结束后再释放共享内存
+        for chunk in pending:
+            if not chunk.future.cancel():
+                chunk.future.exception()
+            chunk.release()
+
+
+def run_parallel(engine: ProcessingEngine, batches: Callable[[], Iterable[Batch]],
+                 sink: Callable[[np.ndarray], None] = None) -> Dict[str, Any]:
+    """
+    以进程池执行 ProcessingEngine.run
+
+    Args:
+        engine: 处理引擎，parallelism 为进程数
+        batches: 返回批数据迭代器的函数
+        sink: 按批的顺序接收变换结果，矩阵在回调返回后释放
+
+    Returns:
+        与 ProcessingEngine.run 相同的结果，chunks 中记录每批所在进程、计算耗时与提交到完成的总耗时
+    """
+    timings: Dict[str, float] = {}
+    chunks: List[Dict[str, Any]] = []
+    width = len(engine.columns)
+
+    global_stats = None
+    if engine.needs_global_stats:
+        start_time = time.perf_counter()
+        global_stats = ColumnStats(width)
+        _run_phase(engine, batches(), "stats", None, lambda chunk, batch_stats: global_stats.merge(batch_stats), chunks)
+        timings["stats"] = time.perf_counter() - start_time
+
+    stats = ColumnStats(width) if global_stats is None else None
+    counts = {"rows": 0, "batches": 0}
+
+    def on_transformed(chunk: _Chunk, batch_stats: Optional[ColumnStats]):
+        engine.absorb(stats, batch_stats)
+        counts["rows"] += chunk.matrix.shape[0]
+        counts["batches"] += 1
+        if sink is not None:
+            sink(chunk.matrix)
+
+    start_time = time.perf_counter()
+    _run_phase(engine, batches(), "transform", global_stats, on_transformed, chunks)
+    timings["transform"] = time.perf_counter() - start_time
+    logger.debug("Processed %d batches with %d processes", counts["batches"], engine.parallelism)
+    return engine.report(counts["rows"], counts["batches"], timings, chunks, global_stats or stats)
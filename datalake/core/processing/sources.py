@@ -0,0 +1,315 @@
+# 欲买桂花同载酒，
+# 终不似、少年游。
+# Copyright (c) VernonSong. All rights reserved.
+# ======================================================================================================================
+"""
+按批读取数据源
+
+每种数据源实现 batches()，以生成器逐批产出 {列名: 列值列表} 形式的批数据，每批不超过 batch_size 行。
+读取过程中只持有当前一批数据，内存占用与数据源大小无关；每次调用 batches() 都从头读取，
+需要遍历两遍的算法（min-max、z-score）可以直接再调用一次。
+
+- database：DB-API 游标 fetchmany，内置 SQLite（sqlite:///path 或文件路径），也可传入其他驱动的连接函数
+- file：CSV 通过内存映射逐行解析；Parquet 通过 pyarrow 内存映射按批读取（需安装 pyarrow）
+- api：分页 HTTP 接口，按 page / page_size 参数逐页请求
+"""
+import csv
+import mmap
+import os
+import sqlite3
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+from urllib.parse import urlparse
+
+from datalake.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# 一批数据：列名 -> 列值
+ColumnBatch = Dict[str, List[Any]]
+
+
+class RecordSource:
+    """数据源接口"""
+
+    def __init__(self, connection_string: str, query: Optional[str] = None, batch_size: int = 1000,
+                 columns: Optional[Sequence[str]] = None):
+        """
+        初始化数据源
+
+        Args:
+            connection_string: 连接字符串（数据库地址、文件路径或接口地址）
+            query: 查询语句（数据库）
+            batch_size: 每批行数
+            columns: 只读取这些列，None 表示全部列
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.connection_string = connection_string
+        self.query = query
+        self.batch_size = batch_size
+        self.columns = list(columns) if columns else None
+
+    def batches(self) -> Iterator[ColumnBatch]:
+        """从头逐批读取数据"""
+        raise NotImplementedError("Subclasses must implement the batches method")
+
+    def _project(self, names: Sequence[str]) -> List[int]:
+        """目标列在数据源列中的下标"""
+        if self.columns is None:
+            return list(range(len(names)))
+        missing = [column for column in self.columns if column not in names]
+        if missing:
+            raise ValueError(f"Columns not found in source: {', '.join(missing)}")
+        return [list(names).index(column) for column in self.columns]
+
+
+def _to_batch(names: Sequence[str], indexes: Sequence[int], rows: Sequence[Sequence[Any]]) -> ColumnBatch:
+    """行列表转换为列字典"""
+    return {names[index]: [row[index] for row in rows] for index in indexes}
+
+
+class DatabaseSource(RecordSource):
+    """数据库数据源，通过 DB-API 游标的 fetchmany 逐批读取"""
+
+    def __init__(self, connection_string: str, query: Optional[str] = None, batch_size: int = 1000,
+                 columns: Optional[Sequence[str]] = None, connect: Callable[[str], Any] = None):
+        """
+        Args:
+            connect: 按连接字符串创建 DB-API 连接的函数，默认支持 SQLite
+        """
+        super().__init__(connection_string, query, batch_size, columns)
+        if not query:
+            raise ValueError("query is required for database sources")
+        self.connect = connect or connect_sqlite
+
+    def batches(self) -> Iterator[ColumnBatch]:
+        connection = self.connect(self.connection_string)
+        try:
+            cursor = connection.cursor()
+            cursor.arraysize = self.batch_size
+            cursor.execute(self.query)
+            names = [description[0] for description in cursor.description]
+            indexes = self._project(names)
+            while True:
+                rows = cursor.fetchmany(self.batch_size)
+                if not rows:
+                    break
+                yield _to_batch(names, indexes, rows)
+            cursor.close()
+        finally:
+            connection.close()
+
+
+def connect_sqlite(connection_string: str) -> sqlite3.Connection:
+    """
+    打开 SQLite 连接（只读）
+
+    Args:
+        connection_string: sqlite:///相对路径、sqlite:////绝对路径，或直接是文件路径
+
+    Raises:
+        ValueError: 不是 SQLite 连接字符串
+    """
+    if "://" in connection_string:
+        parsed = urlparse(connection_string)
+        if parsed.scheme != "sqlite":
+            raise ValueError(f"Unsupported database scheme: {parsed.scheme}, pass a connect function for it")
+        path = connection_string[len("sqlite:///"):]
+    else:
+        path = connection_string
+    if path in ("", ":memory:"):
+        return sqlite3.connect(":memory:")
+    if not os.path.exists(path):
+        raise ValueError(f"Database file not found: {path}")
+    return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+
+class CsvSource(RecordSource):
+    """
+    CSV 文件数据源
+
+    文件以内存映射方式打开，逐行解码解析，不会整体读入内存。首行为列名，空字段读取为 None。
+    """
+
+    def __init__(self, connection_string: str, query: Optional[str] = None, batch_size: int = 1000,
+                 columns: Optional[Sequence[str]] = None, encoding: str = "utf-8", delimiter: str = ","):
+        super().__init__(connection_string, query, batch_size, columns)
+        self.encoding = encoding
+        self.delimiter = delimiter
+
+    def batches(self) -> Iterator[ColumnBatch]:
+        path = _file_path(self.connection_string)
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                lines = (line.decode(self.encoding) for line in iter(mapped.readline, b""))
+                reader = csv.reader(lines, delimiter=self.delimiter)
+                names = next(reader, None)
+                if names is None:
+                    return
+                if names and names[0].startswith("\ufeff"):
+                    names[0] = names[0][1:]
+                indexes = self._project(names)
+                rows: List[List[Any]] = []
+                for row in reader:
+                    if not row:
+                        continue
+                    rows.append([value if value != "" else None for value in row])
+                    if len(rows) >= self.batch_size:
+                        yield _to_batch(names, indexes, rows)
+                        rows = []
+                if rows:
+                    yield _to_batch(names, indexes, rows)
+
+
+class ParquetSource(RecordSource):
+    """Parquet 文件数据源，pyarrow 内存映射打开后按行组逐批读取，只读取目标列"""
+
+    def batches(self) -> Iterator[ColumnBatch]:
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("pyarrow is required to read Parquet files: pip install pyarrow") from e
+
+        parquet_file = pq.ParquetFile(_file_path(self.connection_string), memory_map=True)
+        names = parquet_file.schema_arrow.names
+        self._project(names)
+        for record_batch in parquet_file.iter_batches(batch_size=self.batch_size, columns=self.columns):
+            yield {
+                name: column.to_numpy(zero_copy_only=False)
+                for name, column in zip(record_batch.schema.names, record_batch.columns)
+            }
+
+
+class HttpApiSource(RecordSource):
+    """
+    分页 HTTP 接口数据源
+
+    逐页请求 GET {url}?page=N&page_size=batch_size（page 从 1 开始）。响应为记录列表，
+    或 {"data" | "items" | "records": [...], "has_more": bool, "next": 下一页地址}。
+    返回空页、不足一页、has_more 为 false 时结束；提供 next 时按 next 请求下一页。
+    """
+
+    def __init__(self, connection_string: str, query: Optional[str] = None, batch_size: int = 1000,
+                 columns: Optional[Sequence[str]] = None, transport: Any = None, timeout: float = 30.0,
+                 headers: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            transport: httpx 传输层，测试时可传入 httpx.MockTransport
+            timeout: 单次请求超时（秒）
+            headers: 请求头
+        """
+        super().__init__(connection_string, query, batch_size, columns)
+        self.transport = transport
+        self.timeout = timeout
+        self.headers = headers or {}
+
+    def batches(self) -> Iterator[ColumnBatch]:
+        import httpx
+
+        with httpx.Client(transport=self.transport, timeout=self.timeout, headers=self.headers) as client:
+            url, params, page = self.connection_string, {"page": 1, "page_size": self.batch_size}, 1
+            while url:
+                response = client.get(url, params=params)
+                response.raise_for_status()
+                body = response.json()
+                records, has_more, next_url = _parse_page(body)
+                logger.debug("Fetched %d records from %s page %d", len(records), self.connection_string, page)
+                if not records:
+                    break
+                names = self.columns or list(records[0])
+                yield {name: [record.get(name) for record in records] for name in names}
+                if next_url:
+                    url, params, page = next_url, None, page + 1
+                elif has_more is False or (has_more is None and len(records) < self.batch_size):
+                    break
+                else:
+                    page += 1
+                    params = {"page": page, "page_size": self.batch_size}
+
+
+def _parse_page(body: Any):
+    """解析一页响应，返回 (记录列表, 是否还有下一页, 下一页地址)"""
+    if isinstance(body, list):
+        return body, None, None
+    for key in ("data", "items", "records"):
+        if isinstance(body.get(key), list):
+            return body[key], body.get("has_more"), body.get("next")
+    raise ValueError("Unrecognized page format, expected a list or an object with data/items/records")
+
+
+def paginated_stub(records: Sequence[Dict[str, Any]]):
+    """
+    分页接口的桩实现，供测试与本地调试使用
+
+    Args:
+        records: 全部记录
+
+    Returns:
+        httpx.MockTransport，按 page / page_size 返回 {"data": [...], "has_more": bool}
+    """
+    import httpx
+
+    def handler(request: "httpx.Request") -> "httpx.Response":
+        page = int(request.url.params.get("page", 1))
+        page_size = int(request.url.params.get("page_size", 100))
+        start = (page - 1) * page_size
+        data = list(records[start:start + page_size])
+        return httpx.Response(200, json={"data": data, "has_more": start + page_size < len(records)})
+
+    return httpx.MockTransport(handler)
+
+
+def _file_path(connection_string: str) -> str:
+    """file:///path 或直接是文件路径"""
+    if connection_string.startswith("file://"):
+        return urlparse(connection_string).path
+    return connection_string
+
+
+def _file_source(connection_string: str, **kwargs) -> RecordSource:
+    """按扩展名选择文件数据源"""
+    extension = os.path.splitext(_file_path(connection_string))[1].lower()
+    if extension in (".parquet", ".pq"):
+        return ParquetSource(connection_string, **kwargs)
+    if extension in (".csv", ".txt", ".tsv"):
+        if extension == ".tsv":
+            kwargs.setdefault("delimiter", "\t")
+        return CsvSource(connection_string, **kwargs)
+    raise ValueError(f"Unsupported file type: {extension or connection_string}")
+
+
+# 数据源类型 -> 构造函数
+SOURCE_TYPES: Dict[str, Callable[..., RecordSource]] = {
+    "database": DatabaseSource,
+    "file": _file_source,
+    "api": HttpApiSource
+}
+
+
+def open_source(config: Any, columns: Optional[Sequence[str]] = None, **kwargs) -> RecordSource:
+    """
+    按数据源配置创建数据源
+
+    Args:
+        config: 含 type、connection_string、query、batch_size 的配置（如 DataSourceConfig）
+        columns: 只读取这些列
+        **kwargs: 传给具体数据源的参数，如 connect、transport
+
+    Returns:
+        数据源
+
+    Raises:
+        ValueError: 不支持的数据源类型
+    """
+    factory = SOURCE_TYPES.get(config.type)
+    if factory is None:
+        raise ValueError(f"Unsupported source type: {config.type}")
+    return factory(
+        config.connection_string,
+        query=getattr(config, "query", None),
+        batch_size=getattr(config, "batch_size", 1000),
+        columns=columns,
+        **kwargs
+    )
@@ -0,0 +1,10 @@
+# 欲买桂花同载酒，
+# 终不似、少年游。
+# Copyright (c) VernonSong. All rights reserved.
+# ======================================================================================================================
+from datalake.core.quality.engine import *
+from datalake.core.quality.rules import *
+from datalake.core.quality.sketches import *
+from datalake.core.quality.sampling import *
+from datalake.core.quality.state import *
+from datalake.core.quality.incremental import *
@@ -0,0 +1,193 @@
+# 欲买桂花同载酒，
+# 终不似、少年游。
+# Copyright (c) VernonSong. All rights reserved.
+# ======================================================================================================================
+"""
+数据质量规则引擎
+
+引擎按批读取数据源一遍，每批只把规则用到的列转换为 NumPy 数组一次，再依次交给所有规则，
+规则数量增加不会增加读取次数。数据源可以是 datalake.core.processing.sources 的任一数据源
+（SQLite、CSV、Parquet、分页接口），也可以是任何产出 {列名: 列值} 批数据的迭代器。
+
+规则配置为规则名称或字典：
+
+    ["not_null", "primary_key"]                                   # 按表结构推导检查的列
+    [{"rule": "data_type", "columns": ["amount"], "data_type": "decimal(18,2)"},
+     {"rule": "unique_constraint", "columns": ["order_id", "line_no"]}]
+
+只写规则名称时，not_null 检查表结构中 not_null 或 primary_key 的列，data_type 检查声明了 type 的列，
+primary_key 检查 primary_key 的列，unique_constraint 检查 unique 的列。
+
+primary_key 与 unique_constraint 可配置 "mode": "approximate"（及 error_rate、cardinality_error、max_memory_mb 等），
+以固定内存检查超大表；近似规则有可疑键时，引擎再读取一遍数据只复核可疑键。
+"""
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Sequence
+
+from datalake.core.processing.sources import RecordSource, open_source
+from datalake.core.quality.rules import APPROXIMATE_RULE_TYPES, RULE_TYPES, Rule, as_column
+from datalake.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# 数据源未指定 batch_size 时每批读取的行数，批越大向量化运算的固定开销占比越小
+DEFAULT_BATCH_SIZE = 65536
+
+
+def _schema_columns(table_schema: Mapping[str, Any], flag: str) -> List[str]:
+    return [column["name"] for column in table_schema.get("columns", []) if column.get(flag)]
+
+
+def build_rules(rule_configs: Sequence[Any], table_schema: Mapping[str, Any] = None,
+                sample_size: int = 5) -> List[Rule]:
+    """
+    按规则配置与表结构构造规则
+
+    Args:
+        rule_configs: 规则名称或 {"rule", "columns", "mode", ...} 字典的列表
+        table_schema: 表结构 {"columns": [{"name", "type", "primary_key", "not_null", "unique"}]}
+        sample_size: 每条规则最多记录的违规样本数
+
+    Returns:
+        规则列表，not_null 与 data_type 每列一条
+
+    Raises:
+        ValueError: 不支持的规则或检查方式
+    """
+    table_schema = table_schema or {}
+    types = {column["name"]: column["type"] for column in table_schema.get("columns", []) if column.get("type")}
+    rules = []
+    for config in rule_configs:
+        if isinstance(config, str):
+            config = {"rule": config}
+        config = dict(config)
+        name = config.pop("rule")
+        if name not in RULE_TYPES:
+            raise ValueError(f"Unsupported table check rule: {name}")
+        columns = config.pop("columns", None)
+        if isinstance(columns, str):
+            columns = [columns]
+        mode = config.pop("mode", "exact")
+        if mode not in ("exact", "approximate") or (mode == "approximate" and name not in APPROXIMATE_RULE_TYPES):
+            raise ValueError(f"Unsupported check mode for {name}: {mode}")
+        rule_type = APPROXIMATE_RULE_TYPES[name] if mode == "approximate" else RULE_TYPES[name]
+        options = {"sample_size": config.pop("sample_size", sample_size), **config}
+
+        if name == "not_null":
+            columns = columns or list(dict.fromkeys(
+                _schema_columns(table_schema, "not_null") + _schema_columns(table_schema, "primary_key")
+            ))
+            rules.extend(RULE_TYPES[name]([column], **options) for column in columns)
+        elif name == "data_type":
+            for column in columns or list(types):
+                column_options = dict(options)
+                column_options.setdefault("data_type", types.get(column, "string"))
+                rules.append(RULE_TYPES[name]([column], **column_options))
+        else:
+            columns = columns or _schema_columns(table_schema, "primary_key" if name == "primary_key" else "unique")
+            if columns:
+                rules.append(rule_type(columns, **options))
+            else:
+                logger.info("Skipping %s rule: no key columns in table schema", name)
+    return rules
+
+
+class QualityEngine:
+    """单遍扫描执行全部规则的数据质量引擎"""
+
+    def __init__(self, rules: Sequence[Rule]):
+        self.rules = list(rules)
+
+    @property
+    def columns(self) -> List[str]:
+        """规则用到的列（按首次出现的顺序）"""
+        return list(dict.fromkeys(column for rule in self.rules for column in rule.columns))
+
+    def run(self, batches: Iterable[Mapping[str, Sequence[Any]]],
+            rescan: Callable[[], Iterable[Mapping[str, Sequence[Any]]]] = None) -> Dict[str, Any]:
+        """
+        读取一遍数据并执行全部规则
+
+        Args:
+            batches: 批数据迭代器，每批为 {列名: 列值}
+            rescan: 从头重新读取数据的函数，近似规则需要复核时调用；为 None 时不复核，近似规则返回估计值
+
+        Returns:
+            {"passed", "rows", "batches", "passes", "elapsed", "rows_per_second", "rules": [各规则结果]}
+        """
+        start_time = time.perf_counter()
+        rows, batch_count = self._scan(self.rules, batches, "update")
+        for rule in self.rules:
+            rule.finish()
+        passes = 1
+        pending = [rule for rule in self.rules if rule.needs_verification]
+        if pending and rescan is not None:
+            logger.info("Verifying suspicious keys for %d approximate rules", len(pending))
+            self._scan(pending, rescan(), "verify")
+            for rule in pending:
+                rule.finish_verification()
+            passes = 2
+        else:
+            for rule in pending:
+                rule.skip_verification()
+        elapsed = time.perf_counter() - start_time
+        results = [rule.result() for rule in self.rules]
+        return {
+            "passed": all(result["status"] == "passed" for result in results),
+            "rows": rows,
+            "batches": batch_count,
+            "passes": passes,
+            "elapsed": elapsed,
+            "rows_per_second": rows / elapsed if elapsed > 0 else 0.0,
+            "rules": results
+        }
+
+    @staticmethod
+    def _scan(rules: Sequence[Rule], batches: Iterable[Mapping[str, Sequence[Any]]], method: str):
+        """遍历一遍数据，每批转换一次规则用到的列后调用各规则的 method，返回 (行数, 批数)"""
+        columns = list(dict.fromkeys(column for rule in rules for column in rule.columns))
+        rows = batch_count = 0
+        for batch in batches:
+            arrays = {column: as_column(batch[column]) for column in columns}
+            if not arrays:
+                break
+            for rule in rules:
+                getattr(rule, method)(arrays, rows)
+            rows += len(arrays[columns[0]])
+            batch_count += 1
+        return rows, batch_count
+
+
+def check_source(source: Any, rule_configs: Sequence[Any], table_schema: Mapping[str, Any] = None,
+                 sample_size: int = 5, **source_kwargs) -> Dict[str, Any]:
+    """
+    对数据源执行质量规则
+
+    Args:
+        source: 数据源配置（含 type、connection_string、query、batch_size 的字典或对象，如 DataSourceConfig），
+            或已创建的数据源
+        rule_configs: 规则配置
+        table_schema: 表结构
+        sample_size: 每条规则最多记录的违规样本数
+        **source_kwargs: 传给数据源的参数，如 connect
+
+    Returns:
+        QualityEngine.run 的结果，近似规则需要复核时会再读取一遍数据源
+    """
+    engine = QualityEngine(build_rules(rule_configs, table_schema, sample_size))
+    source = resolve_source(source, engine.columns, **source_kwargs)
+    return engine.run(source.batches(), rescan=source.batches)
+
+
+def resolve_source(source: Any, columns: Sequence[str] = None, **source_kwargs) -> RecordSource:
+    """
+    数据源配置（字典或对象）创建为只读取 columns 的数据源，已创建的数据源原样返回
+
+    字典配置未指定 batch_size 时使用 DEFAULT_BATCH_SIZE。
+    """
+    if isinstance(source, RecordSource):
+        return source
+    if isinstance(source, Mapping):
+        source = SimpleNamespace(**{"query": None, "batch_size": DEFAULT_BATCH_SIZE, **source})
+    return open_source(source, columns=list(columns) or None, **source_kwargs)
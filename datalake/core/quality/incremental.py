@@ -0,0 +1,375 @@
+# 欲买桂花同载酒，
+# 终不似、少年游。
+# Copyright (c) VernonSong. All rights reserved.
+# ======================================================================================================================
+"""
+基于分区水位的增量表检查
+
+源表按 partition_column 分区，每个分区的摘要为 (行数, 最大 watermark_column)，由数据库聚合得到。
+检查状态（datalake.core.quality.state）保存每个分区上次的摘要与检查结果，再次检查时：
+
+1. 有 watermark_column 且有上次的水位时，只聚合包含 watermark_column > 水位的行的分区，其他分区直接沿用缓存；
+   没有 watermark_column 时水位为上次的最大分区值，按分区值递增追加的表只聚合分区值 >= 水位的分区
+   （最大的分区可能仍在写入）。detect_deletes 为 True 或没有水位时聚合全部分区，
+   摘要变化或新增的分区重新检查，消失的分区从缓存删除
+2. 只读取需要重新检查的分区（WHERE partition_column = 分区值），各分区的结果与缓存的结果合并：
+   行数、违规行数相加，违规样本带上分区值
+3. 唯一性与主键规则在分区内精确检查；重新检查的分区另由数据库统计键在其他分区出现过的行数（键列有索引时
+   只需 O(分区行数 × log 表行数)），不同键数由合并各分区键的 HyperLogLog 得到。发现跨分区重复时
+   verify_cross_partition 为 True 则对该规则全量检查，得到准确的违规行数。键包含分区列时不可能跨分区重复。
+   有分区重新检查或被删除时，缓存中存在跨分区重复的分区重新统计，重复的另一侧修正后不再全量检查
+
+规则或表结构变化后缓存失效，全部分区重新检查。只支持数据库数据源，其他数据源全量检查。
+"""
+import base64
+import json
+import time
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from datalake.core.processing.sources import DatabaseSource
+from datalake.core.quality.engine import QualityEngine, build_rules, check_source, resolve_source
+from datalake.core.quality.rules import Rule, UniqueRule, null_mask
+from datalake.core.quality.sketches import HyperLogLog, hash_keys
+from datalake.core.quality.state import CheckStateStore, get_check_state_store
+from datalake.core.workflow.node_cache import canonical_hash
+from datalake.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# 增量检查的默认配置
+DEFAULT_INCREMENTAL = {
+    "partition_column": None,
+    "watermark_column": None,
+    "key": None,
+    "detect_deletes": False,
+    "verify_cross_partition": True,
+    "sketch_precision": 12
+}
+
+# 分区合并时相加的结果字段
+_SUMMED_FIELDS = ("checked", "violations", "null_violations", "duplicate_violations", "suspect_violations",
+                  "cross_partition_rows")
+
+
+def sql_literal(value: Any) -> str:
+    """Python 值转换为 SQL 字面量"""
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+class _KeySketch(Rule):
+    """收集一个分区中键的 HyperLogLog，用于估计跨分区重复"""
+
+    name = "key_sketch"
+
+    def __init__(self, columns: Sequence[str], precision: int):
+        super().__init__(columns, 0)
+        self.hll = HyperLogLog(precision)
+
+    def update(self, batch, offset: int):
+        valid = np.ones(len(batch[self.columns[0]]), dtype=bool)
+        for column in self.columns:
+            valid &= ~null_mask(batch[column])
+        self.hll.add(np.unique(hash_keys({column: batch[column][valid] for column in self.columns}, self.columns)))
+
+
+class PartitionedTable:
+    """按分区读取的数据库表"""
+
+    def __init__(self, source: DatabaseSource, partition_column: str, watermark_column: Optional[str] = None):
+        self.source = source
+        self.partition_column = partition_column
+        self.watermark_column = watermark_column
+        self.base_query = source.query.strip().rstrip(";")
+
+    def digests(self, since: Any = None, from_partition: Any = None) -> Dict[str, Dict[str, Any]]:
+        """
+        各分区的摘要
+
+        Args:
+            since: 只统计包含 watermark_column > since 的行的分区
+            from_partition: 只统计分区值 >= from_partition 的分区
+
+        Returns:
+            {JSON 编码的分区值: {"value", "rows", "max_watermark"}}
+        """
+        partition, watermark = self.partition_column, self.watermark_column
+        columns = f"{partition}, COUNT(*)" + (f", MAX({watermark})" if watermark else "")
+        conditions = []
+        if since is not None:
+            conditions.append(f"{partition} IN (SELECT {partition} FROM ({self.base_query}) AS changed "
+                              f"WHERE {watermark} > {sql_literal(since)})")
+        if from_partition is not None:
+            conditions.append(f"{partition} >= {sql_literal(from_partition)}")
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        query = f"SELECT {columns} FROM ({self.base_query}) AS source{where} GROUP BY {partition}"
+        connection = self.source.connect(self.source.connection_string)
+        try:
+            cursor = connection.cursor()
+            cursor.execute(query)
+            rows = cursor.fetchall()
+        finally:
+            connection.close()
+        return {
+            json.dumps(row[0], default=str): {"value": row[0], "rows": row[1],
+                                              "max_watermark": row[2] if watermark else None}
+            for row in rows
+        }
+
+    def _other_partitions(self, value: Any, alias: str) -> str:
+        column = f"{alias}.{self.partition_column}"
+        if value is None:
+            return f"{column} IS NOT NULL"
+        return f"({column} <> {sql_literal(value)} OR {column} IS NULL)"
+
+    def cross_partition_rows(self, value: Any, columns: Sequence[str]) -> int:
+        """分区中键（各列非空）在其他分区也出现过的行数"""
+        condition = f"changed.{self.partition_column} IS NULL" if value is None else \
+            f"changed.{self.partition_column} = {sql_literal(value)}"
+        matches = " AND ".join(f"other.{column} = changed.{column}" for column in columns)
+        query = (f"SELECT COUNT(*) FROM ({self.base_query}) AS changed WHERE {condition} AND EXISTS ("
+                 f"SELECT 1 FROM ({self.base_query}) AS other WHERE {matches} AND "
+                 f"{self._other_partitions(value, 'other')})")
+        connection = self.source.connect(self.source.connection_string)
+        try:
+            cursor = connection.cursor()
+            cursor.execute(query)
+            return int(cursor.fetchone()[0])
+        finally:
+            connection.close()
+
+    def partition(self, value: Any) -> DatabaseSource:
+        """只读取一个分区的数据源"""
+        condition = f"{self.partition_column} IS NULL" if value is None else \
+            f"{self.partition_column} = {sql_literal(value)}"
+        return DatabaseSource(self.source.connection_string, f"SELECT * FROM ({self.base_query}) AS source "
+                              f"WHERE {condition}", self.source.batch_size, self.source.columns,
+                              connect=self.source.connect)
+
+
+def _check_partition(table: PartitionedTable, value: Any, rule_configs: Sequence[Any],
+                     table_schema: Mapping[str, Any], sample_size: int, precision: int) -> Dict[str, Any]:
+    """检查一个分区，返回该分区各规则的结果与键的 HyperLogLog"""
+    rules = build_rules(rule_configs, table_schema, sample_size)
+    sketches = {index: _KeySketch(rule.columns, precision) for index, rule in enumerate(rules)
+                if isinstance(rule, UniqueRule)}
+    source = table.partition(value)
+    report = QualityEngine(rules + list(sketches.values())).run(source.batches(), rescan=source.batches)
+    results = report["rules"][:len(rules)]
+    for index in sketches:
+        if table.partition_column not in rules[index].columns:
+            results[index]["cross_partition_rows"] = table.cross_partition_rows(value, rules[index].columns)
+    return {
+        "results": results,
+        "sketches": {str(index): base64.b64encode(sketch.hll.to_bytes()).decode("ascii")
+                     for index, sketch in sketches.items()},
+        "rows": report["rows"],
+        "passes": report["passes"]
+    }
+
+
+def _refresh_cross_partition(table: PartitionedTable, cached: Mapping[str, Mapping[str, Any]],
+                             digests: Mapping[str, Any], updated: Mapping[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    重新统计缓存中存在跨分区重复的分区
+
+    重复的另一侧分区变化或被删除后，缓存的 cross_partition_rows 可能已经过期，不重新统计会使该规则每次都全量检查。
+
+    Returns:
+        {JSON 编码的分区值: 更新了 cross_partition_rows 的缓存条目}
+    """
+    refreshed = {}
+    for key, entry in cached.items():
+        if key in updated or key not in digests:
+            continue
+        results = [dict(result) for result in entry["results"]]
+        stale = [result for result in results if result.get("cross_partition_rows", 0) > 0]
+        for result in stale:
+            result["cross_partition_rows"] = table.cross_partition_rows(json.loads(key), result["columns"])
+        if stale:
+            refreshed[key] = {**entry, "results": results}
+    return refreshed
+
+
+def _merge(rule: Rule, index: int, partitions: Mapping[str, Mapping[str, Any]], partition_column: str,
+           sample_size: int) -> Dict[str, Any]:
+    """合并各分区同一条规则的结果"""
+    parts = [(json.loads(key), entry["results"][index]) for key, entry in sorted(partitions.items())]
+    merged = dict(parts[0][1]) if parts else rule.result()
+    for field in _SUMMED_FIELDS:
+        if field in merged:
+            merged[field] = sum(result.get(field, 0) for _, result in parts)
+    merged["samples"] = [
+        {**sample, "partition": value} for value, result in parts for sample in result["samples"]
+    ][:sample_size]
+    if "exact" in merged:
+        merged["exact"] = all(result.get("exact", True) for _, result in parts)
+    merged.pop("bloom_filter", None)
+
+    suspected = False
+    if isinstance(rule, UniqueRule) and parts:
+        sketch = None
+        for _, entry in partitions.items():
+            partition_sketch = HyperLogLog.from_bytes(base64.b64decode(entry["sketches"][str(index)]))
+            if sketch is None:
+                sketch = partition_sketch
+            else:
+                sketch.merge(partition_sketch)
+        partition_distinct = sum(result["distinct"] for _, result in parts)
+        if partition_column in rule.columns:
+            merged["distinct"] = partition_distinct
+        else:
+            merged["distinct"] = sketch.count()
+            # 各分区不同键数之和超出合并后的不同键数 3 倍标准误差时，同样认为存在跨分区重复
+            estimated = max(partition_distinct - merged["distinct"], 0)
+            merged["cross_partition_duplicates"] = estimated
+            suspected = merged.get("cross_partition_rows", 0) > 0 or \
+                estimated > 3 * sketch.relative_error * max(merged["distinct"], 1)
+            if suspected:
+                # 未全量复核时计入跨分区重复行数（两侧分区都重新检查过时会重复计数，为上界）
+                merged["violations"] += merged.get("cross_partition_rows", 0)
+                merged["exact"] = False
+        merged["cross_partition_suspected"] = suspected
+
+    merged["violation_rate"] = merged["violations"] / merged["checked"] if merged["checked"] else 0.0
+    passed = merged["violations"] == 0 and not suspected
+    merged["status"] = "passed" if passed else "failed"
+    merged["message"] = (f"{merged['rule']} check {merged['status']} on {', '.join(merged['columns'])}: "
+                         f"{merged['violations']} of {merged['checked']} rows violate"
+                         + (", duplicates across partitions suspected" if suspected else ""))
+    return merged
+
+
+def incremental_check(source: Any, rule_configs: Sequence[Any], table_schema: Mapping[str, Any] = None,
+                      incremental: Mapping[str, Any] = None, sample_size: int = 5, store: CheckStateStore = None,
+                      **source_kwargs) -> Dict[str, Any]:
+    """
+    增量执行质量规则，只检查新增或变化的分区
+
+    Args:
+        source: 数据库数据源配置或已创建的数据源
+        rule_configs: 规则配置
+        table_schema: 表结构
+        incremental: 增量配置，见 DEFAULT_INCREMENTAL，partition_column 必填
+        sample_size: 每条规则最多记录的违规样本数
+        store: 检查状态，默认为进程共享的检查状态
+        **source_kwargs: 传给数据源的参数
+
+    Returns:
+        QualityEngine.run 的结果，另含 incremental、partitions、checked_partitions、cached_partitions、
+        removed_partitions、watermark、escalated
+
+    Raises:
+        ValueError: 未配置 partition_column
+    """
+    incremental = {**DEFAULT_INCREMENTAL, **(incremental or {})}
+    partition_column, watermark_column = incremental["partition_column"], incremental["watermark_column"]
+    if not partition_column:
+        raise ValueError("partition_column is required for incremental table checks")
+    start_time = time.perf_counter()
+
+    groups = [build_rules([config], table_schema, sample_size) for config in rule_configs]
+    rules = [rule for group in groups for rule in group]
+    columns = list(dict.fromkeys([column for rule in rules for column in rule.columns]))
+    source = resolve_source(source, columns, **source_kwargs)
+    if not isinstance(source, DatabaseSource):
+        logger.warning("Incremental table checks need a database source, checking %s in full",
+                       type(source).__name__)
+        return {**check_source(source, rule_configs, table_schema, sample_size), "incremental": False}
+
+    store = store or get_check_state_store()
+    table = PartitionedTable(source, partition_column, watermark_column)
+    table_key = incremental["key"] or canonical_hash({"connection_string": source.connection_string,
+                                                       "query": source.query})
+    fingerprint = canonical_hash({
+        "rules": list(rule_configs), "columns": (table_schema or {}).get("columns"), "sample_size": sample_size,
+        "partition_column": partition_column, "watermark_column": watermark_column,
+        "sketch_precision": incremental["sketch_precision"]
+    })
+    state = store.get_table(table_key)
+    valid_state = state is not None and state["fingerprint"] == fingerprint
+    cached = store.get_partitions(table_key) if valid_state else {}
+
+    if valid_state and state.get("watermark") is not None and not incremental["detect_deletes"]:
+        recent = table.digests(since=state["watermark"]) if watermark_column else \
+            table.digests(from_partition=state["watermark"])
+        digests = {**{key: {"value": json.loads(key), **entry["digest"]} for key, entry in cached.items()},
+                   **recent}
+        removed: List[str] = []
+    else:
+        digests = table.digests()
+        removed = [key for key in cached if key not in digests]
+
+    def digest_of(entry: Mapping[str, Any]) -> Dict[str, Any]:
+        return {"rows": entry["rows"], "max_watermark": entry["max_watermark"]}
+
+    changed = [key for key, entry in digests.items()
+               if key not in cached or cached[key]["digest"] != json.loads(json.dumps(digest_of(entry), default=str))]
+    rows = passes = 0
+    updated: Dict[str, Dict[str, Any]] = {}
+    for key in changed:
+        value = digests[key]["value"]
+        checked = _check_partition(table, value, rule_configs, table_schema, sample_size,
+                                   incremental["sketch_precision"])
+        updated[key] = {"digest": digest_of(digests[key]), "results": checked["results"],
+                        "sketches": checked["sketches"]}
+        rows += checked["rows"]
+        passes = max(passes, checked["passes"])
+    if changed or removed:
+        updated.update(_refresh_cross_partition(table, cached, digests, updated))
+    logger.info("Incremental table check: %d partitions checked, %d cached, %d removed",
+                len(changed), len(digests) - len(changed), len(removed))
+
+    # JSON 往返后与缓存的格式一致
+    updated = json.loads(json.dumps(updated, default=str))
+    partitions = {key: cached[key] for key in digests if key not in updated}
+    partitions.update(updated)
+
+    if watermark_column:
+        marks = [entry["digest"]["max_watermark"] for entry in partitions.values()
+                 if entry["digest"]["max_watermark"] is not None]
+    else:
+        marks = [json.loads(key) for key in partitions if json.loads(key) is not None]
+    watermark = max(marks) if marks else None
+    store.save(table_key, {"fingerprint": fingerprint, "watermark": watermark, "updated_at": time.time()},
+               updated, removed, replace=not valid_state)
+
+    results: List[Dict[str, Any]] = []
+    escalated = []
+    index = 0
+    for config, group in zip(rule_configs, groups):
+        merged = [_merge(rule, index + offset, partitions, partition_column, sample_size)
+                  for offset, rule in enumerate(group)]
+        index += len(group)
+        if incremental["verify_cross_partition"] and any(result.get("cross_partition_suspected") for result in merged):
+            logger.info("Duplicates across partitions suspected, checking %s in full", config)
+            report = check_source(source, [config], table_schema, sample_size)
+            merged = [{**result, "escalated": True} for result in report["rules"]]
+            escalated.append(config if isinstance(config, str) else config.get("rule"))
+            rows = max(rows, report["rows"])
+            passes += report["passes"]
+        results.extend(merged)
+
+    elapsed = time.perf_counter() - start_time
+    return {
+        "passed": all(result["status"] == "passed" for result in results),
+        "rows": rows,
+        "incremental": True,
+        "partitions": len(partitions),
+        "checked_partitions": len(changed),
+        "cached_partitions": len(partitions) - len(changed),
+        "removed_partitions": len(removed),
+        "watermark": watermark,
+        "escalated": escalated,
+        "passes": passes,
+        "elapsed": elapsed,
+        "rows_per_second": rows / elapsed if elapsed > 0 else 0.0,
+        "rules": results
+    }
@@ -0,0 +1,620 @@
+# 欲买桂花同载酒，
+# 终不似、少年游。
+# Copyright (c) VernonSong. All rights reserved.
+# ======================================================================================================================
+"""
+数据质量规则
+
+每条规则逐批接收 {列名: NumPy 数组}，以向量化运算统计违规行数并记录少量违规样本；
+同一批数据由引擎交给所有规则，规则之间不重复读取数据。
+
+- not_null：列值为 None / NaN / NaT
+- data_type：列值不能转换为声明的类型（int、float、string、bool、timestamp、date），string 可限制 max_length
+- unique_constraint：键（一列或多列）重复，空键不参与比较
+- primary_key：键为空或重复
+
+唯一性检查精确计数：每批内先去重，只保留 (键, 首次出现的行号)，批之间的重复在合并时检出，
+内存与不同键的数量成正比。规则配置 "mode": "approximate" 时改用近似检查（ApproximateUniqueRule），
+内存有上限，与表的行数无关。
+"""
+import datetime
+import itertools
+import numbers
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from datalake.core.quality.sketches import HyperLogLog, ScalableBloomFilter, hash_keys
+from datalake.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# 一批数据：列名 -> 列值数组
+ArrayBatch = Dict[str, np.ndarray]
+
+# 类型别名 -> 标准类型
+_TYPE_ALIASES = {
+    "int": "int", "integer": "int", "bigint": "int", "smallint": "int", "tinyint": "int", "long": "int",
+    "float": "float", "double": "float", "decimal": "float", "numeric": "float", "real": "float",
+    "string": "string", "str": "string", "varchar": "string", "char": "string", "text": "string",
+    "bool": "bool", "boolean": "bool",
+    "timestamp": "timestamp", "datetime": "timestamp",
+    "date": "date"
+}
+
+# 合并唯一性检查的分块前最多保留的块数
+_MAX_KEY_CHUNKS = 64
+
+
+def as_column(values: Any) -> np.ndarray:
+    """
+    把一列值转换为 NumPy 数组
+
+    类型一致且没有空值的列转换为对应的定长类型，其余保留为 object 数组，避免 np.asarray 把 [1, "a"] 转成字符串。
+    """
+    if isinstance(values, np.ndarray):
+        return values
+    types = set(map(type, values))
+    if len(types) == 1 and types <= {int, float, str, bool}:
+        return np.asarray(values)
+    if types <= {int, float} and types:
+        return np.asarray(values, dtype=np.float64)
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def null_mask(values: np.ndarray) -> np.ndarray:
+    """空值掩码：None、NaN、NaT"""
+    kind = values.dtype.kind
+    if kind == "f":
+        return np.isnan(values)
+    if kind in "mM":
+        return np.isnat(values)
+    if kind == "O":
+        # NaN != NaN
+        return np.equal(values, None) | (values != values)
+    return np.zeros(len(values), dtype=bool)
+
+
+def normalize_type(data_type: str) -> str:
+    """
+    解析声明的类型，VARCHAR(64)、DECIMAL(10,2) 等去掉长度与精度
+
+    Raises:
+        ValueError: 不支持的类型
+    """
+    name = data_type.split("(", 1)[0].strip().lower()
+    if name not in _TYPE_ALIASES:
+        raise ValueError(f"Unsupported data type: {data_type}")
+    return _TYPE_ALIASES[name]
+
+
+def _is_int(value: Any) -> bool:
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, int):
+        return True
+    if isinstance(value, float):
+        return value.is_integer()
+    if isinstance(value, str):
+        try:
+            int(value.strip())
+            return True
+        except ValueError:
+            return False
+    return False
+
+
+def _is_float(value: Any) -> bool:
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, (int, float)):
+        return True
+    if isinstance(value, str):
+        try:
+            float(value)
+            return True
+        except ValueError:
+            return False
+    return False
+
+
+def _is_bool(value: Any) -> bool:
+    if isinstance(value, (bool, np.bool_)):
+        return True
+    if isinstance(value, int):
+        return value in (0, 1)
+    return isinstance(value, str) and value.strip().lower() in ("true", "false", "0", "1")
+
+
+def _is_timestamp(value: Any) -> bool:
+    if isinstance(value, (datetime.datetime, datetime.date, np.datetime64)):
+        return True
+    if isinstance(value, str):
+        try:
+            datetime.datetime.fromisoformat(value.strip())
+            return True
+        except ValueError:
+            return False
+    return False
+
+
+def _is_date(value: Any) -> bool:
+    if isinstance(value, datetime.date) and not isinstance(value, datetime.datetime):
+        return True
+    if isinstance(value, str):
+        try:
+            datetime.date.fromisoformat(value.strip())
+            return True
+        except ValueError:
+            return False
+    return False
+
+
+_CONFORMS = {
+    "int": _is_int,
+    "float": _is_float,
+    "string": lambda value: True,
+    "bool": _is_bool,
+    "timestamp": _is_timestamp,
+    "date": _is_date
+}
+
+
+def type_violations(values: np.ndarray, data_type: str) -> np.ndarray:
+    """
+    不能转换为 data_type 的非空值掩码
+
+    定长数组按 dtype 整体判断，字符串数组先尝试整体转换，只有 object 数组和整体转换失败的字符串数组逐个判断。
+    """
+    kind = values.dtype.kind
+    nulls = null_mask(values)
+    if kind in "iu":
+        if data_type in ("int", "float", "string"):
+            return np.zeros(len(values), dtype=bool)
+        if data_type == "bool":
+            return (values != 0) & (values != 1)
+    elif kind == "f":
+        if data_type in ("float", "string"):
+            return np.zeros(len(values), dtype=bool)
+        if data_type == "int":
+            return ~nulls & (np.floor(values) != values)
+    elif kind == "b":
+        if data_type in ("bool", "string"):
+            return np.zeros(len(values), dtype=bool)
+    elif kind == "M":
+        if data_type in ("timestamp", "string"):
+            return np.zeros(len(values), dtype=bool)
+    elif kind == "U":
+        if data_type == "string":
+            return np.zeros(len(values), dtype=bool)
+        if data_type in ("int", "float", "timestamp"):
+            try:
+                converted = values.astype({"int": np.int64, "float": np.float64, "timestamp": "datetime64[us]"}[data_type])
+                # datetime64 把空字符串转换为 NaT
+                return np.isnat(converted) if data_type == "timestamp" else np.zeros(len(values), dtype=bool)
+            except ValueError:
+                pass
+    conforms = np.frompyfunc(_CONFORMS[data_type], 1, 1)
+    return ~nulls & ~conforms(values).astype(bool)
+
+
+def _python_value(value: Any) -> Any:
+    """NumPy 标量转换为可 JSON 序列化的 Python 值"""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return value
+
+
+# 列的数组类型 -> 键的类别，类别相同的列值可以直接比较；object 列逐个值标记类别
+_KEY_FAMILIES = {"i": "number", "u": "number", "f": "number", "b": "number", "U": "string", "S": "bytes",
+                 "M": "datetime", "m": "timedelta"}
+
+
+def _tagged(value: Any) -> tuple:
+    """
+    带类别的键值 (类别, 值)
+
+    与 sketches.hash_column 一致：整数、浮点数与布尔值同为数值，字符串 "1" 与整数 1 是不同的键；
+    不同类别的值按类别排序，不会互相比较。
+    """
+    if isinstance(value, (np.datetime64, np.timedelta64)):
+        value = value.astype(f"{value.dtype.kind}8[us]").item()
+    elif isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, numbers.Number) and not isinstance(value, complex):
+        return "number", value
+    return type(value).__name__, value
+
+
+def tagged_keys(rows: Iterable[Sequence[Any]], count: int) -> np.ndarray:
+    """
+    按行的键值生成带类别的键：(类别1, 值1, 类别2, 值2, ...) 的 object 数组，可以排序且不同类别的值不相等
+
+    Args:
+        rows: 每行键的各列值
+        count: 行数
+    """
+    keys = np.empty(count, dtype=object)
+    for index, row in enumerate(rows):
+        keys[index] = tuple(itertools.chain.from_iterable(_tagged(value) for value in row))
+    return keys
+
+
+def key_array(batch: ArrayBatch, columns: Sequence[str]) -> np.ndarray:
+    """一列或多列组成的键：单列直接使用该列，多个数值列组成结构化数组，否则为元组的 object 数组"""
+    if len(columns) == 1:
+        return batch[columns[0]]
+    arrays = [batch[column] for column in columns]
+    if all(array.dtype.kind in "iufbM" for array in arrays):
+        return np.rec.fromarrays(arrays, names=[f"k{index}" for index in range(len(arrays))]).view(np.ndarray)
+    keys = np.empty(len(arrays[0]), dtype=object)
+    keys[:] = list(zip(*arrays))
+    return keys
+
+
+class Rule:
+    """质量规则基类"""
+
+    name = ""
+
+    def __init__(self, columns: Sequence[str], sample_size: int = 5):
+        """
+        Args:
+            columns: 规则检查的列
+            sample_size: 最多记录的违规样本数
+        """
+        self.columns = list(columns)
+        self.sample_size = sample_size
+        self.checked = 0
+        self.violations = 0
+        self.samples: List[Dict[str, Any]] = []
+
+    def update(self, batch: ArrayBatch, offset: int):
+        """检查一批数据，offset 为该批第一行的行号"""
+        raise NotImplementedError("Subclasses must implement the update method")
+
+    def finish(self):
+        """全部数据检查完后调用"""
+
+    @property
+    def needs_verification(self) -> bool:
+        """是否需要再读取一遍数据复核（近似规则有可疑键时）"""
+        return False
+
+    def verify(self, batch: ArrayBatch, offset: int):
+        """复核遍历中检查一批数据"""
+
+    def finish_verification(self):
+        """复核遍历结束后调用"""
+
+    def skip_verification(self):
+        """无法再读取数据复核时调用，保留第一遍的结果"""
+
+    def _record(self, mask: np.ndarray, batch: ArrayBatch, offset: int):
+        """累计违规行数，并记录违规样本"""
+        count = int(np.count_nonzero(mask))
+        self.violations += count
+        if count and len(self.samples) < self.sample_size:
+            for index in np.flatnonzero(mask)[:self.sample_size - len(self.samples)]:
+                self.samples.append({
+                    "row": offset + int(index),
+                    "values": {column: _python_value(batch[column][index]) for column in self.columns}
+                })
+
+    def details(self) -> Dict[str, Any]:
+        """规则特有的结果字段"""
+        return {}
+
+    def result(self) -> Dict[str, Any]:
+        passed = self.violations == 0
+        return {
+            "rule": self.name,
+            "columns": self.columns,
+            "status": "passed" if passed else "failed",
+            "checked": self.checked,
+            "violations": self.violations,
+            "violation_rate": self.violations / self.checked if self.checked else 0.0,
+            "samples": self.samples,
+            "message": f"{self.name} check {'passed' if passed else 'failed'} on {', '.join(self.columns)}: "
+                       f"{self.violations} of {self.checked} rows violate",
+            **self.details()
+        }
+
+
+class NotNullRule(Rule):
+    name = "not_null"
+
+    def update(self, batch: ArrayBatch, offset: int):
+        values = batch[self.columns[0]]
+        self.checked += len(values)
+        self._record(null_mask(values), batch, offset)
+
+
+class DataTypeRule(Rule):
+    name = "data_type"
+
+    def __init__(self, columns: Sequence[str], sample_size: int = 5, data_type: str = "string",
+                 max_length: Optional[int] = None):
+        """
+        Args:
+            data_type: 声明的类型，VARCHAR(64) 形式的长度同时作为 max_length
+            max_length: string 的最大长度
+        """
+        super().__init__(columns, sample_size)
+        self.declared_type = data_type
+        self.data_type = normalize_type(data_type)
+        if max_length is None and self.data_type == "string" and "(" in data_type:
+            max_length = int(data_type.split("(", 1)[1].rstrip(")").split(",")[0])
+        self.max_length = max_length
+
+    def update(self, batch: ArrayBatch, offset: int):
+        values = batch[self.columns[0]]
+        self.checked += len(values)
+        mask = type_violations(values, self.data_type)
+        if self.max_length is not None:
+            lengths = np.char.str_len(values) if values.dtype.kind == "U" else \
+                np.frompyfunc(lambda value: len(str(value)), 1, 1)(values).astype(np.int64)
+            mask |= ~null_mask(values) & (lengths > self.max_length)
+        self._record(mask, batch, offset)
+
+    def details(self) -> Dict[str, Any]:
+        return {"data_type": self.declared_type}
+
+
+class UniqueRule(Rule):
+    """
+    键唯一：每批去重后保留 (键, 首次出现的行号)，批之间的重复在合并时检出
+
+    各键列都是同一类别的定型数组时直接比较键；含 object 列（如 SQLite 的无类型列）或各批的类别不同时，
+    键转换为带类别的键（tagged_keys）再排序，混合类型不会出错，1 与 "1" 也不会被当作重复。
+    """
+
+    name = "unique_constraint"
+
+    def __init__(self, columns: Sequence[str], sample_size: int = 5):
+        super().__init__(columns, sample_size)
+        # 每批去重后的键、首次出现的行号与键的类别（带类别的键为 None）
+        self._keys: List[np.ndarray] = []
+        self._rows: List[np.ndarray] = []
+        self._families: List[Optional[Tuple[str, ...]]] = []
+        self.distinct = 0
+
+    def _valid(self, batch: ArrayBatch) -> np.ndarray:
+        """参与比较的行：键的各列都不为空"""
+        valid = np.ones(len(batch[self.columns[0]]), dtype=bool)
+        for column in self.columns:
+            valid &= ~null_mask(batch[column])
+        return valid
+
+    def update(self, batch: ArrayBatch, offset: int):
+        valid = self._valid(batch)
+        self.checked += len(valid)
+        self._update_keys(batch, offset, valid)
+
+    def _batch_keys(self, batch: ArrayBatch, valid: np.ndarray) -> Tuple[Optional[Tuple[str, ...]], np.ndarray]:
+        """一批的键与键的类别；含 object 列时为带类别的键，类别为 None"""
+        arrays = {column: batch[column][valid] for column in self.columns}
+        families = tuple(_KEY_FAMILIES.get(array.dtype.kind) for array in arrays.values())
+        if None in families:
+            return None, tagged_keys(zip(*arrays.values()), int(np.count_nonzero(valid)))
+        return families, key_array(arrays, self.columns)
+
+    def _tag(self, keys: np.ndarray) -> np.ndarray:
+        """把定型的键转换为带类别的键"""
+        if keys.dtype.names:
+            rows = zip(*(keys[name] for name in keys.dtype.names))
+        elif len(self.columns) > 1:
+            rows = keys
+        else:
+            rows = ((value,) for value in keys)
+        return tagged_keys(rows, len(keys))
+
+    def _update_keys(self, batch: ArrayBatch, offset: int, valid: np.ndarray):
+        families, keys = self._batch_keys(batch, valid)
+        rows = np.flatnonzero(valid)
+        unique, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        if len(unique) < len(keys):
+            # 批内重复：不是该键在本批首次出现的行
+            repeated = np.ones(len(keys), dtype=bool)
+            repeated[first] = False
+            mask = np.zeros(len(valid), dtype=bool)
+            mask[rows[repeated]] = True
+            self._record(mask, batch, offset)
+        self._keys.append(unique)
+        self._rows.append(rows[first] + offset)
+        self._families.append(families)
+        if len(self._keys) > _MAX_KEY_CHUNKS:
+            self._merge()
+
+    def _merge(self):
+        """合并各批的键，统计批之间的重复，只保留每个键首次出现的行号"""
+        if not self._keys:
+            return
+        families = self._families[0]
+        # 多列的结构化数组字段类型不同时不能直接拼接
+        typed = families is not None and all(item == families for item in self._families) and \
+            (len(self.columns) == 1 or len({chunk.dtype for chunk in self._keys}) == 1)
+        keys = np.concatenate(self._keys if typed else [
+            chunk if family is None else self._tag(chunk) for chunk, family in zip(self._keys, self._families)])
+        rows = np.concatenate(self._rows)
+        order = np.argsort(keys, kind="stable")
+        keys, rows = keys[order], rows[order]
+        repeated = np.zeros(len(keys), dtype=bool)
+        repeated[1:] = keys[1:] == keys[:-1]
+        count = int(np.count_nonzero(repeated))
+        if count:
+            self.violations += count
+            for index in np.flatnonzero(repeated)[:max(self.sample_size - len(self.samples), 0)]:
+                key = keys[index]
+                if not typed:
+                    values = key[1::2]
+                else:
+                    values = key if len(self.columns) > 1 else (key,)
+                self.samples.append({
+                    "row": int(rows[index]),
+                    "values": {column: _python_value(value) for column, value in zip(self.columns, values)}
+                })
+        self._keys, self._rows = [keys[~repeated]], [rows[~repeated]]
+        self._families = [families if typed else None]
+
+    def finish(self):
+        self._merge()
+        self.distinct = len(self._keys[0]) if self._keys else 0
+        self._keys, self._rows, self._families = [], [], []
+
+    def details(self) -> Dict[str, Any]:
+        return {"distinct": self.distinct}
+
+
+class PrimaryKeyRule(UniqueRule):
+    """主键：键的各列不为空且键唯一"""
+
+    name = "primary_key"
+
+    def __init__(self, columns: Sequence[str], sample_size: int = 5):
+        super().__init__(columns, sample_size)
+        self.null_violations = 0
+
+    def update(self, batch: ArrayBatch, offset: int):
+        valid = self._valid(batch)
+        self.checked += len(valid)
+        before = self.violations
+        self._record(~valid, batch, offset)
+        self.null_violations += self.violations - before
+        self._update_keys(batch, offset, valid)
+
+    def details(self) -> Dict[str, Any]:
+        return {"distinct": self.distinct, "null_violations": self.null_violations,
+                "duplicate_violations": self.violations - self.null_violations}
+
+
+class ApproximateUniqueRule(UniqueRule):
+    """
+    近似键唯一检查
+
+    第一遍只处理键的 64 位哈希：HyperLogLog 估计不同键数，可扩展布隆过滤器找出可能在之前批次出现过的键，
+    批内重复的键与布隆过滤器命中的键作为可疑键保留哈希。布隆过滤器没有假阴性，重复的键一定是可疑键；
+    误判只会多出可疑键。有可疑键时由引擎再读取一遍数据，只对哈希属于可疑键的行按实际键值精确计数，
+    得到准确的违规行数与样本。
+
+    内存上限为布隆过滤器的 max_memory_mb、HyperLogLog 的寄存器与最多 max_suspects 个可疑键；
+    可疑键超过上限时不再复核，违规行数为第一遍的估计值（上界），结果中 exact 为 False。
+    """
+
+    def __init__(self, columns: Sequence[str], sample_size: int = 5, error_rate: float = 0.001,
+                 cardinality_error: float = 0.01, initial_capacity: int = 1 << 20, max_memory_mb: float = 64,
+                 max_suspects: int = 1_000_000):
+        """
+        Args:
+            error_rate: 布隆过滤器的误判率，决定可疑键中误判的比例
+            cardinality_error: 不同键数估计的相对标准误差
+            initial_capacity: 第一个布隆子过滤器的容量
+            max_memory_mb: 布隆过滤器的内存上限（MB）
+            max_suspects: 最多保留的可疑键数
+        """
+        super().__init__(columns, sample_size)
+        self.hll = HyperLogLog.for_error(cardinality_error)
+        self.bloom = ScalableBloomFilter(error_rate, initial_capacity, int(max_memory_mb * (1 << 20)))
+        self.max_suspects = max_suspects
+        self.suspect_violations = 0
+        self.exact = True
+        self._suspects: List[np.ndarray] = []
+        self._suspect_hashes = np.empty(0, dtype=np.uint64)
+        self._seen: Dict[Any, int] = {}
+
+    def _update_keys(self, batch: ArrayBatch, offset: int, valid: np.ndarray):
+        hashes = hash_keys({column: batch[column][valid] for column in self.columns}, self.columns)
+        unique, counts = np.unique(hashes, return_counts=True)
+        self.hll.add(unique)
+        seen = self.bloom.add_new(unique)
+        suspects = unique[seen | (counts > 1)]
+        self.suspect_violations += int(np.sum(counts[counts > 1] - 1)) + int(np.count_nonzero(seen))
+        if len(suspects) and self.exact:
+            self._suspects.append(suspects)
+            if sum(len(chunk) for chunk in self._suspects) > self.max_suspects:
+                self._suspects = [np.unique(np.concatenate(self._suspects))]
+                if len(self._suspects[0]) > self.max_suspects:
+                    logger.warning("Too many suspicious keys for %s on %s, skipping exact verification",
+                                   self.name, ", ".join(self.columns))
+                    self.exact = False
+                    self._suspects = []
+
+    def finish(self):
+        self.distinct = self.hll.count()
+        if self._suspects:
+            self._suspect_hashes = np.unique(np.concatenate(self._suspects))
+            self._suspects = []
+        if not self.needs_verification:
+            self.violations += self.suspect_violations
+
+    @property
+    def needs_verification(self) -> bool:
+        return self.exact and len(self._suspect_hashes) > 0
+
+    def verify(self, batch: ArrayBatch, offset: int):
+        valid = self._valid(batch)
+        rows = np.flatnonzero(valid)
+        hashes = hash_keys({column: batch[column][valid] for column in self.columns}, self.columns)
+        position = np.minimum(np.searchsorted(self._suspect_hashes, hashes), len(self._suspect_hashes) - 1)
+        candidates = rows[self._suspect_hashes[position] == hashes]
+        if not len(candidates):
+            return
+        # 可疑行按实际键值计数，键第二次及之后出现的行为违规行
+        mask = np.zeros(len(valid), dtype=bool)
+        for index in candidates:
+            key = tuple(_python_value(batch[column][index]) for column in self.columns)
+            if key in self._seen:
+                mask[index] = True
+            else:
+                self._seen[key] = offset + int(index)
+        self._record(mask, batch, offset)
+
+    def finish_verification(self):
+        self._suspect_hashes = np.empty(0, dtype=np.uint64)
+        self._seen = {}
+
+    def skip_verification(self):
+        self.exact = False
+        self.violations += self.suspect_violations
+        self.finish_verification()
+
+    def details(self) -> Dict[str, Any]:
+        return {
+            "distinct": self.distinct,
+            "mode": "approximate",
+            "exact": self.exact,
+            "distinct_error": self.hll.relative_error,
+            "suspect_violations": self.suspect_violations,
+            "bloom_filter": self.bloom.stats()
+        }
+
+
+class ApproximatePrimaryKeyRule(ApproximateUniqueRule, PrimaryKeyRule):
+    """近似主键检查：空键在第一遍精确计数，重复键按 ApproximateUniqueRule 检查"""
+
+    name = "primary_key"
+
+    def details(self) -> Dict[str, Any]:
+        return {**ApproximateUniqueRule.details(self), "null_violations": self.null_violations,
+                "duplicate_violations": self.violations - self.null_violations}
+
+
+# 规则名称 -> 规则类
+RULE_TYPES = {
+    "not_null": NotNullRule,
+    "data_type": DataTypeRule,
+    "unique_constraint": UniqueRule,
+    "primary_key": PrimaryKeyRule
+}
+
+# 支持近似检查的规则名称 -> 近似规则类
+APPROXIMATE_RULE_TYPES = {
+    "unique_constraint": ApproximateUniqueRule,
+    "primary_key": ApproximatePrimaryKeyRule
+}
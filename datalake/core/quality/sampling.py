@@ -0,0 +1,316 @@
+# 欲买桂花同载酒，
+# 终不似、少年游。
+# Copyright (c) VernonSong. All rights reserved.
+# ======================================================================================================================
+"""
+抽样质量检查
+
+只检查源表的一个均匀样本，按 Wilson 区间给出各规则违规率的置信区间，快速判断能否入湖：
+
+- 置信区间下界超过 max_violation_rate：判定失败
+- 置信区间上界不超过 max_violation_rate + margin：判定通过
+- 其余为无法判定（inconclusive），escalate 为 True 时只对这些规则全量检查
+
+抽样方式（sampling.method）：
+
+- reservoir：逐批为每行生成随机优先级，保留优先级最小的 sample_rows 行（向量化的水库抽样），只转换被选中的行
+- block：按 fraction 的概率整批保留或跳过，再在保留的批中水库抽样
+
+数据库数据源在知道抽样比例（sampling.fraction，或 COUNT(*) 得到的行数）时把抽样下推到查询：
+SQLite 以 random() 过滤，其他数据库配置 sampling.tablesample 后改写为 TABLESAMPLE SYSTEM（block）/
+BERNOULLI（reservoir），只有单表的简单查询可以改写。
+
+每条规则可单独配置样本行数 sample_rows（规则字典中，或 sampling.rule_sample_rows），为 0 时不抽样直接全量检查。
+唯一性与主键规则在样本中发现重复即判定失败，未发现重复不能说明全表唯一，判定为无法判定。
+"""
+import re
+import time
+from statistics import NormalDist
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from datalake.core.processing.sources import DatabaseSource, RecordSource, connect_sqlite
+from datalake.core.quality.engine import QualityEngine, build_rules, check_source, resolve_source
+from datalake.core.quality.rules import UniqueRule, as_column
+from datalake.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# 抽样检查的默认配置
+DEFAULT_SAMPLING = {
+    "method": "reservoir",
+    "sample_rows": 10000,
+    "confidence": 0.95,
+    "margin": 0.001,
+    "escalate": True,
+    "oversample": 1.2,
+    "seed": None
+}
+
+_SIMPLE_QUERY = re.compile(
+    r"^\s*SELECT\s+(?P<select>.+?)\s+FROM\s+(?P<table>[\w.\"`]+)(?P<rest>\s+(?:WHERE|ORDER\s+BY|LIMIT)\b.*)?\s*;?\s*$",
+    re.IGNORECASE | re.DOTALL
+)
+
+
+def wilson_interval(violations: int, rows: int, confidence: float = 0.95) -> Tuple[float, float]:
+    """
+    违规率的 Wilson 置信区间
+
+    Args:
+        violations: 样本中的违规行数
+        rows: 样本行数
+        confidence: 置信度
+
+    Returns:
+        (下界, 上界)，样本为空时为 (0, 1)
+    """
+    if rows <= 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    rate = violations / rows
+    denominator = 1 + z * z / rows
+    center = (rate + z * z / (2 * rows)) / denominator
+    half_width = z * np.sqrt(rate * (1 - rate) / rows + z * z / (4 * rows * rows)) / denominator
+    # 没有违规时下界为 0，全部违规时上界为 1，避免浮点误差
+    low = 0.0 if violations == 0 else max(0.0, float(center - half_width))
+    high = 1.0 if violations == rows else min(1.0, float(center + half_width))
+    return low, high
+
+
+def _concatenate(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """拼接两批样本，类型不同（数值以外）时保留为 object 数组，避免整数与字符串被合并为字符串"""
+    kinds = {first.dtype.kind, second.dtype.kind}
+    if len(kinds) > 1 and not kinds <= set("iufb"):
+        first, second = first.astype(object), second.astype(object)
+    return np.concatenate([first, second])
+
+
+class ReservoirSampler:
+    """向量化水库抽样：每行一个均匀随机优先级，保留优先级最小的 size 行，样本按优先级排序"""
+
+    def __init__(self, size: int, columns: Sequence[str], seed: Optional[int] = None):
+        self.size = size
+        self.columns = list(columns)
+        self.rng = np.random.default_rng(seed)
+        self.rows_seen = 0
+        self._priorities = np.empty(0)
+        self._rows = np.empty(0, dtype=np.int64)
+        self._values: Dict[str, np.ndarray] = {}
+
+    def update(self, batch: Mapping[str, Sequence[Any]]):
+        """加入一批数据，只转换进入样本的行"""
+        count = len(batch[self.columns[0]]) if self.columns else 0
+        offset, self.rows_seen = self.rows_seen, self.rows_seen + count
+        if not count or not self.size:
+            return
+        priorities = self.rng.random(count)
+        if len(self._priorities) >= self.size:
+            selected = np.flatnonzero(priorities < self._priorities.max())
+            if not len(selected):
+                return
+        else:
+            selected = np.arange(count)
+        values = {}
+        for column in self.columns:
+            column_values = batch[column]
+            values[column] = as_column(column_values[selected] if isinstance(column_values, np.ndarray)
+                                       else [column_values[index] for index in selected])
+        self._merge(priorities[selected], selected + offset, values)
+
+    def _merge(self, priorities: np.ndarray, rows: np.ndarray, values: Dict[str, np.ndarray]):
+        priorities = np.concatenate([self._priorities, priorities])
+        rows = np.concatenate([self._rows, rows])
+        values = {column: _concatenate(self._values[column], values[column]) if column in self._values
+                  else values[column] for column in self.columns}
+        if len(priorities) > self.size:
+            keep = np.argpartition(priorities, self.size - 1)[:self.size]
+            priorities, rows = priorities[keep], rows[keep]
+            values = {column: array[keep] for column, array in values.items()}
+        self._priorities, self._rows, self._values = priorities, rows, values
+
+    def sample(self) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        """
+        Returns:
+            (按优先级排序的样本 {列名: 数组}, 样本各行在数据源中的行号)；任意前缀仍是均匀样本
+        """
+        order = np.argsort(self._priorities, kind="stable")
+        return {column: array[order] for column, array in self._values.items()}, self._rows[order]
+
+
+def sample_query(query: str, fraction: float, method: str = "reservoir", dialect: str = "sqlite",
+                 tablesample: Optional[str] = None, seed: Optional[int] = None) -> Optional[str]:
+    """
+    把抽样下推到查询
+
+    Args:
+        query: 原查询
+        fraction: 抽样比例 (0, 1)
+        method: reservoir 或 block
+        dialect: sqlite 以 random() 过滤；其他方言需要 tablesample
+        tablesample: 非 SQLite 数据库的抽样方式，如 "SYSTEM"、"BERNOULLI"，为 None 时按 method 选择
+        seed: 可重复抽样的种子（TABLESAMPLE ... REPEATABLE）
+
+    Returns:
+        改写后的查询，无法改写时为 None
+    """
+    if dialect == "sqlite":
+        threshold = int(fraction * 1_000_000)
+        return f"SELECT * FROM ({query.strip().rstrip(';')}) WHERE abs(random() % 1000000) < {threshold}"
+    match = _SIMPLE_QUERY.match(query)
+    if not match:
+        return None
+    clause = (tablesample or ("SYSTEM" if method == "block" else "BERNOULLI")).upper()
+    repeatable = f" REPEATABLE ({seed})" if seed is not None else ""
+    return (f"SELECT {match.group('select')} FROM {match.group('table')} "
+            f"TABLESAMPLE {clause} ({fraction * 100:.6g}){repeatable}{match.group('rest') or ''}")
+
+
+def _count_rows(source: DatabaseSource) -> int:
+    connection = source.connect(source.connection_string)
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"SELECT COUNT(*) FROM ({source.query.strip().rstrip(';')}) AS counted")
+        return int(cursor.fetchone()[0])
+    finally:
+        connection.close()
+
+
+def _pushdown(source: RecordSource, sampling: Mapping[str, Any],
+              sample_rows: int) -> Tuple[RecordSource, Dict[str, Any]]:
+    """数据库数据源下推抽样，返回 (读取样本的数据源, 下推信息)"""
+    info: Dict[str, Any] = {"pushdown": None, "source_rows": sampling.get("rows")}
+    if not isinstance(source, DatabaseSource):
+        return source, info
+    dialect = "sqlite" if source.connect is connect_sqlite else sampling.get("dialect")
+    if dialect != "sqlite" and not sampling.get("tablesample"):
+        return source, info
+    fraction = sampling.get("fraction")
+    if fraction is None:
+        if info["source_rows"] is None:
+            info["source_rows"] = _count_rows(source)
+        fraction = sampling["oversample"] * sample_rows / info["source_rows"] if info["source_rows"] else 1.0
+    if fraction >= 1:
+        return source, info
+    query = sample_query(source.query, fraction, sampling["method"], dialect, sampling.get("tablesample"),
+                         sampling.get("seed"))
+    if query is None:
+        logger.info("Query cannot be rewritten with TABLESAMPLE, sampling after reading: %s", source.query)
+        return source, info
+    info.update(pushdown="random" if dialect == "sqlite" else "tablesample", fraction=fraction)
+    sampled = DatabaseSource(source.connection_string, query, source.batch_size, source.columns, connect=source.connect)
+    return sampled, info
+
+
+def _verdict(rule: Any, result: Dict[str, Any], max_violation_rate: float, sampling: Mapping[str, Any]) -> str:
+    """根据置信区间判定规则 passed / failed / inconclusive"""
+    low, high = result["confidence_interval"]
+    if isinstance(rule, UniqueRule):
+        # 样本中没有重复不能说明全表没有重复
+        return "failed" if result["violations"] else "inconclusive"
+    if low > max_violation_rate:
+        return "failed"
+    if high <= max_violation_rate + sampling["margin"]:
+        return "passed"
+    return "inconclusive"
+
+
+def sample_check(source: Any, rule_configs: Sequence[Any], table_schema: Mapping[str, Any] = None,
+                 sampling: Mapping[str, Any] = None, sample_size: int = 5, **source_kwargs) -> Dict[str, Any]:
+    """
+    抽样执行质量规则，无法判定的规则按配置升级为全量检查
+
+    Args:
+        source: 数据源配置或已创建的数据源
+        rule_configs: 规则配置，规则字典可包含 sample_rows 与 max_violation_rate
+        table_schema: 表结构
+        sampling: 抽样配置，见 DEFAULT_SAMPLING，另可包含 fraction、rows、rule_sample_rows、tablesample、dialect
+        sample_size: 每条规则最多记录的违规样本数
+        **source_kwargs: 传给数据源的参数
+
+    Returns:
+        {"passed", "rows", "sample_rows", "source_rows", "pushdown", "escalated", "passes", "elapsed", "rules"}
+    """
+    sampling = {**DEFAULT_SAMPLING, **(sampling or {})}
+    rule_sample_rows = sampling.get("rule_sample_rows") or {}
+    start_time = time.perf_counter()
+
+    groups = []
+    for config in rule_configs:
+        config = {"rule": config} if isinstance(config, str) else dict(config)
+        rows = config.pop("sample_rows", rule_sample_rows.get(config["rule"], sampling["sample_rows"]))
+        max_violation_rate = config.pop("max_violation_rate", 0.0)
+        groups.append({"config": config, "sample_rows": rows, "max_violation_rate": max_violation_rate,
+                       "rules": build_rules([config], table_schema, sample_size)})
+
+    sampled = [group for group in groups if group["sample_rows"] and group["rules"]]
+    size = max((group["sample_rows"] for group in sampled), default=0)
+    columns = list(dict.fromkeys(column for group in sampled for rule in group["rules"] for column in rule.columns))
+    rows_read, info = 0, {"pushdown": None, "source_rows": sampling.get("rows")}
+    if sampled:
+        source = resolve_source(source, list(dict.fromkeys(
+            column for group in groups for rule in group["rules"] for column in rule.columns)), **source_kwargs)
+        sample_source, info = _pushdown(source, sampling, size)
+        sampler = ReservoirSampler(size, columns, sampling["seed"])
+        rng = np.random.default_rng(sampling["seed"])
+        fraction = sampling.get("fraction") if info["pushdown"] is None else None
+        for batch in sample_source.batches():
+            if sampling["method"] == "block" and fraction is not None and rng.random() >= fraction:
+                continue
+            sampler.update(batch)
+        rows_read = sampler.rows_seen
+        if info["pushdown"] is None and info["source_rows"] is None and fraction is None:
+            info["source_rows"] = rows_read
+        sample, sample_rows = sampler.sample()
+
+        for group in sampled:
+            count = min(group["sample_rows"], len(sample_rows))
+            report = QualityEngine(group["rules"]).run([{column: array[:count] for column, array in sample.items()}])
+            group["results"] = []
+            for rule, result in zip(group["rules"], report["rules"]):
+                for violation in result["samples"]:
+                    violation["row"] = int(sample_rows[violation["row"]])
+                result["confidence_interval"] = list(wilson_interval(result["violations"], count,
+                                                                     sampling["confidence"]))
+                result.update(sampled=True, sample_rows=count, confidence=sampling["confidence"],
+                              max_violation_rate=group["max_violation_rate"])
+                if info["source_rows"]:
+                    result["estimated_violations"] = int(round(result["violation_rate"] * info["source_rows"]))
+                verdict = _verdict(rule, result, group["max_violation_rate"], sampling)
+                result["verdict"] = verdict
+                result["status"] = "passed" if verdict == "passed" else verdict
+                result["message"] = (f"{result['rule']} sample check {verdict} on {', '.join(result['columns'])}: "
+                                     f"{result['violations']} of {count} sampled rows violate")
+                group["results"].append(result)
+
+    escalated = [group for group in groups if group["rules"] and (
+        not group["sample_rows"] or
+        (sampling["escalate"] and any(result["verdict"] == "inconclusive" for result in group["results"]))
+    )]
+    passes = 1 if sampled else 0
+    if escalated:
+        logger.info("Escalating %d table check rules to a full scan", len(escalated))
+        report = check_source(source, [group["config"] for group in escalated], table_schema, sample_size,
+                              **source_kwargs)
+        results = iter(report["rules"])
+        for group in escalated:
+            group["results"] = [{**next(results), "sampled": False, "escalated": bool(group["sample_rows"])}
+                                for _ in group["rules"]]
+        passes += report["passes"]
+        rows_read = max(rows_read, report["rows"])
+
+    results: List[Dict[str, Any]] = [result for group in groups for result in group.get("results", [])]
+    elapsed = time.perf_counter() - start_time
+    return {
+        "passed": all(result["status"] == "passed" for result in results),
+        "rows": rows_read,
+        "sample_rows": size,
+        "source_rows": info["source_rows"],
+        "pushdown": info["pushdown"],
+        "escalated": [group["config"]["rule"] for group in escalated],
+        "passes": passes,
+        "elapsed": elapsed,
+        "rows_per_second": rows_read / elapsed if elapsed > 0 else 0.0,
+        "rules": results
+    }
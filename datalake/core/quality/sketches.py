@@ -0,0 +1,310 @@
+# 欲买桂花同载酒，
+# 终不似、少年游。
+# Copyright (c) VernonSong. All rights reserved.
+# ======================================================================================================================
+"""
+近似唯一性检查使用的概率数据结构
+
+- hash_keys：把一列或多列键向量化地映射为稳定的 64 位哈希，同一个键在不同批次、不同进程中哈希相同
+- HyperLogLog：基数估计，2^precision 个 1 字节寄存器，相对标准误差约 1.04 / sqrt(2^precision)
+- BloomFilter / ScalableBloomFilter：判断键是否可能出现过，没有假阴性；可扩展布隆过滤器按容量逐级追加子过滤器，
+  总误判率不超过设定值，子过滤器总内存达到上限后不再追加，之后误判率随写入逐渐升高
+"""
+import math
+import zlib
+from typing import Any, Dict, List, Mapping, Sequence
+
+import numpy as np
+
+_FNV_OFFSET = np.uint64(0xcbf29ce484222325)
+_FNV_PRIME = np.uint64(0x100000001b3)
+_GOLDEN = np.uint64(0x9e3779b97f4a7c15)
+_MIX1 = np.uint64(0xbf58476d1ce4e5b9)
+_MIX2 = np.uint64(0x94d049bb133111eb)
+_LOW32 = np.uint64(0xffffffff)
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    """splitmix64 终混合，使相近的输入得到分布均匀的哈希"""
+    with np.errstate(over="ignore"):
+        values = values + _GOLDEN
+        values = (values ^ (values >> np.uint64(30))) * _MIX1
+        values = (values ^ (values >> np.uint64(27))) * _MIX2
+        return values ^ (values >> np.uint64(31))
+
+
+def _hash_strings(values: np.ndarray) -> np.ndarray:
+    """定长 Unicode 数组逐字符做 FNV-1a，跳过补齐的空字符，与数组的定长宽度无关"""
+    values = np.ascontiguousarray(values.astype(str))
+    width = values.dtype.itemsize // 4
+    hashes = np.full(len(values), _FNV_OFFSET, dtype=np.uint64)
+    if width and len(values):
+        codes = values.view(np.uint32).reshape(len(values), width).astype(np.uint64)
+        with np.errstate(over="ignore"):
+            for index in range(width):
+                code = codes[:, index]
+                hashes = np.where(code != 0, (hashes ^ code) * _FNV_PRIME, hashes)
+    # 与整数键区分："1" 与 1 是不同的键
+    return _mix(hashes ^ np.uint64(0x5bd1e995))
+
+
+def _hash_objects(values: np.ndarray) -> np.ndarray:
+    """object 数组中的字符串按字符串哈希，其余值按转换后的类型哈希"""
+    is_str = np.frompyfunc(lambda value: isinstance(value, str), 1, 1)(values).astype(bool)
+    hashes = np.empty(len(values), dtype=np.uint64)
+    if is_str.any():
+        hashes[is_str] = _hash_strings(values[is_str])
+    rest = ~is_str
+    if rest.any():
+        # 避免循环导入
+        from datalake.core.quality.rules import as_column
+        typed = as_column(values[rest].tolist())
+        hashes[rest] = _hash_strings(typed) if typed.dtype.kind == "O" else hash_column(typed)
+    return hashes
+
+
+def hash_column(values: np.ndarray) -> np.ndarray:
+    """
+    一列值的 64 位哈希
+
+    整数与整数值的浮点数哈希相同（批内有空值时整数列会转换为浮点数或 object），-0.0 与 0.0 哈希相同。
+    """
+    kind = values.dtype.kind
+    if kind == "f":
+        values = values.astype(np.float64) + 0.0
+        integral = (np.floor(values) == values) & (np.abs(values) < 2.0 ** 63)
+        bits = values.view(np.uint64).copy()
+        bits[integral] = values[integral].astype(np.int64).view(np.uint64)
+        return _mix(bits)
+    if kind in "iub":
+        return _mix(values.astype(np.int64).view(np.uint64))
+    if kind in "mM":
+        return _mix(values.view(np.int64).view(np.uint64))
+    if kind in "US":
+        return _hash_strings(values)
+    return _hash_objects(values)
+
+
+def hash_keys(batch: Mapping[str, np.ndarray], columns: Sequence[str]) -> np.ndarray:
+    """一列或多列组成的键的 64 位哈希"""
+    hashes = hash_column(batch[columns[0]])
+    with np.errstate(over="ignore"):
+        for column in columns[1:]:
+            hashes = _mix((hashes * _FNV_PRIME) ^ hash_column(batch[column]))
+    return hashes
+
+
+class HyperLogLog:
+    """HyperLogLog 基数估计"""
+
+    def __init__(self, precision: int = 14):
+        """
+        Args:
+            precision: 寄存器数量为 2^precision，取值 4 ~ 18
+        """
+        if not 4 <= precision <= 18:
+            raise ValueError("HyperLogLog precision must be between 4 and 18")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @classmethod
+    def for_error(cls, relative_error: float) -> "HyperLogLog":
+        """按目标相对标准误差选择精度"""
+        precision = math.ceil(math.log2((1.04 / relative_error) ** 2))
+        return cls(min(max(precision, 4), 18))
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def add(self, hashes: np.ndarray):
+        """写入一批 64 位哈希"""
+        if not len(hashes):
+            return
+        shift = np.uint64(64 - self.precision)
+        index = (hashes >> shift).astype(np.intp)
+        remaining = hashes & np.uint64((1 << (64 - self.precision)) - 1)
+        # 剩余位的前导零个数 + 1；frexp 的指数即二进制位数
+        bit_length = np.frexp(remaining.astype(np.float64))[1]
+        rank = (64 - self.precision - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: "HyperLogLog"):
+        """合并另一个相同精度的 HyperLogLog，结果为两者并集的估计"""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def to_bytes(self) -> bytes:
+        """序列化为 1 字节精度 + 压缩后的寄存器"""
+        return bytes([self.precision]) + zlib.compress(self.registers.tobytes())
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        sketch = cls(data[0])
+        sketch.registers = np.frombuffer(zlib.decompress(data[1:]), dtype=np.uint8).copy()
+        return sketch
+
+    def count(self) -> int:
+        """估计写入的不同哈希数量"""
+        size = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / float(np.sum(np.ldexp(1.0, -self.registers.astype(np.int64))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * size and zeros:
+            # 小基数时改用线性计数
+            estimate = size * math.log(size / zeros)
+        return int(round(estimate))
+
+
+class BloomFilter:
+    """位数组布隆过滤器，k 个哈希函数由 64 位哈希的高低 32 位双重哈希得到"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        """
+        Args:
+            capacity: 设计容量，写入数量不超过容量时误判率不超过 error_rate
+            error_rate: 误判率
+        """
+        self.capacity = max(int(capacity), 1)
+        self.error_rate = error_rate
+        self.size = max(int(math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2)), 64)
+        if self.size >= 1 << 32:
+            raise ValueError("Bloom filter capacity too large, use a scalable Bloom filter")
+        self.hash_count = max(int(math.ceil(-math.log2(error_rate))), 1)
+        self.bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        self.count = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self.bits.nbytes
+
+    @staticmethod
+    def probes(hashes: np.ndarray, hash_count: int) -> np.ndarray:
+        """每个哈希的 hash_count 个 32 位探测值 (low + i * high) mod 2^32，形状为 (n, hash_count)"""
+        low = hashes & _LOW32
+        high = (hashes >> np.uint64(32)) | np.uint64(1)
+        steps = np.arange(hash_count, dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            return (low[:, None] + steps[None, :] * high[:, None]) & _LOW32
+
+    def _positions(self, probes: np.ndarray) -> np.ndarray:
+        # 32 位探测值乘以位数后取高 32 位映射到 [0, size)，比取模快
+        return ((probes * np.uint64(self.size)) >> np.uint64(32)).astype(np.int64)
+
+    def contains(self, hashes: np.ndarray, probes: np.ndarray = None) -> np.ndarray:
+        """
+        可能出现过的掩码，没有假阴性
+
+        逐个哈希函数检查，只有前面的位都已置位的哈希才继续检查下一位，大部分未出现过的哈希一两步就排除。
+        """
+        if probes is None:
+            probes = self.probes(hashes, self.hash_count)
+        candidates = np.arange(len(hashes))
+        for step in range(self.hash_count):
+            positions = self._positions(probes[candidates, step])
+            hit = (self.bits[positions >> 3] >> (positions & 7).astype(np.uint8)) & 1
+            candidates = candidates[hit.astype(bool)]
+            if not len(candidates):
+                break
+        found = np.zeros(len(hashes), dtype=bool)
+        found[candidates] = True
+        return found
+
+    def add(self, hashes: np.ndarray, probes: np.ndarray = None):
+        if probes is None:
+            probes = self.probes(hashes, self.hash_count)
+        positions = self._positions(probes[:, :self.hash_count]).ravel()
+        np.bitwise_or.at(self.bits, positions >> 3, (1 << (positions & 7)).astype(np.uint8))
+        self.count += len(hashes)
+
+    def false_positive_rate(self) -> float:
+        """按已置位比例估计当前误判率"""
+        fill = float(np.unpackbits(self.bits).sum()) / self.size
+        return fill ** self.hash_count
+
+
+class ScalableBloomFilter:
+    """
+    可扩展布隆过滤器
+
+    子过滤器写满后追加容量为 growth 倍、误判率为 tightening 倍的新子过滤器，总误判率不超过 error_rate；
+    追加后总内存会超过 max_bytes 时不再追加，继续写入最后一个子过滤器。
+    """
+
+    def __init__(self, error_rate: float = 0.01, initial_capacity: int = 1 << 20, max_bytes: int = 64 << 20,
+                 growth: int = 2, tightening: float = 0.5):
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+        self.error_rate = error_rate
+        self.initial_capacity = initial_capacity
+        self.max_bytes = max_bytes
+        self.growth = growth
+        self.tightening = tightening
+        self.filters: List[BloomFilter] = []
+        self.saturated = False
+        self._append()
+
+    @property
+    def nbytes(self) -> int:
+        return sum(bloom.nbytes for bloom in self.filters)
+
+    def _append(self) -> bool:
+        level = len(self.filters)
+        bloom = BloomFilter(self.initial_capacity * self.growth ** level,
+                            self.error_rate * (1 - self.tightening) * self.tightening ** level)
+        if self.filters and self.nbytes + bloom.nbytes > self.max_bytes:
+            self.saturated = True
+            return False
+        self.filters.append(bloom)
+        return True
+
+    def _probes(self, hashes: np.ndarray) -> np.ndarray:
+        """各子过滤器共用的探测值，按最多的哈希函数个数计算一次"""
+        return BloomFilter.probes(hashes, max(bloom.hash_count for bloom in self.filters))
+
+    def contains(self, hashes: np.ndarray, probes: np.ndarray = None) -> np.ndarray:
+        if probes is None:
+            probes = self._probes(hashes)
+        found = np.zeros(len(hashes), dtype=bool)
+        for bloom in self.filters:
+            pending = np.flatnonzero(~found)
+            if not len(pending):
+                break
+            found[pending] = bloom.contains(hashes[pending], probes[pending])
+        return found
+
+    def add(self, hashes: np.ndarray):
+        """写入哈希（调用方保证与已写入的哈希不重复）"""
+        start = 0
+        while start < len(hashes):
+            bloom = self.filters[-1]
+            room = bloom.capacity - bloom.count
+            if room <= 0 and not self.saturated and self._append():
+                continue
+            end = len(hashes) if self.saturated or room <= 0 else min(len(hashes), start + room)
+            self.filters[-1].add(hashes[start:end])
+            start = end
+
+    def add_new(self, hashes: np.ndarray) -> np.ndarray:
+        """
+        检查并写入一批互不相同的哈希
+
+        Returns:
+            写入前可能已出现过的掩码
+        """
+        seen = self.contains(hashes)
+        self.add(hashes[~seen])
+        return seen
+
+    def false_positive_rate(self) -> float:
+        """按各子过滤器的置位比例估计当前误判率"""
+        return 1 - math.prod(1 - bloom.false_positive_rate() for bloom in self.filters)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "filters": len(self.filters),
+            "bytes": self.nbytes,
+            "saturated": self.saturated,
+            "false_positive_rate": self.false_positive_rate()
+        }
@@ -0,0 +1,187 @@
+# 欲买桂花同载酒，
+# 终不似、少年游。
+# Copyright (c) VernonSong. All rights reserved.
+# ======================================================================================================================
+"""
+增量表检查状态
+
+每张表记录 {"fingerprint", "watermark", "updated_at"}：fingerprint 为规则与表结构的摘要，规则变化后缓存失效；
+watermark 为上次检查时的最大 update_time（或最大分区号）。每个分区记录
+{"digest", "results", "sketches"}：digest 为分区的行数与最大 update_time，results 为该分区各规则的检查结果，
+sketches 为唯一性规则键的 HyperLogLog（base64 编码的序列化字节），用于合并各分区的不同键数。
+
+DATALAKE_CHECK_STATE 指定 SQLite 文件路径时状态持久化，多个 worker 进程共享；否则保存在进程内。
+"""
+import copy
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Optional, Sequence
+
+from datalake.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# 状态文件路径的环境变量
+STATE_ENV = "DATALAKE_CHECK_STATE"
+
+
+class CheckStateStore:
+    """增量表检查状态接口，分区以 JSON 编码后的分区值为键"""
+
+    def get_table(self, table_key: str) -> Optional[Dict[str, Any]]:
+        """读取表状态，不存在时返回 None"""
+        raise NotImplementedError("Subclasses must implement the get_table method")
+
+    def get_partitions(self, table_key: str) -> Dict[str, Dict[str, Any]]:
+        """读取表的全部分区状态"""
+        raise NotImplementedError("Subclasses must implement the get_partitions method")
+
+    def save(self, table_key: str, table: Dict[str, Any], partitions: Dict[str, Dict[str, Any]],
+             removed: Sequence[str] = (), replace: bool = False):
+        """
+        写入表状态与变化的分区
+
+        Args:
+            table_key: 表标识
+            table: 表状态
+            partitions: 新增或变化的分区状态
+            removed: 已不存在的分区
+            replace: 为 True 时先删除该表的全部分区状态（规则变化后重建）
+        """
+        raise NotImplementedError("Subclasses must implement the save method")
+
+
+class InMemoryCheckStateStore(CheckStateStore):
+    """进程内检查状态"""
+
+    def __init__(self):
+        self._tables: Dict[str, Dict[str, Any]] = {}
+        self._partitions: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def get_table(self, table_key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return copy.deepcopy(self._tables.get(table_key))
+
+    def get_partitions(self, table_key: str) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return copy.deepcopy(self._partitions.get(table_key, {}))
+
+    def save(self, table_key: str, table: Dict[str, Any], partitions: Dict[str, Dict[str, Any]],
+             removed: Sequence[str] = (), replace: bool = False):
+        with self._lock:
+            stored = {} if replace else self._partitions.setdefault(table_key, {})
+            for partition in removed:
+                stored.pop(partition, None)
+            stored.update(copy.deepcopy(partitions))
+            self._partitions[table_key] = stored
+            self._tables[table_key] = copy.deepcopy(table)
+
+
+class SQLiteCheckStateStore(CheckStateStore):
+    """基于SQLite文件的检查状态，WAL 模式，每个线程使用独立连接"""
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        """
+        初始化检查状态
+
+        Args:
+            path: 数据库文件路径，不存在时自动创建
+            timeout: 等待写锁的超时时间（秒）
+        """
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS check_tables ("
+                "table_key TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, watermark TEXT, updated_at REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS check_partitions ("
+                "table_key TEXT NOT NULL, partition TEXT NOT NULL, digest TEXT NOT NULL, results TEXT NOT NULL, "
+                "sketches TEXT, PRIMARY KEY (table_key, partition))"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get_table(self, table_key: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            "SELECT fingerprint, watermark, updated_at FROM check_tables WHERE table_key = ?", (table_key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"fingerprint": row[0], "watermark": json.loads(row[1]), "updated_at": row[2]}
+
+    def get_partitions(self, table_key: str) -> Dict[str, Dict[str, Any]]:
+        rows = self._connection().execute(
+            "SELECT partition, digest, results, sketches FROM check_partitions WHERE table_key = ?", (table_key,)
+        ).fetchall()
+        return {
+            partition: {"digest": json.loads(digest), "results": json.loads(results),
+                        "sketches": json.loads(sketches) if sketches else {}}
+            for partition, digest, results, sketches in rows
+        }
+
+    def save(self, table_key: str, table: Dict[str, Any], partitions: Dict[str, Dict[str, Any]],
+             removed: Sequence[str] = (), replace: bool = False):
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            if replace:
+                connection.execute("DELETE FROM check_partitions WHERE table_key = ?", (table_key,))
+            connection.executemany("DELETE FROM check_partitions WHERE table_key = ? AND partition = ?",
+                                   [(table_key, partition) for partition in removed])
+            connection.executemany(
+                "INSERT INTO check_partitions (table_key, partition, digest, results, sketches) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(table_key, partition) DO UPDATE SET digest = excluded.digest, "
+                "results = excluded.results, sketches = excluded.sketches",
+                [
+                    (table_key, partition, json.dumps(entry["digest"], default=str),
+                     json.dumps(entry["results"], ensure_ascii=False, default=str),
+                     json.dumps(entry.get("sketches") or {}))
+                    for partition, entry in partitions.items()
+                ]
+            )
+            connection.execute(
+                "INSERT INTO check_tables (table_key, fingerprint, watermark, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(table_key) DO UPDATE SET fingerprint = excluded.fingerprint, "
+                "watermark = excluded.watermark, updated_at = excluded.updated_at",
+                (table_key, table["fingerprint"], json.dumps(table.get("watermark"), default=str), table["updated_at"])
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+
+def state_store_from_env() -> CheckStateStore:
+    """按 DATALAKE_CHECK_STATE 环境变量创建检查状态，未设置时使用进程内状态"""
+    path = os.getenv(STATE_ENV)
+    if path:
+        return SQLiteCheckStateStore(path)
+    return InMemoryCheckStateStore()
+
+
+_store: Optional[CheckStateStore] = None
+_store_lock = threading.Lock()
+
+
+def get_check_state_store() -> CheckStateStore:
+    """进程共享的检查状态，首次使用时按环境变量创建"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = state_store_from_env()
+        return _store
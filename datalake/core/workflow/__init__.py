@@ -5,4 +5,5 @@
 
 from datalake.core.workflow.models import *
 from datalake.core.workflow.workflow_manager import *
-from datalake.core.workflow.workflow_orchestrator import *
\ No newline at end of file
+from datalake.core.workflow.workflow_orchestrator import *
+from datalake.core.workflow.pipeline import *
\ No newline at end of file
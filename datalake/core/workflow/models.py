@@ -5,7 +5,7 @@
 import datetime
 from typing import List, Optional, Any, Dict, Callable, Union, Tuple
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 
@@ -52,6 +52,7 @@ class WorkflowConfig(BaseModel):
     node_configs: Dict[str, Any]
     orchestration_type: str = "manual"  # manual, ai
     acceptance_criteria: Optional[List[str]] = None
+    result_cache_ttl: float = 0  # 幂等工作流的结果缓存时间（秒），0表示不缓存
     created_by: Optional[str] = None
     updated_by: Optional[str] = None
     created_at: datetime.datetime = datetime.datetime.now()
@@ -75,6 +76,50 @@ class LakeIngestionRequest(BaseModel):
     workflow_name: str
     source_data: Dict[str, Any]
     custom_params: Optional[Dict[str, Any]] = {}
+    dedupe: bool = True  # 是否合并相同的进行中请求
+    workflow_version: Optional[int] = None  # 指定执行的工作流版本，默认使用当前版本
+
+
+# 批量集成任务生成请求
+class BulkTaskRequest(BaseModel):
+    tasks: List[Any]  # 每项为 (源表, 目标表, 字段映射[, 覆盖项]) 或对象，见 datalake.services.task_templates
+    username: str = "default_user"
+    integration_type: str = "full"
+    parallelism: int = 1
+    audit_template_name: str = "default_audit"
+
+
+class JobStatusCallback(BaseModel):
+    jobid: str
+    status: str  # running / succeeded / failed / cancelled
+    message: str = ""
+
+
+# 等待状态模型：挂起在等待网关处的执行，见 datalake.core.workflow.waits
+class WaitState(BaseModel):
+    wait_id: str
+    request_id: str
+    workflow_name: str
+    workflow_version: Optional[int] = None
+    node_name: str = "wait_gateway"
+    interrupt_id: Optional[str] = None
+    wait_type: str  # manual_approval, time_delay, external_event, job_status
+    wait_condition: Dict[str, Any] = {}
+    event: Optional[str] = None  # external_event 等待的事件名
+    wait_until: Optional[datetime.datetime] = None  # time_delay 的触发时间，其他类型为超时时间
+    status: str = "waiting"  # waiting, completed, cancelled
+    created_at: datetime.datetime = Field(default_factory=datetime.datetime.now)
+    updated_at: datetime.datetime = Field(default_factory=datetime.datetime.now)
+
+
+class WaitApproval(BaseModel):
+    approved: bool = True
+    approver: str = ""
+    comment: str = ""
+
+
+class WaitEvent(BaseModel):
+    payload: Dict[str, Any] = {}
 
 
 def register_node(func: Optional[Callable] = None, *, name: str = None, description: str = "", inputs: List[NodeInputParameter] = None, outputs: List[NodeOutputParameter] = None, version: str = "1.0.0", **kwargs):
@@ -0,0 +1,135 @@
+# 欲买桂花同载酒，
+# 终不似、少年游。
+# Copyright (c) VernonSong. All rights reserved.
+# ======================================================================================================================
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Optional
+from datalake.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+def canonical_hash(value: Any) -> str:
+    """计算任意可JSON化对象的规范化SHA-256摘要"""
+    payload = json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def default_cache_key(state: Dict[str, Any]) -> Any:
+    """
+    默认缓存键：节点可见的全部输入（源数据与上游节点结果）
+
+    声明 cacheable=True 但未提供 cache_key 的节点使用此函数。
+    """
+    return {"source_data": state.get("source_data"), "results": state.get("results")}
+
+
+class NodeCache:
+    """节点结果缓存后端接口"""
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存的节点结果，不存在时返回 None"""
+        raise NotImplementedError("Subclasses must implement the get method")
+
+    def set(self, key: str, value: Dict[str, Any]):
+        """写入节点结果"""
+        raise NotImplementedError("Subclasses must implement the set method")
+
+    def clear(self):
+        """清空缓存"""
+        raise NotImplementedError("Subclasses must implement the clear method")
+
+
+class InMemoryNodeCache(NodeCache):
+    """进程内LRU缓存，可选过期时间"""
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None):
+        """
+        初始化缓存
+
+        Args:
+            max_entries: 最大缓存条目数，超出时淘汰最久未使用的条目
+            ttl: 过期时间（秒），None 表示不过期
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Dict[str, Any]):
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def memoize_node(node_name: str, fn: Callable[[Dict[str, Any]], Dict[str, Any]], cache: NodeCache,
+                 cache_key: Callable[[Dict[str, Any]], Any] = None, version: str = "1.0.0") -> Callable:
+    """
+    为纯节点包装结果缓存
+
+    cache_key 返回 None 时本次调用不走缓存（例如 sql_generate 的温度较高时）。
+    只缓存 status 为 success 的结果；命中时在节点结果中标记 cache_hit。
+
+    Args:
+        node_name: 节点名称
+        fn: 节点函数
+        cache: 缓存后端
+        cache_key: 从状态中提取缓存键的函数，默认使用 default_cache_key
+        version: 节点版本，参与缓存键计算，节点升级后旧结果自动失效
+
+    Returns:
+        包装后的节点函数
+    """
+    key_fn = cache_key or default_cache_key
+
+    def memoized(state: Dict[str, Any]) -> Dict[str, Any]:
+        key_value = key_fn(state)
+        if key_value is None:
+            return fn(state)
+
+        key = canonical_hash({"node": node_name, "version": version, "key": key_value})
+        cached = cache.get(key)
+        if cached is not None:
+            logger.info("Cache hit for node %s, request: %s", node_name, state.get("request_id"))
+            return {
+                **state,
+                "results": {
+                    **state.get("results", {}),
+                    node_name: {**copy.deepcopy(cached), "cache_hit": True}
+                },
+                "current_node": node_name
+            }
+
+        new_state = fn(state)
+        node_result = new_state.get("results", {}).get(node_name)
+        if isinstance(node_result, dict) and node_result.get("status") == "success":
+            cache.set(key, copy.deepcopy(node_result))
+        return new_state
+
+    memoized.__name__ = getattr(fn, "__name__", node_name)
+    memoized.__wrapped__ = fn
+    return memoized
@@ -0,0 +1,253 @@
+# 欲买桂花同载酒，
+# 终不似、少年游。
+# Copyright (c) VernonSong. All rights reserved.
+# ======================================================================================================================
+import contextvars
+import random
+import threading
+import time
+from typing import Dict, Any, Callable, Optional
+
+from langgraph.errors import GraphBubbleUp
+from pydantic import BaseModel, Field
+from datalake.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+# 熔断器配置模型
+class CircuitBreakerPolicy(BaseModel):
+    failure_threshold: int = Field(default=5, ge=1, description="连续失败多少次后熔断")
+    reset_timeout: float = Field(default=30.0, gt=0, description="熔断后多久允许一次探测调用（秒）")
+
+
+# 节点执行策略模型
+class NodePolicy(BaseModel):
+    max_attempts: int = Field(default=1, ge=1, description="最大尝试次数（含首次）")
+    backoff_base: float = Field(default=0.5, ge=0, description="指数退避的初始间隔（秒）")
+    backoff_max: float = Field(default=30.0, ge=0, description="退避间隔上限（秒）")
+    jitter: float = Field(default=0.5, ge=0, le=1, description="退避抖动比例，实际间隔在 [d*(1-jitter), d] 内随机")
+    timeout: Optional[float] = Field(default=None, gt=0, description="单次尝试的硬超时（秒）")
+    circuit_breaker: Optional[CircuitBreakerPolicy] = None
+
+    def backoff(self, attempt: int) -> float:
+        """第 attempt 次失败后的等待时间"""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        return random.uniform(delay * (1 - self.jitter), delay)
+
+
+def resolve_policy(*sources: Optional[Dict[str, Any]]) -> Optional[NodePolicy]:
+    """
+    合并多个策略声明，后面的覆盖前面的
+
+    Args:
+        *sources: 策略字典，通常依次为 register_node 元数据中的 policy 与 node_configs 中的 policy
+
+    Returns:
+        合并后的策略；没有任何声明时返回 None
+    """
+    merged: Dict[str, Any] = {}
+    for source in sources:
+        if source:
+            merged.update(source.model_dump(exclude_unset=True) if isinstance(source, BaseModel) else source)
+    if not merged:
+        return None
+    return NodePolicy(**merged)
+
+
+class CircuitBreaker:
+    """
+    熔断器：连续失败达到阈值后打开，reset_timeout 后进入半开状态放行一次探测调用，
+    探测成功则关闭，失败则重新打开。
+    """
+
+    def __init__(self, policy: CircuitBreakerPolicy):
+        self.policy = policy
+        self.state = "closed"  # closed, open, half_open
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """是否允许本次调用"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.policy.reset_timeout:
+                self.state = "half_open"
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.policy.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+class CircuitBreakerRegistry:
+    """按下游目标维护熔断器，同一目标在所有工作流之间共享"""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, target: str, policy: CircuitBreakerPolicy) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(target)
+            if breaker is None:
+                breaker = CircuitBreaker(policy)
+                self._breakers[target] = breaker
+            return breaker
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """各目标熔断器的当前状态"""
+        with self._lock:
+            return {
+                target: {"state": breaker.state, "failures": breaker.failures}
+                for target, breaker in self._breakers.items()
+            }
+
+
+class NodeTimeoutError(Exception):
+    """节点执行超时"""
+    pass
+
+
+def call_with_timeout(fn: Callable[[Dict[str, Any]], Dict[str, Any]], state: Dict[str, Any],
+                      timeout: Optional[float]) -> Dict[str, Any]:
+    """
+    在独立线程中执行节点，超过 timeout 秒抛出 NodeTimeoutError
+
+    Python 线程无法被强制终止，超时的调用会在后台线程中继续运行直至返回，但其结果被丢弃，
+    工作流不再等待它。节点在复制的 contextvars 上下文中执行，保留 LangGraph 的运行时配置。
+    """
+    if timeout is None:
+        return fn(state)
+
+    outcome: Dict[str, Any] = {}
+    done = threading.Event()
+    context = contextvars.copy_context()
+
+    def target():
+        try:
+            outcome["result"] = context.run(fn, state)
+        except BaseException as e:
+            outcome["error"] = e
+        finally:
+            done.set()
+
+    threading.Thread(target=target, name="node-timeout-worker", daemon=True).start()
+    if not done.wait(timeout):
+        raise NodeTimeoutError(f"Node execution exceeded {timeout}s")
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+
+def apply_policy(node_name: str, fn: Callable[[Dict[str, Any]], Dict[str, Any]], policy: NodePolicy,
+                 breakers: CircuitBreakerRegistry, circuit_target: Callable[[Dict[str, Any]], str] = None,
+                 policy_override: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]] = None) -> Callable:
+    """
+    按策略包装节点：重试、指数退避加抖动、硬超时与按下游目标熔断
+
+    节点抛出异常、超时或返回 status 为 failed 都视为一次失败；节点调用 interrupt 挂起工作流时直接向上传递。全部尝试失败后返回 failed 状态而不是抛出异常，
+    节点结果中记录 attempts（尝试次数）、retries（重试次数）、timeouts（超时次数）与 circuit_open。
+
+    Args:
+        node_name: 节点名称
+        fn: 节点函数
+        policy: 执行策略
+        breakers: 熔断器注册表
+        circuit_target: 从状态中解析下游目标的函数，默认以节点名称作为目标
+        policy_override: 按状态调整本次执行策略的函数，返回覆盖的策略字段，如不可安全重试的执行关闭重试与超时
+
+    Returns:
+        包装后的节点函数
+    """
+
+    def guarded(state: Dict[str, Any]) -> Dict[str, Any]:
+        override = policy_override(state) if policy_override else None
+        active = policy.model_copy(update=override) if override else policy
+        breaker = None
+        if active.circuit_breaker is not None:
+            target = circuit_target(state) if circuit_target else node_name
+            breaker = breakers.get(target, active.circuit_breaker)
+
+        attempts = 0
+        timeouts = 0
+        circuit_open = False
+        last_state = None
+        last_error = None
+
+        for attempt in range(1, active.max_attempts + 1):
+            if breaker is not None and not breaker.allow():
+                circuit_open = True
+                last_error = f"Circuit open for {node_name}"
+                break
+
+            attempts += 1
+            try:
+                new_state = call_with_timeout(fn, state, active.timeout)
+            except NodeTimeoutError as e:
+                timeouts += 1
+                last_error = str(e)
+            except GraphBubbleUp:
+                # interrupt 挂起工作流，不是失败
+                raise
+            except Exception as e:
+                last_error = str(e)
+            else:
+                node_result = new_state.get("results", {}).get(node_name, {})
+                if not (isinstance(node_result, dict) and node_result.get("status") == "failed"):
+                    if breaker is not None:
+                        breaker.record_success()
+                    return _annotate(new_state, node_name, attempts, timeouts, circuit_open)
+                last_state = new_state
+                last_error = None
+
+            if breaker is not None:
+                breaker.record_failure()
+            if attempt < active.max_attempts:
+                logger.warning("Node %s attempt %s failed for request %s, retrying", node_name, attempt, state.get("request_id"))
+                time.sleep(active.backoff(attempt))
+
+        if last_state is None or last_error is not None:
+            last_state = {
+                **state,
+                "results": {
+                    **state.get("results", {}),
+                    node_name: {"status": "failed", "error_message": last_error}
+                },
+                "current_node": node_name
+            }
+        return _annotate(last_state, node_name, attempts, timeouts, circuit_open)
+
+    guarded.__name__ = getattr(fn, "__name__", node_name)
+    guarded.__wrapped__ = fn
+    return guarded
+
+
+def _annotate(state: Dict[str, Any], node_name: str, attempts: int, timeouts: int, circuit_open: bool) -> Dict[str, Any]:
+    """在节点结果中记录重试与超时信息"""
+    results = state.get("results", {})
+    node_result = results.get(node_name, {})
+    return {
+        **state,
+        "results": {
+            **results,
+            node_name: {
+                **node_result,
+                "attempts": attempts,
+                "retries": max(attempts - 1, 0),
+                "timeouts": timeouts,
+                "circuit_open": circuit_open
+            }
+        }
+    }
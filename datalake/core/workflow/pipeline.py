@@ -0,0 +1,178 @@
+# 欲买桂花同载酒，
+# 终不似、少年游。
+# Copyright (c) VernonSong. All rights reserved.
+# ======================================================================================================================
+import queue
+import threading
+import time
+from typing import Dict, Any, List, Optional, Callable
+
+# 队列结束标记
+_STOP = object()
+
+
+class DDLPipeline:
+    """
+    多表建表流水线：sql_generate（生产者）与 sql_execute（消费者）通过有界队列衔接，
+    第 i 张表执行DDL的同时，第 i+1 张表已在生成DDL，使大模型延迟与数据库执行延迟重叠。
+    """
+
+    def __init__(self, generate_fn: Callable[[Dict[str, Any]], Dict[str, Any]] = None,
+                 execute_fn: Callable[[Dict[str, Any]], Dict[str, Any]] = None,
+                 generate_concurrency: int = 1, execute_concurrency: int = 1, queue_size: int = 4):
+        """
+        初始化流水线
+
+        Args:
+            generate_fn: SQL生成阶段的节点函数，默认为 sql_generate_node
+            execute_fn: SQL执行阶段的节点函数，默认为 sql_execute_node
+            generate_concurrency: 生成阶段并发数
+            execute_concurrency: 执行阶段并发数
+            queue_size: 两阶段之间有界队列的容量
+        """
+        if generate_fn is None or execute_fn is None:
+            from datalake.core.nodes import NODE_MAPPING
+            generate_fn = generate_fn or NODE_MAPPING["sql_generate"]
+            execute_fn = execute_fn or NODE_MAPPING["sql_execute"]
+        if generate_concurrency < 1 or execute_concurrency < 1 or queue_size < 1:
+            raise ValueError("Pipeline concurrency and queue_size must be >= 1")
+
+        self.generate_fn = generate_fn
+        self.execute_fn = execute_fn
+        self.generate_concurrency = generate_concurrency
+        self.execute_concurrency = execute_concurrency
+        self.queue_size = queue_size
+
+    def run(self, states: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        执行流水线
+
+        Args:
+            states: 每张表的初始状态（与工作流节点的状态格式一致）
+
+        Returns:
+            每张表的最终状态，顺序与输入一致
+        """
+        outputs: List[Optional[Dict[str, Any]]] = [None] * len(states)
+        pending = queue.Queue()
+        for index, state in enumerate(states):
+            pending.put((index, state))
+
+        handoff = queue.Queue(maxsize=self.queue_size)
+
+        def produce():
+            while True:
+                try:
+                    index, state = pending.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    generated = self.generate_fn(state)
+                except Exception as e:
+                    outputs[index] = self._failed(state, "sql_generate", str(e))
+                    continue
+                if generated.get("results", {}).get("sql_generate", {}).get("status") != "success":
+                    # 生成失败的表不进入执行阶段
+                    outputs[index] = generated
+                    continue
+                handoff.put((index, generated))
+
+        def consume():
+            while True:
+                item = handoff.get()
+                if item is _STOP:
+                    return
+                index, state = item
+                try:
+                    outputs[index] = self.execute_fn(state)
+                except Exception as e:
+                    outputs[index] = self._failed(state, "sql_execute", str(e))
+
+        producers = [threading.Thread(target=produce, name=f"ddl-generate-{i}", daemon=True)
+                     for i in range(self.generate_concurrency)]
+        consumers = [threading.Thread(target=consume, name=f"ddl-execute-{i}", daemon=True)
+                     for i in range(self.execute_concurrency)]
+        for thread in producers + consumers:
+            thread.start()
+
+        for thread in producers:
+            thread.join()
+        for _ in consumers:
+            handoff.put(_STOP)
+        for thread in consumers:
+            thread.join()
+
+        return outputs
+
+    @staticmethod
+    def _failed(state: Dict[str, Any], node_name: str, message: str) -> Dict[str, Any]:
+        """构造阶段异常时的失败状态"""
+        return {
+            **state,
+            "results": {
+                **state.get("results", {}),
+                node_name: {"status": "failed", "error_message": message}
+            },
+            "current_node": node_name
+        }
+
+
+def build_table_states(request_id: str, workflow_config: Any, tables: List[Dict[str, Any]],
+                       custom_params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    将多表请求拆分为每张表的初始状态
+
+    Args:
+        request_id: 请求ID
+        workflow_config: 工作流配置
+        tables: 表列表，每个元素即该表的 source_data
+        custom_params: 自定义参数
+
+    Returns:
+        每张表的初始状态列表
+    """
+    return [
+        {
+            "request_id": f"{request_id}-{index}",
+            "workflow_config": workflow_config,
+            "source_data": table,
+            "current_node": "sql_generate",
+            "results": {},
+            "errors": [],
+            "status": "running",
+            "custom_params": custom_params or {}
+        }
+        for index, table in enumerate(tables)
+    ]
+
+
+def summarize_pipeline(outputs: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    """汇总流水线执行结果"""
+    succeeded = sum(
+        1 for output in outputs
+        if output.get("results", {}).get("sql_execute", {}).get("status") == "success"
+    )
+    return {
+        "tables": len(outputs),
+        "succeeded": succeeded,
+        "failed": len(outputs) - succeeded,
+        "elapsed": elapsed,
+        "throughput": len(outputs) / elapsed if elapsed > 0 else 0.0
+    }
+
+
+def run_ddl_pipeline(states: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+    """
+    便捷函数：执行流水线并返回结果与汇总
+
+    Args:
+        states: 每张表的初始状态
+        **kwargs: 传递给 DDLPipeline 的参数
+
+    Returns:
+        包含 outputs 与 summary 的字典
+    """
+    pipeline = DDLPipeline(**kwargs)
+    start_time = time.perf_counter()
+    outputs = pipeline.run(states)
+    return {"outputs": outputs, "summary": summarize_pipeline(outputs, time.perf_counter() - start_time)}
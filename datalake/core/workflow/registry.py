@@ -0,0 +1,418 @@
+# 欲买桂花同载酒，
+# 终不似、少年游。
+# Copyright (c) VernonSong. All rights reserved.
+# ======================================================================================================================
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from datalake.core.workflow.models import WorkflowConfig
+from datalake.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# 共享工作流注册表的SQLite文件路径，多进程部署时所有 worker 指向同一个文件
+REGISTRY_ENV = "DATALAKE_WORKFLOW_REGISTRY"
+
+# 服务默认的持久化注册表路径
+DEFAULT_REGISTRY_PATH = os.path.join(os.path.expanduser("~"), ".datalake", "workflows.db")
+
+# 使用热度的半衰期（秒）：一天前的一次执行只相当于现在的半次
+USAGE_HALF_LIFE = 24 * 3600
+
+
+def decayed_score(score: float, last_used: float, now: float, half_life: float = USAGE_HALF_LIFE) -> float:
+    """把 last_used 时刻的热度衰减到 now 时刻"""
+    return score * math.pow(0.5, max(now - last_used, 0.0) / half_life)
+
+
+class WorkflowRegistry:
+    """
+    工作流配置存储接口
+
+    每次写入（注册、更新、删除）都会使全局修订号加一，并记录该工作流最后一次变更时的修订号。
+    各进程通过比较修订号得知哪些工作流发生了变化。
+
+    每次写入的配置都作为一个不可变版本保存，版本号即写入时的修订号。
+    注册表同时记录各工作流的使用热度，供启动时预编译最常用的工作流。
+    """
+
+    def put(self, config: WorkflowConfig) -> int:
+        """写入工作流配置，返回新的修订号（即新版本号）"""
+        raise NotImplementedError("Subclasses must implement the put method")
+
+    def get(self, name: str, version: Optional[int] = None) -> Optional[Tuple[WorkflowConfig, int]]:
+        """读取工作流的当前配置（或指定版本）及其版本号，不存在时返回 None"""
+        raise NotImplementedError("Subclasses must implement the get method")
+
+    def versions(self, name: str) -> List[int]:
+        """工作流的全部版本号，按时间顺序"""
+        raise NotImplementedError("Subclasses must implement the versions method")
+
+    def delete(self, name: str) -> bool:
+        """删除工作流，返回是否存在"""
+        raise NotImplementedError("Subclasses must implement the delete method")
+
+    def list(self) -> List[WorkflowConfig]:
+        """列出全部工作流配置"""
+        raise NotImplementedError("Subclasses must implement the list method")
+
+    def revision(self) -> int:
+        """当前全局修订号"""
+        raise NotImplementedError("Subclasses must implement the revision method")
+
+    def changes_since(self, revision: int) -> Tuple[int, Dict[str, Optional[int]]]:
+        """
+        获取某个修订号之后发生变化的工作流
+
+        Returns:
+            (当前修订号, 工作流名称 -> 最新修订号；已删除的工作流为 None)
+        """
+        raise NotImplementedError("Subclasses must implement the changes_since method")
+
+    def record_usage(self, name: str, count: int = 1):
+        """记录工作流被执行，实现可以缓冲后批量写入"""
+        raise NotImplementedError("Subclasses must implement the record_usage method")
+
+    def flush_usage(self):
+        """写入缓冲的使用记录"""
+        pass
+
+    def close(self):
+        """停止后台任务并写入缓冲的使用记录"""
+        self.flush_usage()
+
+    def hot_workflows(self, limit: int) -> List[str]:
+        """按近期使用热度从高到低返回工作流名称"""
+        raise NotImplementedError("Subclasses must implement the hot_workflows method")
+
+
+class InMemoryWorkflowRegistry(WorkflowRegistry):
+    """进程内注册表，单进程部署时使用"""
+
+    def __init__(self):
+        self._configs: Dict[str, Tuple[WorkflowConfig, int]] = {}
+        # 工作流名称 -> {版本号: 配置}
+        self._versions: Dict[str, Dict[int, WorkflowConfig]] = {}
+        # 工作流名称 -> 最后一次变更的修订号（含删除）
+        self._changes: Dict[str, int] = {}
+        # 工作流名称 -> (热度, 最后使用时间)
+        self._usage: Dict[str, Tuple[float, float]] = {}
+        self._revision = 0
+        self._lock = threading.Lock()
+
+    def put(self, config: WorkflowConfig) -> int:
+        with self._lock:
+            self._revision += 1
+            self._configs[config.name] = (config, self._revision)
+            self._versions.setdefault(config.name, {})[self._revision] = config
+            self._changes[config.name] = self._revision
+            return self._revision
+
+    def get(self, name: str, version: Optional[int] = None) -> Optional[Tuple[WorkflowConfig, int]]:
+        with self._lock:
+            if version is None:
+                return self._configs.get(name)
+            config = self._versions.get(name, {}).get(version)
+            return (config, version) if config is not None else None
+
+    def versions(self, name: str) -> List[int]:
+        with self._lock:
+            return sorted(self._versions.get(name, {}))
+
+    def delete(self, name: str) -> bool:
+        with self._lock:
+            if name not in self._configs:
+                return False
+            self._revision += 1
+            del self._configs[name]
+            self._changes[name] = self._revision
+            return True
+
+    def list(self) -> List[WorkflowConfig]:
+        with self._lock:
+            return [config for config, _ in self._configs.values()]
+
+    def revision(self) -> int:
+        return self._revision
+
+    def changes_since(self, revision: int) -> Tuple[int, Dict[str, Optional[int]]]:
+        with self._lock:
+            changed = {
+                name: self._configs[name][1] if name in self._configs else None
+                for name, changed_at in self._changes.items() if changed_at > revision
+            }
+            return self._revision, changed
+
+    def record_usage(self, name: str, count: int = 1):
+        now = time.time()
+        with self._lock:
+            score, last_used = self._usage.get(name, (0.0, now))
+            self._usage[name] = (decayed_score(score, last_used, now) + count, now)
+
+    def hot_workflows(self, limit: int) -> List[str]:
+        now = time.time()
+        with self._lock:
+            ranked = sorted(
+                (name for name in self._usage if name in self._configs),
+                key=lambda name: decayed_score(*self._usage[name], now),
+                reverse=True
+            )
+        return ranked[:limit]
+
+
+class SQLiteWorkflowRegistry(WorkflowRegistry):
+    """
+    基于SQLite文件的共享注册表
+
+    多个 worker 进程打开同一个数据库文件，WAL 模式下读写互不阻塞。每个线程使用独立连接。
+    删除以墓碑记录保存，其他进程据此得知工作流已被删除。服务重启后工作流仍然存在。
+
+    - workflows：工作流的当前版本（config 为当前版本配置的副本）
+    - workflow_versions：全部历史版本
+    - workflow_usage：使用热度，执行记录先在内存中累积，由后台线程每隔 usage_flush_interval 秒批量写入，
+      写入不在请求路径上，写入失败时记录放回缓冲等待下次写入
+    """
+
+    def __init__(self, path: str, timeout: float = 30.0, usage_flush_interval: float = 5.0):
+        """
+        初始化注册表
+
+        Args:
+            path: 数据库文件路径，不存在时自动创建
+            timeout: 等待写锁的超时时间（秒）
+            usage_flush_interval: 使用记录的批量写入间隔（秒）
+        """
+        self.path = path
+        self.timeout = timeout
+        self.usage_flush_interval = usage_flush_interval
+        self._local = threading.local()
+        self._pending_usage: Dict[str, int] = {}
+        self._usage_lock = threading.Lock()
+        self._usage_thread: Optional[threading.Thread] = None
+        self._usage_stop = threading.Event()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS workflows ("
+                "name TEXT PRIMARY KEY, config TEXT, revision INTEGER NOT NULL, deleted INTEGER NOT NULL DEFAULT 0)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS workflow_versions ("
+                "name TEXT NOT NULL, version INTEGER NOT NULL, config TEXT NOT NULL, created_at REAL NOT NULL, "
+                "PRIMARY KEY (name, version))"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS workflow_usage ("
+                "name TEXT PRIMARY KEY, score REAL NOT NULL, last_used REAL NOT NULL, executions INTEGER NOT NULL)"
+            )
+            connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            connection.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('revision', 0)")
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _write(self, name: str, config_json: Optional[str]) -> int:
+        """在一个写事务中递增修订号并写入（config_json 为 None 表示删除）"""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            revision = connection.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()[0] + 1
+            connection.execute("UPDATE meta SET value = ? WHERE key = 'revision'", (revision,))
+            connection.execute(
+                "INSERT INTO workflows (name, config, revision, deleted) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET config = excluded.config, revision = excluded.revision, "
+                "deleted = excluded.deleted",
+                (name, config_json, revision, 1 if config_json is None else 0)
+            )
+            if config_json is not None:
+                connection.execute(
+                    "INSERT INTO workflow_versions (name, version, config, created_at) VALUES (?, ?, ?, ?)",
+                    (name, revision, config_json, time.time())
+                )
+            connection.execute("COMMIT")
+            return revision
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def put(self, config: WorkflowConfig) -> int:
+        return self._write(config.name, config.model_dump_json())
+
+    def get(self, name: str, version: Optional[int] = None) -> Optional[Tuple[WorkflowConfig, int]]:
+        if version is None:
+            row = self._connection().execute(
+                "SELECT config, revision FROM workflows WHERE name = ? AND deleted = 0", (name,)
+            ).fetchone()
+        else:
+            row = self._connection().execute(
+                "SELECT config, version FROM workflow_versions WHERE name = ? AND version = ?", (name, version)
+            ).fetchone()
+        if row is None:
+            return None
+        return WorkflowConfig.model_validate_json(row[0]), row[1]
+
+    def versions(self, name: str) -> List[int]:
+        rows = self._connection().execute(
+            "SELECT version FROM workflow_versions WHERE name = ? ORDER BY version", (name,)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def delete(self, name: str) -> bool:
+        if self.get(name) is None:
+            return False
+        self._write(name, None)
+        return True
+
+    def list(self) -> List[WorkflowConfig]:
+        rows = self._connection().execute(
+            "SELECT config FROM workflows WHERE deleted = 0 ORDER BY name"
+        ).fetchall()
+        return [WorkflowConfig.model_validate_json(row[0]) for row in rows]
+
+    def revision(self) -> int:
+        return self._connection().execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()[0]
+
+    def changes_since(self, revision: int) -> Tuple[int, Dict[str, Optional[int]]]:
+        connection = self._connection()
+        connection.execute("BEGIN")
+        try:
+            current = connection.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()[0]
+            rows = connection.execute(
+                "SELECT name, revision, deleted FROM workflows WHERE revision > ?", (revision,)
+            ).fetchall()
+        finally:
+            connection.execute("COMMIT")
+        return current, {name: None if deleted else row_revision for name, row_revision, deleted in rows}
+
+    def record_usage(self, name: str, count: int = 1):
+        with self._usage_lock:
+            self._pending_usage[name] = self._pending_usage.get(name, 0) + count
+            if self._usage_thread is None and not self._usage_stop.is_set():
+                self._usage_thread = threading.Thread(target=self._flush_periodically, name="registry-usage",
+                                                      daemon=True)
+                self._usage_thread.start()
+
+    def _flush_periodically(self):
+        while not self._usage_stop.wait(self.usage_flush_interval):
+            try:
+                self.flush_usage()
+            except Exception as e:
+                logger.warning("Failed to flush workflow usage to %s, retrying later: %s", self.path, e)
+
+    def flush_usage(self):
+        with self._usage_lock:
+            pending, self._pending_usage = self._pending_usage, {}
+        if not pending:
+            return
+        try:
+            self._write_usage(pending)
+        except BaseException:
+            # 放回缓冲，下次写入时合并
+            with self._usage_lock:
+                for name, count in pending.items():
+                    self._pending_usage[name] = self._pending_usage.get(name, 0) + count
+            raise
+
+    def _write_usage(self, pending: Dict[str, int]):
+        now = time.time()
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            for name, count in pending.items():
+                row = connection.execute(
+                    "SELECT score, last_used FROM workflow_usage WHERE name = ?", (name,)
+                ).fetchone()
+                score = decayed_score(row[0], row[1], now) + count if row else float(count)
+                connection.execute(
+                    "INSERT INTO workflow_usage (name, score, last_used, executions) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET score = excluded.score, last_used = excluded.last_used, "
+                    "executions = workflow_usage.executions + ?",
+                    (name, score, now, count, count)
+                )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def close(self):
+        self._usage_stop.set()
+        if self._usage_thread is not None:
+            self._usage_thread.join()
+        self.flush_usage()
+
+    def hot_workflows(self, limit: int) -> List[str]:
+        self.flush_usage()
+        now = time.time()
+        rows = self._connection().execute(
+            "SELECT u.name, u.score, u.last_used FROM workflow_usage u "
+            "JOIN workflows w ON w.name = u.name WHERE w.deleted = 0"
+        ).fetchall()
+        ranked = sorted(rows, key=lambda row: decayed_score(row[1], row[2], now), reverse=True)
+        return [row[0] for row in ranked[:limit]]
+
+
+class RegistryWatcher:
+    """
+    注册表变更通知
+
+    以修订号轮询注册表，发现变化时回调 on_change(变化的工作流)。poll_interval 内重复调用 poll 不会访问存储。
+    """
+
+    def __init__(self, registry: WorkflowRegistry, on_change, poll_interval: float = 0.0):
+        """
+        初始化变更通知
+
+        Args:
+            registry: 工作流注册表
+            on_change: 变更回调，参数为 工作流名称 -> 最新修订号（已删除为 None）
+            poll_interval: 两次检查之间的最小间隔（秒），0 表示每次调用都检查
+        """
+        self.registry = registry
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.revision = 0
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def poll(self):
+        """检查注册表是否有新的变更"""
+        now = time.monotonic()
+        if self.poll_interval and now - self._checked_at < self.poll_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            if self.registry.revision() == self.revision:
+                return
+            revision, changed = self.registry.changes_since(self.revision)
+            self.revision = revision
+        if changed:
+            self.on_change(changed)
+
+
+def registry_from_env(default_path: Optional[str] = None) -> WorkflowRegistry:
+    """
+    按 DATALAKE_WORKFLOW_REGISTRY 环境变量创建注册表
+
+    Args:
+        default_path: 未设置环境变量时使用的SQLite文件路径；为 None 时使用进程内注册表
+
+    Returns:
+        工作流注册表
+    """
+    path = os.getenv(REGISTRY_ENV) or default_path
+    if path:
+        return SQLiteWorkflowRegistry(path)
+    return InMemoryWorkflowRegistry()
@@ -0,0 +1,134 @@
+# 欲买桂花同载酒，
+# 终不似、少年游。
+# Copyright (c) VernonSong. All rights reserved.
+# ======================================================================================================================
+"""
+节点模拟行为的统一入口
+
+大模型调用、SQL执行与任务部署目前都是模拟实现，延迟与成败随机产生。节点通过全局 simulation 获取随机数与延迟：
+
+- 未设置种子时行为与直接使用 random 模块一致；
+- 设置种子后，每个节点按 (种子, 节点名, 源数据) 派生独立的随机序列，并发执行时结果同样可复现；
+- 可按类别（llm / sql / deploy）覆盖模拟延迟与失败率，供基准测试使用；
+- DATALAKE_SIMULATION 环境变量（configure 参数的JSON）可在服务进程启动时开启模拟模式。
+"""
+import json
+import os
+import random
+import threading
+import time
+from typing import Dict, Any, Callable, Optional, Union
+
+from pydantic import BaseModel, Field
+
+from datalake.core.workflow.node_cache import canonical_hash
+
+# 模拟配置环境变量
+SIMULATION_ENV = "DATALAKE_SIMULATION"
+
+
+# 模拟延迟配置
+class LatencyProfile(BaseModel):
+    mean: float = Field(..., ge=0, description="平均延迟（秒）")
+    jitter: float = Field(default=0.2, ge=0, le=1, description="抖动比例，实际延迟在 [mean*(1-jitter), mean*(1+jitter)] 内均匀分布")
+
+
+class Simulation:
+    """模拟延迟与随机结果的配置"""
+
+    def __init__(self):
+        self.seed: Optional[int] = None
+        self.latencies: Dict[str, LatencyProfile] = {}
+        self.failure_rates: Dict[str, float] = {}
+        self.time_scale = 1.0
+        self._streams: Dict[str, random.Random] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """是否处于可复现的模拟模式（设置了种子）"""
+        return self.seed is not None
+
+    def configure(self, seed: Optional[int] = None, latencies: Dict[str, Union[float, Dict[str, Any]]] = None,
+                  failure_rates: Dict[str, float] = None, time_scale: float = 1.0):
+        """
+        配置模拟行为
+
+        Args:
+            seed: 随机种子，None 表示使用全局 random
+            latencies: 各类别的模拟延迟，值为平均秒数或 LatencyProfile 字段字典
+            failure_rates: 各类别的失败率（0~1）
+            time_scale: 实际等待时间的缩放比例，延迟数值本身不受影响
+        """
+        with self._lock:
+            self.seed = seed
+            self.latencies = {
+                kind: LatencyProfile(mean=value) if isinstance(value, (int, float)) else LatencyProfile(**value)
+                for kind, value in (latencies or {}).items()
+            }
+            self.failure_rates = dict(failure_rates or {})
+            self.time_scale = time_scale
+            self._streams.clear()
+
+    def reset(self):
+        """恢复默认行为"""
+        self.configure()
+
+    def configure_from_env(self):
+        """按 DATALAKE_SIMULATION 环境变量配置，如 {"seed": 42, "latencies": {"llm": 0.2}}"""
+        raw = os.getenv(SIMULATION_ENV)
+        if raw:
+            self.configure(**json.loads(raw))
+
+    def rng(self, node_name: str, state: Dict[str, Any]) -> Union[random.Random, Any]:
+        """
+        获取节点使用的随机数生成器
+
+        模拟模式下同一节点处理同一份源数据得到同一条随机序列，重试时沿序列继续取值。
+
+        Args:
+            node_name: 节点名称
+            state: 工作流状态
+
+        Returns:
+            random.Random 实例；未设置种子时返回 random 模块本身
+        """
+        if self.seed is None:
+            return random
+        key = canonical_hash({"seed": self.seed, "node": node_name, "source_data": state.get("source_data")})
+        with self._lock:
+            stream = self._streams.get(key)
+            if stream is None:
+                stream = self._streams[key] = random.Random(key)
+            return stream
+
+    def latency(self, kind: str, rng, default: Callable[[Any], float]) -> float:
+        """
+        抽取一次模拟延迟
+
+        Args:
+            kind: 类别，llm / sql / deploy
+            rng: rng() 返回的随机数生成器
+            default: 未配置该类别时使用的延迟分布
+
+        Returns:
+            延迟秒数
+        """
+        profile = self.latencies.get(kind)
+        if profile is None:
+            return default(rng)
+        return rng.uniform(profile.mean * (1 - profile.jitter), profile.mean * (1 + profile.jitter))
+
+    def failed(self, kind: str, rng, default_rate: float) -> bool:
+        """按失败率抽取一次结果，返回是否失败"""
+        return rng.random() < self.failure_rates.get(kind, default_rate)
+
+    def sleep(self, seconds: float):
+        """等待模拟延迟"""
+        if seconds > 0 and self.time_scale > 0:
+            time.sleep(seconds * self.time_scale)
+
+
+# 全局模拟配置
+simulation = Simulation()
+simulation.configure_from_env()
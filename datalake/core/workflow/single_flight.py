@@ -0,0 +1,117 @@
+# 欲买桂花同载酒，
+# 终不似、少年游。
+# Copyright (c) VernonSong. All rights reserved.
+# ======================================================================================================================
+import hashlib
+import json
+import threading
+import time
+from typing import Dict, Any, Callable, Optional, Tuple
+
+
+def request_fingerprint(workflow_name: str, source_data: Dict[str, Any], custom_params: Optional[Dict[str, Any]]) -> str:
+    """
+    计算入湖请求的规范化哈希（键排序，与字典插入顺序无关）
+
+    Args:
+        workflow_name: 工作流名称
+        source_data: 源数据
+        custom_params: 自定义参数
+
+    Returns:
+        SHA-256 十六进制摘要
+    """
+    payload = json.dumps(
+        {"workflow_name": workflow_name, "source_data": source_data, "custom_params": custom_params or {}},
+        sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Call:
+    """一次进行中的执行"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    请求合并：相同键的并发调用只执行一次，其余调用等待并共享结果。
+    可选的短期结果缓存用于幂等工作流，在 ttl 秒内直接返回上次结果。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._cache: Dict[str, Tuple[float, Any]] = {}
+
+    def do(self, key: str, fn: Callable[[], Any], cache_ttl: float = 0,
+           cacheable: Optional[Callable[[Any], bool]] = None) -> Tuple[Any, bool]:
+        """
+        执行或加入相同键的进行中调用
+
+        Args:
+            key: 请求键
+            fn: 实际执行函数
+            cache_ttl: 结果缓存时间（秒），0 表示不缓存
+            cacheable: 判断结果是否缓存的函数，默认缓存全部未抛出异常的结果
+
+        Returns:
+            (结果, 是否为共享结果)
+        """
+        with self._lock:
+            if cache_ttl > 0:
+                cached = self._cache.get(key)
+                if cached and cached[0] > time.monotonic():
+                    return cached[1], True
+                self._cache.pop(key, None)
+
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                if call.error is None and cache_ttl > 0 and (cacheable is None or cacheable(call.result)):
+                    self._purge_expired()
+                    self._cache[key] = (time.monotonic() + cache_ttl, call.result)
+            call.done.set()
+
+        return call.result, False
+
+    def _purge_expired(self):
+        """清理过期的缓存结果（调用方需持有锁）"""
+        now = time.monotonic()
+        for key in [key for key, (expires_at, _) in self._cache.items() if expires_at <= now]:
+            del self._cache[key]
+
+    def forget(self, key: str):
+        """清除指定键的缓存结果"""
+        with self._lock:
+            self._cache.pop(key, None)
+
+    def clear(self):
+        """清除全部缓存结果"""
+        with self._lock:
+            self._cache.clear()
@@ -0,0 +1,269 @@
+# 欲买桂花同载酒，
+# 终不似、少年游。
+# Copyright (c) VernonSong. All rights reserved.
+# ======================================================================================================================
+import bisect
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List, Callable, Optional, Tuple
+
+from langgraph.errors import GraphBubbleUp
+
+# 延迟直方图的桶边界（秒），覆盖毫秒级的元数据查询到分钟级的大模型调用
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def state_size(state: Any) -> int:
+    """状态序列化为JSON后的字节数"""
+    try:
+        return len(json.dumps(state, ensure_ascii=False, default=str).encode("utf-8"))
+    except (TypeError, ValueError):
+        return 0
+
+
+class LatencyHistogram:
+    """累积延迟直方图（Prometheus histogram 语义）"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """返回 (le, 累计计数) 列表，最后一项为 +Inf"""
+        with self._lock:
+            counts = list(self.counts)
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets, counts):
+            total += count
+            result.append((_format_float(bound), total))
+        result.append(("+Inf", total + counts[-1]))
+        return result
+
+
+class _TraceWriter:
+    """
+    后台线程追加写入追踪记录文件
+
+    节点线程只把序列化好的行放入队列，文件 I/O 在后台线程完成，不阻塞节点执行。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._queue: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def write(self, line: str):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+                    self._thread.start()
+        self._queue.put(line)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待已入队的记录全部写入文件"""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _run(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                item = self._queue.get()
+                # 一次取完队列中已有的记录，批量写入后再 flush
+                while True:
+                    if isinstance(item, threading.Event):
+                        f.flush()
+                        item.set()
+                    else:
+                        f.write(item)
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                f.flush()
+
+
+class NodeTracer:
+    """
+    节点执行追踪：记录每次节点执行的起止时间、耗时、输入输出状态大小与异常，
+    汇总为按工作流、节点划分的延迟直方图，并可导出追踪记录到本地JSON文件。
+    """
+
+    def __init__(self, trace_file: Optional[str] = None, max_spans: int = 10000, measure_state_size: bool = False):
+        """
+        初始化追踪器
+
+        Args:
+            trace_file: 追踪记录文件（JSON Lines），每个 span 由后台线程追加一行；None 时只保存在内存中
+            max_spans: 内存中保留的最近 span 数量
+            measure_state_size: 是否计算输入输出状态大小；每次节点执行都要把输入输出状态各序列化一次，
+                批量任务等大状态下开销与状态大小成正比，默认关闭，排查状态膨胀时开启
+        """
+        self.trace_file = trace_file
+        self._writer = _TraceWriter(trace_file) if trace_file else None
+        self.measure_state_size = measure_state_size
+        self.spans = deque(maxlen=max_spans)
+        self.histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self.errors: Dict[Tuple[str, str], int] = {}
+        self.state_bytes: Dict[Tuple[str, str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def wrap(self, workflow_name: str, node_name: str, fn: Callable[[Dict[str, Any]], Dict[str, Any]]) -> Callable:
+        """
+        包装节点函数，记录每次执行
+
+        Args:
+            workflow_name: 工作流名称
+            node_name: 节点名称
+            fn: 节点函数
+
+        Returns:
+            包装后的节点函数
+        """
+
+        def traced(state: Dict[str, Any]) -> Dict[str, Any]:
+            span = {
+                "workflow": workflow_name,
+                "node": node_name,
+                "request_id": state.get("request_id"),
+                "start_time": time.time(),
+                "input_bytes": state_size(state) if self.measure_state_size else None
+            }
+            start = time.perf_counter()
+            try:
+                new_state = fn(state)
+            except GraphBubbleUp:
+                # 节点调用 interrupt 挂起工作流
+                span["status"] = "suspended"
+                raise
+            except Exception as e:
+                span["exception"] = f"{type(e).__name__}: {e}"
+                raise
+            else:
+                node_result = new_state.get("results", {}).get(node_name) if isinstance(new_state, dict) else None
+                if isinstance(node_result, dict):
+                    span["status"] = node_result.get("status")
+                    if node_result.get("cache_hit"):
+                        span["cache_hit"] = True
+                span["output_bytes"] = state_size(new_state) if self.measure_state_size else None
+                return new_state
+            finally:
+                span["duration"] = time.perf_counter() - start
+                span["end_time"] = span["start_time"] + span["duration"]
+                self.record(span)
+
+        traced.__name__ = getattr(fn, "__name__", node_name)
+        traced.__wrapped__ = fn
+        return traced
+
+    def record(self, span: Dict[str, Any]):
+        """记录一个 span 并更新统计"""
+        key = (span["workflow"], span["node"])
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = LatencyHistogram()
+            if span.get("exception") or span.get("status") == "failed":
+                self.errors[key] = self.errors.get(key, 0) + 1
+            for direction in ("input", "output"):
+                size = span.get(f"{direction}_bytes")
+                if size:
+                    size_key = key + (direction,)
+                    self.state_bytes[size_key] = self.state_bytes.get(size_key, 0) + size
+            self.spans.append(span)
+        histogram.observe(span["duration"])
+        if self._writer is not None:
+            self._writer.write(json.dumps(span, ensure_ascii=False, default=str) + "\n")
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待已记录的 span 全部写入追踪记录文件"""
+        return self._writer.flush(timeout) if self._writer is not None else True
+
+    def export_trace(self, path: str) -> int:
+        """
+        将内存中的 span 导出为JSON文件
+
+        Returns:
+            导出的 span 数量
+        """
+        with self._lock:
+            spans = list(self.spans)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"spans": spans}, f, ensure_ascii=False, default=str, indent=2)
+        return len(spans)
+
+    def render_prometheus(self) -> str:
+        """以 Prometheus 文本格式输出指标"""
+        with self._lock:
+            histograms = dict(self.histograms)
+            errors = dict(self.errors)
+            state_bytes = dict(self.state_bytes)
+
+        lines = [
+            "# HELP datalake_node_duration_seconds Node execution latency in seconds.",
+            "# TYPE datalake_node_duration_seconds histogram"
+        ]
+        for (workflow_name, node_name), histogram in sorted(histograms.items()):
+            labels = f'workflow="{_escape(workflow_name)}",node="{_escape(node_name)}"'
+            for le, count in histogram.cumulative():
+                lines.append(f'datalake_node_duration_seconds_bucket{{{labels},le="{le}"}} {count}')
+            lines.append(f"datalake_node_duration_seconds_sum{{{labels}}} {histogram.sum}")
+            lines.append(f"datalake_node_duration_seconds_count{{{labels}}} {histogram.count}")
+
+        lines.append("# HELP datalake_node_failures_total Node executions that raised or returned status failed.")
+        lines.append("# TYPE datalake_node_failures_total counter")
+        for (workflow_name, node_name), count in sorted(errors.items()):
+            lines.append(f'datalake_node_failures_total{{workflow="{_escape(workflow_name)}",node="{_escape(node_name)}"}} {count}')
+
+        lines.append("# HELP datalake_node_state_bytes_total Serialized workflow state size seen by nodes.")
+        lines.append("# TYPE datalake_node_state_bytes_total counter")
+        for (workflow_name, node_name, direction), size in sorted(state_bytes.items()):
+            lines.append(
+                f'datalake_node_state_bytes_total{{workflow="{_escape(workflow_name)}",node="{_escape(node_name)}",'
+                f'direction="{direction}"}} {size}'
+            )
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """清空全部追踪数据"""
+        with self._lock:
+            self.spans.clear()
+            self.histograms.clear()
+            self.errors.clear()
+            self.state_bytes.clear()
+
+
+def _format_float(value: float) -> str:
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# 全局追踪器，DATALAKE_TRACE_FILE 环境变量指定追踪记录文件，DATALAKE_TRACE_STATE_SIZE 为 1 时记录状态大小
+tracer = NodeTracer(trace_file=os.getenv("DATALAKE_TRACE_FILE"),
+                    measure_state_size=os.getenv("DATALAKE_TRACE_STATE_SIZE", "0").lower() in ("1", "true"))
@@ -0,0 +1,137 @@
+# 欲买桂花同载酒，
+# 终不似、少年游。
+# Copyright (c) VernonSong. All rights reserved.
+# ======================================================================================================================
+"""
+已编译工作流版本表
+
+每个工作流版本编译后不再修改。每个工作流有一个“当前版本”指针，更新工作流时先在锁外编译新版本，再在锁内切换指针。
+执行期间持有版本引用，旧版本在不再是当前版本且引用计数归零后才被回收，进行中的执行始终在其开始时的版本上完成。
+"""
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from datalake.core.workflow.models import WorkflowConfig
+
+
+class CompiledVersion:
+    """一个不可变的已编译工作流版本"""
+
+    __slots__ = ("name", "version", "graph", "config", "refcount")
+
+    def __init__(self, name: str, version: int, graph: Any, config: WorkflowConfig):
+        self.name = name
+        self.version = version
+        self.graph = graph
+        self.config = config
+        # 正在使用该版本的执行数，由 WorkflowVersions 在锁内维护
+        self.refcount = 0
+
+    def __repr__(self) -> str:
+        return f"CompiledVersion({self.name}@{self.version}, refcount={self.refcount})"
+
+
+class WorkflowVersions:
+    """按 (工作流名称, 版本号) 保存已编译版本，维护当前版本指针与引用计数"""
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, int], CompiledVersion] = {}
+        # 工作流名称 -> 当前版本号
+        self._current: Dict[str, int] = {}
+        # 工作流名称 -> 已知的最新版本号，低于它的版本不能再成为当前版本
+        self._latest: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def install(self, entry: CompiledVersion, make_current: bool = True, acquire: bool = False) -> CompiledVersion:
+        """
+        加入一个已编译版本
+
+        版本号只增不减，只有比当前版本更新、且不早于已知最新版本的版本才会成为当前版本，并发安装时不会回退。
+        同一版本已存在时保留已有的实例。
+
+        Args:
+            entry: 已编译版本
+            make_current: 是否切换当前版本指针；执行指定的历史版本时为 False
+            acquire: 是否同时获取引用，非当前版本只有持有引用才不会被立即回收
+
+        Returns:
+            表中该版本的实例
+        """
+        with self._lock:
+            key = (entry.name, entry.version)
+            entry = self._entries.setdefault(key, entry)
+            if acquire:
+                entry.refcount += 1
+            current = self._current.get(entry.name)
+            newer = (current is None or entry.version > current) and entry.version >= self._latest.get(entry.name, 0)
+            if make_current and newer:
+                self._current[entry.name] = entry.version
+                if current is not None:
+                    self._collect(entry.name, current)
+            elif entry.version != self._current.get(entry.name):
+                self._collect(entry.name, entry.version)
+            return entry
+
+    def acquire(self, name: str, version: Optional[int] = None) -> Optional[CompiledVersion]:
+        """
+        获取一个版本的引用
+
+        Args:
+            name: 工作流名称
+            version: 版本号，None 表示当前版本
+
+        Returns:
+            已编译版本（引用计数已加一），本进程尚未编译时返回 None
+        """
+        with self._lock:
+            if version is None:
+                version = self._current.get(name)
+                if version is None:
+                    return None
+            entry = self._entries.get((name, version))
+            if entry is not None:
+                entry.refcount += 1
+            return entry
+
+    def release(self, entry: CompiledVersion):
+        """释放引用，不再是当前版本的旧版本在引用归零时被回收"""
+        with self._lock:
+            entry.refcount -= 1
+            self._collect(entry.name, entry.version)
+
+    def retire(self, name: str, latest: Optional[int] = None) -> bool:
+        """
+        撤下当前版本指针（工作流被其他进程更新或删除）
+
+        Args:
+            name: 工作流名称
+            latest: 注册表中的最新版本号，当前版本即为该版本时保留；None 表示工作流已删除
+
+        Returns:
+            是否撤下了指针
+        """
+        with self._lock:
+            if latest is not None:
+                self._latest[name] = max(self._latest.get(name, 0), latest)
+            current = self._current.get(name)
+            if current is None or current == latest:
+                return False
+            del self._current[name]
+            self._collect(name, current)
+            return True
+
+    def current(self) -> Dict[str, CompiledVersion]:
+        """各工作流的当前版本"""
+        with self._lock:
+            return {name: self._entries[(name, version)] for name, version in self._current.items()}
+
+    def loaded(self, name: str) -> List[int]:
+        """本进程已编译（含执行中的旧版本）的版本号"""
+        with self._lock:
+            return sorted(version for entry_name, version in self._entries if entry_name == name)
+
+    def _collect(self, name: str, version: int):
+        """回收非当前且无人使用的版本，调用方需持有锁"""
+        entry = self._entries.get((name, version))
+        if entry is not None and entry.refcount <= 0 and self._current.get(name) != version:
+            del self._entries[(name, version)]
@@ -0,0 +1,540 @@
+# 欲买桂花同载酒，
+# 终不似、少年游。
+# Copyright (c) VernonSong. All rights reserved.
+# ======================================================================================================================
+"""
+等待网关的挂起与恢复
+
+wait_gateway 节点以 LangGraph interrupt 挂起执行，执行的状态保存在检查点中，挂起期间不占用任何线程。
+WaitCoordinator 把每个挂起记录为一条 WaitState，由以下三种方式之一结束等待并恢复执行：
+
+- manual_approval：approve(request_id, approved) 审批
+- external_event：signal(event, payload) 结束所有等待该事件的执行
+- time_delay：到达 wait_until 时由定时器触发；其他类型配置了超时时间时同样由定时器以超时结束
+- job_status：等待部署任务结束，由 watch 登记到任务状态跟踪器，任务全部结束时 complete(wait_id, statuses)
+
+每条等待只能被结束一次：store.claim 原子地把 waiting 改为 completed/cancelled，多个入口或多个进程竞争时只有一个恢复执行。
+claim 之前先确认本进程能恢复该执行（检查点中仍挂起），恢复失败时 store.release 把记录改回 waiting，
+避免记录已结束而执行仍挂起、再也无法恢复。
+定时器是一个最小堆加一个线程，堆中只保存 (触发时间, wait_id)，已结束的等待在触发时由 claim 过滤，不需要从堆中删除。
+
+DATALAKE_WAIT_STORE 指定 SQLite 文件路径时等待记录持久化，重启后 recover 重新登记定时器与任务状态跟踪；
+DATALAKE_CHECKPOINT_DB 指定 SQLite 文件路径时检查点同样持久化（需要 langgraph-checkpoint-sqlite），
+否则检查点保存在进程内，挂起的执行占用内存，且重启后无法恢复。
+"""
+import datetime
+import heapq
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langgraph.checkpoint.memory import MemorySaver
+
+from datalake.core.workflow.models import WaitState
+from datalake.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# 等待记录的 SQLite 文件路径
+WAIT_STORE_ENV = "DATALAKE_WAIT_STORE"
+# 检查点的 SQLite 文件路径
+CHECKPOINT_ENV = "DATALAKE_CHECKPOINT_DB"
+
+# 等待类型
+WAIT_TYPES = ("manual_approval", "time_delay", "external_event")
+# 等待部署任务结束，由任务状态跟踪器结束
+JOB_STATUS_WAIT = "job_status"
+# 定时器触发后恢复执行失败时，重新触发的间隔（秒）
+TIMER_RETRY_DELAY = 30.0
+
+
+class WaitStore:
+    """等待记录存储接口"""
+
+    def put(self, state: WaitState):
+        """写入等待记录"""
+        raise NotImplementedError("Subclasses must implement the put method")
+
+    def get(self, wait_id: str) -> Optional[WaitState]:
+        """读取等待记录，不存在时返回 None"""
+        raise NotImplementedError("Subclasses must implement the get method")
+
+    def claim(self, wait_id: str, status: str) -> Optional[WaitState]:
+        """把仍在等待的记录原子地改为 status，返回修改后的记录；已结束或不存在时返回 None"""
+        raise NotImplementedError("Subclasses must implement the claim method")
+
+    def release(self, wait_id: str, status: str) -> bool:
+        """把 claim 为 status 的记录改回 waiting（恢复执行失败时），返回是否修改"""
+        raise NotImplementedError("Subclasses must implement the release method")
+
+    def find(self, request_id: str = None, event: str = None, status: str = "waiting",
+             wait_type: str = None) -> List[WaitState]:
+        """按请求ID、事件名或等待类型查询等待记录"""
+        raise NotImplementedError("Subclasses must implement the find method")
+
+    def timers(self) -> List[Tuple[float, str]]:
+        """仍在等待且有 wait_until 的记录，(触发时间戳, wait_id)"""
+        raise NotImplementedError("Subclasses must implement the timers method")
+
+    def count(self, status: str = "waiting") -> int:
+        """指定状态的记录数"""
+        raise NotImplementedError("Subclasses must implement the count method")
+
+
+class InMemoryWaitStore(WaitStore):
+    """进程内等待记录存储"""
+
+    def __init__(self):
+        self._states: Dict[str, WaitState] = {}
+        self._lock = threading.Lock()
+
+    def put(self, state: WaitState):
+        with self._lock:
+            self._states[state.wait_id] = state.model_copy()
+
+    def get(self, wait_id: str) -> Optional[WaitState]:
+        with self._lock:
+            state = self._states.get(wait_id)
+            return state.model_copy() if state else None
+
+    def claim(self, wait_id: str, status: str) -> Optional[WaitState]:
+        with self._lock:
+            state = self._states.get(wait_id)
+            if state is None or state.status != "waiting":
+                return None
+            state.status = status
+            state.updated_at = datetime.datetime.now()
+            return state.model_copy()
+
+    def release(self, wait_id: str, status: str) -> bool:
+        with self._lock:
+            state = self._states.get(wait_id)
+            if state is None or state.status != status:
+                return False
+            state.status = "waiting"
+            state.updated_at = datetime.datetime.now()
+            return True
+
+    def find(self, request_id: str = None, event: str = None, status: str = "waiting",
+             wait_type: str = None) -> List[WaitState]:
+        with self._lock:
+            return [
+                state.model_copy() for state in self._states.values()
+                if (request_id is None or state.request_id == request_id)
+                and (event is None or state.event == event)
+                and (status is None or state.status == status)
+                and (wait_type is None or state.wait_type == wait_type)
+            ]
+
+    def timers(self) -> List[Tuple[float, str]]:
+        with self._lock:
+            return [(state.wait_until.timestamp(), state.wait_id) for state in self._states.values()
+                    if state.status == "waiting" and state.wait_until is not None]
+
+    def count(self, status: str = "waiting") -> int:
+        with self._lock:
+            return sum(1 for state in self._states.values() if state.status == status)
+
+
+class SQLiteWaitStore(WaitStore):
+    """基于SQLite文件的等待记录存储，WAL 模式，每个线程使用独立连接"""
+
+    _COLUMNS = ("wait_id", "request_id", "workflow_name", "workflow_version", "node_name", "interrupt_id", "wait_type",
+                "wait_condition", "event", "wait_until", "status", "created_at", "updated_at")
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        """
+        初始化存储
+
+        Args:
+            path: 数据库文件路径，不存在时自动创建
+            timeout: 等待写锁的超时时间（秒）
+        """
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS wait_states ("
+                "wait_id TEXT PRIMARY KEY, request_id TEXT NOT NULL, workflow_name TEXT NOT NULL, "
+                "workflow_version INTEGER, node_name TEXT NOT NULL, interrupt_id TEXT, wait_type TEXT NOT NULL, "
+                "wait_condition TEXT NOT NULL, event TEXT, wait_until REAL, status TEXT NOT NULL, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            # 只为仍在等待的记录建索引，已结束的记录不占用索引
+            connection.execute("CREATE INDEX IF NOT EXISTS wait_states_event ON wait_states (event) "
+                               "WHERE status = 'waiting'")
+            connection.execute("CREATE INDEX IF NOT EXISTS wait_states_until ON wait_states (wait_until) "
+                               "WHERE status = 'waiting' AND wait_until IS NOT NULL")
+            connection.execute("CREATE INDEX IF NOT EXISTS wait_states_request ON wait_states (request_id)")
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def _to_row(state: WaitState) -> tuple:
+        return (
+            state.wait_id, state.request_id, state.workflow_name, state.workflow_version, state.node_name,
+            state.interrupt_id, state.wait_type, json.dumps(state.wait_condition, ensure_ascii=False, default=str),
+            state.event, state.wait_until.timestamp() if state.wait_until else None, state.status,
+            state.created_at.timestamp(), state.updated_at.timestamp()
+        )
+
+    def _from_row(self, row: tuple) -> WaitState:
+        values = dict(zip(self._COLUMNS, row))
+        values["wait_condition"] = json.loads(values["wait_condition"])
+        for name in ("wait_until", "created_at", "updated_at"):
+            if values[name] is not None:
+                values[name] = datetime.datetime.fromtimestamp(values[name])
+        return WaitState(**values)
+
+    def put(self, state: WaitState):
+        with self._connection() as connection:
+            connection.execute(
+                f"INSERT OR REPLACE INTO wait_states ({', '.join(self._COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(self._COLUMNS))})", self._to_row(state)
+            )
+
+    def get(self, wait_id: str) -> Optional[WaitState]:
+        row = self._connection().execute(
+            f"SELECT {', '.join(self._COLUMNS)} FROM wait_states WHERE wait_id = ?", (wait_id,)
+        ).fetchone()
+        return self._from_row(row) if row else None
+
+    def claim(self, wait_id: str, status: str) -> Optional[WaitState]:
+        with self._connection() as connection:
+            updated = connection.execute(
+                "UPDATE wait_states SET status = ?, updated_at = ? WHERE wait_id = ? AND status = 'waiting'",
+                (status, time.time(), wait_id)
+            ).rowcount
+        return self.get(wait_id) if updated else None
+
+    def release(self, wait_id: str, status: str) -> bool:
+        with self._connection() as connection:
+            return connection.execute(
+                "UPDATE wait_states SET status = 'waiting', updated_at = ? WHERE wait_id = ? AND status = ?",
+                (time.time(), wait_id, status)
+            ).rowcount > 0
+
+    def find(self, request_id: str = None, event: str = None, status: str = "waiting",
+             wait_type: str = None) -> List[WaitState]:
+        clauses, params = [], []
+        for column, value in (("request_id", request_id), ("event", event), ("status", status),
+                              ("wait_type", wait_type)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connection().execute(
+            f"SELECT {', '.join(self._COLUMNS)} FROM wait_states{where}", params
+        ).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def timers(self) -> List[Tuple[float, str]]:
+        return self._connection().execute(
+            "SELECT wait_until, wait_id FROM wait_states WHERE status = 'waiting' AND wait_until IS NOT NULL"
+        ).fetchall()
+
+    def count(self, status: str = "waiting") -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM wait_states WHERE status = ?", (status,)).fetchone()[0]
+
+
+def wait_store_from_env() -> WaitStore:
+    """按 DATALAKE_WAIT_STORE 环境变量创建等待记录存储，未设置时使用进程内存储"""
+    path = os.getenv(WAIT_STORE_ENV)
+    if path:
+        return SQLiteWaitStore(path)
+    return InMemoryWaitStore()
+
+
+def durable_checkpointer(checkpointer: Any) -> bool:
+    """检查点是否持久化（进程内的 MemorySaver 不是）"""
+    return not isinstance(checkpointer, MemorySaver)
+
+
+def checkpointer_from_env():
+    """
+    按 DATALAKE_CHECKPOINT_DB 环境变量创建检查点存储，未设置时使用进程内的 MemorySaver
+
+    Raises:
+        ImportError: 设置了环境变量但未安装 langgraph-checkpoint-sqlite（pip install datalake-solo[checkpoint]）
+    """
+    path = os.getenv(CHECKPOINT_ENV)
+    if not path:
+        return MemorySaver()
+    try:
+        from langgraph.checkpoint.sqlite import SqliteSaver
+    except ImportError as e:
+        raise ImportError(
+            "langgraph-checkpoint-sqlite is required for durable checkpoints: pip install datalake-solo[checkpoint]"
+        ) from e
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    return SqliteSaver(sqlite3.connect(path, check_same_thread=False))
+
+
+class WaitTimers:
+    """最小堆定时器：一个线程按触发时间依次触发，回调在线程池中执行"""
+
+    def __init__(self, fire: Callable[[str], None], workers: int = 4, name: str = "wait-timers"):
+        """
+        初始化定时器
+
+        Args:
+            fire: 到期时调用，参数为 wait_id
+            workers: 执行回调（恢复执行）的线程数
+            name: 定时器线程名称
+        """
+        self.fire = fire
+        self.name = name
+        self._heap: List[Tuple[float, str]] = []
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{name}-fire")
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def __len__(self) -> int:
+        with self._condition:
+            return len(self._heap)
+
+    def schedule(self, wait_id: str, deadline: float):
+        """登记定时器，deadline 为触发时间戳"""
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Wait timers are closed")
+            heapq.heappush(self._heap, (deadline, wait_id))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            # 新的定时器比当前等待的更早时唤醒线程
+            if self._heap[0][1] == wait_id:
+                self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._closed:
+                    if not self._heap:
+                        self._condition.wait()
+                        continue
+                    remaining = self._heap[0][0] - time.time()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                if self._closed:
+                    return
+                now = time.time()
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    due.append(heapq.heappop(self._heap)[1])
+            for wait_id in due:
+                self._executor.submit(self._fire, wait_id)
+
+    def _fire(self, wait_id: str):
+        try:
+            self.fire(wait_id)
+        except Exception:
+            logger.exception("Wait timer %s failed", wait_id)
+
+    def close(self):
+        """停止定时器，未触发的定时器在 recover 时重新登记"""
+        with self._condition:
+            self._closed = True
+            self._heap.clear()
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        self._executor.shutdown(wait=True)
+
+
+class WaitCoordinator:
+    """登记挂起的等待，并在审批、事件或定时器到达时恢复执行"""
+
+    def __init__(self, resume: Callable[[WaitState, Dict[str, Any]], Dict[str, Any]], store: WaitStore = None,
+                 timer_workers: int = 4, resumable: Callable[[WaitState], bool] = None,
+                 watch: Callable[[WaitState], None] = None, retry_delay: float = TIMER_RETRY_DELAY):
+        """
+        初始化
+
+        Args:
+            resume: 恢复执行的函数，参数为等待记录与 interrupt 的返回值，返回执行结果
+            store: 等待记录存储，默认按 DATALAKE_WAIT_STORE 创建
+            timer_workers: 定时器触发后恢复执行的线程数
+            resumable: 本进程能否恢复该等待的执行（检查点中仍挂起），不能恢复时不结束等待记录
+            watch: 登记 job_status 等待到任务状态跟踪器，任务结束时调用 complete
+            retry_delay: 有触发时间的等待恢复执行失败后，重新触发定时器的间隔（秒）
+        """
+        self.resume = resume
+        self.resumable = resumable
+        self.watch = watch
+        self.retry_delay = retry_delay
+        self.store = store or wait_store_from_env()
+        self.timers = WaitTimers(self._on_timer, workers=timer_workers)
+        self._recovered = False
+        self._recover_lock = threading.Lock()
+
+    def park(self, request_id: str, workflow_name: str, workflow_version: Optional[int], interrupt_id: str,
+             value: Dict[str, Any]) -> WaitState:
+        """
+        记录一次挂起
+
+        Args:
+            request_id: 执行的请求ID
+            workflow_name: 工作流名称
+            workflow_version: 工作流版本
+            interrupt_id: interrupt 的ID，恢复时据此指定恢复哪一个挂起
+            value: wait_gateway 传给 interrupt 的值 {"type", "condition", "event", "wait_until", "node"}，
+                job_status 为 {"type", "jobids", "deploy_url"}
+
+        Returns:
+            等待记录
+        """
+        self.recover()
+        wait_until = value.get("wait_until")
+        condition = value.get("condition") or {}
+        if value["type"] == JOB_STATUS_WAIT:
+            condition = {"jobids": value.get("jobids", []), "deploy_url": value["deploy_url"]}
+        state = WaitState(
+            wait_id=f"{request_id}:{interrupt_id}",
+            request_id=request_id,
+            workflow_name=workflow_name,
+            workflow_version=workflow_version,
+            node_name=value.get("node", "wait_gateway"),
+            interrupt_id=interrupt_id,
+            wait_type=value["type"],
+            wait_condition=condition,
+            event=value.get("event"),
+            wait_until=datetime.datetime.fromtimestamp(wait_until) if wait_until is not None else None
+        )
+        self.store.put(state)
+        if wait_until is not None:
+            self.timers.schedule(state.wait_id, wait_until)
+        if state.wait_type == JOB_STATUS_WAIT and self.watch is not None:
+            self.watch(state)
+        logger.info("Request %s waiting for %s", request_id, state.wait_type)
+        return state
+
+    def recover(self):
+        """重新登记持久化的等待记录中尚未触发的定时器与尚未结束的任务状态等待（进程内只执行一次）"""
+        with self._recover_lock:
+            if self._recovered:
+                return
+            self._recovered = True
+            timers = self.store.timers()
+            jobs = self.store.find(wait_type=JOB_STATUS_WAIT) if self.watch is not None else []
+        for deadline, wait_id in timers:
+            self.timers.schedule(wait_id, deadline)
+        for state in jobs:
+            self.watch(state)
+        if timers or jobs:
+            logger.info("Recovered %d wait timers and %d job status waits", len(timers), len(jobs))
+
+    def complete(self, wait_id: str, value: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        以 value 结束一条等待并恢复执行
+
+        Returns:
+            恢复后的执行结果；等待已结束、不存在或本进程不能恢复时返回 None
+        """
+        state = self.store.get(wait_id)
+        if state is None or state.status != "waiting":
+            return None
+        return self._finish(state, "completed", value)
+
+    def _finish(self, state: WaitState, status: str, value: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        结束一条等待并恢复执行
+
+        Returns:
+            恢复后的执行结果；本进程不能恢复或已被其他入口结束时返回 None
+
+        Raises:
+            恢复执行失败时等待记录改回 waiting、有触发时间的等待在 retry_delay 后重新触发，之后抛出原异常
+        """
+        if self.resumable is not None and not self.resumable(state):
+            logger.info("Wait %s cannot be resumed by this process", state.wait_id)
+            return None
+        claimed = self.store.claim(state.wait_id, status)
+        if claimed is None:
+            return None
+        try:
+            return self.resume(claimed, value)
+        except Exception:
+            self.store.release(claimed.wait_id, status)
+            if claimed.wait_until is not None:
+                self._reschedule(claimed)
+            raise
+
+    def _reschedule(self, state: WaitState):
+        """重新登记恢复失败的等待的定时器，否则定时或超时的等待要到下次重启才会再触发"""
+        deadline = max(state.wait_until.timestamp(), time.time() + self.retry_delay)
+        try:
+            self.timers.schedule(state.wait_id, deadline)
+        except RuntimeError:
+            # 定时器已关闭，由下次 recover 重新登记
+            pass
+
+    def _on_timer(self, wait_id: str):
+        state = self.store.get(wait_id)
+        if state is None or state.status != "waiting":
+            return
+        fired_at = time.time()
+        if state.wait_type == "time_delay":
+            self._finish(state, "completed", {"fired_at": fired_at})
+        else:
+            self._finish(state, "completed", {"timed_out": True, "fired_at": fired_at})
+
+    def approve(self, request_id: str, approved: bool = True, approver: str = "", comment: str = "") -> Dict[str, Any]:
+        """
+        审批挂起在 manual_approval 的执行
+
+        Returns:
+            恢复后的执行结果
+
+        Raises:
+            ValueError: 该执行没有等待审批
+        """
+        for state in self.store.find(request_id=request_id):
+            if state.wait_type != "manual_approval":
+                continue
+            result = self._finish(state, "completed", {"approved": approved, "approver": approver, "comment": comment})
+            if result is not None:
+                return result
+        raise ValueError(f"Request is not waiting for approval: {request_id}")
+
+    def signal(self, event: str, payload: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """
+        发送外部事件，恢复所有等待该事件的执行
+
+        Returns:
+            各执行恢复后的结果
+        """
+        results = []
+        for state in self.store.find(event=event):
+            result = self._finish(state, "completed", {"event": event, "payload": payload or {}})
+            if result is not None:
+                results.append(result)
+        return results
+
+    def cancel(self, request_id: str) -> List[Dict[str, Any]]:
+        """取消执行的全部等待，等待网关以 cancelled 结束"""
+        results = []
+        for state in self.store.find(request_id=request_id):
+            result = self._finish(state, "cancelled", {"cancelled": True})
+            if result is not None:
+                results.append(result)
+        return results
+
+    def close(self):
+        self.timers.close()
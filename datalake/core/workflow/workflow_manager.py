@@ -2,24 +2,207 @@
 # 终不似、少年游。
 # Copyright (c) VernonSong. All rights reserved.
 # ======================================================================================================================
-from typing import Dict, Any, List
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Tuple
 from uuid import uuid4
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
-from datalake.core.workflow.models import WorkflowState, WorkflowConfig, LakeIngestionRequest
+from langgraph.types import Command
+from datalake.core.workflow.models import WorkflowState, WorkflowConfig, LakeIngestionRequest, WaitState, node_registry
 from datalake.core.nodes import NODE_MAPPING
+from datalake.core.workflow.pipeline import DDLPipeline, build_table_states, summarize_pipeline
+from datalake.core.workflow.single_flight import SingleFlight, request_fingerprint
+from datalake.core.workflow.node_cache import NodeCache, InMemoryNodeCache, memoize_node
+from datalake.core.workflow.node_policy import CircuitBreakerRegistry, apply_policy, resolve_policy
+from datalake.core.workflow.tracing import NodeTracer, tracer as default_tracer
+from datalake.core.workflow.registry import WorkflowRegistry, RegistryWatcher, registry_from_env
+from datalake.core.workflow.versions import CompiledVersion, WorkflowVersions
+from datalake.core.workflow.waits import (
+    JOB_STATUS_WAIT, WAIT_TYPES, WaitCoordinator, WaitStore, checkpointer_from_env, durable_checkpointer
+)
+from datalake.services.job_tracker import get_job_tracker
+from datalake.utils.log import get_logger, bind_request_id
+
+logger = get_logger(__name__)
 
 
 class WorkflowManager:
-    def __init__(self):
-        self.workflows: Dict[str, StateGraph] = {}
-        self.workflow_configs: Dict[str, WorkflowConfig] = {}
-        self.memory = MemorySaver()
+    def __init__(self, node_cache: NodeCache = None, tracer: NodeTracer = None, registry: WorkflowRegistry = None,
+                 poll_interval: float = 0.0, checkpointer: Any = None, wait_store: WaitStore = None):
+        """
+        初始化工作流管理器
+
+        Args:
+            node_cache: 节点结果缓存
+            tracer: 节点执行追踪器
+            registry: 工作流配置存储；未传入时在首次使用时按 DATALAKE_WORKFLOW_REGISTRY 环境变量创建
+            poll_interval: 检查注册表变更的最小间隔（秒），0 表示每次访问工作流前都检查
+            checkpointer: LangGraph 检查点存储；未传入时按 DATALAKE_CHECKPOINT_DB 环境变量创建
+            wait_store: 等待网关的等待记录存储；未传入时按 DATALAKE_WAIT_STORE 环境变量创建
+        """
+        # 工作流配置以注册表为准，本进程只缓存编译后的不可变版本
+        self._registry = registry
+        self._watcher: Optional[RegistryWatcher] = None
+        self._registry_lock = threading.RLock()
+        self.poll_interval = poll_interval
+        self.versions = WorkflowVersions()
+        # (工作流名称, 版本号) -> 编译锁，同一版本只编译一次，不同工作流的编译互不阻塞
+        self._compile_locks: Dict[Tuple[str, Optional[int]], threading.Lock] = {}
+        self._compile_locks_guard = threading.Lock()
+        self.memory = checkpointer or checkpointer_from_env()
+        # 挂起在等待网关处的执行
+        self.waits = WaitCoordinator(self._resume_wait, wait_store, resumable=self._resumable, watch=self._watch_jobs)
+        self._volatile_warned = False
+        self.single_flight = SingleFlight()
+        # request_id -> (工作流名称, 版本号)，只保存进行中的执行，结束或挂起后从检查点元数据查找
+        self.runs: Dict[str, Tuple[str, int]] = {}
+        # request_id -> 恢复锁，同一执行的多次恢复依次进行
+        self._resume_locks: Dict[str, threading.Lock] = {}
+        self._resume_locks_guard = threading.Lock()
+        # 纯节点（cacheable=True）的结果缓存
+        self.node_cache = node_cache or InMemoryNodeCache()
+        # 按下游目标共享的熔断器
+        self.circuit_breakers = CircuitBreakerRegistry()
+        # 节点执行追踪与延迟直方图
+        self.tracer = tracer or default_tracer
+
+    @property
+    def registry(self) -> WorkflowRegistry:
+        """
+        工作流配置存储
+
+        延迟到首次使用时创建，服务启动脚本可在导入路由模块之后再设置注册表路径。
+        """
+        if self._registry is None:
+            with self._registry_lock:
+                if self._registry is None:
+                    self._registry = registry_from_env()
+        return self._registry
+
+    @property
+    def watcher(self) -> RegistryWatcher:
+        """注册表变更监听"""
+        if self._watcher is None:
+            with self._registry_lock:
+                if self._watcher is None:
+                    self._watcher = RegistryWatcher(self.registry, self._invalidate, self.poll_interval)
+        return self._watcher
+
+    @property
+    def workflows(self) -> Dict[str, Any]:
+        """本进程已编译的各工作流当前版本的图"""
+        return {name: entry.graph for name, entry in self.versions.current().items()}
+
+    @property
+    def workflow_configs(self) -> Dict[str, WorkflowConfig]:
+        """本进程已编译的各工作流当前版本的配置"""
+        return {name: entry.config for name, entry in self.versions.current().items()}
 
     def register_workflow(self, config: WorkflowConfig) -> str:
-        """注册新的工作流"""
-        print(f"Registering workflow: {config.name}")
+        """
+        注册新的工作流，已存在时作为新版本
 
+        先在不持有任何锁的情况下编译（同时校验配置），再写入注册表并切换当前版本指针。
+        进行中的执行继续使用旧版本，旧版本在执行结束后回收。
+        """
+        logger.info("Registering workflow: %s", config.name)
+
+        compiled_workflow = self._compile(config)
+        version = self.registry.put(config)
+        self.versions.install(CompiledVersion(config.name, version, compiled_workflow, config))
+        logger.info("Workflow %s is now at version %s", config.name, version)
+
+        return config.name
+
+    def _acquire(self, workflow_name: str, version: Optional[int] = None) -> CompiledVersion:
+        """
+        获取已编译版本的引用
+
+        先检查注册表变更，已失效的当前版本指针会被撤下；本进程尚未编译的版本从注册表读取配置后编译。
+        调用方用完后需调用 versions.release 释放。
+
+        Args:
+            workflow_name: 工作流名称
+            version: 版本号，None 表示当前版本
+
+        Raises:
+            ValueError: 工作流或版本不存在
+        """
+        self.watcher.poll()
+        entry = self.versions.acquire(workflow_name, version)
+        if entry is not None:
+            return entry
+
+        with self._compile_lock_for(workflow_name, version):
+            entry = self.versions.acquire(workflow_name, version)
+            if entry is not None:
+                return entry
+            stored = self.registry.get(workflow_name, version)
+            if stored is None:
+                if version is not None:
+                    raise ValueError(f"Workflow version not found: {workflow_name}@{version}")
+                raise ValueError(f"Workflow not found: {workflow_name}")
+            config, stored_version = stored
+            logger.info("Compiling workflow %s at version %s", workflow_name, stored_version)
+            entry = CompiledVersion(workflow_name, stored_version, self._compile(config), config)
+            return self.versions.install(entry, make_current=version is None, acquire=True)
+
+    def _compile_lock_for(self, workflow_name: str, version: Optional[int]) -> threading.Lock:
+        with self._compile_locks_guard:
+            return self._compile_locks.setdefault((workflow_name, version), threading.Lock())
+
+    @contextmanager
+    def _use(self, workflow_name: str, version: Optional[int] = None):
+        """在 with 块内持有一个已编译版本，保证执行期间该版本不被回收"""
+        entry = self._acquire(workflow_name, version)
+        try:
+            yield entry
+        finally:
+            self.versions.release(entry)
+
+    def warm_up(self, limit: int = 10, background: bool = True) -> Optional[threading.Thread]:
+        """
+        预编译近期最常用的工作流
+
+        按注册表记录的使用热度取前 limit 个工作流编译，其余工作流仍在首次执行时编译。
+        单个工作流编译失败只记录日志，不影响其他工作流。
+
+        Args:
+            limit: 预编译的工作流数量
+            background: 是否在后台线程中编译，服务启动时不阻塞请求处理
+
+        Returns:
+            后台编译线程；background 为 False 时同步编译并返回 None
+        """
+        def compile_hot():
+            names = self.registry.hot_workflows(limit)
+            start_time = time.perf_counter()
+            for name in names:
+                try:
+                    self.versions.release(self._acquire(name))
+                except Exception as e:
+                    logger.warning("Failed to warm up workflow %s: %s", name, e)
+            logger.info("Warmed up %d workflow(s) in %.3fs: %s", len(names), time.perf_counter() - start_time, names)
+
+        if not background:
+            compile_hot()
+            return None
+        thread = threading.Thread(target=compile_hot, name="workflow-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def _invalidate(self, changed: Dict[str, Any]):
+        """注册表变更回调：撤下已过期的当前版本指针，进行中的执行不受影响"""
+        dropped = False
+        for name, revision in changed.items():
+            dropped = self.versions.retire(name, revision) or dropped
+        if dropped:
+            # 工作流定义变化后，旧的缓存结果不再有效
+            self.single_flight.clear()
+
+    def _compile(self, config: WorkflowConfig):
+        """按配置构建并编译状态图"""
         # 创建状态图
         workflow = StateGraph(dict)
 
@@ -27,7 +210,7 @@ class WorkflowManager:
         for node_name in config.nodes:
             if node_name in NODE_MAPPING:
                 # 普通任务节点
-                workflow.add_node(node_name, NODE_MAPPING[node_name])
+                workflow.add_node(node_name, self._build_node(config, node_name))
             elif 'gateway' in node_name:
                 # 网关节点 - 简单传递状态
                 workflow.add_node(node_name, lambda state: state)
@@ -128,23 +311,84 @@ class WorkflowManager:
             workflow.set_finish_point(end_node)
 
         # 编译工作流
-        compiled_workflow = workflow.compile(checkpointer=self.memory)
+        return workflow.compile(checkpointer=self.memory)
+
+    def _build_node(self, config: WorkflowConfig, node_name: str):
+        """
+        构建图中实际执行的节点函数
+
+        1. 执行策略：register_node 元数据或 node_configs 中的 policy 声明重试、超时与熔断，
+           node_configs 中的声明覆盖元数据；
+        2. 结果缓存：节点通过元数据声明 cacheable=True 与 cache_key 后，结果会被缓存，
+           node_configs 中的 cacheable 可覆盖元数据声明。缓存在策略之外，命中时不再触发重试；
+        3. 追踪：最外层记录节点在工作流中的实际耗时（含重试与缓存命中）。
+        """
+        node_fn = NODE_MAPPING[node_name]
+        metadata = node_registry.get(node_name, {}).get("metadata")
+        node_config = config.node_configs.get(node_name, {})
+
+        policy = resolve_policy(getattr(metadata, "policy", None), node_config.get("policy"))
+        if policy is not None:
+            node_fn = apply_policy(
+                node_name,
+                node_fn,
+                policy,
+                self.circuit_breakers,
+                circuit_target=getattr(metadata, "circuit_target", None),
+                policy_override=getattr(metadata, "policy_override", None)
+            )
+
+        cacheable = node_config.get("cacheable", getattr(metadata, "cacheable", False))
+        if cacheable:
+            node_fn = memoize_node(
+                node_name,
+                node_fn,
+                self.node_cache,
+                cache_key=getattr(metadata, "cache_key", None),
+                version=getattr(metadata, "version", "1.0.0")
+            )
 
-        # 存储工作流
-        self.workflows[config.name] = compiled_workflow
-        self.workflow_configs[config.name] = config
+        return self.tracer.wrap(config.name, node_name, node_fn)
 
-        return config.name
+    def _record_usage(self, workflow_name: str):
+        """记录工作流使用热度，失败不影响执行"""
+        try:
+            self.registry.record_usage(workflow_name)
+        except Exception as e:
+            logger.warning("Failed to record usage of workflow %s: %s", workflow_name, e)
 
     def execute_workflow(self, request: LakeIngestionRequest) -> Dict[str, Any]:
-        """执行工作流"""
-        print(f"Executing workflow: {request.workflow_name}")
-
-        if request.workflow_name not in self.workflows:
-            raise ValueError(f"Workflow not found: {request.workflow_name}")
+        """
+        执行工作流
+
+        相同 workflow_name、版本、source_data、custom_params 的并发请求合并为一次执行，
+        重复请求等待并共享进行中执行的结果；request.dedupe 为 False 时不合并。
+        工作流配置了 result_cache_ttl 时，成功完成（completed）的结果在该时间内直接复用，失败或挂起的执行不缓存。
+        request.workflow_version 指定时执行该版本，否则执行开始时的当前版本，执行期间工作流被更新不影响本次执行。
+        """
+        logger.info("Executing workflow: %s", request.workflow_name)
+
+        with self._use(request.workflow_name, request.workflow_version) as entry:
+            self._record_usage(request.workflow_name)
+
+            if not request.dedupe:
+                return self._run_workflow(request, entry)
+
+            key = request_fingerprint(f"{request.workflow_name}@{entry.version}", request.source_data,
+                                      request.custom_params)
+            result, shared = self.single_flight.do(
+                key,
+                lambda: self._run_workflow(request, entry),
+                cache_ttl=entry.config.result_cache_ttl,
+                cacheable=lambda result: result.get("status") == "completed"
+            )
+        if shared:
+            return {**result, "deduplicated": True}
+        return result
 
-        workflow = self.workflows[request.workflow_name]
-        workflow_config = self.workflow_configs[request.workflow_name]
+    def _run_workflow(self, request: LakeIngestionRequest, entry: CompiledVersion) -> Dict[str, Any]:
+        """实际执行一次工作流"""
+        workflow_config = entry.config
 
         # 生成请求ID
         request_id = str(uuid4())
@@ -164,47 +408,372 @@ class WorkflowManager:
             "custom_params": custom_params
         }
 
+        # 记录请求所属的工作流与版本，供断点续跑使用
+        self.runs[request_id] = (request.workflow_name, entry.version)
+
         # 执行工作流
-        result = workflow.invoke(
-            initial_state,
-            config={"configurable": {"thread_id": request_id}}
-        )
+        return self._invoke(entry, request_id, initial_state, {"configurable": {"thread_id": request_id}})
+
+    def _invoke(self, entry: CompiledVersion, request_id: str, graph_input: Any,
+                graph_config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        调用编译后的图并整理返回结果
+
+        节点抛出异常时不向外抛出，而是返回 failed 状态与最后一个检查点的结果，
+        调用方可凭 request_id 调用 resume_workflow 续跑。
+        节点调用 interrupt 挂起时返回 waiting 状态，waiting_for 为各 interrupt 的值；
+        等待部署任务结束的挂起登记到任务状态跟踪器，任务结束后自动恢复。
+        """
+        workflow, workflow_name = entry.graph, entry.name
+        # 检查点元数据记录工作流与版本，重启后或其他 worker 上仍可找到执行所属的版本
+        graph_config = {**graph_config, "metadata": {**graph_config.get("metadata", {}),
+                                                     "workflow_name": workflow_name,
+                                                     "workflow_version": entry.version}}
+        errors = []
+        interrupts = []
+        try:
+            with bind_request_id(request_id):
+                result = workflow.invoke(graph_input, config=graph_config)
+            interrupts = result.pop("__interrupt__", None) or []
+            status = result.get("status", "completed")
+            if interrupts:
+                status = "waiting"
+            elif status == "running":
+                # 图已执行结束，节点透传的初始 running 状态即为完成
+                status = "completed"
+        except Exception as e:
+            logger.exception("Workflow %s failed for request %s: %s", workflow_name, request_id, e)
+            result = workflow.get_state({"configurable": {"thread_id": request_id}}).values or {}
+            status = "failed"
+            errors.append(str(e))
+
+        results = result.get("results", {})
 
         # 返回结果
+        response = {
+            "request_id": request_id,
+            "status": status,
+            "results": results,
+            "errors": result.get("errors", []) + errors,
+            "cache_hits": [
+                node_name for node_name, node_result in results.items()
+                if isinstance(node_result, dict) and node_result.get("cache_hit")
+            ],
+            "workflow_name": workflow_name,
+            "workflow_version": entry.version
+        }
+        # 挂起的执行不留在进程内，恢复时从检查点元数据与等待记录查找
+        self.runs.pop(request_id, None)
+        if interrupts:
+            response["waiting_for"] = [item.value for item in interrupts]
+            self._suspend(entry, request_id, interrupts)
+        return response
+
+    def _suspend(self, entry: CompiledVersion, request_id: str, interrupts: List[Any]):
+        """
+        登记挂起：审批、事件、定时与等待部署任务结束的挂起记录到等待存储，后者同时登记到任务状态跟踪器；
+        其他挂起由调用方通过 resume_waiting 恢复
+        """
+        for item in interrupts:
+            value = item.value
+            if not isinstance(value, dict):
+                continue
+            wait_type = value.get("type")
+            if wait_type in WAIT_TYPES or (wait_type == JOB_STATUS_WAIT and value.get("deploy_url")):
+                if not self._volatile_warned and not durable_checkpointer(self.memory):
+                    self._volatile_warned = True
+                    logger.warning("Parking runs with an in-memory checkpointer: parked runs stay in memory and "
+                                   "cannot be resumed after a restart, set DATALAKE_CHECKPOINT_DB "
+                                   "(requires datalake-solo[checkpoint])")
+                self.waits.park(request_id, entry.name, entry.version, item.id, value)
+
+    def _watch_jobs(self, state: WaitState):
+        """把 job_status 等待登记到任务状态跟踪器，任务全部结束时结束等待"""
+        jobids = state.wait_condition.get("jobids", [])
+        get_job_tracker(state.wait_condition["deploy_url"]).watch(
+            jobids, lambda statuses, wait_id=state.wait_id: self._resume_from_tracker(wait_id, statuses)
+        )
+        logger.info("Request %s suspended waiting for %d jobs", state.request_id, len(jobids))
+
+    def _resume_from_tracker(self, wait_id: str, statuses: Dict[str, Any]):
+        try:
+            self.waits.complete(wait_id, statuses)
+        except Exception:
+            logger.exception("Failed to resume wait %s", wait_id)
+
+    def recover(self):
+        """
+        服务启动时恢复挂起的执行：重新登记定时器与任务状态跟踪
+
+        检查点不持久化时挂起的执行无法在重启后恢复，记录警告。
+        """
+        if not durable_checkpointer(self.memory):
+            logger.warning("Checkpoints are kept in memory: runs parked at wait gateways are lost on restart, "
+                           "set DATALAKE_CHECKPOINT_DB for durable checkpoints (requires datalake-solo[checkpoint])")
+        self.waits.recover()
+
+    def resume_waiting(self, request_id: str, value: Any, interrupt_id: str = None) -> Dict[str, Any]:
+        """
+        恢复挂起的工作流
+
+        挂起的节点从头重新执行，其中的 interrupt 返回 value。
+
+        Args:
+            request_id: 挂起的执行的请求ID
+            value: interrupt 的返回值
+            interrupt_id: 同时有多个挂起时指定恢复哪一个
+
+        Returns:
+            执行结果，再次挂起时 status 仍为 waiting
+        """
+        workflow_name, version = self._run_version(request_id)
+        return self._resume(request_id, workflow_name, version, value, interrupt_id)
+
+    def _resume_wait(self, state: WaitState, value: Dict[str, Any]) -> Dict[str, Any]:
+        """结束一条等待记录后恢复执行，使用记录中的工作流版本，进程重启后同样可以恢复"""
+        return self._resume(state.request_id, state.workflow_name, state.workflow_version, value, state.interrupt_id)
+
+    def _resumable(self, state: WaitState) -> bool:
+        """等待记录对应的执行在本进程的检查点中是否仍挂起"""
+        try:
+            with self._use(state.workflow_name, state.workflow_version) as entry:
+                snapshot = entry.graph.get_state({"configurable": {"thread_id": state.request_id}})
+        except ValueError:
+            return False
+        return any(item.id == state.interrupt_id for item in snapshot.interrupts)
+
+    def _resume(self, request_id: str, workflow_name: str, version: Optional[int], value: Any,
+                interrupt_id: Optional[str]) -> Dict[str, Any]:
+        with self._resume_locks_guard:
+            lock = self._resume_locks.setdefault(request_id, threading.Lock())
+        with lock, self._use(workflow_name, version) as entry:
+            thread_config = {"configurable": {"thread_id": request_id}}
+            if not entry.graph.get_state(thread_config).interrupts:
+                raise ValueError(f"Request is not waiting: {request_id}")
+            logger.info("Resuming suspended request: %s", request_id)
+            self.runs.setdefault(request_id, (workflow_name, entry.version))
+            resume = {interrupt_id: value} if interrupt_id else value
+            response = self._invoke(entry, request_id, Command(resume=resume), thread_config)
+        if response["status"] != "waiting":
+            with self._resume_locks_guard:
+                self._resume_locks.pop(request_id, None)
+        return response
+
+    def approve(self, request_id: str, approved: bool = True, approver: str = "", comment: str = "") -> Dict[str, Any]:
+        """审批挂起在 manual_approval 等待网关的执行，返回恢复后的执行结果"""
+        return self.waits.approve(request_id, approved, approver, comment)
+
+    def signal(self, event: str, payload: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """发送外部事件，恢复所有等待该事件的执行"""
+        return self.waits.signal(event, payload)
+
+    def cancel_wait(self, request_id: str) -> List[Dict[str, Any]]:
+        """取消执行的等待，等待网关以 cancelled 结束"""
+        return self.waits.cancel(request_id)
+
+    def _run_version(self, request_id: str) -> Tuple[str, Optional[int]]:
+        """执行所属的工作流与版本；本进程没有记录时（如重启后）从检查点元数据或等待记录中查找"""
+        run = self.runs.get(request_id)
+        if run is not None:
+            return run
+        checkpoint = self.memory.get_tuple({"configurable": {"thread_id": request_id}})
+        metadata = (checkpoint.metadata or {}) if checkpoint is not None else {}
+        if metadata.get("workflow_name"):
+            return metadata["workflow_name"], metadata.get("workflow_version")
+        states = self.waits.store.find(request_id=request_id, status=None)
+        if not states:
+            raise ValueError(f"Run not found: {request_id}")
+        return states[0].workflow_name, states[0].workflow_version
+
+    def get_run(self, request_id: str) -> Dict[str, Any]:
+        """
+        按检查点查询执行状态
+
+        挂起中的执行 status 为 waiting，waiting_for 为各挂起等待的条件。
+        """
+        workflow_name, version = self._run_version(request_id)
+        with self._use(workflow_name, version) as entry:
+            snapshot = entry.graph.get_state({"configurable": {"thread_id": request_id}})
+        values = snapshot.values or {}
+        status = values.get("status", "completed")
+        if snapshot.interrupts:
+            status = "waiting"
+        elif snapshot.next:
+            status = "running"
+        elif status == "running":
+            status = "completed"
+        response = {
+            "request_id": request_id,
+            "status": status,
+            "results": values.get("results", {}),
+            "errors": values.get("errors", []),
+            "workflow_name": workflow_name,
+            "workflow_version": entry.version
+        }
+        if snapshot.interrupts:
+            response["waiting_for"] = [item.value for item in snapshot.interrupts]
+        return response
+
+    def close(self):
+        """停止等待定时器"""
+        self.waits.close()
+
+    def resume_workflow(self, request_id: str, from_node: str = None) -> Dict[str, Any]:
+        """
+        从检查点续跑工作流
+
+        恢复 from_node 执行前的最后一个检查点，只重新执行 from_node 及其下游节点。
+        未指定 from_node 时，取最早失败的节点（结果 status 为 failed，或抛出异常中断的节点）。
+        续跑使用原执行的工作流版本。
+
+        Args:
+            request_id: 原执行的请求ID
+            from_node: 续跑起始节点
+
+        Returns:
+            执行结果，request_id 与原执行相同
+        """
+        logger.info("Resuming request: %s", request_id)
+
+        workflow_name, version = self._run_version(request_id)
+
+        with self._use(workflow_name, version) as entry:
+            history = self._checkpoint_chain(entry.graph, {"configurable": {"thread_id": request_id}})
+
+            if from_node is None:
+                from_node = self._find_failed_node(history)
+                if from_node is None:
+                    raise ValueError(f"No failed node to resume for request: {request_id}")
+
+            # 检查点按时间倒序，取 from_node 最近一次执行前的检查点
+            checkpoint = next((snapshot for snapshot in history if from_node in snapshot.next), None)
+            if checkpoint is None:
+                raise ValueError(f"No checkpoint before node {from_node} for request: {request_id}")
+
+            # 以 None 为输入从该检查点继续执行，检查点之前的节点不会重新执行
+            response = self._invoke(entry, request_id, None, checkpoint.config)
+        response["resumed_from"] = from_node
+        return response
+
+    @staticmethod
+    def _checkpoint_chain(workflow, thread_config: Dict[str, Any]) -> List[Any]:
+        """
+        沿 parent_config 回溯当前分支的检查点（按时间倒序）
+
+        续跑会在同一 thread 上分叉出新分支，get_state_history 会混入旧分支的检查点，因此按父链回溯。
+        """
+        chain = []
+        snapshot = workflow.get_state(thread_config)
+        while snapshot is not None and snapshot.config:
+            chain.append(snapshot)
+            if not snapshot.parent_config:
+                break
+            snapshot = workflow.get_state(snapshot.parent_config)
+        return chain
+
+    @staticmethod
+    def _find_failed_node(history: List[Any]) -> Any:
+        """从检查点历史（按时间倒序）中找到最早失败的节点"""
+        # 最新检查点仍有待执行节点，说明执行因异常中断
+        if history and history[0].next:
+            return history[0].next[0]
+
+        for snapshot in reversed(history):
+            results = (snapshot.values or {}).get("results", {})
+            for node_name, node_result in results.items():
+                if isinstance(node_result, dict) and node_result.get("status") == "failed":
+                    return node_name
+        return None
+
+    def execute_pipeline(self, request: LakeIngestionRequest) -> Dict[str, Any]:
+        """
+        以流水线模式执行多表的 sql_generate → sql_execute
+
+        source_data.tables 为表列表，每个元素即该表的 source_data；
+        并发度与队列容量取自 node_configs.pipeline。
+        """
+        logger.info("Executing pipeline for workflow: %s", request.workflow_name)
+
+        with self._use(request.workflow_name, request.workflow_version) as entry:
+            workflow_config = entry.config
+        self._record_usage(request.workflow_name)
+        for node_name in ("sql_generate", "sql_execute"):
+            if node_name not in workflow_config.nodes:
+                raise ValueError(f"Workflow {request.workflow_name} has no {node_name} node")
+
+        tables = request.source_data.get("tables", [])
+        pipeline_config = workflow_config.node_configs.get("pipeline", {})
+        pipeline = DDLPipeline(
+            generate_fn=self.tracer.wrap(workflow_config.name, "sql_generate", NODE_MAPPING["sql_generate"]),
+            execute_fn=self.tracer.wrap(workflow_config.name, "sql_execute", NODE_MAPPING["sql_execute"]),
+            generate_concurrency=pipeline_config.get("generate_concurrency", 1),
+            execute_concurrency=pipeline_config.get("execute_concurrency", 1),
+            queue_size=pipeline_config.get("queue_size", 4)
+        )
+
+        request_id = str(uuid4())
+        states = build_table_states(request_id, workflow_config, tables, request.custom_params)
+        start_time = time.perf_counter()
+        outputs = pipeline.run(states)
+        summary = summarize_pipeline(outputs, time.perf_counter() - start_time)
+
         return {
             "request_id": request_id,
-            "status": result.get("status", "completed"),
-            "results": result.get("results", {}),
-            "errors": result.get("errors", []),
+            "status": "completed" if summary["failed"] == 0 else "failed",
+            "results": [output.get("results", {}) for output in outputs],
+            "summary": summary,
             "workflow_name": request.workflow_name
         }
 
-    def get_workflow_config(self, workflow_name: str) -> WorkflowConfig:
-        """获取工作流配置"""
-        if workflow_name not in self.workflow_configs:
+    def get_workflow_config(self, workflow_name: str, version: int = None) -> WorkflowConfig:
+        """获取工作流配置，指定 version 时返回该历史版本"""
+        stored = self.registry.get(workflow_name, version)
+        if stored is None:
+            if version is not None:
+                raise ValueError(f"Workflow version not found: {workflow_name}@{version}")
+            raise ValueError(f"Workflow not found: {workflow_name}")
+        return stored[0]
+
+    def get_run_config(self, request_id: str) -> WorkflowConfig:
+        """
+        获取执行所用版本的工作流配置
+
+        Raises:
+            ValueError: 执行或工作流版本不存在
+        """
+        workflow_name, version = self._run_version(request_id)
+        return self.get_workflow_config(workflow_name, version)
+
+    def list_workflow_versions(self, workflow_name: str) -> List[int]:
+        """列出工作流的全部版本号"""
+        versions = self.registry.versions(workflow_name)
+        if not versions:
             raise ValueError(f"Workflow not found: {workflow_name}")
-        return self.workflow_configs[workflow_name]
+        return versions
 
     def list_workflows(self) -> List[Dict[str, Any]]:
         """列出所有注册的工作流"""
         return [
             {
-                "name": name,
+                "name": config.name,
                 "description": config.description,
                 "nodes_count": len(config.nodes),
                 "edges_count": len(config.edges)
             }
-            for name, config in self.workflow_configs.items()
+            for config in self.registry.list()
         ]
 
     def update_workflow(self, config: WorkflowConfig) -> str:
-        """更新工作流"""
-        return self.register_workflow(config)
+        """更新工作流：编译新版本后原子切换，进行中的执行在旧版本上完成"""
+        workflow_name = self.register_workflow(config)
+        # 工作流定义变化后，旧的缓存结果不再有效
+        self.single_flight.clear()
+        return workflow_name
 
     def delete_workflow(self, workflow_name: str) -> bool:
-        """删除工作流"""
-        if workflow_name in self.workflows:
-            del self.workflows[workflow_name]
-            del self.workflow_configs[workflow_name]
+        """删除工作流，进行中的执行在原版本上完成"""
+        if self.registry.delete(workflow_name):
+            self.single_flight.clear()
+            self.versions.retire(workflow_name)
             return True
-        return False
\ No newline at end of file
+        return False
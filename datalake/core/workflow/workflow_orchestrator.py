@@ -4,14 +4,22 @@ import ast
 from typing import Dict, Any, List, Optional
 from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.memory import MemorySaver
-from datalake.core.nodes.db_type_query import db_type_query_node
-from datalake.core.nodes.table_field_query import table_field_query_node
-from datalake.core.nodes.sql_generate import sql_generate_node
-from datalake.core.nodes.sql_execute import sql_execute_node
-from datalake.core.nodes.page_submit import page_submit_node
-from datalake.core.nodes.table_check import table_check_node
-from datalake.core.nodes.data_processing import data_processing_node
-from datalake.core.nodes.example_node import example_node
+from datalake.core.nodes import NODE_MAPPING
+from datalake.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# 流程图JSON支持的节点类型
+SUPPORTED_NODE_TYPES = (
+    "db_type_query",
+    "table_field_query",
+    "sql_generate",
+    "sql_execute",
+    "page_submit",
+    "table_check",
+    "data_processing",
+    "example"
+)
 
 # 定义工作流状态类型
 class WorkflowState(Dict[str, Any]):
@@ -39,25 +47,13 @@ def create_workflow_from_json(workflow_json: str, checkpoint_saver: Optional[Mem
     # 创建状态图
     graph = StateGraph(WorkflowState)
     
-    # 节点注册字典，用于存储节点类型和对应处理函数的映射
-    node_registry = {
-        "db_type_query": db_type_query_node,
-        "table_field_query": table_field_query_node,
-        "sql_generate": sql_generate_node,
-        "sql_execute": sql_execute_node,
-        "page_submit": page_submit_node,
-        "table_check": table_check_node,
-        "data_processing": data_processing_node,
-        "example": example_node
-    }
-    
-    # 添加节点到图中
+    # 添加节点到图中，节点函数从 NODE_MAPPING 按需导入
     for node in nodes:
         node_id = node.get("id")
         node_type = node.get("type")
         
-        if node_type in node_registry:
-            node_func = node_registry[node_type]
+        if node_type in SUPPORTED_NODE_TYPES:
+            node_func = NODE_MAPPING[node_type]
             graph.add_node(node_id, node_func)
         else:
             raise ValueError(f"不支持的节点类型: {node_type}")
@@ -83,7 +79,7 @@ def create_workflow_from_json(workflow_json: str, checkpoint_saver: Optional[Mem
                     local_vars = {**state}
                     return "next" if eval(condition, {}, local_vars) else "end"
                 except Exception as e:
-                    print(f"条件执行失败: {e}")
+                    logger.warning("条件执行失败: %s", e)
                     return "next"
             
             # 添加条件路由
@@ -184,7 +180,7 @@ def process_complex_params(params: Dict[str, Any], state: Dict[str, Any]) -> Dic
                     # 获取转换结果
                     processed_params[param_name] = local_vars.get("result")
                 except Exception as e:
-                    print(f"执行转换脚本失败: {e}")
+                    logger.warning("执行转换脚本失败: %s", e)
                     processed_params[param_name] = None
             else:
                 processed_params[param_name] = None
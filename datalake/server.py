@@ -2,12 +2,39 @@
 # 终不似、少年游。
 # Copyright (c) VernonSong. All rights reserved.
 # ======================================================================================================================
+import argparse
+import os
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from datalake.api.routes import router
+from datalake.api.routes import router, workflow_manager
 from datalake.core.workflow.workflow_manager import WorkflowManager
 from datalake.core.workflow.models import WorkflowConfig
+from datalake.core.workflow.registry import REGISTRY_ENV, DEFAULT_REGISTRY_PATH
+from datalake.services.deploy_client import close_deploy_clients
+from datalake.services.job_tracker import close_job_trackers
+
+# 启动时预编译的最常用工作流数量，0 表示不预编译
+WARM_WORKFLOWS_ENV = "DATALAKE_WARM_WORKFLOWS"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    服务生命周期：启动时在后台预编译最常用的工作流并恢复持久化的等待定时器，
+    退出时写入缓冲的使用记录，停止等待定时器与任务状态跟踪并关闭部署连接池
+    """
+    limit = int(os.getenv(WARM_WORKFLOWS_ENV, "10"))
+    if limit > 0:
+        workflow_manager.warm_up(limit)
+    workflow_manager.recover()
+    yield
+    workflow_manager.registry.close()
+    workflow_manager.close()
+    close_job_trackers()
+    close_deploy_clients()
 
 
 class DataLakeServer:
@@ -24,7 +51,8 @@ class DataLakeServer:
             description="数据湖服务API",
             version="1.0.0",
             docs_url="/docs",
-            redoc_url="/redoc"
+            redoc_url="/redoc",
+            lifespan=lifespan
         )
         
         # 配置CORS
@@ -52,21 +80,30 @@ class DataLakeServer:
         self.app.include_router(router, prefix="/api")
 
     
-    def run(self, host="0.0.0.0", port=8000, reload=False):
+    def run(self, host="0.0.0.0", port=8000, reload=False, workers=1, registry_path=None):
         """
         启动服务
         
         Args:
             host: 服务主机地址
             port: 服务端口
-            reload: 是否启用热重载
+            reload: 是否启用热重载（与多 worker 互斥）
+            workers: worker 进程数
+            registry_path: 工作流注册表（SQLite）路径；未设置 DATALAKE_WORKFLOW_REGISTRY 时
+                默认使用 ~/.datalake/workflows.db，服务重启后已注册的工作流仍然存在
         """
+        if registry_path:
+            os.environ[REGISTRY_ENV] = registry_path
+        elif not os.getenv(REGISTRY_ENV):
+            # worker 进程继承环境变量，从而共享同一个注册表
+            os.environ[REGISTRY_ENV] = DEFAULT_REGISTRY_PATH
+
         uvicorn.run(
             "datalake.server:app",
             host=host,
             port=port,
-            reload=reload,
-            workers=1
+            reload=reload and workers == 1,
+            workers=workers
         )
 
 
@@ -79,4 +116,12 @@ app = server.app
 
 if __name__ == "__main__":
     # 直接运行时启动服务
-    server.run(host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="DataLake API server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--registry", help="workflow registry (SQLite) path")
+    parser.add_argument("--no-reload", action="store_true")
+    args = parser.parse_args()
+    server.run(host=args.host, port=args.port, reload=not args.no_reload, workers=args.workers,
+               registry_path=args.registry)
\ No newline at end of file
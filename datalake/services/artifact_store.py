@@ -0,0 +1,494 @@
+# 欲买桂花同载酒，
+# 终不似、少年游。
+# Copyright (c) VernonSong. All rights reserved.
+# ======================================================================================================================
+"""
+内容寻址的制品存储
+
+制品内容按未压缩内容的 SHA-256 寻址，压缩后保存为 blobs/{摘要前两位}/{摘要}{.zst|.gz}，
+相同的 DDL、元数据无论来自哪个任务、哪次执行都只保存一份。写入时边读边计算摘要边压缩，不把整个制品放入内存。
+
+每次执行有一个清单 manifests/{run_id}.json，列出该次执行的制品：
+
+    {"run_id", "created_time", "artifacts": [{"name", "type", "media_type", "digest", "size", "stored_size",
+                                              "codec", "materialized", "recipe"}]}
+
+文本制品（DDL、执行日志）写入清单时即压缩保存为 blob，清单中只保留摘要，相同内容跨执行只保存一份。
+由对象渲染的制品（元数据 JSON）默认延迟物化：artifact_generate 只把渲染所需的对象（recipe）写入清单，
+第一次通过 materialize 读取时才渲染、计算摘要、压缩并写入对象存储，之后清单中只保留摘要。
+
+对象存储可以是本地目录（LocalObjectStore），也可以是 S3 兼容的存储（S3ObjectStore，需要 boto3）。
+DATALAKE_ARTIFACT_STORE 为目录路径或 s3://bucket/prefix，未设置时使用 ~/.datalake/artifacts。
+zstd 压缩需要 zstandard，未安装时默认使用 gzip。
+"""
+import datetime
+import gzip
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import zlib
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Union
+
+from datalake.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# 制品存储位置：目录路径或 s3://bucket/prefix
+ARTIFACT_STORE_ENV = "DATALAKE_ARTIFACT_STORE"
+
+# 流式读写的块大小
+CHUNK_SIZE = 1 << 20
+# 压缩结果超过该大小时才落盘
+SPOOL_SIZE = 8 << 20
+
+
+def default_artifact_root() -> str:
+    return os.path.join(os.path.expanduser("~"), ".datalake", "artifacts")
+
+
+class ObjectStore:
+    """对象存储接口，语义与 S3 一致：按键整体写入、读取，写入是原子的"""
+
+    def put(self, key: str, fileobj: BinaryIO):
+        """从文件对象写入对象"""
+        raise NotImplementedError("Subclasses must implement the put method")
+
+    def open(self, key: str) -> BinaryIO:
+        """以流的形式读取对象"""
+        raise NotImplementedError("Subclasses must implement the open method")
+
+    def exists(self, key: str) -> bool:
+        """对象是否存在"""
+        raise NotImplementedError("Subclasses must implement the exists method")
+
+    def list(self, prefix: str = "") -> Iterator[str]:
+        """列出指定前缀下的键"""
+        raise NotImplementedError("Subclasses must implement the list method")
+
+    def delete(self, key: str) -> bool:
+        """删除对象"""
+        raise NotImplementedError("Subclasses must implement the delete method")
+
+    def uri(self, key: str) -> str:
+        """对象的访问地址"""
+        raise NotImplementedError("Subclasses must implement the uri method")
+
+    def put_bytes(self, key: str, data: bytes):
+        self.put(key, io.BytesIO(data))
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        """读取整个对象，不存在时返回 None"""
+        if not self.exists(key):
+            return None
+        with self.open(key) as stream:
+            return stream.read()
+
+
+class LocalObjectStore(ObjectStore):
+    """本地目录对象存储，先写临时文件再重命名，读者不会看到写了一半的对象"""
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid object key: {key}")
+        return path
+
+    def put(self, key: str, fileobj: BinaryIO):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(descriptor, "wb") as output:
+                while True:
+                    chunk = fileobj.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    output.write(chunk)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self._path(key), "rb")
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def list(self, prefix: str = "") -> Iterator[str]:
+        for directory, _, files in os.walk(self.root):
+            for file_name in files:
+                if file_name.startswith(".tmp-"):
+                    continue
+                key = os.path.relpath(os.path.join(directory, file_name), self.root).replace(os.sep, "/")
+                if key.startswith(prefix):
+                    yield key
+
+    def delete(self, key: str) -> bool:
+        try:
+            os.unlink(self._path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def uri(self, key: str) -> str:
+        return f"file://{self._path(key)}"
+
+
+class S3ObjectStore(ObjectStore):
+    """S3 兼容的对象存储，client 为 boto3 的 S3 客户端（或实现相同方法的对象）"""
+
+    def __init__(self, bucket: str, prefix: str = "", client: Any = None, **client_kwargs):
+        """
+        初始化存储
+
+        Args:
+            bucket: 存储桶
+            prefix: 键前缀
+            client: S3 客户端，未传入时用 boto3 创建
+            **client_kwargs: 创建客户端的参数，如 endpoint_url
+        """
+        if client is None:
+            try:
+                import boto3
+            except ImportError as e:
+                raise ImportError("boto3 is required for S3 artifact storage: pip install boto3") from e
+            client = boto3.client("s3", **client_kwargs)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def put(self, key: str, fileobj: BinaryIO):
+        # upload_fileobj 对大对象自动分片上传
+        self.client.upload_fileobj(fileobj, self.bucket, self._key(key))
+
+    def open(self, key: str) -> BinaryIO:
+        return self.client.get_object(Bucket=self.bucket, Key=self._key(key))["Body"]
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except Exception as e:
+            if getattr(e, "response", {}).get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def list(self, prefix: str = "") -> Iterator[str]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        strip = len(self.prefix) + 1 if self.prefix else 0
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix)):
+            for item in page.get("Contents", []):
+                yield item["Key"][strip:]
+
+    def delete(self, key: str) -> bool:
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+        return True
+
+    def uri(self, key: str) -> str:
+        return f"s3://{self.bucket}/{self._key(key)}"
+
+
+class _Codec:
+    """压缩格式：流式压缩器与解压读取器"""
+
+    def __init__(self, name: str, suffix: str):
+        self.name = name
+        self.suffix = suffix
+
+    def compressor(self, level: Optional[int]):
+        raise NotImplementedError("Subclasses must implement the compressor method")
+
+    def reader(self, stream: BinaryIO) -> BinaryIO:
+        raise NotImplementedError("Subclasses must implement the reader method")
+
+
+class _Identity:
+    @staticmethod
+    def compress(data: bytes) -> bytes:
+        return data
+
+    @staticmethod
+    def flush() -> bytes:
+        return b""
+
+
+class _NoCodec(_Codec):
+    def compressor(self, level: Optional[int]):
+        return _Identity()
+
+    def reader(self, stream: BinaryIO) -> BinaryIO:
+        return stream
+
+
+class _GzipReader(gzip.GzipFile):
+    """关闭时同时关闭底层流的 gzip 读取器"""
+
+    def __init__(self, stream: BinaryIO):
+        super().__init__(fileobj=stream, mode="rb")
+        self._stream = stream
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._stream.close()
+
+
+class _GzipCodec(_Codec):
+    def compressor(self, level: Optional[int]):
+        # wbits=31 输出 gzip 格式
+        return zlib.compressobj(6 if level is None else level, zlib.DEFLATED, 31)
+
+    def reader(self, stream: BinaryIO) -> BinaryIO:
+        return _GzipReader(stream)
+
+
+class _ZstdCodec(_Codec):
+    def compressor(self, level: Optional[int]):
+        import zstandard
+        return zstandard.ZstdCompressor(level=3 if level is None else level).compressobj()
+
+    def reader(self, stream: BinaryIO) -> BinaryIO:
+        import zstandard
+        return zstandard.ZstdDecompressor().stream_reader(stream, closefd=True)
+
+
+CODECS = {
+    "zstd": _ZstdCodec("zstd", ".zst"),
+    "gzip": _GzipCodec("gzip", ".gz"),
+    "none": _NoCodec("none", "")
+}
+
+
+def _zstd_available() -> bool:
+    try:
+        import zstandard  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def resolve_codec(name: Optional[str] = None) -> _Codec:
+    """
+    获取压缩格式，未指定时优先使用 zstd
+
+    Raises:
+        ValueError: 不支持的压缩格式
+        ImportError: 指定了 zstd 但未安装 zstandard
+    """
+    if name is None:
+        name = "zstd" if _zstd_available() else "gzip"
+    if name not in CODECS:
+        raise ValueError(f"Unsupported codec: {name}")
+    if name == "zstd" and not _zstd_available():
+        raise ImportError("zstandard is required for zstd compression: pip install zstandard")
+    return CODECS[name]
+
+
+def _chunks(content: Union[bytes, str, Iterable[bytes], BinaryIO]) -> Iterator[bytes]:
+    """把各种形式的内容转为字节块"""
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        view = memoryview(content)
+        for start in range(0, len(view), CHUNK_SIZE):
+            yield bytes(view[start:start + CHUNK_SIZE])
+    elif hasattr(content, "read"):
+        while True:
+            chunk = content.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    else:
+        for chunk in content:
+            yield chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+
+
+def render_recipe(recipe: Dict[str, Any]) -> bytes:
+    """
+    按清单中的 recipe 渲染制品内容
+
+    recipe 为 {"text": 字符串} 或 {"json": 对象}，JSON 按键排序输出，相同对象的内容与摘要一致。
+    """
+    if "text" in recipe:
+        return recipe["text"].encode("utf-8")
+    if "json" in recipe:
+        return json.dumps(recipe["json"], ensure_ascii=False, sort_keys=True, indent=2, default=str).encode("utf-8")
+    raise ValueError(f"Unsupported artifact recipe: {sorted(recipe)}")
+
+
+class ArtifactStore:
+    """内容寻址的制品存储与执行清单"""
+
+    def __init__(self, objects: ObjectStore, codec: Optional[str] = None, level: Optional[int] = None):
+        """
+        初始化制品存储
+
+        Args:
+            objects: 对象存储
+            codec: 压缩格式 zstd / gzip / none，默认优先 zstd
+            level: 压缩级别，默认 zstd 3、gzip 6
+        """
+        self.objects = objects
+        self.codec = resolve_codec(codec)
+        self.level = level
+        self._manifest_lock = threading.Lock()
+
+    @staticmethod
+    def blob_key(digest: str, codec: str) -> str:
+        return f"blobs/{digest[:2]}/{digest}{CODECS[codec].suffix}"
+
+    @staticmethod
+    def manifest_key(run_id: str) -> str:
+        return f"manifests/{run_id}.json"
+
+    def put(self, content: Union[bytes, str, Iterable[bytes], BinaryIO]) -> Dict[str, Any]:
+        """
+        写入制品内容
+
+        边计算摘要边压缩到临时缓冲（超过 SPOOL_SIZE 时落盘），摘要已存在时不再写入对象存储。
+
+        Args:
+            content: 字节、字符串、字节块的迭代器或文件对象
+
+        Returns:
+            {"digest", "size", "stored_size", "codec", "deduplicated"}
+        """
+        digest = hashlib.sha256()
+        size = 0
+        compressor = self.codec.compressor(self.level)
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as spool:
+            for chunk in _chunks(content):
+                digest.update(chunk)
+                size += len(chunk)
+                spool.write(compressor.compress(chunk))
+            spool.write(compressor.flush())
+            stored_size = spool.tell()
+            hex_digest = digest.hexdigest()
+            key = self.blob_key(hex_digest, self.codec.name)
+            deduplicated = self.objects.exists(key)
+            if not deduplicated:
+                spool.seek(0)
+                self.objects.put(key, spool)
+        return {"digest": hex_digest, "size": size, "stored_size": stored_size, "codec": self.codec.name,
+                "deduplicated": deduplicated}
+
+    def open(self, digest: str, codec: str) -> BinaryIO:
+        """以流的形式读取解压后的制品内容"""
+        return CODECS[codec].reader(self.objects.open(self.blob_key(digest, codec)))
+
+    def read(self, digest: str, codec: str) -> bytes:
+        with self.open(digest, codec) as stream:
+            return stream.read()
+
+    def iter_content(self, digest: str, codec: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """逐块读取解压后的制品内容，用于流式响应"""
+        with self.open(digest, codec) as stream:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def write_manifest(self, run_id: str, artifacts: List[Dict[str, Any]], eager: Iterable[str] = ()) -> Dict[str, Any]:
+        """
+        写入执行清单
+
+        Args:
+            run_id: 执行ID
+            artifacts: 制品列表，每项为 {"name", "type", "media_type", "recipe"}
+            eager: 立即物化的制品类型；文本制品总是立即物化，其余制品在第一次读取时物化
+
+        Returns:
+            清单
+        """
+        eager = set(eager)
+        entries = []
+        for artifact in artifacts:
+            entry = {**artifact, "digest": None, "size": None, "stored_size": None, "codec": None,
+                     "materialized": False}
+            # 文本若留在清单中，每次执行的清单都是一份未压缩、不去重的副本
+            if artifact["type"] in eager or "text" in artifact["recipe"]:
+                self._materialize_entry(entry)
+            entries.append(entry)
+        manifest = {"run_id": run_id, "created_time": datetime.datetime.now().isoformat(timespec="seconds"),
+                    "artifacts": entries}
+        self._save_manifest(manifest)
+        return manifest
+
+    def _save_manifest(self, manifest: Dict[str, Any]):
+        data = json.dumps(manifest, ensure_ascii=False, default=str).encode("utf-8")
+        self.objects.put_bytes(self.manifest_key(manifest["run_id"]), data)
+
+    def read_manifest(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """读取执行清单，不存在时返回 None"""
+        data = self.objects.get_bytes(self.manifest_key(run_id))
+        return json.loads(data) if data is not None else None
+
+    def _materialize_entry(self, entry: Dict[str, Any]):
+        stored = self.put(render_recipe(entry.pop("recipe")))
+        stored.pop("deduplicated")
+        entry.update(stored, materialized=True)
+
+    def materialize(self, run_id: str, name: str) -> Dict[str, Any]:
+        """
+        物化执行清单中的一个制品并返回清单条目（已物化时直接返回）
+
+        Raises:
+            KeyError: 清单或制品不存在
+        """
+        with self._manifest_lock:
+            manifest = self.read_manifest(run_id)
+            if manifest is None:
+                raise KeyError(f"Manifest not found: {run_id}")
+            entry = next((item for item in manifest["artifacts"] if item["name"] == name), None)
+            if entry is None:
+                raise KeyError(f"Artifact not found: {run_id}/{name}")
+            if not entry["materialized"]:
+                self._materialize_entry(entry)
+                self._save_manifest(manifest)
+                logger.info("Materialized artifact %s/%s (%s)", run_id, name, entry["digest"])
+            return entry
+
+    def manifest_uri(self, run_id: str) -> str:
+        return self.objects.uri(self.manifest_key(run_id))
+
+
+def object_store_for(location: str) -> ObjectStore:
+    """按位置创建对象存储：s3://bucket/prefix 或目录路径"""
+    if location.startswith("s3://"):
+        bucket, _, prefix = location[len("s3://"):].partition("/")
+        return S3ObjectStore(bucket, prefix, endpoint_url=os.getenv("DATALAKE_S3_ENDPOINT") or None)
+    return LocalObjectStore(location)
+
+
+# 位置 -> 共享的制品存储
+_stores: Dict[str, ArtifactStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_artifact_store(location: Optional[str] = None, codec: Optional[str] = None) -> ArtifactStore:
+    """
+    获取（必要时创建）共享的制品存储
+
+    Args:
+        location: 目录路径或 s3://bucket/prefix，默认取 DATALAKE_ARTIFACT_STORE 或 ~/.datalake/artifacts
+        codec: 首次创建时使用的压缩格式
+    """
+    location = location or os.getenv(ARTIFACT_STORE_ENV) or default_artifact_root()
+    with _stores_lock:
+        store = _stores.get(location)
+        if store is None:
+            store = _stores[location] = ArtifactStore(object_store_for(location), codec)
+        return store
@@ -0,0 +1,521 @@
+# 欲买桂花同载酒，
+# 终不似、少年游。
+# Copyright (c) VernonSong. All rights reserved.
+# ======================================================================================================================
+"""
+集成任务部署客户端
+
+上游部署接口：
+- POST {base_url}/tasks：部署单个任务，请求体为 upstream_api_json，返回 {"jobid", "message"}
+- PATCH {base_url}/tasks/{jobid}：以 JSON Merge Patch 更新已部署的任务，返回 {"jobid", "message"}，任务不存在时返回 404
+- POST {base_url}/jobs/status：批量查询任务状态，请求体为 {"jobids": [...]}，返回 {"statuses": {jobid: {"status", "message"}}}
+- POST {base_url}/tasks/batch：批量部署，请求体为 {"tasks": [...]}，返回 {"results": [{"status", "jobid", "message"}]}，
+  与请求中的任务一一对应。上游不支持时（404 / 405 / 501）自动改为逐个部署，并记住该上游不支持批量接口
+
+DeployClient 持有一个长连接池，同一上游的多次部署复用连接，deploy_many 在线程池中并发逐个部署；
+AsyncDeployClient 供异步调用方使用，以信号量限制同时在途的请求数。
+连接错误、超时、429 与 5xx 视为暂时性失败，按指数退避重试；其他错误直接记为该任务部署失败。
+新建任务的 POST /tasks 与 POST /tasks/batch 不是幂等的：上游可能已部署而响应丢失，重试会重复部署，
+因此只在请求确定未被处理时重试（连接未建立、429、503）。
+每个任务的结果为 {"status": "success" | "failed", "jobid", "deploy_message"}，单个任务失败不影响其他任务。
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+from datalake.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# 上游不支持批量接口时的状态码
+BATCH_UNSUPPORTED = (404, 405, 501)
+# 可重试的状态码
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+# 新建任务可重试的状态码：上游明确未处理请求
+CREATE_RETRYABLE_STATUS = (429, 503)
+# 请求未发出的传输错误，新建任务可以安全重试
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# 每组任务部署完成后的回调，参数为任务下标与对应的结果
+DoneCallback = Callable[[List[int], List[Dict[str, Any]]], None]
+
+
+class DeployError(Exception):
+    """部署请求失败"""
+
+    def __init__(self, message: str, retryable: bool = False, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.status_code = status_code
+
+
+def deploy_result(status: str, jobid: str = "", message: str = "") -> Dict[str, Any]:
+    """单个任务的部署结果"""
+    if not message:
+        message = f"Task deployed successfully, Job ID: {jobid}" if status == "success" else "Task deployment failed"
+    return {"status": status, "jobid": jobid, "deploy_message": message}
+
+
+def _retryable_status(idempotent: bool) -> Tuple[int, ...]:
+    return RETRYABLE_STATUS if idempotent else CREATE_RETRYABLE_STATUS
+
+
+def _transport_error(error: httpx.TransportError, idempotent: bool) -> DeployError:
+    """传输错误；非幂等请求只在请求未发出时可重试"""
+    return DeployError(f"{type(error).__name__}: {error}", retryable=idempotent or isinstance(error, UNSENT_ERRORS))
+
+
+def _parse_response(response: httpx.Response, idempotent: bool = True) -> Dict[str, Any]:
+    """解析单个任务部署的响应"""
+    if response.status_code in _retryable_status(idempotent):
+        raise DeployError(f"Upstream returned {response.status_code}", retryable=True,
+                          status_code=response.status_code)
+    try:
+        body = response.json()
+    except ValueError:
+        body = {}
+    if response.status_code >= 400:
+        detail = body.get("error") or body.get("message") if isinstance(body, dict) else None
+        raise DeployError(f"Upstream returned {response.status_code}: {detail or response.text[:200]}",
+                          status_code=response.status_code)
+    jobid = body.get("jobid") if isinstance(body, dict) else None
+    if not jobid:
+        raise DeployError("Upstream response has no jobid")
+    return deploy_result("success", jobid, body.get("message", ""))
+
+
+def _parse_batch(body: Any, count: int) -> List[Dict[str, Any]]:
+    """解析批量部署的响应"""
+    results = body.get("results") if isinstance(body, dict) else None
+    if not isinstance(results, list) or len(results) != count:
+        raise DeployError(f"Batch response must contain {count} results")
+    parsed = []
+    for item in results:
+        if item.get("status") == "success" and item.get("jobid"):
+            parsed.append(deploy_result("success", item["jobid"], item.get("message", "")))
+        else:
+            parsed.append(deploy_result("failed", "", f"Task deployment failed: {item.get('message') or 'unknown error'}"))
+    return parsed
+
+
+def _failed(error: Exception) -> Dict[str, Any]:
+    return deploy_result("failed", "", f"Task deployment failed: {error}")
+
+
+def _update_failed(jobid: str, error: DeployError) -> Dict[str, Any]:
+    """更新失败的结果，not_found 表示上游已不存在该任务"""
+    result = deploy_result("failed", jobid, f"Task update failed: {error}")
+    if error.status_code == 404:
+        result["not_found"] = True
+    return result
+
+
+class _ClientBase:
+    """同步、异步客户端共用的配置"""
+
+    def __init__(self, base_url: str, timeout: float = 30.0, max_connections: int = 32, batch_size: int = 100,
+                 max_attempts: int = 3, backoff_base: float = 0.2, headers: Optional[Dict[str, str]] = None,
+                 transport: Any = None):
+        """
+        初始化客户端
+
+        Args:
+            base_url: 上游部署接口地址
+            timeout: 单次请求超时（秒）
+            max_connections: 连接池大小，也是并发部署的上限
+            batch_size: 每个批量请求包含的任务数，0 表示不使用批量接口
+            max_attempts: 暂时性失败的最大尝试次数
+            backoff_base: 重试退避基数（秒），第 n 次重试前等待 backoff_base * 2^(n-1)
+            headers: 请求头
+            transport: httpx 传输层，测试时可传入 MockTransport
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_connections = max(1, max_connections)
+        self.batch_size = batch_size
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.headers = headers or {}
+        self.transport = transport
+        # None 表示尚未探测上游是否支持批量接口
+        self.supports_batch: Optional[bool] = None if batch_size > 0 else False
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+
+    def _chunks(self, tasks: Sequence[Dict[str, Any]]) -> List[range]:
+        return [range(start, min(start + self.batch_size, len(tasks))) for start in range(0, len(tasks), self.batch_size)]
+
+    def _delay(self, attempt: int) -> float:
+        return self.backoff_base * (2 ** (attempt - 1))
+
+
+class DeployClient(_ClientBase):
+    """同步部署客户端，线程安全，可在多个工作流线程间共享"""
+
+    def __init__(self, base_url: str, **kwargs):
+        super().__init__(base_url, **kwargs)
+        self._client = httpx.Client(base_url=self.base_url, timeout=self.timeout, headers=self.headers,
+                                    limits=self._limits(), transport=self.transport)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _post(self, path: str, payload: Any, method: str = "POST", idempotent: bool = True) -> httpx.Response:
+        try:
+            return self._client.request(method, path, json=payload)
+        except httpx.TransportError as e:
+            raise _transport_error(e, idempotent) from e
+
+    def _send(self, method: str, path: str, payload: Any) -> Dict[str, Any]:
+        # 只有新建任务的 POST 不是幂等的
+        idempotent = method != "POST"
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                return _parse_response(self._post(path, payload, method, idempotent), idempotent)
+            except DeployError as e:
+                if not e.retryable or attempt == self.max_attempts:
+                    raise
+                logger.debug("%s %s attempt %d failed: %s", method, path, attempt, e)
+                time.sleep(self._delay(attempt))
+
+    def deploy(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        部署单个任务
+
+        Raises:
+            DeployError: 重试后仍失败
+        """
+        return self._send("POST", "/tasks", task)
+
+    def update(self, jobid: str, patch: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        以 JSON Merge Patch 更新已部署的任务
+
+        Raises:
+            DeployError: 重试后仍失败，任务不存在时 status_code 为 404
+        """
+        return self._send("PATCH", f"/tasks/{jobid}", patch)
+
+    def _update_item(self, item: Tuple[str, Dict[str, Any]]) -> Dict[str, Any]:
+        jobid, patch = item
+        try:
+            return self.update(jobid, patch)
+        except DeployError as e:
+            return _update_failed(jobid, e)
+
+    def update_many(self, items: Sequence[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        并发更新多个任务
+
+        Args:
+            items: (jobid, 差异) 列表
+
+        Returns:
+            与 items 顺序一致的结果，上游已不存在的任务带有 not_found
+        """
+        return list(self._pool().map(self._update_item, items))
+
+    def job_statuses(self, jobids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        批量查询任务状态
+
+        Returns:
+            jobid -> {"status": pending | running | succeeded | failed | cancelled, "message"}
+
+        Raises:
+            DeployError: 重试后仍失败或响应格式不正确
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                response = self._post("/jobs/status", {"jobids": list(jobids)})
+                if response.status_code in RETRYABLE_STATUS:
+                    raise DeployError(f"Upstream returned {response.status_code}", retryable=True)
+                if response.status_code >= 400:
+                    raise DeployError(f"Upstream returned {response.status_code}", status_code=response.status_code)
+                statuses = response.json().get("statuses")
+                if not isinstance(statuses, dict):
+                    raise DeployError("Status response has no statuses")
+                return statuses
+            except DeployError as e:
+                if not e.retryable or attempt == self.max_attempts:
+                    raise
+                time.sleep(self._delay(attempt))
+
+    def _deploy_item(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            return self.deploy(task)
+        except DeployError as e:
+            return _failed(e)
+
+    def _deploy_batch(self, tasks: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        """批量部署一组任务；上游不支持批量接口时返回 None"""
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                response = self._post("/tasks/batch", {"tasks": tasks}, idempotent=False)
+                if response.status_code in BATCH_UNSUPPORTED:
+                    return None
+                if response.status_code in CREATE_RETRYABLE_STATUS:
+                    raise DeployError(f"Upstream returned {response.status_code}", retryable=True)
+                response.raise_for_status()
+                return _parse_batch(response.json(), len(tasks))
+            except DeployError as e:
+                if not e.retryable or attempt == self.max_attempts:
+                    raise
+                time.sleep(self._delay(attempt))
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_connections, thread_name_prefix="deploy")
+            return self._executor
+
+    def _submit(self, tasks: Sequence[Dict[str, Any]], chunk: range,
+                on_done: Optional[DoneCallback] = None) -> Optional[List[Dict[str, Any]]]:
+        try:
+            batch = self._deploy_batch([tasks[index] for index in chunk])
+        except (DeployError, httpx.HTTPError, ValueError) as e:
+            logger.warning("Batch deploy of %d tasks failed: %s", len(chunk), e)
+            batch = [_failed(e) for _ in chunk]
+        if batch is not None and on_done is not None:
+            on_done(list(chunk), batch)
+        return batch
+
+    def _deploy_indexed(self, tasks: Sequence[Dict[str, Any]], index: int,
+                        on_done: Optional[DoneCallback] = None) -> Dict[str, Any]:
+        result = self._deploy_item(tasks[index])
+        if on_done is not None:
+            on_done([index], [result])
+        return result
+
+    def deploy_many(self, tasks: Sequence[Dict[str, Any]],
+                    on_done: Optional[DoneCallback] = None) -> List[Dict[str, Any]]:
+        """
+        部署多个任务
+
+        上游支持批量接口时按 batch_size 分组并发提交，否则并发逐个部署，并发数不超过 max_connections。
+        尚未探测上游时先单独提交第一组，确认支持批量接口后再并发提交其余各组。
+
+        Args:
+            tasks: 任务定义
+            on_done: 每组（逐个部署时每个）任务返回后立即调用，调用方可随部署进度记录结果
+
+        Returns:
+            与 tasks 顺序一致的部署结果
+        """
+        tasks = list(tasks)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(tasks)
+        pending = list(range(len(tasks)))
+        if self.supports_batch is not False and tasks:
+            chunks = self._chunks(tasks)
+            batches = [self._submit(tasks, chunks[0], on_done)] if self.supports_batch is None else []
+            if batches and batches[0] is None:
+                logger.info("Upstream %s has no batch endpoint, deploying tasks one by one", self.base_url)
+                self.supports_batch = False
+            else:
+                self.supports_batch = True
+                batches.extend(self._pool().map(lambda chunk: self._submit(tasks, chunk, on_done),
+                                                chunks[len(batches):]))
+                pending = []
+                for chunk, batch in zip(chunks, batches):
+                    if batch is None:
+                        pending.extend(chunk)
+                    else:
+                        for index, result in zip(chunk, batch):
+                            results[index] = result
+        if pending:
+            deployed = self._pool().map(lambda index: self._deploy_indexed(tasks, index, on_done), pending)
+            for index, result in zip(pending, deployed):
+                results[index] = result
+        return results
+
+    def close(self):
+        """关闭连接池与线程池"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        self._client.close()
+
+    def __enter__(self) -> "DeployClient":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class AsyncDeployClient(_ClientBase):
+    """异步部署客户端，同时在途的请求数不超过 max_connections"""
+
+    def __init__(self, base_url: str, **kwargs):
+        super().__init__(base_url, **kwargs)
+        self._client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, headers=self.headers,
+                                         limits=self._limits(), transport=self.transport)
+        self._semaphore = asyncio.Semaphore(self.max_connections)
+
+    async def _post(self, path: str, payload: Any, method: str = "POST", idempotent: bool = True) -> httpx.Response:
+        async with self._semaphore:
+            try:
+                return await self._client.request(method, path, json=payload)
+            except httpx.TransportError as e:
+                raise _transport_error(e, idempotent) from e
+
+    async def _send(self, method: str, path: str, payload: Any) -> Dict[str, Any]:
+        # 只有新建任务的 POST 不是幂等的
+        idempotent = method != "POST"
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                return _parse_response(await self._post(path, payload, method, idempotent), idempotent)
+            except DeployError as e:
+                if not e.retryable or attempt == self.max_attempts:
+                    raise
+                await asyncio.sleep(self._delay(attempt))
+
+    async def deploy(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        部署单个任务
+
+        Raises:
+            DeployError: 重试后仍失败
+        """
+        return await self._send("POST", "/tasks", task)
+
+    async def update(self, jobid: str, patch: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        以 JSON Merge Patch 更新已部署的任务
+
+        Raises:
+            DeployError: 重试后仍失败，任务不存在时 status_code 为 404
+        """
+        return await self._send("PATCH", f"/tasks/{jobid}", patch)
+
+    async def _update_item(self, jobid: str, patch: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            return await self.update(jobid, patch)
+        except DeployError as e:
+            return _update_failed(jobid, e)
+
+    async def update_many(self, items: Sequence[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """并发更新多个任务，行为与 DeployClient.update_many 相同"""
+        return list(await asyncio.gather(*(self._update_item(jobid, patch) for jobid, patch in items)))
+
+    async def _deploy_item(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            return await self.deploy(task)
+        except DeployError as e:
+            return _failed(e)
+
+    async def _deploy_batch(self, tasks: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                response = await self._post("/tasks/batch", {"tasks": tasks}, idempotent=False)
+                if response.status_code in BATCH_UNSUPPORTED:
+                    return None
+                if response.status_code in CREATE_RETRYABLE_STATUS:
+                    raise DeployError(f"Upstream returned {response.status_code}", retryable=True)
+                response.raise_for_status()
+                return _parse_batch(response.json(), len(tasks))
+            except DeployError as e:
+                if not e.retryable or attempt == self.max_attempts:
+                    raise
+                await asyncio.sleep(self._delay(attempt))
+
+    async def _submit(self, tasks: Sequence[Dict[str, Any]], chunk: range,
+                      on_done: Optional[DoneCallback] = None) -> Optional[List[Dict[str, Any]]]:
+        try:
+            batch = await self._deploy_batch([tasks[index] for index in chunk])
+        except (DeployError, httpx.HTTPError, ValueError) as e:
+            logger.warning("Batch deploy of %d tasks failed: %s", len(chunk), e)
+            batch = [_failed(e) for _ in chunk]
+        if batch is not None and on_done is not None:
+            on_done(list(chunk), batch)
+        return batch
+
+    async def _deploy_indexed(self, tasks: Sequence[Dict[str, Any]], index: int,
+                              on_done: Optional[DoneCallback] = None) -> Dict[str, Any]:
+        result = await self._deploy_item(tasks[index])
+        if on_done is not None:
+            on_done([index], [result])
+        return result
+
+    async def deploy_many(self, tasks: Sequence[Dict[str, Any]],
+                          on_done: Optional[DoneCallback] = None) -> List[Dict[str, Any]]:
+        """
+        并发部署多个任务，行为与 DeployClient.deploy_many 相同
+
+        Returns:
+            与 tasks 顺序一致的部署结果
+        """
+        tasks = list(tasks)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(tasks)
+        pending = list(range(len(tasks)))
+        if self.supports_batch is not False and tasks:
+            chunks = self._chunks(tasks)
+            batches = [await self._submit(tasks, chunks[0], on_done)] if self.supports_batch is None else []
+            if batches and batches[0] is None:
+                logger.info("Upstream %s has no batch endpoint, deploying tasks one by one", self.base_url)
+                self.supports_batch = False
+            else:
+                self.supports_batch = True
+                batches.extend(await asyncio.gather(*(self._submit(tasks, chunk, on_done)
+                                                      for chunk in chunks[len(batches):])))
+                pending = []
+                for chunk, batch in zip(chunks, batches):
+                    if batch is None:
+                        pending.extend(chunk)
+                    else:
+                        for index, result in zip(chunk, batch):
+                            results[index] = result
+        if pending:
+            deployed = await asyncio.gather(*(self._deploy_indexed(tasks, index, on_done) for index in pending))
+            for index, result in zip(pending, deployed):
+                results[index] = result
+        return results
+
+    async def aclose(self):
+        """关闭连接池"""
+        await self._client.aclose()
+
+    async def __aenter__(self) -> "AsyncDeployClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+
+# 上游地址 -> 共享的同步客户端
+_clients: Dict[str, DeployClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_deploy_client(base_url: str, **kwargs) -> DeployClient:
+    """
+    获取（必要时创建）指定上游的共享客户端，同一上游的部署复用同一个连接池
+
+    Args:
+        base_url: 上游部署接口地址
+        **kwargs: 首次创建时传给 DeployClient 的参数
+    """
+    with _clients_lock:
+        client = _clients.get(base_url)
+        if client is None:
+            client = _clients[base_url] = DeployClient(base_url, **kwargs)
+        return client
+
+
+def close_deploy_clients():
+    """关闭全部共享客户端"""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+
+
+def deploy_url_from_env() -> Optional[str]:
+    """DATALAKE_DEPLOY_URL 指定的上游部署接口地址"""
+    return os.getenv("DATALAKE_DEPLOY_URL") or None
@@ -0,0 +1,360 @@
+# 欲买桂花同载酒，
+# 终不似、少年游。
+# Copyright (c) VernonSong. All rights reserved.
+# ======================================================================================================================
+"""
+集成任务部署台账
+
+台账按 (上游, 任务名) 记录已部署任务的 jobid、任务定义及其规范化摘要。摘要计算前去掉 create_time、update_time
+等每次生成都会变化的字段，因此重新运行工作流生成的相同任务摘要不变：
+
+- 摘要相同：不调用上游，直接返回已有的 jobid（action 为 skipped）
+- 摘要不同：以 JSON Merge Patch（RFC 7386）的形式只提交变化的部分，PATCH {base_url}/tasks/{jobid}（action 为 updated）；
+  上游已不存在该任务（404）时重新部署
+- 没有记录：完整部署（action 为 created）
+
+DATALAKE_DEPLOY_LEDGER 指定 SQLite 文件路径时台账持久化，多个 worker 进程共享；否则保存在进程内。
+"""
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from datalake.core.workflow.node_cache import canonical_hash
+from datalake.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# 台账文件路径的环境变量
+LEDGER_ENV = "DATALAKE_DEPLOY_LEDGER"
+
+# 不参与摘要计算的字段路径
+VOLATILE_FIELDS: Tuple[Tuple[str, ...], ...] = (
+    ("task_info", "create_time"),
+    ("task_info", "update_time"),
+)
+
+
+def stable_definition(task: Dict[str, Any]) -> Dict[str, Any]:
+    """去掉易变字段后的任务定义"""
+    stable = copy.deepcopy(task)
+    for path in VOLATILE_FIELDS:
+        parent = stable
+        for key in path[:-1]:
+            parent = parent.get(key) if isinstance(parent, dict) else None
+        if isinstance(parent, dict):
+            parent.pop(path[-1], None)
+    return stable
+
+
+def task_hash(task: Dict[str, Any]) -> str:
+    """任务定义的规范化摘要，忽略易变字段"""
+    return canonical_hash(stable_definition(task))
+
+
+def task_identity(task: Dict[str, Any]) -> str:
+    """任务在上游的标识：任务名，缺失时为源表与目标表"""
+    name = (task.get("task_info") or {}).get("name")
+    if name:
+        return name
+    source, target = task.get("source") or {}, task.get("target") or {}
+    return canonical_hash({"source": source, "target": target})
+
+
+def merge_patch(old: Any, new: Any) -> Any:
+    """
+    计算把 old 变为 new 的 JSON Merge Patch（RFC 7386）
+
+    对象逐键比较，删除的键记为 None；其他类型（含列表）不同时整体替换。
+    """
+    if not (isinstance(old, dict) and isinstance(new, dict)):
+        return copy.deepcopy(new)
+    patch = {}
+    for key in old:
+        if key not in new:
+            patch[key] = None
+    for key, value in new.items():
+        if key not in old:
+            patch[key] = copy.deepcopy(value)
+        elif old[key] != value:
+            patch[key] = merge_patch(old[key], value)
+    return patch
+
+
+def apply_merge_patch(target: Any, patch: Any) -> Any:
+    """把 JSON Merge Patch 应用到 target，返回新对象"""
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    result = copy.deepcopy(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = apply_merge_patch(result.get(key), value)
+    return result
+
+
+class DeployLedger:
+    """部署台账接口，条目为 {"jobid", "hash", "definition", "deployed_at"}"""
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """批量读取条目，只返回存在的键"""
+        raise NotImplementedError("Subclasses must implement the get_many method")
+
+    def put_many(self, entries: Dict[str, Dict[str, Any]]):
+        """批量写入条目"""
+        raise NotImplementedError("Subclasses must implement the put_many method")
+
+    def delete(self, key: str) -> bool:
+        """删除条目"""
+        raise NotImplementedError("Subclasses must implement the delete method")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取条目，不存在时返回 None"""
+        return self.get_many([key]).get(key)
+
+    def put(self, key: str, entry: Dict[str, Any]):
+        """写入条目"""
+        self.put_many({key: entry})
+
+
+class InMemoryDeployLedger(DeployLedger):
+    """进程内台账"""
+
+    def __init__(self):
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {key: copy.deepcopy(self._entries[key]) for key in keys if key in self._entries}
+
+    def put_many(self, entries: Dict[str, Dict[str, Any]]):
+        with self._lock:
+            for key, entry in entries.items():
+                self._entries[key] = copy.deepcopy(entry)
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+
+class SQLiteDeployLedger(DeployLedger):
+    """基于SQLite文件的台账，WAL 模式，每个线程使用独立连接"""
+
+    # SQLite 单条语句的参数数量上限
+    _CHUNK = 500
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        """
+        初始化台账
+
+        Args:
+            path: 数据库文件路径，不存在时自动创建
+            timeout: 等待写锁的超时时间（秒）
+        """
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS deploy_ledger ("
+                "key TEXT PRIMARY KEY, jobid TEXT NOT NULL, hash TEXT NOT NULL, definition TEXT NOT NULL, "
+                "deployed_at REAL NOT NULL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        connection = self._connection()
+        entries = {}
+        keys = list(keys)
+        for start in range(0, len(keys), self._CHUNK):
+            chunk = keys[start:start + self._CHUNK]
+            rows = connection.execute(
+                f"SELECT key, jobid, hash, definition, deployed_at FROM deploy_ledger "
+                f"WHERE key IN ({', '.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            for key, jobid, digest, definition, deployed_at in rows:
+                entries[key] = {"jobid": jobid, "hash": digest, "definition": json.loads(definition),
+                                "deployed_at": deployed_at}
+        return entries
+
+    def put_many(self, entries: Dict[str, Dict[str, Any]]):
+        if not entries:
+            return
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany(
+                "INSERT INTO deploy_ledger (key, jobid, hash, definition, deployed_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET jobid = excluded.jobid, hash = excluded.hash, "
+                "definition = excluded.definition, deployed_at = excluded.deployed_at",
+                [
+                    (key, entry["jobid"], entry["hash"], json.dumps(entry["definition"], ensure_ascii=False),
+                     entry["deployed_at"])
+                    for key, entry in entries.items()
+                ]
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def delete(self, key: str) -> bool:
+        with self._connection() as connection:
+            return connection.execute("DELETE FROM deploy_ledger WHERE key = ?", (key,)).rowcount > 0
+
+
+def ledger_from_env() -> DeployLedger:
+    """按 DATALAKE_DEPLOY_LEDGER 环境变量创建台账，未设置时使用进程内台账"""
+    path = os.getenv(LEDGER_ENV)
+    if path:
+        return SQLiteDeployLedger(path)
+    return InMemoryDeployLedger()
+
+
+_ledger: Optional[DeployLedger] = None
+_ledger_lock = threading.Lock()
+
+
+def get_deploy_ledger() -> DeployLedger:
+    """进程共享的部署台账，首次使用时按环境变量创建"""
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = ledger_from_env()
+        return _ledger
+
+
+def ledger_entry(jobid: str, digest: str, task: Dict[str, Any]) -> Dict[str, Any]:
+    """新的台账条目"""
+    return {"jobid": jobid, "hash": digest, "definition": stable_definition(task), "deployed_at": time.time()}
+
+
+class DeployPlan:
+    """
+    一批任务按台账划分为跳过、更新、新建三类
+
+    同一批中台账键相同的任务只部署最后一个（后面的定义覆盖前面的），其余记入 duplicates，结果与之相同。
+    """
+
+    def __init__(self, target: str, tasks: Sequence[Dict[str, Any]], ledger: DeployLedger):
+        """
+        Args:
+            target: 上游标识，与任务名一起组成台账键
+            tasks: 任务定义
+            ledger: 部署台账
+        """
+        self.keys = [f"{target}|{task_identity(task)}" for task in tasks]
+        self.hashes = [task_hash(task) for task in tasks]
+        self.entries = ledger.get_many(sorted(set(self.keys)))
+        self.skipped: List[int] = []
+        self.updated: List[Tuple[int, str, Dict[str, Any]]] = []
+        self.created: List[int] = []
+        # 重复任务的下标 -> 实际部署的任务下标
+        last = {key: index for index, key in enumerate(self.keys)}
+        self.duplicates: Dict[int, int] = {
+            index: last[key] for index, key in enumerate(self.keys) if last[key] != index
+        }
+        for index, (key, digest) in enumerate(zip(self.keys, self.hashes)):
+            if index in self.duplicates:
+                continue
+            entry = self.entries.get(key)
+            if entry is None:
+                self.created.append(index)
+            elif entry["hash"] == digest:
+                self.skipped.append(index)
+            else:
+                patch = merge_patch(entry["definition"], stable_definition(tasks[index]))
+                self.updated.append((index, entry["jobid"], patch))
+
+
+def skipped_result(jobid: str) -> Dict[str, Any]:
+    return {"status": "success", "jobid": jobid, "action": "skipped",
+            "deploy_message": f"Task unchanged, Job ID: {jobid}"}
+
+
+class IdempotentDeployer:
+    """按部署台账跳过未变化的任务、以差异更新变化的任务"""
+
+    def __init__(self, client: Any, ledger: Optional[DeployLedger] = None):
+        """
+        Args:
+            client: DeployClient
+            ledger: 部署台账，默认使用进程共享的台账
+        """
+        self.client = client
+        self.ledger = ledger or get_deploy_ledger()
+
+    def deploy(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """部署单个任务"""
+        return self.deploy_many([task])[0]
+
+    def deploy_many(self, tasks: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        部署多个任务
+
+        Returns:
+            与 tasks 顺序一致的部署结果，action 为 skipped / updated / created
+        """
+        tasks = list(tasks)
+        plan = DeployPlan(self.client.base_url, tasks, self.ledger)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(tasks)
+        for index in plan.skipped:
+            results[index] = skipped_result(plan.entries[plan.keys[index]]["jobid"])
+
+        # 上游已不存在的任务改为新建
+        created, missing = list(plan.created), 0
+        if plan.updated:
+            updates = self.client.update_many([(jobid, patch) for _, jobid, patch in plan.updated])
+            for (index, _, _), result in zip(plan.updated, updates):
+                if result.get("not_found"):
+                    created.append(index)
+                    missing += 1
+                else:
+                    results[index] = {**result, "action": "updated"}
+            self._record(plan, tasks, [index for index, _, _ in plan.updated if results[index] is not None], results)
+        if created:
+            # 每组任务返回后立即记入台账，部署中途失败或被重试时已部署的任务不会重复新建
+            def record_chunk(positions: List[int], chunk_results: List[Dict[str, Any]]):
+                indices = [created[position] for position in positions]
+                for index, result in zip(indices, chunk_results):
+                    results[index] = {**result, "action": "created"}
+                self._record(plan, tasks, indices, results)
+
+            self.client.deploy_many([tasks[index] for index in created], on_done=record_chunk)
+        for index, representative in plan.duplicates.items():
+            results[index] = dict(results[representative])
+        logger.info("Deployed %d tasks: %d skipped, %d updated, %d created", len(tasks), len(plan.skipped),
+                    len(plan.updated) - missing, len(created))
+        return results
+
+    def _record(self, plan: DeployPlan, tasks: Sequence[Dict[str, Any]], indices: Sequence[int],
+                results: Sequence[Optional[Dict[str, Any]]]):
+        """把部署成功的任务写入台账"""
+        self.ledger.put_many({
+            plan.keys[index]: ledger_entry(results[index]["jobid"], plan.hashes[index], tasks[index])
+            for index in indices if results[index]["status"] == "success"
+        })
+
+
+def deploy_actions(results: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+    """按 action 统计部署结果"""
+    counts = {"skipped": 0, "updated": 0, "created": 0}
+    for result in results:
+        if result.get("status") == "success" and result.get("action") in counts:
+            counts[result["action"]] += 1
+    return counts
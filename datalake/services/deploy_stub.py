@@ -0,0 +1,186 @@
+# 欲买桂花同载酒，
+# 终不似、少年游。
+# Copyright (c) VernonSong. All rights reserved.
+# ======================================================================================================================
+"""
+本地上游部署接口桩
+
+在本机随机端口启动一个 HTTP/1.1 服务，实现 datalake.services.deploy_client 约定的部署接口，供测试、基准测试与本地调试使用：
+
+    with StubUpstream(latency=0.05) as upstream:
+        client = DeployClient(upstream.url)
+        client.deploy_many(tasks)
+
+latency 模拟每个请求的处理耗时（批量请求也只计一次），batch=False 时批量接口返回 404，
+reject(task) 返回错误信息时该任务部署失败。PATCH /tasks/{jobid} 把差异合并到已部署的任务上。
+部署的任务在 job_duration 秒内为 running，之后为 succeeded；finish(jobid, status) 可直接指定任务的终态。
+"""
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from datalake.services.deploy_ledger import apply_merge_patch
+
+
+class StubUpstream:
+    """本地上游部署接口桩"""
+
+    def __init__(self, latency: float = 0.0, batch: bool = True,
+                 reject: Optional[Callable[[Dict[str, Any]], Optional[str]]] = None, job_duration: float = 0.0,
+                 host: str = "127.0.0.1", port: int = 0):
+        """
+        初始化接口桩
+
+        Args:
+            latency: 每个请求的处理耗时（秒）
+            batch: 是否提供批量接口
+            reject: 返回错误信息时拒绝部署该任务
+            job_duration: 部署后任务运行的时长（秒），None 表示一直运行直到调用 finish
+            host: 监听地址
+            port: 监听端口，0 表示随机端口
+        """
+        self.latency = latency
+        self.batch = batch
+        self.reject = reject
+        self.job_duration = job_duration
+        # jobid -> 部署时间
+        self.deployed_at: Dict[str, float] = {}
+        # jobid -> 指定的任务状态
+        self.job_states: Dict[str, Dict[str, Any]] = {}
+        # jobid -> 任务定义
+        self.tasks: Dict[str, Dict[str, Any]] = {}
+        # 各接口的请求次数
+        self.requests: Dict[str, int] = {}
+        # 收到的更新 (jobid, 差异)
+        self.patches: List[Tuple[str, Dict[str, Any]]] = []
+        self._jobids = itertools.count(10000001)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubUpstream":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="deploy-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "StubUpstream":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _count(self, endpoint: str):
+        with self._lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+
+    def _deploy(self, task: Any) -> Dict[str, Any]:
+        """部署一个任务，返回 {"status", "jobid", "message"}"""
+        if not isinstance(task, dict) or not task.get("task_info"):
+            return {"status": "failed", "message": "Invalid JSON format"}
+        error = self.reject(task) if self.reject else None
+        if error:
+            return {"status": "failed", "message": error}
+        with self._lock:
+            jobid = f"JOB-{next(self._jobids)}"
+            self.tasks[jobid] = task
+            self.deployed_at[jobid] = time.monotonic()
+        return {"status": "success", "jobid": jobid, "message": f"Task deployed successfully, Job ID: {jobid}"}
+
+    def finish(self, jobid: str, status: str = "succeeded", message: str = ""):
+        """指定任务的状态"""
+        with self._lock:
+            self.job_states[jobid] = {"status": status, "message": message}
+
+    def job_status(self, jobid: str) -> Dict[str, Any]:
+        """任务当前的状态"""
+        with self._lock:
+            if jobid in self.job_states:
+                return dict(self.job_states[jobid])
+            deployed_at = self.deployed_at.get(jobid)
+        if deployed_at is None:
+            return {"status": "failed", "message": f"Job {jobid} not found"}
+        if self.job_duration is not None and time.monotonic() - deployed_at >= self.job_duration:
+            return {"status": "succeeded", "message": ""}
+        return {"status": "running", "message": ""}
+
+    def handle(self, method: str, path: str, body: Any) -> Tuple[int, Any]:
+        """处理一个请求，返回 (状态码, 响应体)"""
+        if self.latency:
+            time.sleep(self.latency)
+        if method == "POST" and path == "/tasks":
+            self._count("deploy")
+            result = self._deploy(body)
+            if result["status"] != "success":
+                return 400, {"error": result["message"]}
+            return 200, {"jobid": result["jobid"], "message": result["message"]}
+        if method == "PATCH" and path.startswith("/tasks/"):
+            self._count("patch")
+            jobid = path[len("/tasks/"):]
+            if not isinstance(body, dict):
+                return 400, {"error": "Patch must be an object"}
+            with self._lock:
+                if jobid not in self.tasks:
+                    return 404, {"error": f"Job {jobid} not found"}
+                self.tasks[jobid] = apply_merge_patch(self.tasks[jobid], body)
+                self.patches.append((jobid, body))
+            return 200, {"jobid": jobid, "message": f"Task updated, Job ID: {jobid}"}
+        if method == "POST" and path == "/jobs/status":
+            self._count("status")
+            jobids = body.get("jobids") if isinstance(body, dict) else None
+            if not isinstance(jobids, list):
+                return 400, {"error": "jobids must be a list"}
+            return 200, {"statuses": {jobid: self.job_status(jobid) for jobid in jobids}}
+        if method == "POST" and path == "/tasks/batch":
+            self._count("batch")
+            if not self.batch:
+                return 404, {"error": "Not found"}
+            tasks: List[Any] = body.get("tasks") if isinstance(body, dict) else None
+            if not isinstance(tasks, list):
+                return 400, {"error": "tasks must be a list"}
+            return 200, {"results": [self._deploy(task) for task in tasks]}
+        return 404, {"error": "Not found"}
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # HTTP/1.1 保持连接，客户端可以复用连接
+            protocol_version = "HTTP/1.1"
+
+            def _dispatch(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                try:
+                    body = json.loads(raw) if raw else None
+                except ValueError:
+                    status, payload = 400, {"error": "Invalid JSON format"}
+                else:
+                    status, payload = stub.handle(self.command, self.path.split("?", 1)[0], body)
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _dispatch
+
+            def log_message(self, format: str, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,249 @@
+# 欲买桂花同载酒，
+# 终不似、少年游。
+# Copyright (c) VernonSong. All rights reserved.
+# ======================================================================================================================
+"""
+部署任务状态跟踪
+
+等待部署任务结束的工作流不再占用线程轮询：工作流在等待节点处挂起（LangGraph interrupt），
+把要等待的 jobid 登记到 JobStatusTracker 后立即返回；跟踪器结束等待时回调，由回调恢复工作流。
+
+每个上游只有一个后台线程，把所有在等的 jobid 合并为批量请求 POST {base_url}/jobs/status 查询，
+请求体为 {"jobids": [...]}，返回 {"statuses": {jobid: {"status", "message"}}}。
+轮询间隔自适应：有任务状态变化或登记了新任务时回到 min_interval，否则每次乘以 backoff，直到 max_interval。
+上游也可以主动回调本地 webhook（POST /api/jobs/callback），notify_job_status 收到终态后立即结束等待。
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from uuid import uuid4
+
+from datalake.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# 任务终态
+TERMINAL_STATES = ("succeeded", "failed", "cancelled")
+
+# 等待结束时的回调：jobid -> 终态
+JobCallback = Callable[[Dict[str, Dict[str, Any]]], None]
+
+
+class _Watch:
+    """一次等待：等待的 jobid 全部到达终态后回调"""
+
+    __slots__ = ("pending", "statuses", "on_done")
+
+    def __init__(self, jobids: Iterable[str], on_done: JobCallback):
+        self.pending = set(jobids)
+        self.statuses: Dict[str, Dict[str, Any]] = {}
+        self.on_done = on_done
+
+
+class JobStatusTracker:
+    """批量轮询与 webhook 回调结合的任务状态跟踪器"""
+
+    def __init__(self, fetch: Callable[[List[str]], Dict[str, Dict[str, Any]]], min_interval: float = 0.5,
+                 max_interval: float = 30.0, backoff: float = 1.5, batch_size: int = 500, callback_workers: int = 4,
+                 name: str = "job-tracker"):
+        """
+        初始化跟踪器
+
+        Args:
+            fetch: 批量查询任务状态的函数，jobid 列表 -> {jobid: {"status", ...}}
+            min_interval: 最小轮询间隔（秒）
+            max_interval: 最大轮询间隔（秒）
+            backoff: 状态无变化时轮询间隔的增长倍数
+            batch_size: 每个查询请求包含的 jobid 数
+            callback_workers: 执行回调（恢复工作流）的线程数
+            name: 轮询线程名称
+        """
+        self.fetch = fetch
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.batch_size = batch_size
+        self.name = name
+        self.interval = min_interval
+        self.polls = 0
+        # watch_id -> 等待
+        self._watches: Dict[str, _Watch] = {}
+        # jobid -> 上次看到的状态
+        self._last_status: Dict[str, str] = {}
+        self._condition = threading.Condition()
+        self._callbacks = ThreadPoolExecutor(max_workers=callback_workers, thread_name_prefix=f"{name}-callback")
+        self._thread: Optional[threading.Thread] = None
+        self._wakeup = False
+        self._closed = False
+
+    def watch(self, jobids: Iterable[str], on_done: JobCallback) -> str:
+        """
+        登记一次等待
+
+        Args:
+            jobids: 要等待的 jobid
+            on_done: 全部到达终态后在回调线程中调用，参数为 {jobid: 终态}
+
+        Returns:
+            等待标识，可用于 cancel
+        """
+        watch_id = str(uuid4())
+        watch = _Watch(jobids, on_done)
+        if not watch.pending:
+            self._callbacks.submit(self._run_callback, watch)
+            return watch_id
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Job tracker is closed")
+            self._watches[watch_id] = watch
+            self.interval = self.min_interval
+            self._wakeup = True
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        logger.debug("Watching %d jobs (%s)", len(watch.pending), watch_id)
+        return watch_id
+
+    def cancel(self, watch_id: str) -> bool:
+        """取消等待，不再回调"""
+        with self._condition:
+            return self._watches.pop(watch_id, None) is not None
+
+    def pending(self) -> List[str]:
+        """仍在等待的 jobid"""
+        with self._condition:
+            return sorted({jobid for watch in self._watches.values() for jobid in watch.pending})
+
+    def notify(self, jobid: str, status: Dict[str, Any]) -> bool:
+        """
+        接收任务状态（webhook 回调）
+
+        Returns:
+            是否有等待该任务的工作流
+        """
+        with self._condition:
+            watched = any(jobid in watch.pending for watch in self._watches.values())
+            if watched:
+                self._apply({jobid: status})
+        return watched
+
+    def _apply(self, statuses: Dict[str, Dict[str, Any]]) -> bool:
+        """记录查询到的状态，结束已全部到达终态的等待；返回是否有状态变化（调用方持有锁）"""
+        changed = False
+        for jobid, status in statuses.items():
+            state = status.get("status")
+            previous = self._last_status.get(jobid)
+            if previous != state:
+                self._last_status[jobid] = state
+                # 首次看到的非终态不算变化
+                changed = changed or previous is not None or state in TERMINAL_STATES
+            if state not in TERMINAL_STATES:
+                continue
+            for watch in self._watches.values():
+                if jobid in watch.pending:
+                    watch.pending.discard(jobid)
+                    watch.statuses[jobid] = status
+        for watch_id in [watch_id for watch_id, watch in self._watches.items() if not watch.pending]:
+            watch = self._watches.pop(watch_id)
+            for jobid in watch.statuses:
+                self._last_status.pop(jobid, None)
+            self._callbacks.submit(self._run_callback, watch)
+        return changed
+
+    @staticmethod
+    def _run_callback(watch: _Watch):
+        try:
+            watch.on_done(watch.statuses)
+        except Exception:
+            logger.exception("Job status callback failed")
+
+    def poll_once(self) -> bool:
+        """
+        批量查询一次全部在等的任务
+
+        Returns:
+            是否有任务状态变化
+        """
+        jobids = self.pending()
+        changed = False
+        for start in range(0, len(jobids), self.batch_size):
+            statuses = self.fetch(jobids[start:start + self.batch_size])
+            with self._condition:
+                changed = self._apply(statuses) or changed
+        self.polls += 1
+        return changed
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._watches and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                self._wakeup = False
+            try:
+                changed = self.poll_once()
+            except Exception as e:
+                logger.warning("Polling job statuses failed: %s", e)
+                changed = False
+            with self._condition:
+                self.interval = self.min_interval if changed else min(self.interval * self.backoff, self.max_interval)
+                # 查询期间或等待期间登记了新任务时提前开始下一次查询
+                deadline = time.monotonic() + self.interval
+                while self._watches and not self._closed and not self._wakeup:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+
+    def close(self):
+        """停止轮询，不再回调尚未结束的等待"""
+        with self._condition:
+            self._closed = True
+            self._watches.clear()
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        self._callbacks.shutdown(wait=True)
+
+
+# 上游地址 -> 跟踪器
+_trackers: Dict[str, JobStatusTracker] = {}
+_trackers_lock = threading.Lock()
+
+
+def get_job_tracker(base_url: str, **kwargs) -> JobStatusTracker:
+    """
+    获取（必要时创建）指定上游的共享跟踪器，通过该上游的共享部署客户端查询状态
+
+    Args:
+        base_url: 上游部署接口地址
+        **kwargs: 首次创建时传给 JobStatusTracker 的参数
+    """
+    from datalake.services.deploy_client import get_deploy_client
+
+    with _trackers_lock:
+        tracker = _trackers.get(base_url)
+        if tracker is None:
+            tracker = _trackers[base_url] = JobStatusTracker(
+                get_deploy_client(base_url).job_statuses, name=f"job-tracker-{len(_trackers) + 1}", **kwargs
+            )
+        return tracker
+
+
+def notify_job_status(jobid: str, status: Dict[str, Any]) -> bool:
+    """把 webhook 收到的任务状态交给各跟踪器，返回是否有工作流在等待该任务"""
+    with _trackers_lock:
+        trackers = list(_trackers.values())
+    return any([tracker.notify(jobid, status) for tracker in trackers])
+
+
+def close_job_trackers():
+    """关闭全部跟踪器"""
+    with _trackers_lock:
+        trackers = list(_trackers.values())
+        _trackers.clear()
+    for tracker in trackers:
+        tracker.close()
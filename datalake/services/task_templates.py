@@ -0,0 +1,294 @@
+# 欲买桂花同载酒，
+# 终不似、少年游。
+# Copyright (c) VernonSong. All rights reserved.
+# ======================================================================================================================
+"""
+集成任务模板
+
+同一批接入的集成任务，upstream_api_json 中的 advanced_settings、schedule、任务类型、创建人、创建时间等部分完全相同，
+只有源表、目标表、字段映射不同。TaskTemplate 在创建时把公共部分预先序列化，渲染每个任务时只序列化各表自己的字段，
+再与预先序列化的片段拼接为一行 JSON；带有覆盖项（overrides）的任务按完整字典合并后序列化。
+
+批量任务的每一项可以是：
+- 元组 (源表, 目标表, 字段映射[, 覆盖项])，表为 "db.schema.table" 字符串或 {"db", "schema", "table"} 字典；
+- 字典 {"source_db", "source_schema", "source_table", "target_db", ..., "field_mapping", "overrides"}，
+  或 {"source": 表, "target": 表, "field_mapping": [...], "overrides": {...}}。
+"""
+import copy
+import json
+import os
+import time
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# 字符串转 JSON 字面量（C 实现，不转义非 ASCII 字符）
+_quote = json.encoder.encode_basestring
+# 复用同一个编码器；json.dumps 带参数时每次调用都会新建编码器
+_encode = json.JSONEncoder(ensure_ascii=False).encode
+
+# 默认调度配置
+DEFAULT_SCHEDULE = {"type": "cron", "expression": "0 0 * * *", "start_time": "2024-01-01 00:00:00"}
+
+_TABLE_FIELDS = ("db", "schema", "table")
+
+
+class TaskTemplate:
+    """预编译的集成任务模板"""
+
+    def __init__(self, username: str = "default_user", integration_type: str = "full", parallelism: int = 1,
+                 audit_template_name: str = "default_audit", source_type: str = "mysql", target_type: str = "hive",
+                 retry_count: int = 3, timeout: int = 3600, schedule: Optional[Dict[str, Any]] = None,
+                 create_time: Optional[str] = None):
+        """
+        初始化模板
+
+        Args:
+            username: 创建人
+            integration_type: 集成类型
+            parallelism: 任务并行度
+            audit_template_name: 审计模板名
+            source_type: 源库类型
+            target_type: 目标库类型
+            retry_count: 重试次数
+            timeout: 任务超时（秒）
+            schedule: 调度配置，默认每天零点
+            create_time: 创建/更新时间，默认为模板创建时间
+        """
+        self.username = username
+        self.integration_type = integration_type
+        self.source_type = source_type
+        self.target_type = target_type
+        self.create_time = create_time or time.strftime("%Y-%m-%d %H:%M:%S")
+        self.advanced_settings = {
+            "parallelism": parallelism,
+            "retry_count": retry_count,
+            "timeout": timeout,
+            "audit_template": audit_template_name
+        }
+        self.schedule = dict(schedule or DEFAULT_SCHEDULE)
+
+        # 预先序列化的公共片段
+        dumps = _encode
+        self._task_info_tail = (
+            f', "type": {dumps(integration_type)}, "create_by": {dumps(username)}, '
+            f'"create_time": {dumps(self.create_time)}, "update_time": {dumps(self.create_time)}}}'
+        )
+        self._source_tail = f', "type": {dumps(source_type)}}}'
+        self._target_tail = f', "type": {dumps(target_type)}}}'
+        self._settings_and_schedule = (
+            f', "advanced_settings": {dumps(self.advanced_settings)}, "schedule": {dumps(self.schedule)}'
+        )
+        self._type_tag = _quote(f"type:{integration_type}")
+
+    @classmethod
+    def from_inputs(cls, inputs: Dict[str, Any], **kwargs) -> "TaskTemplate":
+        """按集成任务生成节点的输入参数创建模板"""
+        return cls(
+            username=inputs.get("username", "default_user"),
+            integration_type=inputs.get("integration_type", "full"),
+            parallelism=inputs.get("parallelism", 1),
+            audit_template_name=inputs.get("audit_template_name", "default_audit"),
+            **kwargs
+        )
+
+    def names(self, item: Dict[str, Any]) -> Tuple[str, str, str]:
+        """任务名称、描述与目录"""
+        source = f"{item['source_db']}.{item['source_schema']}.{item['source_table']}"
+        target = f"{item['target_db']}.{item['target_schema']}.{item['target_table']}"
+        task_name = (
+            f"{item['source_db']}_{item['source_schema']}_{item['source_table']}_to_"
+            f"{item['target_db']}_{item['target_schema']}_{item['target_table']}_{self.integration_type}"
+        )
+        task_description = f"从{source}到{target}的{self.integration_type}集成任务"
+        task_directory = (
+            f"/integration_tasks/{item['source_db']}/{item['source_schema']}/{item['source_table']}/"
+            f"{item['target_db']}/{item['target_schema']}/{item['target_table']}"
+        )
+        return task_name, task_description, task_directory
+
+    def render(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        渲染一个任务的 upstream_api_json
+
+        Args:
+            item: parse_item 解析后的任务
+
+        Returns:
+            upstream_api_json 字典
+        """
+        task_name, task_description, _ = self.names(item)
+        task = {
+            "task_info": {
+                "name": task_name,
+                "description": task_description,
+                "type": self.integration_type,
+                "create_by": self.username,
+                "create_time": self.create_time,
+                "update_time": self.create_time
+            },
+            "source": {
+                "db": item["source_db"],
+                "schema": item["source_schema"],
+                "table": item["source_table"],
+                "type": self.source_type
+            },
+            "target": {
+                "db": item["target_db"],
+                "schema": item["target_schema"],
+                "table": item["target_table"],
+                "type": self.target_type
+            },
+            "field_mapping": item["field_mapping"],
+            "advanced_settings": dict(self.advanced_settings),
+            "schedule": dict(self.schedule),
+            "tags": [
+                f"source:{item['source_db']}",
+                f"target:{item['target_db']}",
+                f"type:{self.integration_type}"
+            ]
+        }
+        overrides = item.get("overrides")
+        if overrides:
+            _deep_merge(task, overrides)
+        return task
+
+    def render_json(self, item: Dict[str, Any], names: Optional[Tuple[str, str, str]] = None) -> str:
+        """
+        渲染一个任务的 upstream_api_json 为单行 JSON，与 json.dumps(render(item)) 等价
+
+        没有覆盖项时直接拼接预先序列化的公共片段。
+
+        Args:
+            item: parse_item 解析后的任务
+            names: 已计算的 names(item)
+        """
+        if item.get("overrides"):
+            return _encode(self.render(item))
+        task_name, task_description, _ = names or self.names(item)
+        source_db, target_db = item["source_db"], item["target_db"]
+        return (
+            f'{{"task_info": {{"name": {_quote(task_name)}, "description": {_quote(task_description)}'
+            f'{self._task_info_tail}, '
+            f'"source": {{"db": {_quote(source_db)}, "schema": {_quote(item["source_schema"])}, '
+            f'"table": {_quote(item["source_table"])}{self._source_tail}, '
+            f'"target": {{"db": {_quote(target_db)}, "schema": {_quote(item["target_schema"])}, '
+            f'"table": {_quote(item["target_table"])}{self._target_tail}, '
+            f'"field_mapping": {_encode(item["field_mapping"])}'
+            f'{self._settings_and_schedule}, '
+            f'"tags": [{_quote("source:" + source_db)}, {_quote("target:" + target_db)}, {self._type_tag}]}}'
+        )
+
+    def render_line(self, index: int, raw: Any) -> Tuple[str, bool]:
+        """
+        渲染批量任务中的一项为 NDJSON 行
+
+        Returns:
+            (行, 是否成功)；成功时为 {"index", "task_name", "task_directory", "upstream_api_json"}，
+            解析失败时为 {"index", "error"}
+        """
+        try:
+            item = parse_item(raw)
+            names = self.names(item)
+            return (
+                f'{{"index": {index}, "task_name": {_quote(names[0])}, '
+                f'"task_directory": {_quote(names[2])}, "upstream_api_json": {self.render_json(item, names)}}}\n'
+            ), True
+        except (ValueError, KeyError, TypeError) as e:
+            return _encode({"index": index, "error": str(e)}) + "\n", False
+
+    def render_chunks(self, items: Iterable[Any], lines_per_chunk: int = 256) -> Iterator[str]:
+        """逐块渲染 NDJSON，每块包含 lines_per_chunk 行，供流式响应使用"""
+        buffer: List[str] = []
+        for index, raw in enumerate(items):
+            buffer.append(self.render_line(index, raw)[0])
+            if len(buffer) >= lines_per_chunk:
+                yield "".join(buffer)
+                buffer.clear()
+        if buffer:
+            yield "".join(buffer)
+
+    def write_ndjson(self, items: Iterable[Any], output: IO[str], lines_per_chunk: int = 512) -> Dict[str, int]:
+        """
+        把任务渲染写入 NDJSON 文件，单项失败不影响其他任务
+
+        Returns:
+            {"rendered": 成功数, "failed": 失败数}
+        """
+        rendered = failed = 0
+        buffer: List[str] = []
+        for index, raw in enumerate(items):
+            line, ok = self.render_line(index, raw)
+            if ok:
+                rendered += 1
+            else:
+                failed += 1
+            buffer.append(line)
+            if len(buffer) >= lines_per_chunk:
+                output.write("".join(buffer))
+                buffer.clear()
+        if buffer:
+            output.write("".join(buffer))
+        return {"rendered": rendered, "failed": failed}
+
+
+def parse_item(raw: Any) -> Dict[str, Any]:
+    """
+    解析批量任务中的一项
+
+    Raises:
+        ValueError: 格式不正确
+    """
+    if isinstance(raw, (list, tuple)):
+        if len(raw) not in (3, 4):
+            raise ValueError("Task tuple must be (source, target, field_mapping[, overrides])")
+        source, target, field_mapping = raw[:3]
+        overrides = raw[3] if len(raw) == 4 else None
+    elif isinstance(raw, dict):
+        if "source" in raw or "target" in raw:
+            source, target = raw.get("source"), raw.get("target")
+        else:
+            source = {field: raw.get(f"source_{field}") for field in _TABLE_FIELDS}
+            target = {field: raw.get(f"target_{field}") for field in _TABLE_FIELDS}
+        field_mapping = raw.get("field_mapping", [])
+        overrides = raw.get("overrides")
+    else:
+        raise ValueError(f"Unsupported task item: {type(raw).__name__}")
+
+    item = {}
+    for prefix, table in (("source", source), ("target", target)):
+        for field, value in zip(_TABLE_FIELDS, _split_table(table, prefix)):
+            item[f"{prefix}_{field}"] = value
+    if not isinstance(field_mapping, list):
+        raise ValueError("field_mapping must be a list")
+    item["field_mapping"] = field_mapping
+    if overrides is not None and not isinstance(overrides, dict):
+        raise ValueError("overrides must be an object")
+    item["overrides"] = overrides
+    return item
+
+
+def _split_table(table: Any, prefix: str) -> Sequence[str]:
+    if isinstance(table, str):
+        parts = table.split(".")
+    elif isinstance(table, dict):
+        parts = [table.get(field) for field in _TABLE_FIELDS]
+    else:
+        parts = []
+    if len(parts) != 3 or not all(isinstance(part, str) and part for part in parts):
+        raise ValueError(f"{prefix} must be 'db.schema.table' or an object with db/schema/table")
+    return parts
+
+
+def _deep_merge(base: Dict[str, Any], overrides: Dict[str, Any]):
+    """把覆盖项递归合并到 base"""
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            _deep_merge(base[key], value)
+        else:
+            base[key] = copy.deepcopy(value)
+
+
+def default_output_path(request_id: str) -> str:
+    """批量任务默认的 NDJSON 输出路径"""
+    directory = os.getenv("DATALAKE_TASK_OUTPUT_DIR") or os.path.join(os.path.expanduser("~"), ".datalake", "tasks")
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"integration_tasks_{request_id}.ndjson")
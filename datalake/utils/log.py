@@ -0,0 +1,198 @@
+# 欲买桂花同载酒，
+# 终不似、少年游。
+# Copyright (c) VernonSong. All rights reserved.
+# ======================================================================================================================
+"""
+结构化日志
+
+- 非阻塞：业务线程只把日志记录放入内存队列，格式化与输出在后台线程完成；
+- 结构化：每条日志输出为一行JSON，包含时间、级别、模块、request_id 与附加字段；
+- 按模块设置级别：DATALAKE_LOG_LEVELS="datalake.core.nodes=DEBUG,datalake.core.agents=WARNING"；
+- 大负载截断：超过 max_payload 字符的消息被截断，避免完整的大模型响应、提示词写满日志；
+- request_id 关联：bind_request_id 设置当前上下文的请求ID，自动附加到每条日志。
+
+调用方使用 %s 占位符传参（logger.info("... %s", value)），日志级别未开启时不会产生字符串格式化开销。
+"""
+import atexit
+import contextlib
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from typing import Dict, Optional
+
+# 当前上下文的请求ID
+request_id_var: contextvars.ContextVar = contextvars.ContextVar("request_id", default=None)
+
+# 标准 LogRecord 属性，不作为附加字段输出
+_RESERVED_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+_configure_lock = threading.Lock()
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class RequestIdFilter(logging.Filter):
+    """在记录产生时捕获当前上下文的 request_id（后台线程中无法再读取调用方的上下文）"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """将日志记录格式化为一行JSON，超长消息截断到 max_payload 字符"""
+
+    def __init__(self, max_payload: int = 2000):
+        super().__init__()
+        self.max_payload = max_payload
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = _truncate(record.getMessage(), self.max_payload)
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", None),
+            "message": message
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value if isinstance(value, (int, float, bool, type(None))) else _truncate(str(value), self.max_payload)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """可读文本格式，同样截断超长消息"""
+
+    def __init__(self, max_payload: int = 2000):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+        self.max_payload = max_payload
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        record.message = _truncate(record.message, self.max_payload)
+        return super().formatMessage(record)
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    只入队、不格式化的 QueueHandler
+
+    标准 QueueHandler.prepare 会在业务线程中完成消息格式化；这里把格式化推迟到后台线程，
+    业务线程只承担一次入队。参数对象在入队后不应再被修改（节点返回的都是新字典，满足该约定）。
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _truncate(text: str, limit: int) -> str:
+    if limit and len(text) > limit:
+        return f"{text[:limit]}...<truncated {len(text) - limit} chars>"
+    return text
+
+
+def _parse_levels(spec: Optional[str]) -> Dict[str, str]:
+    """解析 "module=LEVEL,module=LEVEL" 格式的模块级别配置"""
+    levels = {}
+    for item in (spec or "").split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(level: str = None, module_levels: Dict[str, str] = None, max_payload: int = None,
+                      json_format: bool = None, stream=None, force: bool = False):
+    """
+    配置 datalake 日志
+
+    未传入的参数依次取环境变量 DATALAKE_LOG_LEVEL、DATALAKE_LOG_LEVELS、DATALAKE_LOG_MAX_PAYLOAD、
+    DATALAKE_LOG_FORMAT（json/text），最后使用默认值。重复调用不会重复配置，除非 force=True。
+
+    Args:
+        level: datalake 日志的默认级别
+        module_levels: 按模块设置的级别，如 {"datalake.core.nodes": "DEBUG"}
+        max_payload: 单条消息的最大字符数，0 表示不截断
+        json_format: 是否输出JSON
+        stream: 输出流，默认 stderr
+        force: 是否强制重新配置
+    """
+    global _listener
+
+    with _configure_lock:
+        if _listener is not None and not force:
+            return
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+        level = level or os.getenv("DATALAKE_LOG_LEVEL", "INFO")
+        module_levels = module_levels if module_levels is not None else _parse_levels(os.getenv("DATALAKE_LOG_LEVELS"))
+        max_payload = max_payload if max_payload is not None else int(os.getenv("DATALAKE_LOG_MAX_PAYLOAD", "2000"))
+        if json_format is None:
+            json_format = os.getenv("DATALAKE_LOG_FORMAT", "json") == "json"
+
+        output = logging.StreamHandler(stream or sys.stderr)
+        output.setFormatter(JsonFormatter(max_payload) if json_format else TextFormatter(max_payload))
+
+        log_queue = queue.SimpleQueue()
+        handler = _DeferredQueueHandler(log_queue)
+        handler.addFilter(RequestIdFilter())
+
+        root = logging.getLogger("datalake")
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel(level.upper())
+        root.propagate = False
+        for name, module_level in module_levels.items():
+            logging.getLogger(name).setLevel(module_level)
+
+        _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+
+
+def shutdown_logging():
+    """停止后台线程并输出队列中剩余的日志"""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    获取日志记录器，首次调用时按环境变量完成默认配置
+
+    Args:
+        name: 模块名，通常为 __name__；不在 datalake 命名空间下的模块归入 datalake.<name>
+
+    Returns:
+        日志记录器
+    """
+    if _listener is None:
+        configure_logging()
+    if name != "datalake" and not name.startswith("datalake."):
+        name = f"datalake.{name}"
+    return logging.getLogger(name)
+
+
+@contextlib.contextmanager
+def bind_request_id(request_id: Optional[str]):
+    """在上下文中绑定请求ID，期间产生的日志自动带上该ID"""
+    token = request_id_var.set(request_id)
+    try:
+        yield
+    finally:
+        request_id_var.reset(token)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+测试内容寻址的制品存储：压缩往返、跨任务去重、执行清单与延迟物化
+"""
+
+import io
+import os
+import tempfile
+
+import pytest
+
+from datalake.core.nodes.artifact_generate import artifact_generate_node
+from datalake.services.artifact_store import ArtifactStore, LocalObjectStore, S3ObjectStore
+
+
+@pytest.mark.parametrize("codec", ["zstd", "gzip", "none"])
+def test_streamed_put_roundtrip_and_dedupe(codec):
+    """测试流式写入后解压读取一致，相同内容只保存一份"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = ArtifactStore(LocalObjectStore(directory), codec)
+        content = b"".join(f"row {index}\n".encode() for index in range(200000))
+        first = store.put(iter([content[:1000], content[1000:]]))
+        second = store.put(io.BytesIO(content))
+        assert first["digest"] == second["digest"] and second["deduplicated"] is True
+        assert first["size"] == len(content)
+        if codec != "none":
+            assert first["stored_size"] < len(content) / 4
+        assert store.read(first["digest"], codec) == content
+        assert list(store.objects.list("blobs/")) == [store.blob_key(first["digest"], codec)]
+
+
+def _state(store, request_id, table, log, ddl=None):
+    return {
+        "request_id": request_id,
+        "workflow_config": {"node_configs": {"artifact_generate": {"store": store}}},
+        "results": {
+            "sql_generate": {"generated_sql": ddl or f"CREATE TABLE lake.{table} (id BIGINT)", "sql_type": "DDL"},
+            "sql_execute": {"execution_log": log},
+            "integration_task_generate": {"task_name": table, "upstream_api_json": {
+                "task_info": {"task_name": table, "create_time": request_id}}}
+        }
+    }
+
+
+def test_node_dedupes_across_runs_and_materializes_lazily():
+    """测试 DDL 与执行日志立即写入且跨执行去重，元数据第一次读取时才写入"""
+    with tempfile.TemporaryDirectory() as directory:
+        first = artifact_generate_node(_state(directory, "run-1", "orders", "log 1"))["results"]["artifact_generate"]
+        second = artifact_generate_node(_state(directory, "run-2", "orders", "log 2"))["results"]["artifact_generate"]
+        assert first["artifact_info"]["task_id"] == "orders"
+        assert first["storage_location"] == f"file://{os.path.join(directory, 'manifests', 'run-1.json')}"
+        assert [artifact["materialized"] for artifact in first["artifacts"]] == [True, True, False]
+        assert first["artifacts"][0]["digest"] == second["artifacts"][0]["digest"]
+
+        store = ArtifactStore(LocalObjectStore(directory))
+        assert len(list(store.objects.list("blobs/"))) == 3
+        assert store.read(second["artifacts"][1]["digest"], second["artifacts"][1]["codec"]) == b"log 2"
+
+        metadata = store.materialize("run-2", "orders_metadata.json")
+        assert b'"task_name": "orders"' in store.read(metadata["digest"], metadata["codec"])
+        assert store.read_manifest("run-2")["artifacts"][2]["materialized"] is True
+        assert "recipe" not in store.read_manifest("run-2")["artifacts"][2]
+        assert store.read_manifest("run-1")["artifacts"][2]["materialized"] is False
+        assert store.materialize("run-1", "orders_metadata.json")["digest"] == metadata["digest"]
+        assert len(list(store.objects.list("blobs/"))) == 4
+        with pytest.raises(KeyError):
+            store.materialize("run-3", "orders_execution.log")
+
+
+def test_large_ddl_is_stored_once_outside_manifests():
+    """测试相同的大 DDL 跨执行只保存一份 blob，清单中不含 DDL 文本"""
+    ddl = "".join(f"CREATE TABLE lake.orders_{index} (id BIGINT, name STRING);\n" for index in range(5000))
+    with tempfile.TemporaryDirectory() as directory:
+        for run_id in ("run-1", "run-2"):
+            artifact_generate_node(_state(directory, run_id, "orders", "log", ddl=ddl))
+        store = ArtifactStore(LocalObjectStore(directory))
+        for run_id in ("run-1", "run-2"):
+            manifest = store.objects.get_bytes(store.manifest_key(run_id))
+            assert len(manifest) < 4096 and b"CREATE TABLE" not in manifest
+        entry = store.read_manifest("run-1")["artifacts"][0]
+        assert store.read(entry["digest"], entry["codec"]) == ddl.encode()
+        assert len(list(store.objects.list("blobs/"))) == 2
+
+
+def test_api_reads_artifacts_from_the_configured_store():
+    """测试制品接口从执行所用工作流配置的 store 读取清单与制品"""
+    from fastapi.testclient import TestClient
+    from datalake.api.routes import workflow_manager
+    from datalake.core.nodes import NODE_MAPPING
+    from datalake.core.workflow import WorkflowConfig, LakeIngestionRequest
+    from datalake.server import app
+
+    def fake_sql(state):
+        return {**state, "results": {**state.get("results", {}), "sql_generate": {
+            "status": "success", "generated_sql": "CREATE TABLE lake.orders (id BIGINT)"}},
+            "current_node": "fake_sql"}
+
+    NODE_MAPPING["fake_sql"] = fake_sql
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            workflow_manager.register_workflow(WorkflowConfig(
+                name="artifact_store_test", description="制品存储位置测试", nodes=["fake_sql", "artifact_generate"],
+                edges=[{"start": "fake_sql", "end": "artifact_generate"}],
+                node_configs={"artifact_generate": {"store": directory}}))
+            result = workflow_manager.execute_workflow(LakeIngestionRequest(
+                workflow_name="artifact_store_test", source_data={}, dedupe=False))
+            run_id = result["request_id"]
+            client = TestClient(app)
+            manifest = client.get(f"/api/artifacts/runs/{run_id}")
+            assert manifest.status_code == 200
+            name = manifest.json()["artifacts"][0]["name"]
+            content = client.get(f"/api/artifacts/runs/{run_id}/{name}")
+            assert content.status_code == 200 and content.text == "CREATE TABLE lake.orders (id BIGINT)"
+            assert client.get("/api/artifacts/runs/missing").status_code == 404
+    finally:
+        workflow_manager.delete_workflow("artifact_store_test")
+        NODE_MAPPING.pop("fake_sql", None)
+
+
+class FakeS3Client:
+    """实现 S3ObjectStore 用到的 boto3 方法"""
+
+    class NotFound(Exception):
+        response = {"Error": {"Code": "404"}}
+
+    def __init__(self):
+        self.objects = {}
+
+    def upload_fileobj(self, fileobj, bucket, key):
+        self.objects[(bucket, key)] = fileobj.read()
+
+    def get_object(self, Bucket, Key):
+        return {"Body": io.BytesIO(self.objects[(Bucket, Key)])}
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise self.NotFound()
+        return {}
+
+
+def test_s3_backend():
+    """测试 S3 兼容存储使用桶与前缀寻址"""
+    client = FakeS3Client()
+    store = ArtifactStore(S3ObjectStore("artifacts", "datalake/", client=client), "gzip")
+    stored = store.put("CREATE TABLE t (id INT)")
+    assert store.put("CREATE TABLE t (id INT)")["deduplicated"] is True
+    assert ("artifacts", f"datalake/{store.blob_key(stored['digest'], 'gzip')}") in client.objects
+    assert store.read(stored["digest"], "gzip") == b"CREATE TABLE t (id INT)"
+    assert store.manifest_uri("run-1") == "s3://artifacts/datalake/manifests/run-1.json"
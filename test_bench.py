@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+测试工作流基准测试：固定种子下结果可复现、与基线对比发现回退
+"""
+
+from datalake.core.workflow.simulation import simulation
+from datalake.bench.workflows import run_suite, compare_with_baseline, percentile
+
+
+def _run(seed):
+    return run_suite(
+        ["full"], requests=20, concurrency=4, seed=seed,
+        latencies={"llm": 0.2, "sql": 0.05, "deploy": 0.1},
+        failure_rates={"llm": 0.2, "sql": 0.2, "deploy": 0.0, "table_check": 0.0},
+        time_scale=0
+    )
+
+
+def test_seeded_runs_are_reproducible():
+    """测试相同种子下并发执行的成败与节点执行次数一致"""
+    first, second = _run(7), _run(7)
+    first_graph, second_graph = first["graphs"]["full"], second["graphs"]["full"]
+    assert first_graph["status"] == second_graph["status"]
+    assert first_graph["status"].get("failed", 0) > 0
+    assert {node: stats["count"] for node, stats in first_graph["nodes"].items()} == \
+           {node: stats["count"] for node, stats in second_graph["nodes"].items()}
+    assert not simulation.enabled
+
+
+def test_simulated_latencies_are_seeded():
+    """测试模拟延迟由种子决定"""
+    state = {"source_data": {"source_table": "t1"}}
+    simulation.configure(seed=1, latencies={"llm": 1.0})
+    try:
+        first = simulation.latency("llm", simulation.rng("sql_generate", state), lambda rng: 0)
+        simulation.configure(seed=1, latencies={"llm": 1.0})
+        second = simulation.latency("llm", simulation.rng("sql_generate", state), lambda rng: 0)
+    finally:
+        simulation.reset()
+    assert first == second
+    assert 0.8 <= first <= 1.2
+
+
+def test_compare_with_baseline_flags_regressions():
+    """测试吞吐量下降与延迟上升超过阈值时判定为回退"""
+    baseline = {"graphs": {"ddl": {"throughput": 10.0, "latency": {"p50": 1.0, "p95": 2.0, "p99": 3.0}}}}
+    report = {"graphs": {"ddl": {"throughput": 7.0, "latency": {"p50": 1.05, "p95": 2.0, "p99": 4.0}}}}
+    comparison = compare_with_baseline(report, baseline, tolerance=0.2)
+    assert comparison["regressions"] == ["ddl.throughput", "ddl.latency_p99"]
+    assert not comparison["graphs"]["ddl"]["latency_p50"]["regression"]
+
+
+def test_percentile():
+    """测试最近秩法分位数"""
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 50) is None
+
+
+if __name__ == "__main__":
+    test_seeded_runs_are_reproducible()
+    test_simulated_latencies_are_seeded()
+    test_compare_with_baseline_flags_regressions()
+    test_percentile()
+    print("All bench tests passed!")
@@ -54,7 +54,13 @@ try:
     input_data = InputData(
         source_config=source_config,
         processing_config=processing_config,
-        target_columns=["value1", "value2", "value3", "value4"]
+        target_columns=["value1", "value2", "value3", "value4"],
+        data={
+            "value1": [1.0, 2.0, 3.0, 4.0],
+            "value2": [10.0, 20.0, None, 40.0],
+            "value3": [5.0, 5.0, 5.0, 5.0],
+            "value4": [0.5, 1.5, 2.5, 3.5]
+        }
     )
     
     print("✓ 成功创建输入数据模型")
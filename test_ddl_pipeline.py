@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+测试多表建表流水线（sql_generate → sql_execute）
+"""
+
+import time
+
+from datalake.core.workflow.pipeline import DDLPipeline, build_table_states
+from datalake.bench.ddl_pipeline import make_fake_generate, make_fake_execute
+
+
+def test_pipeline_keeps_table_order():
+    """测试流水线输出顺序与输入一致"""
+    tables = [{"lake_table": f"t{i}"} for i in range(8)]
+    states = build_table_states("req", {"node_configs": {}}, tables)
+    pipeline = DDLPipeline(generate_fn=make_fake_generate(0.01), execute_fn=make_fake_execute(0.01),
+                           generate_concurrency=3, execute_concurrency=2, queue_size=2)
+    outputs = pipeline.run(states)
+
+    assert [o["source_data"]["lake_table"] for o in outputs] == [t["lake_table"] for t in tables]
+    assert all(o["results"]["sql_execute"]["status"] == "success" for o in outputs)
+
+
+def test_pipeline_skips_execute_when_generate_fails():
+    """测试生成失败的表不会进入执行阶段"""
+    executed = []
+
+    def generate(state):
+        status = "failed" if state["source_data"]["lake_table"] == "bad" else "success"
+        return {**state, "results": {"sql_generate": {"status": status, "generated_sql": "CREATE TABLE x"}}}
+
+    def execute(state):
+        executed.append(state["source_data"]["lake_table"])
+        return {**state, "results": {**state["results"], "sql_execute": {"status": "success"}}}
+
+    states = build_table_states("req", {}, [{"lake_table": "good"}, {"lake_table": "bad"}])
+    outputs = DDLPipeline(generate_fn=generate, execute_fn=execute).run(states)
+
+    assert executed == ["good"]
+    assert "sql_execute" not in outputs[1]["results"]
+
+
+def test_pipeline_overlaps_stages():
+    """测试生成与执行延迟重叠：1x1 流水线耗时应明显小于串行"""
+    states = build_table_states("req", {}, [{"lake_table": f"t{i}"} for i in range(6)])
+    start_time = time.perf_counter()
+    DDLPipeline(generate_fn=make_fake_generate(0.05), execute_fn=make_fake_execute(0.05)).run(states)
+    elapsed = time.perf_counter() - start_time
+
+    # 串行约 0.6s，流水线约 0.35s
+    assert elapsed < 0.5
+
+
+if __name__ == "__main__":
+    test_pipeline_keeps_table_order()
+    test_pipeline_skips_execute_when_generate_fails()
+    test_pipeline_overlaps_stages()
+    print("✅ 流水线测试通过")
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+测试集成任务部署客户端：连接池复用、批量接口与逐个部署回退、异步并发部署、批量部署节点
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+
+from datalake.core.nodes.integration_task_deploy import integration_task_deploy_metadata, integration_task_deploy_node
+from datalake.core.nodes.integration_task_generate import integration_task_generate_node
+from datalake.core.workflow.node_policy import CircuitBreakerRegistry, apply_policy, resolve_policy
+from datalake.services.deploy_client import AsyncDeployClient, DeployClient
+from datalake.services.deploy_stub import StubUpstream
+from datalake.services.task_templates import TaskTemplate, parse_item
+
+MAPPING = [{"source": "id", "target": "id"}]
+
+
+def _tasks(count):
+    template = TaskTemplate()
+    return [template.render(parse_item((f"a.b.t{index}", f"h.o.t{index}", MAPPING))) for index in range(count)]
+
+
+def test_batch_submission():
+    """测试上游支持批量接口时按组提交，单个任务的失败单独记录"""
+    reject = lambda task: "Permission denied" if task["source"]["table"] == "t7" else None
+    with StubUpstream(latency=0.01, reject=reject) as upstream:
+        with DeployClient(upstream.url, batch_size=100) as client:
+            results = client.deploy_many(_tasks(1000))
+        assert upstream.requests == {"batch": 10}
+        assert client.supports_batch is True
+    assert [result["status"] for result in results].count("success") == 999
+    assert results[7] == {"status": "failed", "jobid": "", "deploy_message": "Task deployment failed: Permission denied"}
+    assert len({result["jobid"] for result in results}) == 1000
+
+
+def test_per_item_fallback_is_concurrent():
+    """测试上游不支持批量接口时并发逐个部署，1000 个任务在数秒内完成"""
+    with StubUpstream(latency=0.02, batch=False) as upstream:
+        with DeployClient(upstream.url, max_connections=32) as client:
+            start_time = time.perf_counter()
+            results = client.deploy_many(_tasks(1000))
+            elapsed = time.perf_counter() - start_time
+            # 之后不再探测批量接口
+            client.deploy_many(_tasks(2))
+        assert upstream.requests == {"batch": 1, "deploy": 1002}
+    assert all(result["status"] == "success" for result in results)
+    # 串行需要 1000 × 0.02 = 20 秒
+    assert elapsed < 10
+
+
+def test_async_client_bounded_concurrency():
+    """测试异步客户端逐个部署与单个失败"""
+    async def run(url):
+        async with AsyncDeployClient(url, max_connections=8, batch_size=0) as client:
+            return await client.deploy_many(_tasks(50) + [{"bad": True}])
+
+    with StubUpstream(latency=0.01) as upstream:
+        results = asyncio.run(run(upstream.url))
+        assert upstream.requests == {"deploy": 51}
+    assert all(result["status"] == "success" for result in results[:50])
+    assert results[50]["status"] == "failed"
+
+
+def test_bulk_generate_then_deploy():
+    """测试批量生成的任务由部署节点一次部署"""
+    with tempfile.TemporaryDirectory() as directory, StubUpstream() as upstream:
+        state = {
+            "request_id": "bulk-deploy",
+            "source_data": {
+                "tasks": [(f"a.b.t{index}", f"h.o.t{index}", MAPPING) for index in range(20)] + [("bad", "h.o.t", [])],
+                "output_path": os.path.join(directory, "tasks.ndjson"),
+                "deploy_url": upstream.url
+            },
+            "results": {}
+        }
+        result = integration_task_deploy_node(integration_task_generate_node(state))["results"]["integration_task_deploy"]
+        assert result["status"] == "success"
+        assert result["deployed_count"] == 20
+        assert set(result["jobids"].values()) == set(upstream.tasks)
+
+        single = {"request_id": "single", "source_data": {"deploy_url": upstream.url}, "results": {
+            "integration_task_generate": {"upstream_api_json": _tasks(1)[0]}}}
+        result = integration_task_deploy_node(single)["results"]["integration_task_deploy"]
+        assert result["status"] == "success" and result["jobid"] in upstream.tasks
+
+
+def test_ledger_skips_unchanged_and_patches_changes():
+    """测试未变化的任务不再部署，变化的任务只提交差异"""
+    from datalake.services.deploy_ledger import IdempotentDeployer, SQLiteDeployLedger
+
+    with tempfile.TemporaryDirectory() as directory, StubUpstream() as upstream:
+        ledger = SQLiteDeployLedger(os.path.join(directory, "ledger.db"))
+        with DeployClient(upstream.url) as client:
+            deployer = IdempotentDeployer(client, ledger)
+            first = deployer.deploy_many(_tasks(3))
+            assert [result["action"] for result in first] == ["created"] * 3
+
+            # 重新生成的任务只有创建时间不同
+            again = _tasks(3)
+            for task in again:
+                task["task_info"]["create_time"] = task["task_info"]["update_time"] = "2030-01-01 00:00:00"
+            again[1]["advanced_settings"]["parallelism"] = 8
+            second = deployer.deploy_many(again)
+            assert [result["action"] for result in second] == ["skipped", "updated", "skipped"]
+            assert [result["jobid"] for result in second] == [result["jobid"] for result in first]
+            assert upstream.patches == [(first[1]["jobid"], {"advanced_settings": {"parallelism": 8}})]
+            assert upstream.tasks[first[1]["jobid"]]["advanced_settings"]["parallelism"] == 8
+
+            # 上游已删除的任务重新部署
+            del upstream.tasks[first[2]["jobid"]]
+            again[2]["tags"].append("owner:etl")
+            third = IdempotentDeployer(client, SQLiteDeployLedger(ledger.path)).deploy_many(again)
+            assert [result["action"] for result in third] == ["skipped", "skipped", "created"]
+            assert third[2]["jobid"] in upstream.tasks
+        assert upstream.requests == {"batch": 2, "patch": 2}
+
+
+def test_create_is_not_retried_after_it_may_have_been_applied():
+    """测试新建任务只在请求确定未被处理时重试，更新任务的暂时性失败照常重试"""
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        if request.method == "POST" and len(calls) == 1:
+            raise httpx.ReadTimeout("response lost", request=request)
+        if request.method == "POST" and len(calls) == 2:
+            return httpx.Response(500)
+        if request.method == "POST":
+            return httpx.Response(503) if len(calls) == 3 else httpx.Response(200, json={"jobid": "J1"})
+        return httpx.Response(502) if calls.count("PATCH") == 1 else httpx.Response(200, json={"jobid": "J1"})
+
+    with DeployClient("http://upstream", batch_size=0, backoff_base=0,
+                      transport=httpx.MockTransport(handler)) as client:
+        assert client.deploy_many(_tasks(1))[0]["status"] == "failed"
+        assert client.deploy_many(_tasks(1))[0]["status"] == "failed"
+        assert client.deploy_many(_tasks(1))[0]["jobid"] == "J1"
+        assert client.update("J1", {"tags": []})["jobid"] == "J1"
+    assert calls == ["POST", "POST", "POST", "POST", "PATCH", "PATCH"]
+
+
+def test_bulk_deploy_is_not_retried_by_node_policy():
+    """测试超过节点策略超时的批量部署不会被重试而重复部署"""
+    policy = resolve_policy(integration_task_deploy_metadata.policy, {"timeout": 1, "backoff_base": 0})
+    node = apply_policy("integration_task_deploy", integration_task_deploy_node, policy, CircuitBreakerRegistry(),
+                        policy_override=integration_task_deploy_metadata.policy_override)
+    with tempfile.TemporaryDirectory() as directory, StubUpstream(latency=0.4, batch=False) as upstream:
+        state = {
+            "request_id": "bulk-timeout",
+            "source_data": {
+                "tasks": [(f"a.b.slow{index}", f"h.o.slow{index}", MAPPING) for index in range(40)],
+                "output_path": os.path.join(directory, "tasks.ndjson"),
+                "deploy_url": upstream.url
+            },
+            "results": {},
+            "workflow_config": {"node_configs": {"integration_task_deploy": {"max_connections": 8}}}
+        }
+        result = node(integration_task_generate_node(state))["results"]["integration_task_deploy"]
+        assert result["status"] == "success" and result["attempts"] == 1
+        assert len(upstream.tasks) == 40
+
+
+def test_remote_deploy_is_not_retried_by_node_policy():
+    """测试部署单个任务时响应丢失，节点不会重试而再次 POST 同一任务"""
+    from datalake.services import deploy_client
+
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        raise httpx.ReadTimeout("response lost", request=request)
+
+    url = "http://lost-response"
+    policy = resolve_policy(integration_task_deploy_metadata.policy, {"backoff_base": 0})
+    node = apply_policy("integration_task_deploy", integration_task_deploy_node, policy, CircuitBreakerRegistry(),
+                        policy_override=integration_task_deploy_metadata.policy_override)
+    deploy_client._clients[url] = DeployClient(url, batch_size=0, backoff_base=0,
+                                               transport=httpx.MockTransport(handler))
+    try:
+        state = {
+            "request_id": "lost-response",
+            "source_data": {"deploy_url": url, "upstream_api_json": _tasks(1)[0]},
+            "results": {},
+            "workflow_config": {"node_configs": {"integration_task_deploy": {"idempotent": False}}}
+        }
+        result = node(state)["results"]["integration_task_deploy"]
+    finally:
+        deploy_client._clients.pop(url).close()
+    assert result["status"] == "failed" and result["attempts"] == 1
+    assert calls == ["POST"]
+
+
+def test_ledger_records_each_chunk():
+    """测试每组任务部署后立即记入台账，中途中断后再次部署只新建剩余的任务"""
+    from datalake.services.deploy_ledger import IdempotentDeployer, InMemoryDeployLedger
+
+    with StubUpstream() as upstream, DeployClient(upstream.url, batch_size=5, max_connections=1) as client:
+        ledger = InMemoryDeployLedger()
+        tasks = _tasks(20)
+        original = client._deploy_batch
+        sent = []
+
+        def interrupted(batch):
+            if len(sent) == 2:
+                raise KeyboardInterrupt
+            sent.append(batch)
+            return original(batch)
+
+        client._deploy_batch = interrupted
+        try:
+            IdempotentDeployer(client, ledger).deploy_many(tasks)
+            assert False, "expected KeyboardInterrupt"
+        except KeyboardInterrupt:
+            pass
+        client._deploy_batch = original
+        results = IdempotentDeployer(client, ledger).deploy_many(tasks)
+    assert [result["action"] for result in results] == ["skipped"] * 10 + ["created"] * 10
+    assert len(upstream.tasks) == 20
+
+
+def test_ledger_deduplicates_tasks_in_one_batch():
+    """测试同一批中同名的任务只部署一次，结果相同"""
+    from datalake.services.deploy_ledger import IdempotentDeployer, InMemoryDeployLedger
+
+    with StubUpstream() as upstream, DeployClient(upstream.url) as client:
+        tasks = _tasks(2) + _tasks(1)
+        results = IdempotentDeployer(client, InMemoryDeployLedger()).deploy_many(tasks)
+    assert [result["action"] for result in results] == ["created"] * 3
+    assert results[0]["jobid"] == results[2]["jobid"] != results[1]["jobid"]
+    assert len(upstream.tasks) == 2
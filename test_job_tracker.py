@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+测试部署任务状态跟踪：批量轮询与退避、webhook 回调，以及等待部署任务的工作流挂起与自动恢复
+"""
+
+import os
+import tempfile
+import threading
+import time
+
+from langgraph.checkpoint.memory import MemorySaver
+
+from datalake.core.workflow import WorkflowManager, WorkflowConfig, LakeIngestionRequest
+from datalake.core.workflow.registry import InMemoryWorkflowRegistry
+from datalake.core.workflow.waits import SQLiteWaitStore
+from datalake.services.deploy_client import DeployClient
+from datalake.services.deploy_stub import StubUpstream
+from datalake.services.job_tracker import JobStatusTracker, close_job_trackers
+
+
+def _deploy(client, count):
+    tasks = [{"task_info": {"task_name": f"t{index}"}} for index in range(count)]
+    return [result["jobid"] for result in client.deploy_many(tasks)]
+
+
+def test_batched_polling_with_backoff():
+    """测试所有在等的任务合并为批量查询，全部结束后回调一次"""
+    done = threading.Event()
+    received = {}
+
+    def on_done(statuses):
+        received.update(statuses)
+        done.set()
+
+    with StubUpstream(job_duration=None) as upstream, DeployClient(upstream.url) as client:
+        jobids = _deploy(client, 600)
+        tracker = JobStatusTracker(client.job_statuses, min_interval=0.02, max_interval=0.1, batch_size=500)
+        try:
+            tracker.watch(jobids, on_done)
+            time.sleep(0.5)
+            assert not done.is_set()
+            # 状态无变化时轮询间隔退避到上限
+            assert tracker.interval == 0.1
+            # 600 个任务每次轮询只需 2 个请求（可能有一次轮询正在进行）
+            polls = tracker.polls
+            assert 2 * polls <= upstream.requests["status"] <= 2 * (polls + 1)
+
+            for jobid in jobids[:-1]:
+                upstream.finish(jobid)
+            upstream.finish(jobids[-1], "failed", "OOM")
+            assert done.wait(2)
+        finally:
+            tracker.close()
+    assert len(received) == 600
+    assert received[jobids[-1]] == {"status": "failed", "message": "OOM"}
+    assert tracker.pending() == []
+
+
+def test_webhook_notify_finishes_wait():
+    """测试 webhook 推送的终态无需等到下次轮询"""
+    done = threading.Event()
+    fetch = lambda jobids: {jobid: {"status": "running"} for jobid in jobids}
+    tracker = JobStatusTracker(fetch, min_interval=10, max_interval=10)
+    try:
+        tracker.watch(["JOB-1", "JOB-2"], lambda statuses: done.set())
+        assert tracker.notify("JOB-1", {"status": "succeeded"}) is True
+        assert tracker.notify("JOB-3", {"status": "succeeded"}) is False
+        assert not done.is_set()
+        tracker.notify("JOB-2", {"status": "cancelled"})
+        assert done.wait(1)
+    finally:
+        tracker.close()
+
+
+DEPLOY_AND_WAIT = dict(
+    name="deploy_and_wait",
+    description="部署后等待任务结束",
+    nodes=["integration_task_generate", "integration_task_deploy", "wait_gateway"],
+    edges=[
+        {"start": "integration_task_generate", "end": "integration_task_deploy"},
+        {"start": "integration_task_deploy", "end": "wait_gateway"}
+    ],
+    node_configs={
+        "integration_task_deploy": {"idempotent": False},
+        "wait_gateway": {"type": "job_status"}
+    }
+)
+
+
+def _source_data(url, table="wait_t"):
+    return {
+        "source_db": "a", "source_schema": "b", "source_table": table,
+        "target_db": "h", "target_schema": "o", "target_table": table,
+        "field_mapping": [{"source": "id", "target": "id"}],
+        "deploy_url": url
+    }
+
+
+def _wait_until_done(manager, request_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while manager.get_run(request_id)["status"] == "waiting" and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return manager.get_run(request_id)
+
+
+def test_job_wait_survives_restart():
+    """测试等待部署任务的挂起记录到等待存储，重启后 recover 重新跟踪，结束的执行不再保存在 runs 中"""
+    with tempfile.TemporaryDirectory() as directory, StubUpstream(job_duration=None) as upstream:
+        path = os.path.join(directory, "waits.db")
+        checkpointer, registry = MemorySaver(), InMemoryWorkflowRegistry()
+        manager = WorkflowManager(checkpointer=checkpointer, registry=registry, wait_store=SQLiteWaitStore(path))
+        manager.register_workflow(WorkflowConfig(**DEPLOY_AND_WAIT))
+        try:
+            result = manager.execute_workflow(LakeIngestionRequest(
+                workflow_name="deploy_and_wait", source_data=_source_data(upstream.url, "restart_t"), dedupe=False))
+            assert manager.waits.store.find(request_id=result["request_id"])[0].wait_type == "job_status"
+            manager.close()
+            # 模拟重启：旧进程的跟踪器不再存在
+            close_job_trackers()
+
+            restarted = WorkflowManager(checkpointer=checkpointer, registry=registry, wait_store=SQLiteWaitStore(path))
+            restarted.recover()
+            upstream.finish(result["results"]["integration_task_deploy"]["jobid"])
+            assert _wait_until_done(restarted, result["request_id"])["status"] == "completed"
+            assert result["request_id"] not in restarted.runs
+            assert restarted.waits.store.count() == 0
+            restarted.close()
+        finally:
+            close_job_trackers()
+
+
+def test_workflow_suspends_until_jobs_finish():
+    """测试工作流在等待网关处挂起后立即返回，部署任务结束后自动恢复执行"""
+    manager = WorkflowManager()
+    manager.register_workflow(WorkflowConfig(
+        name="deploy_and_wait",
+        description="部署后等待任务结束",
+        nodes=["integration_task_generate", "integration_task_deploy", "wait_gateway"],
+        edges=[
+            {"start": "integration_task_generate", "end": "integration_task_deploy"},
+            {"start": "integration_task_deploy", "end": "wait_gateway"}
+        ],
+        node_configs={
+            "integration_task_deploy": {"idempotent": False},
+            "wait_gateway": {"type": "job_status"}
+        }
+    ))
+    try:
+        with StubUpstream(job_duration=None) as upstream:
+            source_data = {
+                "source_db": "a", "source_schema": "b", "source_table": "wait_t",
+                "target_db": "h", "target_schema": "o", "target_table": "wait_t",
+                "field_mapping": [{"source": "id", "target": "id"}],
+                "deploy_url": upstream.url
+            }
+            result = manager.execute_workflow(LakeIngestionRequest(
+                workflow_name="deploy_and_wait", source_data=source_data, dedupe=False))
+            assert result["status"] == "waiting"
+            jobid = result["results"]["integration_task_deploy"]["jobid"]
+            assert result["waiting_for"] == [{"type": "job_status", "jobids": [jobid], "deploy_url": upstream.url}]
+            assert manager.get_run(result["request_id"])["status"] == "waiting"
+
+            upstream.finish(jobid)
+            deadline = time.monotonic() + 5
+            while manager.get_run(result["request_id"])["status"] == "waiting" and time.monotonic() < deadline:
+                time.sleep(0.05)
+            run = manager.get_run(result["request_id"])
+            assert run["status"] == "completed"
+            assert run["results"]["wait_gateway"]["job_statuses"] == {jobid: {"status": "succeeded", "message": ""}}
+            # 部署节点没有重新执行
+            assert list(upstream.tasks) == [jobid]
+    finally:
+        close_job_trackers()
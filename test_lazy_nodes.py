@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+测试节点模块与智能体的惰性加载
+"""
+
+import subprocess
+import sys
+
+from datalake.core.nodes import NODE_MAPPING, register_node_module
+
+
+def _loaded_after_import(module: str, probe: str) -> bool:
+    """在新解释器中导入 module，返回 probe 模块是否随之被加载"""
+    code = f"import sys, {module}; print({probe!r} in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    return output.strip() == "True"
+
+
+def test_startup_does_not_load_llm_clients():
+    """测试导入服务、节点包与智能体模块时不加载 langchain_openai 与节点模块"""
+    assert not _loaded_after_import("datalake.server", "langchain_openai")
+    assert not _loaded_after_import("datalake.core.nodes", "datalake.core.nodes.sql_generate")
+    assert not _loaded_after_import("datalake.core.agents.validation_agent", "langchain_openai")
+
+
+def test_node_resolved_on_first_use():
+    """测试节点名称无需导入即可枚举，读取时才导入模块并注册元数据"""
+    code = (
+        "import sys\n"
+        "from datalake.core.nodes import NODE_MAPPING\n"
+        "assert 'sql_execute' in NODE_MAPPING and 'sql_execute' in list(NODE_MAPPING)\n"
+        "assert 'datalake.core.nodes.sql_execute' not in sys.modules\n"
+        "node = NODE_MAPPING['sql_execute']\n"
+        "from datalake.core.workflow.models import node_registry\n"
+        "assert node.__name__ == 'sql_execute_node' and 'sql_execute' in node_registry\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_register_node_module_and_overrides():
+    """测试以模块路径声明节点，以及直接赋值覆盖"""
+    register_node_module("lazy_example", "datalake.core.nodes.example_node", "example_node")
+    try:
+        assert NODE_MAPPING["lazy_example"].__name__ == "example_node"
+
+        def override(state):
+            return state
+
+        NODE_MAPPING["lazy_example"] = override
+        assert NODE_MAPPING["lazy_example"] is override
+    finally:
+        del NODE_MAPPING["lazy_example"]
+    assert "lazy_example" not in NODE_MAPPING
+
+
+def test_star_import_covers_lazy_exports():
+    """测试 __all__ 包含全部按需导入的名称，from datalake.core.nodes import * 可以拿到每个节点"""
+    import datalake.core.nodes as nodes
+
+    assert set(nodes._EXPORTS) <= set(nodes.__all__)
+    namespace = {}
+    exec("from datalake.core.nodes import *", namespace)
+    assert namespace["wait_gateway_metadata"].name == "wait_gateway"
+
+
+if __name__ == "__main__":
+    test_startup_does_not_load_llm_clients()
+    test_node_resolved_on_first_use()
+    test_register_node_module_and_overrides()
+    test_star_import_covers_lazy_exports()
+    print("All lazy loading tests passed!")
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+测试结构化日志：JSON输出、大负载截断、按模块级别与 request_id 关联
+"""
+
+import io
+import json
+
+from datalake.core.workflow import WorkflowManager, WorkflowConfig, LakeIngestionRequest
+from datalake.core.nodes import NODE_MAPPING
+from datalake.utils.log import configure_logging, shutdown_logging, get_logger, bind_request_id
+
+
+def _capture(**kwargs):
+    """配置日志输出到内存流，返回读取已输出日志的函数"""
+    stream = io.StringIO()
+    configure_logging(stream=stream, force=True, json_format=True, **kwargs)
+
+    def read():
+        shutdown_logging()
+        return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    return read
+
+
+def _restore():
+    configure_logging(force=True)
+
+
+def test_json_output_and_truncation():
+    """测试日志为一行JSON，超长消息被截断"""
+    read = _capture(level="INFO", max_payload=50)
+    try:
+        logger = get_logger("datalake.test_logging")
+        logger.info("payload: %s", "x" * 500, extra={"node": "sql_generate"})
+        entries = read()
+    finally:
+        _restore()
+
+    assert len(entries) == 1
+    entry = entries[0]
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "datalake.test_logging"
+    assert entry["node"] == "sql_generate"
+    assert entry["message"].endswith("<truncated 459 chars>")
+    assert len(entry["message"]) < 100
+
+
+def test_disabled_level_skips_formatting():
+    """测试级别未开启时不格式化参数，按模块级别可单独开启"""
+
+    class Expensive:
+        formatted = 0
+
+        def __str__(self):
+            Expensive.formatted += 1
+            return "expensive"
+
+    read = _capture(level="INFO", module_levels={"datalake.verbose": "DEBUG"})
+    try:
+        get_logger("datalake.quiet").debug("blob: %s", Expensive())
+        get_logger("datalake.verbose").debug("blob: %s", Expensive())
+        entries = read()
+    finally:
+        _restore()
+
+    assert [entry["logger"] for entry in entries] == ["datalake.verbose"]
+    assert Expensive.formatted == 1
+
+
+def test_request_id_correlation():
+    """测试节点日志自动带上所属请求的 request_id"""
+
+    def logging_node(state):
+        get_logger("datalake.test_logging").info("inside node")
+        return {**state, "results": {**state.get("results", {}), "logging_node": {"status": "success"}}}
+
+    NODE_MAPPING["logging_node"] = logging_node
+    read = _capture(level="INFO")
+    try:
+        manager = WorkflowManager()
+        manager.register_workflow(WorkflowConfig(
+            name="logging_wf", description="logging", nodes=["logging_node"], edges=[], node_configs={}
+        ))
+        result = manager.execute_workflow(LakeIngestionRequest(workflow_name="logging_wf", source_data={}))
+        with bind_request_id("explicit"):
+            get_logger("datalake.test_logging").info("bound")
+        entries = read()
+    finally:
+        _restore()
+        NODE_MAPPING.pop("logging_node", None)
+
+    node_entries = [entry for entry in entries if entry["message"] == "inside node"]
+    assert node_entries and node_entries[0]["request_id"] == result["request_id"]
+    assert [entry["request_id"] for entry in entries if entry["message"] == "bound"] == ["explicit"]
+
+
+if __name__ == "__main__":
+    test_json_output_and_truncation()
+    test_disabled_level_skips_formatting()
+    test_request_id_correlation()
+    print("All logging tests passed!")
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+测试纯节点（cacheable=True）的结果缓存
+"""
+
+from datalake.core.workflow import WorkflowManager, WorkflowConfig, LakeIngestionRequest
+from datalake.core.nodes.integration_task_generate import _task_cache_key, integration_task_generate_node
+from datalake.core.workflow.node_cache import InMemoryNodeCache, memoize_node
+
+
+def make_counting_node(node_name, calls, status="success"):
+    """构造记录调用次数的节点"""
+    def node(state):
+        calls.append(node_name)
+        return {
+            **state,
+            "results": {**state.get("results", {}), node_name: {"status": status, "value": state["source_data"]["x"]}},
+            "current_node": node_name
+        }
+    return node
+
+
+def test_memoize_skips_recomputation():
+    """测试相同输入的第二次调用命中缓存"""
+    calls = []
+    node = memoize_node("demo", make_counting_node("demo", calls), InMemoryNodeCache(),
+                        cache_key=lambda state: state["source_data"]["x"])
+
+    first = node({"source_data": {"x": 1}, "results": {}})
+    second = node({"source_data": {"x": 1}, "results": {}})
+    third = node({"source_data": {"x": 2}, "results": {}})
+
+    assert calls == ["demo", "demo"]
+    assert "cache_hit" not in first["results"]["demo"]
+    assert second["results"]["demo"] == {"status": "success", "value": 1, "cache_hit": True}
+    assert third["results"]["demo"]["value"] == 2
+
+
+def test_memoize_bypass_and_failures():
+    """测试 cache_key 返回 None 时不缓存，失败结果不缓存"""
+    calls = []
+    bypass = memoize_node("demo", make_counting_node("demo", calls), InMemoryNodeCache(), cache_key=lambda state: None)
+    bypass({"source_data": {"x": 1}})
+    bypass({"source_data": {"x": 1}})
+    assert len(calls) == 2
+
+    calls.clear()
+    failing = memoize_node("demo", make_counting_node("demo", calls, status="failed"), InMemoryNodeCache(),
+                           cache_key=lambda state: 1)
+    failing({"source_data": {"x": 1}})
+    failing({"source_data": {"x": 1}})
+    assert len(calls) == 2
+
+
+def test_task_generate_cache_key_includes_overrides():
+    """测试只有 overrides 不同的两次任务生成不会命中同一个缓存"""
+    node = memoize_node("integration_task_generate", integration_task_generate_node, InMemoryNodeCache(),
+                        cache_key=_task_cache_key)
+    source_data = {"source_db": "a", "source_table": "t", "target_db": "h", "target_table": "t"}
+    plain = node({"source_data": source_data, "results": {}})["results"]["integration_task_generate"]
+    overridden = node({"source_data": {**source_data, "overrides": {"job_config": {"parallelism": 8}}},
+                       "results": {}})["results"]["integration_task_generate"]
+    assert "cache_hit" not in overridden
+    assert overridden["upstream_api_json"]["job_config"]["parallelism"] == 8
+    assert overridden["upstream_api_json"] != plain["upstream_api_json"]
+
+
+def test_lru_eviction():
+    """测试LRU淘汰"""
+    cache = InMemoryNodeCache(max_entries=2)
+    cache.set("a", {"v": 1})
+    cache.set("b", {"v": 2})
+    cache.get("a")
+    cache.set("c", {"v": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1}
+
+
+def test_workflow_rerun_marks_cache_hits():
+    """测试工作流重跑时纯节点命中缓存并在结果中标记"""
+    manager = WorkflowManager()
+    manager.register_workflow(WorkflowConfig(
+        name="cache_test_workflow",
+        description="缓存测试",
+        nodes=["db_type_query", "table_field_query"],
+        edges=[{"start": "db_type_query", "end": "table_field_query"}],
+        node_configs={}
+    ))
+    request = dict(workflow_name="cache_test_workflow",
+                   source_data={"source_db": "mysql_db", "source_schema": "s", "source_table": "source_table_1"},
+                   dedupe=False)
+
+    first = manager.execute_workflow(LakeIngestionRequest(**request))
+    second = manager.execute_workflow(LakeIngestionRequest(**request))
+
+    assert first["cache_hits"] == []
+    assert sorted(second["cache_hits"]) == ["db_type_query", "table_field_query"]
+    assert second["results"]["db_type_query"]["db_type"] == "MySQL"
+
+
+if __name__ == "__main__":
+    test_memoize_skips_recomputation()
+    test_memoize_bypass_and_failures()
+    test_lru_eviction()
+    test_workflow_rerun_marks_cache_hits()
+    print("✅ 节点缓存测试通过")
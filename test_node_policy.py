@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+测试节点执行策略：重试、超时与熔断
+"""
+
+import time
+
+from datalake.core.workflow import WorkflowManager, WorkflowConfig, LakeIngestionRequest
+from datalake.core.workflow.node_policy import NodePolicy, CircuitBreakerRegistry, apply_policy, resolve_policy
+from datalake.core.nodes import NODE_MAPPING
+
+
+def make_flaky_node(fail_times, mode="status", delay=0.0):
+    """构造前 fail_times 次失败的节点，mode 为 status（返回failed）或 raise（抛出异常）"""
+    calls = []
+
+    def node(state):
+        calls.append(1)
+        time.sleep(delay)
+        failed = len(calls) <= fail_times
+        if failed and mode == "raise":
+            raise RuntimeError("upstream error")
+        return {**state, "results": {"flaky": {"status": "failed" if failed else "success"}}}
+    return node, calls
+
+
+def test_retry_until_success():
+    """测试失败后重试直至成功，并记录重试次数"""
+    node, calls = make_flaky_node(2, mode="raise")
+    guarded = apply_policy("flaky", node, NodePolicy(max_attempts=3, backoff_base=0), CircuitBreakerRegistry())
+    result = guarded({"results": {}})["results"]["flaky"]
+
+    assert len(calls) == 3
+    assert result["status"] == "success"
+    assert result["attempts"] == 3
+    assert result["retries"] == 2
+
+
+def test_exhausted_attempts_return_failed():
+    """测试重试耗尽后返回 failed 而不是抛出异常"""
+    node, calls = make_flaky_node(10, mode="status")
+    guarded = apply_policy("flaky", node, NodePolicy(max_attempts=2, backoff_base=0), CircuitBreakerRegistry())
+    result = guarded({"results": {}})["results"]["flaky"]
+
+    assert len(calls) == 2
+    assert result["status"] == "failed"
+    assert result["retries"] == 1
+
+
+def test_timeout_is_recorded():
+    """测试硬超时"""
+    node, calls = make_flaky_node(0, delay=0.5)
+    guarded = apply_policy("flaky", node, NodePolicy(max_attempts=2, backoff_base=0, timeout=0.05),
+                           CircuitBreakerRegistry())
+    start_time = time.perf_counter()
+    result = guarded({"results": {}})["results"]["flaky"]
+
+    assert time.perf_counter() - start_time < 0.4
+    assert result["status"] == "failed"
+    assert result["timeouts"] == 2
+
+
+def test_circuit_breaker_opens_per_target():
+    """测试同一下游目标连续失败后熔断，其他目标不受影响"""
+    breakers = CircuitBreakerRegistry()
+    policy = NodePolicy(backoff_base=0, circuit_breaker={"failure_threshold": 2, "reset_timeout": 60})
+    node, calls = make_flaky_node(100, mode="raise")
+    guarded = apply_policy("flaky", node, policy, breakers, circuit_target=lambda state: state["target"])
+
+    for _ in range(3):
+        result = guarded({"target": "api_a", "results": {}})["results"]["flaky"]
+    assert len(calls) == 2
+    assert result["circuit_open"] is True
+    assert breakers.snapshot()["api_a"]["state"] == "open"
+
+    guarded({"target": "api_b", "results": {}})
+    assert len(calls) == 3
+
+
+def test_resolve_policy_overrides():
+    """测试 node_configs 中的策略覆盖元数据声明"""
+    policy = resolve_policy({"max_attempts": 3, "timeout": 10}, {"timeout": 1})
+    assert policy.max_attempts == 3
+    assert policy.timeout == 1
+    assert resolve_policy(None, None) is None
+
+
+def test_policy_from_node_configs():
+    """测试工作流 node_configs 中声明的策略生效"""
+    node, calls = make_flaky_node(1, mode="raise")
+
+    def policy_node(state):
+        new_state = node(state)
+        return {**new_state, "results": {"policy_node": new_state["results"]["flaky"]}}
+
+    NODE_MAPPING["policy_node"] = policy_node
+    try:
+        manager = WorkflowManager()
+        manager.register_workflow(WorkflowConfig(
+            name="policy_test_workflow", description="策略测试", nodes=["policy_node"], edges=[],
+            node_configs={"policy_node": {"policy": {"max_attempts": 2, "backoff_base": 0}}}
+        ))
+        result = manager.execute_workflow(LakeIngestionRequest(workflow_name="policy_test_workflow", source_data={}))
+        assert result["results"]["policy_node"]["status"] == "success"
+        assert result["results"]["policy_node"]["retries"] == 1
+    finally:
+        NODE_MAPPING.pop("policy_node", None)
+
+
+if __name__ == "__main__":
+    test_retry_until_success()
+    test_exhausted_attempts_return_failed()
+    test_timeout_is_recorded()
+    test_circuit_breaker_opens_per_target()
+    test_resolve_policy_overrides()
+    test_policy_from_node_configs()
+    print("✅ 节点执行策略测试通过")
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+测试多进程分批处理：结果与单进程路径完全一致，并记录每批耗时
+"""
+
+import numpy as np
+
+from datalake.core.nodes.data_processing import data_processing_node
+from datalake.core.processing.engine import ProcessingEngine, iter_batches
+
+COLUMNS = ["a", "b"]
+
+
+def _data():
+    rng = np.random.default_rng(3)
+    matrix = rng.normal(1.0, 4.0, size=(6001, len(COLUMNS)))
+    matrix[::31, 0] = np.nan
+    return {column: matrix[:, index] for index, column in enumerate(COLUMNS)}
+
+
+def _run(algorithm, parameters, parallelism):
+    data = _data()
+    outputs = []
+    report = ProcessingEngine(algorithm, parameters, COLUMNS, parallelism=parallelism).run(
+        lambda: iter_batches(data, 700), sink=lambda matrix: outputs.append(matrix.copy())
+    )
+    return report, np.vstack(outputs)
+
+
+def test_parallel_matches_single_process():
+    """测试各算法在进程池中的结果与单进程一致"""
+    for algorithm, parameters in [("z_score", {}), ("min_max", {}), ("batch_normalization", {"momentum": 0.8})]:
+        single_report, single_output = _run(algorithm, parameters, 1)
+        parallel_report, parallel_output = _run(algorithm, parameters, 2)
+        assert np.array_equal(single_output, parallel_output, equal_nan=True)
+        assert single_report["stats"] == parallel_report["stats"]
+        assert single_report.get("running_mean") == parallel_report.get("running_mean")
+        assert parallel_report["parallelism"] == 2
+        phases = [chunk["phase"] for chunk in parallel_report["chunks"]]
+        assert phases.count("transform") == parallel_report["batches"] == 9
+
+
+def test_node_reports_chunk_breakdown():
+    """测试节点按 parallelism 执行并返回每批耗时"""
+    state = {
+        "request_id": "parallel",
+        "results": {
+            "input_data": {
+                "source_config": {"type": "file", "connection_string": "inline", "batch_size": 2},
+                "processing_config": {"algorithm": "feature_scaling", "parameters": {"method": "z-score"},
+                                      "parallelism": 2},
+                "target_columns": ["x"],
+                "data": {"x": [1.0, 2.0, 3.0, 4.0, 5.0]}
+            }
+        }
+    }
+    result = data_processing_node(state)["results"]["data_processing"]
+    assert result["status"] == "success"
+    assert result["parallelism"] == 2
+    assert [chunk["rows"] for chunk in result["chunks"] if chunk["phase"] == "transform"] == [2, 2, 1]
+    assert result["processing_result"]["processed_rows"] == 5
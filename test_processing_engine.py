@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+测试向量化数据处理引擎：流式统计量与一次性计算一致，各算法结果正确
+"""
+
+import numpy as np
+
+from datalake.core.processing.engine import ColumnStats, ProcessingEngine, iter_batches, resolve_algorithm
+
+COLUMNS = ["a", "b", "c"]
+
+
+def _data(rows=5003, seed=7):
+    rng = np.random.default_rng(seed)
+    matrix = rng.normal(10.0, 3.0, size=(rows, len(COLUMNS)))
+    matrix[::97, 1] = np.nan
+    return matrix
+
+
+def _run(algorithm, parameters, matrix, batch_size=512):
+    outputs = []
+    engine = ProcessingEngine(algorithm, parameters, COLUMNS)
+    data = {column: matrix[:, index] for index, column in enumerate(COLUMNS)}
+    report = engine.run(lambda: iter_batches(data, batch_size), sink=outputs.append)
+    return report, np.vstack(outputs)
+
+
+def test_streaming_stats_match_numpy():
+    """测试分批合并的统计量与整体计算一致"""
+    matrix = _data()
+    stats = ColumnStats(len(COLUMNS))
+    for start in range(0, len(matrix), 700):
+        stats.update(matrix[start:start + 700])
+    np.testing.assert_allclose(stats.mean, np.nanmean(matrix, axis=0))
+    np.testing.assert_allclose(stats.std(), np.nanstd(matrix, axis=0))
+    np.testing.assert_allclose(stats.min, np.nanmin(matrix, axis=0))
+    np.testing.assert_allclose(stats.max, np.nanmax(matrix, axis=0))
+    assert stats.count.tolist() == np.sum(~np.isnan(matrix), axis=0).tolist()
+
+
+def test_min_max_and_z_score():
+    """测试 min-max 与 z-score 使用全局统计量"""
+    matrix = _data()
+    report, output = _run("feature_scaling", {"method": "min-max"}, matrix)
+    assert report["passes"] == 2 and report["rows"] == len(matrix)
+    np.testing.assert_allclose(np.nanmin(output, axis=0), 0.0, atol=1e-12)
+    np.testing.assert_allclose(np.nanmax(output, axis=0), 1.0)
+    assert np.isnan(output[0, 1])
+
+    _, output = _run("z_score", {}, matrix)
+    np.testing.assert_allclose(np.nanmean(output, axis=0), 0.0, atol=1e-9)
+    np.testing.assert_allclose(np.nanstd(output, axis=0), 1.0)
+
+
+def test_log_and_batch_normalization():
+    """测试对数变换与批归一化的滑动统计量"""
+    matrix = np.abs(_data())
+    _, output = _run("log_scaling", {}, matrix)
+    np.testing.assert_allclose(output, np.log1p(matrix))
+
+    report, output = _run("batch_normalization", {"momentum": 0.5, "epsilon": 0.0}, matrix[:1024, :], batch_size=512)
+    first, second = matrix[:512], matrix[512:1024]
+    np.testing.assert_allclose(output[:512], (first - np.nanmean(first, 0)) / np.nanstd(first, 0))
+    expected = 0.5 * np.nanmean(first, 0) + 0.5 * np.nanmean(second, 0)
+    np.testing.assert_allclose(list(report["running_mean"].values()), expected)
+
+
+def test_unknown_algorithm():
+    """测试不支持的算法"""
+    assert resolve_algorithm("feature_scaling", {"method": "z-score"}) == "z_score"
+    try:
+        ProcessingEngine("pca", {}, COLUMNS)
+        assert False, "unknown algorithm should be rejected"
+    except ValueError:
+        pass
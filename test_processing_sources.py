@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+测试按批读取的数据源：SQLite、CSV、Parquet、分页接口，以及数据处理节点直接读取数据源
+"""
+
+import os
+import sqlite3
+import tempfile
+from types import SimpleNamespace
+
+import pytest
+
+from datalake.core.nodes.data_processing import data_processing_node
+from datalake.core.processing.sources import (
+    CsvSource, DatabaseSource, HttpApiSource, open_source, paginated_stub
+)
+
+
+def _sqlite(directory, rows=2500):
+    path = os.path.join(directory, "source.db")
+    with sqlite3.connect(path) as connection:
+        connection.execute("CREATE TABLE metrics (id INTEGER, value REAL, label TEXT)")
+        connection.executemany("INSERT INTO metrics VALUES (?, ?, ?)", [(i, i * 0.5, f"l{i}") for i in range(rows)])
+    connection.close()
+    return path
+
+
+def test_database_source_fetchmany():
+    """测试数据库按 batch_size 分批读取并只保留目标列"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = _sqlite(directory)
+        source = DatabaseSource(f"sqlite:///{path}", "SELECT * FROM metrics ORDER BY id", 1000, columns=["value"])
+        batches = list(source.batches())
+        assert [len(batch["value"]) for batch in batches] == [1000, 1000, 500]
+        assert list(batches[0]) == ["value"]
+        assert batches[2]["value"][-1] == 2499 * 0.5
+
+        # 每次调用都从头读取
+        assert sum(len(batch["value"]) for batch in source.batches()) == 2500
+
+
+def test_csv_source_memory_mapped():
+    """测试 CSV 分批读取，空字段为 None"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "data.csv")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("a,b\n1,2\n3,\n5,6\n")
+        batches = list(CsvSource(path, batch_size=2).batches())
+        assert batches == [{"a": ["1", "3"], "b": ["2", None]}, {"a": ["5"], "b": ["6"]}]
+
+        try:
+            list(CsvSource(path, columns=["c"]).batches())
+            assert False, "missing column should be rejected"
+        except ValueError:
+            pass
+
+
+def test_parquet_source():
+    """测试 Parquet 分批读取（需要 pyarrow）"""
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "data.parquet")
+        pq.write_table(pa.table({"x": list(range(10)), "y": [float(i) for i in range(10)]}), path)
+        config = SimpleNamespace(type="file", connection_string=path, query=None, batch_size=4)
+        batches = list(open_source(config, columns=["y"]).batches())
+        assert [len(batch["y"]) for batch in batches] == [4, 4, 2]
+
+
+def test_paginated_api_source():
+    """测试分页接口逐页读取"""
+    records = [{"id": i, "value": i * 2} for i in range(7)]
+    source = HttpApiSource("http://stub/records", batch_size=3, columns=["value"], transport=paginated_stub(records))
+    batches = list(source.batches())
+    assert [batch["value"] for batch in batches] == [[0, 2, 4], [6, 8, 10], [12]]
+
+
+def test_node_reads_database_source():
+    """测试数据处理节点直接从数据库读取"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = _sqlite(directory, rows=101)
+        state = {
+            "request_id": "source",
+            "results": {
+                "input_data": {
+                    "source_config": {"type": "database", "connection_string": f"sqlite:///{path}",
+                                      "query": "SELECT id, value FROM metrics", "batch_size": 25},
+                    "processing_config": {"algorithm": "feature_scaling", "parameters": {"method": "min-max"}},
+                    "target_columns": ["value"]
+                }
+            }
+        }
+        result = data_processing_node(state)["results"]["data_processing"]
+        assert result["status"] == "success"
+        assert result["batches"] == 5
+        assert result["processing_result"]["processed_rows"] == 101
+        assert result["processing_result"]["metrics"]["value_max"] == 50.0
+
+        state["results"]["input_data"]["source_config"]["connection_string"] = "postgresql://user@host/db"
+        assert data_processing_node(state)["results"]["data_processing"]["status"] == "failed"
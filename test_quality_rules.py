@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+测试数据质量规则引擎：单遍执行多条规则、跨批次重复检测、违规样本，以及 table_check 节点读取 SQLite 源表
+"""
+
+import os
+import sqlite3
+import tempfile
+
+import numpy as np
+import pytest
+
+from datalake.core.nodes.table_check import table_check_node
+from datalake.core.quality import QualityEngine, build_rules, check_source
+from datalake.core.quality.state import InMemoryCheckStateStore, SQLiteCheckStateStore
+from datalake.core.quality.incremental import incremental_check
+from datalake.core.quality.sampling import ReservoirSampler, sample_check, sample_query, wilson_interval
+
+SCHEMA = {
+    "columns": [
+        {"name": "id", "type": "int", "primary_key": True},
+        {"name": "name", "type": "string", "not_null": True},
+        {"name": "amount", "type": "decimal(10,2)"},
+        {"name": "code", "type": "varchar(3)", "unique": True}
+    ]
+}
+
+
+def _results(report):
+    return {(result["rule"], tuple(result["columns"])): result for result in report["rules"]}
+
+
+def test_single_pass_counts_and_samples():
+    """测试全部规则在一次遍历中完成，重复键跨批次检测并记录行号样本"""
+    batches = [
+        {"id": [1, 2, 3], "name": ["a", None, "c"], "amount": [1.5, "x", None], "code": ["a1", "b2", "toolong"]},
+        {"id": [4, 2, None], "name": ["d", "e", None], "amount": ["2.25", 3, 4], "code": ["a1", None, "c3"]},
+    ]
+    consumed = []
+
+    def source():
+        for batch in batches:
+            consumed.append(batch)
+            yield batch
+
+    report = QualityEngine(build_rules(["not_null", "data_type", "primary_key", "unique_constraint"], SCHEMA)).run(
+        source())
+    results = _results(report)
+    assert len(consumed) == 2 and report["rows"] == 6 and report["passed"] is False
+    assert results[("not_null", ("name",))]["violations"] == 2
+    assert [sample["row"] for sample in results[("not_null", ("name",))]["samples"]] == [1, 5]
+    assert results[("data_type", ("amount",))]["violations"] == 1
+    assert results[("data_type", ("code",))]["violations"] == 1
+    assert results[("primary_key", ("id",))]["violations"] == 2
+    assert results[("unique_constraint", ("code",))]["violations"] == 1
+    assert results[("data_type", ("id",))]["status"] == "passed"
+
+
+def test_multi_column_key_and_unknown_rule():
+    """测试多列唯一键，以及不支持的规则报错"""
+    rules = build_rules([{"rule": "unique_constraint", "columns": ["a", "b"]}])
+    report = QualityEngine(rules).run(iter([{"a": [1, 1, 2], "b": ["x", "y", "x"]}, {"a": [1, 2], "b": ["y", "z"]}]))
+    assert report["rules"][0]["violations"] == 1
+    with pytest.raises(ValueError):
+        build_rules(["row_count"])
+
+
+def test_unique_keys_of_mixed_types():
+    """测试无类型列中混合类型的键可以比较，整数 1 与字符串 "1" 不是重复，与近似模式一致"""
+    def batches():
+        yield {"k": [1, "a", 2.0, "1"], "v": ["x", "x", 3, "x"]}
+        yield {"k": [1, 2, 3], "v": ["x", "y", "z"]}
+        yield {"k": ["1", "b"], "v": ["x", "x"]}
+
+    rules = [{"rule": "unique_constraint", "columns": ["k"]}, {"rule": "unique_constraint", "columns": ["k", "v"]}]
+    exact = QualityEngine(build_rules(rules)).run(batches())
+    assert [result["violations"] for result in exact["rules"]] == [3, 2]
+    assert [sample["values"]["k"] for sample in exact["rules"][0]["samples"]] == [1, 2, "1"]
+    approximate = QualityEngine(build_rules([{**rule, "mode": "approximate"} for rule in rules])).run(
+        batches(), rescan=batches)
+    assert [result["violations"] for result in approximate["rules"]] == [3, 2]
+
+
+def _write_table(path, rows):
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE orders (id INTEGER, name TEXT, amount, code TEXT)")
+    connection.executemany("INSERT INTO orders VALUES (?, ?, ?, ?)", rows)
+    connection.commit()
+    connection.close()
+
+
+def test_table_check_node_reads_source():
+    """测试 table_check 节点按配置的数据源与表结构检查源表"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "orders.db")
+        _write_table(path, [(index, f"n{index}", index * 1.5, f"c{index}") for index in range(50)] + [(7, None, 1, "c7")])
+        source = {"type": "database", "connection_string": path, "query": "SELECT * FROM orders", "batch_size": 16}
+        state = {
+            "request_id": "quality-1",
+            "workflow_config": {"node_configs": {"table_check": {"source": source, "columns": SCHEMA["columns"]}}},
+            "results": {"page_submit": {"source_table": "orders"}}
+        }
+        result = table_check_node(state)["results"]["table_check"]
+        assert result["status"] == "failed"
+        assert result["check_result"]["orders"]["rows_checked"] == 51
+        assert "primary_key" in result["error_message"] and "not_null" in result["error_message"]
+
+        passed = check_source({**source, "query": "SELECT * FROM orders WHERE name IS NOT NULL"},
+                              ["not_null", "primary_key", "unique_constraint"], SCHEMA)
+        assert passed["passed"] is True and passed["batches"] == 4
+
+        state["workflow_config"]["node_configs"]["table_check"]["columns"] = [{"name": "missing", "not_null": True}]
+        result = table_check_node(state)["results"]["table_check"]
+        assert result["status"] == "failed" and "missing" in result["error_message"]
+
+
+def _keyed_batches(count=6, size=20000, seed=7):
+    """跨批次重复的整数主键与字符串唯一键，部分批次含空值"""
+    rng = np.random.default_rng(seed)
+    for index in range(count):
+        ids = np.arange(index * size, (index + 1) * size).astype(object)
+        duplicates = rng.random(size) < 0.002
+        ids[duplicates] = rng.integers(0, max(index * size, 1), duplicates.sum())
+        ids[rng.random(size) < 0.0005] = None
+        yield {"id": ids.tolist(), "code": [f"c{value}" if value is not None else None for value in ids]}
+
+
+def test_approximate_mode_matches_exact():
+    """测试近似模式复核可疑键后与精确模式的违规行数一致，不同键数误差在误差范围内"""
+    rules = [{"rule": "primary_key", "columns": ["id"]}, {"rule": "unique_constraint", "columns": ["code"]},
+             {"rule": "unique_constraint", "columns": ["id", "code"]}]
+    exact = QualityEngine(build_rules(rules)).run(_keyed_batches())
+    approximate = QualityEngine(build_rules([{**rule, "mode": "approximate", "cardinality_error": 0.02}
+                                             for rule in rules])).run(_keyed_batches(), rescan=_keyed_batches)
+    assert approximate["passes"] == 2
+    for expected, result in zip(exact["rules"], approximate["rules"]):
+        assert result["exact"] is True and result["mode"] == "approximate"
+        assert result["violations"] == expected["violations"] > 0
+        assert len(result["samples"]) == len(expected["samples"])
+        assert abs(result["distinct"] - expected["distinct"]) <= 0.1 * expected["distinct"]
+    assert approximate["rules"][0]["null_violations"] == exact["rules"][0]["null_violations"]
+
+
+def test_approximate_mode_fixed_memory_and_without_rescan():
+    """测试布隆过滤器达到内存上限后停止扩展仍能复核，无法复核时返回违规行数的上界"""
+    rules = [{"rule": "unique_constraint", "columns": ["id"], "mode": "approximate", "initial_capacity": 1000,
+              "max_memory_mb": 0.01}]
+    exact = QualityEngine(build_rules([{"rule": "unique_constraint", "columns": ["id"]}])).run(_keyed_batches())
+    report = QualityEngine(build_rules(rules)).run(_keyed_batches(), rescan=_keyed_batches)
+    result = report["rules"][0]
+    assert result["bloom_filter"]["saturated"] is True
+    assert result["bloom_filter"]["bytes"] <= 0.01 * (1 << 20)
+    assert result["violations"] == exact["rules"][0]["violations"]
+
+    estimated = QualityEngine(build_rules(rules)).run(_keyed_batches())["rules"][0]
+    assert estimated["exact"] is False and estimated["violations"] >= exact["rules"][0]["violations"]
+    with pytest.raises(ValueError):
+        build_rules([{"rule": "not_null", "mode": "approximate"}])
+
+
+def test_wilson_interval_and_reservoir():
+    """测试 Wilson 区间包含观测违规率，水库抽样在多批数据上保持固定大小且近似均匀"""
+    low, high = wilson_interval(20, 1000)
+    assert low < 0.02 < high and wilson_interval(0, 1000)[0] == 0.0
+    assert wilson_interval(0, 0) == (0.0, 1.0)
+
+    sampler = ReservoirSampler(2000, ["value"], seed=3)
+    for start in range(0, 100000, 7000):
+        sampler.update({"value": list(range(start, min(start + 7000, 100000)))})
+    sample, rows = sampler.sample()
+    assert len(rows) == 2000 and len(set(rows.tolist())) == 2000
+    assert (sample["value"] == rows).all()
+    assert 40000 < rows.mean() < 60000
+
+    assert sample_query("SELECT id, name FROM lake.orders WHERE dt = '2024-01-01'", 0.01, "block", "postgres",
+                        "SYSTEM") == "SELECT id, name FROM lake.orders TABLESAMPLE SYSTEM (1) WHERE dt = '2024-01-01'"
+    assert sample_query("SELECT * FROM a JOIN b ON a.id = b.id", 0.01, dialect="postgres", tablesample="SYSTEM") is None
+
+
+def test_sampled_check_keeps_mixed_types():
+    """测试整数批与字符串批的样本不会被合并为字符串，1 与 "1" 在抽样检查中同样不是重复"""
+    sampler = ReservoirSampler(10, ["id"], seed=1)
+    sampler.update({"id": [1, 2]})
+    sampler.update({"id": ["1", "x"]})
+    sample, rows = sampler.sample()
+    assert sorted(map(repr, sample["id"].tolist())) == ["'1'", "'x'", "1", "2"]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "mixed.db")
+        connection = sqlite3.connect(path)
+        connection.execute("CREATE TABLE mixed (id)")
+        connection.executemany("INSERT INTO mixed VALUES (?)", [(1,), (2,), ("1",), ("x",)])
+        connection.commit()
+        connection.close()
+        source = {"type": "database", "connection_string": path, "query": "SELECT * FROM mixed", "batch_size": 2}
+        rules = [{"rule": "unique_constraint", "columns": ["id"]}]
+        assert check_source(source, rules)["rules"][0]["violations"] == 0
+        sampled = sample_check(source, rules, sampling={"sample_rows": 10})
+        assert sampled["rules"][0]["violations"] == 0 and sampled["passed"] is True
+
+
+def test_sampled_table_check_pushdown_and_escalation():
+    """测试抽样检查下推到 SQLite、按置信区间判定，无法判定的主键规则升级为全量检查"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "orders.db")
+        _write_table(path, [(index, None if index % 50 == 0 else f"n{index}", 1.0, f"c{index}")
+                            for index in range(40000)] + [(7, "dup", 1.0, "c7")])
+        source = {"type": "database", "connection_string": path, "query": "SELECT * FROM orders"}
+        sampling = {"sample_rows": 2000, "seed": 5, "rule_sample_rows": {"data_type": 500}}
+        rules = [{"rule": "not_null", "columns": ["name"], "max_violation_rate": 0.05},
+                 {"rule": "data_type", "columns": ["amount"], "max_violation_rate": 0.01}, "primary_key"]
+        report = sample_check(source, rules, SCHEMA, sampling)
+        results = {result["rule"]: result for result in report["rules"]}
+        assert report["pushdown"] == "random" and report["source_rows"] == 40001
+        assert results["not_null"]["verdict"] == "passed" and results["not_null"]["sample_rows"] == 2000
+        low, high = results["not_null"]["confidence_interval"]
+        assert low < results["not_null"]["violation_rate"] < high
+        assert results["data_type"]["sample_rows"] == 500
+        assert report["escalated"] == ["primary_key"] and results["primary_key"]["escalated"] is True
+        assert results["primary_key"]["violations"] == 1 and report["passed"] is False
+
+        state = {
+            "request_id": "quality-2",
+            "workflow_config": {"node_configs": {"table_check": {
+                "source": source, "columns": SCHEMA["columns"], "sampling": {"seed": 5, "escalate": False},
+                "table_check_rules": ["not_null"]}}},
+            "results": {"page_submit": {"source_table": "orders"}}
+        }
+        result = table_check_node(state)["results"]["table_check"]
+        assert result["status"] == "failed" and result["check_result"]["orders"]["sample_rows"] == 10000
+        assert result["check_result"]["orders"]["rows_checked"] < 40001
+
+
+def _partitioned_table(path, partitions=5, size=400):
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE events (id INTEGER, name TEXT, dt TEXT, update_time TEXT)")
+    connection.executemany("INSERT INTO events VALUES (?, ?, ?, ?)", [
+        (day * size + index, None if index % 100 == 0 else "n", f"2026-10-0{day + 1}", f"2026-10-0{day + 1} 08:00")
+        for day in range(partitions) for index in range(size)
+    ])
+    connection.commit()
+    return connection
+
+
+@pytest.mark.parametrize("persistent", [True, False])
+def test_incremental_check_rechecks_only_changed_partitions(persistent):
+    """测试增量检查只读取新增或变化的分区，合并结果与全量检查一致，跨分区重复升级为全量检查"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "events.db")
+        connection = _partitioned_table(path)
+        source = {"type": "database", "connection_string": path, "query": "SELECT * FROM events"}
+        store = SQLiteCheckStateStore(os.path.join(directory, "state.db")) if persistent else InMemoryCheckStateStore()
+        incremental = {"partition_column": "dt", "watermark_column": "update_time"}
+        rules = ["not_null", "primary_key"]
+
+        first = incremental_check(source, rules, SCHEMA, incremental, store=store)
+        assert first["checked_partitions"] == 5 and first["rows"] == 2000
+        second = incremental_check(source, rules, SCHEMA, incremental, store=store)
+        assert second["checked_partitions"] == 0 and second["rows"] == 0
+        assert second["rules"] == first["rules"]
+
+        connection.executemany("INSERT INTO events VALUES (?, ?, ?, ?)", [
+            (9000, None, "2026-10-06", "2026-10-06 08:00"), (9001, "n", "2026-10-02", "2026-10-07 08:00")])
+        connection.commit()
+        third = incremental_check(source, rules, SCHEMA, incremental, store=store)
+        full = check_source(source, rules, SCHEMA)
+        assert third["checked_partitions"] == 2 and third["cached_partitions"] == 4
+        assert third["watermark"] == "2026-10-07 08:00"
+        assert [(result["rule"], result["violations"], result["checked"]) for result in third["rules"]] == \
+               [(result["rule"], result["violations"], result["checked"]) for result in full["rules"]]
+        assert third["rules"][0]["samples"][0]["partition"] == "2026-10-01"
+
+        connection.execute("INSERT INTO events VALUES (3, 'dup', '2026-10-08', '2026-10-08 08:00')")
+        connection.commit()
+        fourth = incremental_check(source, rules, SCHEMA, incremental, store=store)
+        primary_key = fourth["rules"][-1]
+        assert fourth["checked_partitions"] == 1 and fourth["escalated"] == ["primary_key"]
+        assert primary_key["violations"] == 1 and primary_key["escalated"] is True
+        unverified = incremental_check(source, rules, SCHEMA, {**incremental, "verify_cross_partition": False},
+                                       store=store)["rules"][-1]
+        assert unverified["status"] == "failed" and unverified["cross_partition_rows"] == 1
+
+        connection.execute("DELETE FROM events WHERE dt = '2026-10-08'")
+        connection.commit()
+        cleaned = incremental_check(source, rules, SCHEMA, {**incremental, "detect_deletes": True}, store=store)
+        assert cleaned["removed_partitions"] == 1 and cleaned["checked_partitions"] == 0
+        assert incremental_check(source, ["not_null"], SCHEMA, incremental, store=store)["checked_partitions"] == 6
+        connection.close()
+
+
+def test_incremental_partition_watermark_and_stale_cross_partition_rows():
+    """测试没有 watermark_column 时只聚合不小于最大分区的分区，跨分区重复的另一侧修正后不再全量检查"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "events.db")
+        connection = _partitioned_table(path, partitions=3)
+        source = {"type": "database", "connection_string": path, "query": "SELECT * FROM events"}
+        store = SQLiteCheckStateStore(os.path.join(directory, "state.db"))
+        rules = ["primary_key"]
+
+        by_partition = {"partition_column": "dt", "key": "by-partition"}
+        assert incremental_check(source, rules, SCHEMA, by_partition, store=store)["watermark"] == "2026-10-03"
+        connection.executemany("INSERT INTO events VALUES (?, ?, ?, ?)", [
+            (5000, "n", "2026-10-01", None), (5001, "n", "2026-10-03", None), (5002, "n", "2026-10-04", None)])
+        connection.commit()
+        appended = incremental_check(source, rules, SCHEMA, by_partition, store=store)
+        assert appended["checked_partitions"] == 2 and appended["cached_partitions"] == 2
+        assert appended["watermark"] == "2026-10-04"
+        full = incremental_check(source, rules, SCHEMA, {**by_partition, "detect_deletes": True}, store=store)
+        assert full["checked_partitions"] == 1 and full["rules"][0]["checked"] == 1203
+
+        by_time = {"partition_column": "dt", "watermark_column": "update_time", "key": "by-time"}
+        connection.execute("UPDATE events SET update_time = '2026-10-04 08:00' WHERE update_time IS NULL")
+        connection.commit()
+        incremental_check(source, rules, SCHEMA, by_time, store=store)
+        connection.execute("INSERT INTO events VALUES (5, 'dup', '2026-10-04', '2026-10-05 08:00')")
+        connection.commit()
+        duplicated = incremental_check(source, rules, SCHEMA, by_time, store=store)
+        assert duplicated["escalated"] == ["primary_key"]
+        connection.execute("UPDATE events SET id = 9999, update_time = '2026-10-06 08:00' "
+                           "WHERE id = 5 AND dt = '2026-10-01'")
+        connection.commit()
+        fixed = incremental_check(source, rules, SCHEMA, by_time, store=store)
+        assert fixed["checked_partitions"] == 1 and fixed["escalated"] == []
+        assert fixed["rules"][0]["cross_partition_rows"] == 0 and fixed["rules"][0]["status"] == "passed"
+        assert incremental_check(source, rules, SCHEMA, by_time, store=store)["escalated"] == []
+        connection.close()
+
+
+def test_table_check_node_incremental():
+    """测试 table_check 节点按 incremental 配置增量检查"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "events.db")
+        _partitioned_table(path, partitions=3).close()
+        state = {
+            "request_id": "quality-3",
+            "workflow_config": {"node_configs": {"table_check": {
+                "source": {"type": "database", "connection_string": path, "query": "SELECT * FROM events"},
+                "columns": SCHEMA["columns"], "table_check_rules": ["primary_key"],
+                "incremental": {"partition_column": "dt", "key": f"events-{directory}"}}}},
+            "results": {"page_submit": {"source_table": "events"}}
+        }
+        first = table_check_node(state)["results"]["table_check"]
+        second = table_check_node(state)["results"]["table_check"]
+        assert first["status"] == second["status"] == "success"
+        assert first["check_result"]["events"]["checked_partitions"] == 3
+        assert second["check_result"]["events"]["cached_partitions"] == 3
+        assert second["check_result"]["events"]["watermark"] == "2026-10-03"
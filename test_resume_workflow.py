@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+测试基于检查点的断点续跑：只重新执行失败节点及其下游节点
+"""
+
+from collections import Counter
+
+from datalake.core.workflow import WorkflowManager, WorkflowConfig, LakeIngestionRequest
+from datalake.core.nodes import NODE_MAPPING
+
+# 节点调用计数
+calls = Counter()
+# 需要失败的节点及剩余失败次数
+failures = {}
+
+
+def make_node(node_name, raise_error=False):
+    """构造记录调用次数、可按需失败的节点"""
+    def node(state):
+        calls[node_name] += 1
+        failed = failures.get(node_name, 0) > 0
+        if failed:
+            failures[node_name] -= 1
+            if raise_error:
+                raise RuntimeError(f"{node_name} crashed")
+        return {
+            **state,
+            "results": {**state.get("results", {}), node_name: {"status": "failed" if failed else "success"}},
+            "current_node": node_name
+        }
+    return node
+
+
+def setup_manager(raise_error=False):
+    """注册 generate → deploy → artifact 的线性测试工作流"""
+    calls.clear()
+    failures.clear()
+    NODE_MAPPING["resume_generate"] = make_node("resume_generate")
+    NODE_MAPPING["resume_deploy"] = make_node("resume_deploy", raise_error)
+    NODE_MAPPING["resume_artifact"] = make_node("resume_artifact")
+
+    manager = WorkflowManager()
+    manager.register_workflow(WorkflowConfig(
+        name="resume_test_workflow",
+        description="续跑测试",
+        nodes=["resume_generate", "resume_deploy", "resume_artifact"],
+        edges=[
+            {"start": "resume_generate", "end": "resume_deploy"},
+            {"start": "resume_deploy", "end": "resume_artifact"}
+        ],
+        node_configs={}
+    ))
+    return manager
+
+
+def teardown():
+    for node_name in ("resume_generate", "resume_deploy", "resume_artifact"):
+        NODE_MAPPING.pop(node_name, None)
+
+
+def run(manager):
+    return manager.execute_workflow(LakeIngestionRequest(workflow_name="resume_test_workflow", source_data={}))
+
+
+def test_resume_reruns_only_failed_and_downstream():
+    """测试续跑只执行失败节点及其下游"""
+    manager = setup_manager()
+    try:
+        failures["resume_deploy"] = 1
+        first = run(manager)
+        assert first["results"]["resume_deploy"]["status"] == "failed"
+        assert calls == Counter({"resume_generate": 1, "resume_deploy": 1, "resume_artifact": 1})
+
+        resumed = manager.resume_workflow(first["request_id"])
+        assert resumed["request_id"] == first["request_id"]
+        assert resumed["resumed_from"] == "resume_deploy"
+        assert resumed["results"]["resume_deploy"]["status"] == "success"
+        assert calls == Counter({"resume_generate": 1, "resume_deploy": 2, "resume_artifact": 2})
+    finally:
+        teardown()
+
+
+def test_resume_after_exception():
+    """测试节点抛出异常中断后续跑"""
+    manager = setup_manager(raise_error=True)
+    try:
+        failures["resume_deploy"] = 1
+        first = run(manager)
+        assert first["status"] == "failed"
+        assert first["errors"]
+        assert "resume_artifact" not in first["results"]
+
+        resumed = manager.resume_workflow(first["request_id"])
+        assert resumed["status"] == "completed"
+        assert calls == Counter({"resume_generate": 1, "resume_deploy": 2, "resume_artifact": 1})
+    finally:
+        teardown()
+
+
+def test_resume_from_explicit_node_twice():
+    """测试指定起始节点，并在续跑分支上再次续跑"""
+    manager = setup_manager()
+    try:
+        first = run(manager)
+        manager.resume_workflow(first["request_id"], from_node="resume_artifact")
+        manager.resume_workflow(first["request_id"], from_node="resume_deploy")
+        assert calls == Counter({"resume_generate": 1, "resume_deploy": 2, "resume_artifact": 3})
+    finally:
+        teardown()
+
+
+def test_resume_on_another_manager():
+    """测试重启后（或另一个 worker 上）按检查点元数据找到执行所属的版本续跑"""
+    manager = setup_manager()
+    try:
+        failures["resume_deploy"] = 1
+        first = run(manager)
+        restarted = WorkflowManager(registry=manager.registry, checkpointer=manager.memory)
+        resumed = restarted.resume_workflow(first["request_id"])
+        assert resumed["results"]["resume_deploy"]["status"] == "success"
+        assert resumed["workflow_version"] == first["workflow_version"]
+        assert calls == Counter({"resume_generate": 1, "resume_deploy": 2, "resume_artifact": 2})
+    finally:
+        teardown()
+
+
+def test_resume_unknown_request():
+    """测试续跑不存在的请求"""
+    manager = setup_manager()
+    try:
+        manager.resume_workflow("missing")
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    finally:
+        teardown()
+
+
+if __name__ == "__main__":
+    test_resume_reruns_only_failed_and_downstream()
+    test_resume_after_exception()
+    test_resume_from_explicit_node_twice()
+    test_resume_on_another_manager()
+    test_resume_unknown_request()
+    print("✅ 断点续跑测试通过")
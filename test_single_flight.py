@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+测试相同入湖请求的合并执行（single-flight）与结果缓存
+"""
+
+import threading
+import time
+
+from datalake.core.nodes import NODE_MAPPING
+from datalake.core.workflow import WorkflowManager, WorkflowConfig, LakeIngestionRequest
+from datalake.core.workflow.single_flight import SingleFlight, request_fingerprint
+
+
+def test_fingerprint_is_canonical():
+    """测试请求哈希与键顺序无关"""
+    a = request_fingerprint("wf", {"a": 1, "b": {"x": 1, "y": 2}}, None)
+    b = request_fingerprint("wf", {"b": {"y": 2, "x": 1}, "a": 1}, {})
+    c = request_fingerprint("wf", {"a": 2, "b": {"x": 1, "y": 2}}, None)
+    assert a == b
+    assert a != c
+
+
+def test_concurrent_duplicates_share_one_run():
+    """测试并发的重复请求只执行一次"""
+    flight = SingleFlight()
+    calls = []
+    results = []
+
+    def run():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"request_id": "leader"}
+
+    def submit():
+        results.append(flight.do("key", run))
+
+    threads = [threading.Thread(target=submit) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert all(result[0]["request_id"] == "leader" for result in results)
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+
+
+def test_result_cache_ttl():
+    """测试幂等工作流的短期结果缓存"""
+    flight = SingleFlight()
+    calls = []
+
+    def run():
+        calls.append(1)
+        return len(calls)
+
+    assert flight.do("key", run, cache_ttl=0.2) == (1, False)
+    assert flight.do("key", run, cache_ttl=0.2) == (1, True)
+    time.sleep(0.25)
+    assert flight.do("key", run, cache_ttl=0.2) == (2, False)
+    # 未开启缓存时每次都重新执行
+    assert flight.do("other", run) == (3, False)
+    assert flight.do("other", run) == (4, False)
+
+
+def test_errors_propagate_to_waiters():
+    """测试执行失败时所有等待者都收到异常，且不缓存"""
+    flight = SingleFlight()
+    errors = []
+
+    def run():
+        time.sleep(0.05)
+        raise ValueError("boom")
+
+    def submit():
+        try:
+            flight.do("key", run, cache_ttl=10)
+        except ValueError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=submit) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == ["boom"] * 3
+    assert flight.do("key", lambda: "ok", cache_ttl=10) == ("ok", False)
+
+
+def test_only_cacheable_results_are_cached():
+    """测试 cacheable 判断为否的结果不缓存，工作流失败的结果不会在 result_cache_ttl 内返回给重试的请求"""
+    flight = SingleFlight()
+    assert flight.do("key", lambda: "failed", cache_ttl=10, cacheable=lambda result: result == "ok") == \
+           ("failed", False)
+    assert flight.do("key", lambda: "ok", cache_ttl=10, cacheable=lambda result: result == "ok") == ("ok", False)
+    assert flight.do("key", lambda: "other", cache_ttl=10) == ("ok", True)
+
+    calls = []
+
+    def flaky(state):
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("upstream unavailable")
+        return {**state, "results": {**state.get("results", {}), "flaky": {"status": "success"}},
+                "current_node": "flaky"}
+
+    NODE_MAPPING["flaky"] = flaky
+    manager = WorkflowManager()
+    try:
+        manager.register_workflow(WorkflowConfig(name="cached_workflow", description="结果缓存测试",
+                                                 nodes=["flaky"], edges=[], node_configs={}, result_cache_ttl=60))
+        request = LakeIngestionRequest(workflow_name="cached_workflow", source_data={"x": 1})
+        assert manager.execute_workflow(request)["status"] == "failed"
+        retried = manager.execute_workflow(request)
+        assert retried["status"] == "completed" and "deduplicated" not in retried
+        assert manager.execute_workflow(request)["deduplicated"] is True
+        assert len(calls) == 2
+    finally:
+        manager.close()
+        NODE_MAPPING.pop("flaky", None)
+
+
+if __name__ == "__main__":
+    test_fingerprint_is_canonical()
+    test_concurrent_duplicates_share_one_run()
+    test_result_cache_ttl()
+    test_errors_propagate_to_waiters()
+    test_only_cacheable_results_are_cached()
+    print("✅ single-flight测试通过")
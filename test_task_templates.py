@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+测试集成任务模板：模板渲染与逐个构造结果一致、批量写入 NDJSON、流式接口
+"""
+
+import json
+import os
+import tempfile
+
+from datalake.services.task_templates import TaskTemplate, parse_item
+from datalake.core.nodes.integration_task_generate import integration_task_generate_node
+
+MAPPING = [{"source": "id", "target": "id"}, {"source": "名称", "target": "name"}]
+
+
+def test_render_json_matches_render():
+    """测试拼接的 JSON 与字典渲染一致，覆盖项按层级合并"""
+    template = TaskTemplate(username="u", integration_type="incremental", parallelism=2, create_time="2024-05-01 00:00:00")
+    item = parse_item(("src.s.t", {"db": "dst", "schema": "ods", "table": "t_\"q\""}, MAPPING))
+    assert json.loads(template.render_json(item)) == template.render(item)
+
+    rendered = template.render(item)
+    assert rendered["task_info"]["name"] == 'src_s_t_to_dst_ods_t_"q"_incremental'
+    assert rendered["advanced_settings"] == {"parallelism": 2, "retry_count": 3, "timeout": 3600,
+                                             "audit_template": "default_audit"}
+    assert rendered["tags"] == ["source:src", "target:dst", "type:incremental"]
+
+    overridden = parse_item(("src.s.t", "dst.ods.t", MAPPING, {"schedule": {"expression": "0 2 * * *"}}))
+    payload = json.loads(template.render_json(overridden))
+    assert payload["schedule"] == {"type": "cron", "expression": "0 2 * * *", "start_time": "2024-01-01 00:00:00"}
+    # 覆盖项不影响模板本身
+    assert template.render(item)["schedule"]["expression"] == "0 0 * * *"
+
+
+def test_bulk_node_writes_ndjson():
+    """测试批量模式写入 NDJSON，无法解析的项单独记录错误，并行度取自 node_configs"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "tasks.ndjson")
+        state = {
+            "request_id": "bulk",
+            "workflow_config": {"node_configs": {"integration_task_generate": {"parallelism": 6}}},
+            "source_data": {
+                "tasks": [("a.b.t1", "h.o.t1", MAPPING), ("bad", "h.o.t2", MAPPING),
+                          {"source": "a.b.t3", "target": "h.o.t3", "field_mapping": MAPPING}],
+                "output_path": path
+            },
+            "results": {}
+        }
+        result = integration_task_generate_node(state)["results"]["integration_task_generate"]
+        assert result["status"] == "success"
+        assert (result["task_count"], result["failed_count"]) == (2, 1)
+
+        with open(path, encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f]
+        assert [line["index"] for line in lines] == [0, 1, 2]
+        assert "error" in lines[1]
+        assert lines[2]["task_directory"] == "/integration_tasks/a/b/t3/h/o/t3"
+        assert lines[0]["upstream_api_json"]["advanced_settings"]["parallelism"] == 6
+
+
+def test_single_task_unchanged():
+    """测试单任务模式的输出结构不变"""
+    state = {
+        "request_id": "single",
+        "source_data": {"source_db": "a", "source_schema": "b", "source_table": "c", "target_db": "d",
+                        "target_schema": "e", "target_table": "f", "field_mapping": MAPPING, "parallelism": 3},
+        "results": {}
+    }
+    result = integration_task_generate_node(state)["results"]["integration_task_generate"]
+    assert result["task_name"] == "a_b_c_to_d_e_f_full"
+    assert result["task_directory"] == "/integration_tasks/a/b/c/d/e/f"
+    assert list(result["upstream_api_json"]) == ["task_info", "source", "target", "field_mapping",
+                                                 "advanced_settings", "schedule", "tags"]
+    assert result["upstream_api_json"]["advanced_settings"]["parallelism"] == 3
+
+
+def test_bulk_route_streams_ndjson():
+    """测试批量接口以 NDJSON 流返回"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from datalake.api.routes import router
+
+    app = FastAPI()
+    app.include_router(router)
+    tasks = [[f"a.b.t{index}", f"h.o.t{index}", MAPPING] for index in range(300)]
+    response = TestClient(app).post("/integration/tasks/bulk", json={"tasks": tasks, "parallelism": 4})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 300
+    assert lines[299]["task_name"] == "a_b_t299_to_h_o_t299_full"
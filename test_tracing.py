@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+测试节点执行追踪、延迟直方图与 /api/metrics
+"""
+
+import json
+import os
+import tempfile
+
+from datalake.core.workflow import WorkflowManager, WorkflowConfig, LakeIngestionRequest
+from datalake.core.workflow.tracing import NodeTracer, LatencyHistogram
+
+
+def test_histogram_is_cumulative():
+    """测试直方图桶计数为累计值"""
+    histogram = LatencyHistogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value)
+    assert histogram.cumulative() == [("0.1", 1), ("1.0", 3), ("+Inf", 4)]
+    assert histogram.count == 4
+
+
+def test_wrap_records_spans_and_exceptions():
+    """测试包装后的节点记录耗时、状态大小与异常"""
+    tracer = NodeTracer(measure_state_size=True)
+
+    def ok_node(state):
+        return {**state, "results": {"ok": {"status": "success"}}}
+
+    def bad_node(state):
+        raise RuntimeError("boom")
+
+    tracer.wrap("wf", "ok", ok_node)({"request_id": "r1", "results": {}})
+    try:
+        tracer.wrap("wf", "bad", bad_node)({"request_id": "r2"})
+    except RuntimeError:
+        pass
+
+    ok_span, bad_span = list(tracer.spans)
+    assert ok_span["request_id"] == "r1"
+    assert ok_span["duration"] >= 0
+    assert ok_span["output_bytes"] > ok_span["input_bytes"] > 0
+    assert bad_span["exception"] == "RuntimeError: boom"
+
+    text = tracer.render_prometheus()
+    assert 'datalake_node_duration_seconds_count{workflow="wf",node="ok"} 1' in text
+    assert 'datalake_node_failures_total{workflow="wf",node="bad"} 1' in text
+    assert 'le="+Inf"' in text
+
+
+def test_trace_export():
+    """测试追踪记录导出到JSON文件与JSON Lines文件"""
+    with tempfile.TemporaryDirectory() as directory:
+        lines_path = os.path.join(directory, "trace.jsonl")
+        tracer = NodeTracer(trace_file=lines_path)
+        tracer.wrap("wf", "n", lambda state: state)({"request_id": "r"})
+
+        export_path = os.path.join(directory, "export", "trace.json")
+        assert tracer.export_trace(export_path) == 1
+        assert tracer.flush(timeout=5)
+        with open(export_path, encoding="utf-8") as f:
+            assert json.load(f)["spans"][0]["node"] == "n"
+        with open(lines_path, encoding="utf-8") as f:
+            assert json.loads(f.readline())["workflow"] == "wf"
+
+
+def test_workflow_nodes_are_traced():
+    """测试工作流中的每个节点都被追踪"""
+    tracer = NodeTracer()
+    manager = WorkflowManager(tracer=tracer)
+    manager.register_workflow(WorkflowConfig(
+        name="trace_test_workflow", description="追踪测试",
+        nodes=["db_type_query", "table_field_query"],
+        edges=[{"start": "db_type_query", "end": "table_field_query"}],
+        node_configs={}
+    ))
+    manager.execute_workflow(LakeIngestionRequest(workflow_name="trace_test_workflow",
+                                                  source_data={"source_db": "mysql_db"}))
+
+    assert [span["node"] for span in tracer.spans] == ["db_type_query", "table_field_query"]
+    # 默认不序列化状态计算大小
+    assert all(span["input_bytes"] is None and span["output_bytes"] is None for span in tracer.spans)
+    assert set(tracer.histograms) == {("trace_test_workflow", "db_type_query"),
+                                      ("trace_test_workflow", "table_field_query")}
+
+
+def test_metrics_endpoint():
+    """测试 /api/metrics 返回 Prometheus 文本格式"""
+    from fastapi.testclient import TestClient
+    from datalake.server import app
+
+    response = TestClient(app).get("/api/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE datalake_node_duration_seconds histogram" in response.text
+
+
+if __name__ == "__main__":
+    test_histogram_is_cumulative()
+    test_wrap_records_spans_and_exceptions()
+    test_trace_export()
+    test_workflow_nodes_are_traced()
+    test_metrics_endpoint()
+    print("✅ 追踪测试通过")
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+测试等待网关：审批、外部事件与定时等待挂起执行后恢复，超时与取消，以及重启后从持久化的等待记录恢复
+"""
+
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import pytest
+from langgraph.checkpoint.memory import MemorySaver
+
+from datalake.core.nodes import NODE_MAPPING
+from datalake.core.workflow import WorkflowManager, WorkflowConfig, LakeIngestionRequest
+from datalake.core.workflow.registry import InMemoryWorkflowRegistry
+from datalake.core.workflow.waits import CHECKPOINT_ENV, SQLiteWaitStore, WaitTimers
+
+# 等待网关下游节点的调用次数
+calls = Counter()
+
+
+def after_wait(state):
+    calls["after_wait"] += 1
+    return {**state, "results": {**state.get("results", {}), "after_wait": {"status": "success"}},
+            "current_node": "after_wait"}
+
+
+def setup_manager(wait_config, **kwargs):
+    """注册 wait_gateway → after_wait 的测试工作流"""
+    calls.clear()
+    NODE_MAPPING["after_wait"] = after_wait
+    manager = WorkflowManager(**kwargs)
+    manager.register_workflow(WorkflowConfig(
+        name="wait_test_workflow",
+        description="等待网关测试",
+        nodes=["wait_gateway", "after_wait"],
+        edges=[{"start": "wait_gateway", "end": "after_wait"}],
+        node_configs={"wait_gateway": wait_config}
+    ))
+    return manager
+
+
+def run(manager, source_data=None):
+    return manager.execute_workflow(LakeIngestionRequest(
+        workflow_name="wait_test_workflow", source_data=source_data or {}, dedupe=False))
+
+
+def wait_for_status(manager, request_id, status, timeout=5):
+    deadline = time.monotonic() + timeout
+    while manager.get_run(request_id)["status"] != status and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return manager.get_run(request_id)
+
+
+def test_manual_approval():
+    """测试审批前执行挂起、不执行下游，审批后继续执行"""
+    manager = setup_manager({"type": "manual_approval"})
+    try:
+        result = run(manager)
+        assert result["status"] == "waiting"
+        assert result["waiting_for"][0]["type"] == "manual_approval"
+        assert calls["after_wait"] == 0
+        assert manager.waits.store.count() == 1
+
+        resumed = manager.approve(result["request_id"], approver="alice", comment="ok")
+        assert resumed["status"] == "completed"
+        assert resumed["results"]["wait_gateway"]["approver"] == "alice"
+        assert calls["after_wait"] == 1
+        assert manager.waits.store.count() == 0
+
+        rejected = manager.approve(run(manager)["request_id"], approved=False)
+        assert rejected["results"]["wait_gateway"]["status"] == "failed"
+    finally:
+        manager.close()
+        NODE_MAPPING.pop("after_wait", None)
+
+
+def test_time_delay_resumes_from_timer():
+    """测试定时等待到期后由定时器恢复"""
+    manager = setup_manager({"type": "time_delay", "condition": {"seconds": 0.2}})
+    try:
+        result = run(manager)
+        assert result["status"] == "waiting"
+        run_state = wait_for_status(manager, result["request_id"], "completed")
+        assert run_state["status"] == "completed"
+        assert run_state["results"]["wait_gateway"]["fired_at"] >= result["waiting_for"][0]["wait_until"]
+        assert calls["after_wait"] == 1
+    finally:
+        manager.close()
+        NODE_MAPPING.pop("after_wait", None)
+
+
+def test_external_event_signal_timeout_and_cancel():
+    """测试事件恢复所有等待该事件的执行，未收到事件的执行超时结束，取消的执行以 cancelled 结束"""
+    manager = setup_manager({"type": "external_event", "condition": {"event": "table_ready"}})
+    try:
+        first, second = run(manager), run(manager)
+        resumed = manager.signal("table_ready", {"rows": 10})
+        assert sorted(result["request_id"] for result in resumed) == sorted([first["request_id"], second["request_id"]])
+        assert resumed[0]["results"]["wait_gateway"]["event_payload"] == {"rows": 10}
+        assert manager.signal("table_ready") == []
+
+        timed = run(manager, {"wait_config": {"condition": {"event": "never", "timeout": 0.1}}})
+        run_state = wait_for_status(manager, timed["request_id"], "completed")
+        assert run_state["results"]["wait_gateway"]["status"] == "failed"
+
+        cancelled = run(manager, {"wait_config": {"condition": {"event": "later"}}})
+        assert manager.cancel_wait(cancelled["request_id"])[0]["results"]["wait_gateway"]["status"] == "cancelled"
+        assert manager.signal("later") == []
+    finally:
+        manager.close()
+        NODE_MAPPING.pop("after_wait", None)
+
+
+def test_resume_after_restart():
+    """测试新的管理器（模拟重启）从持久化的等待记录恢复审批与定时器"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "waits.db")
+        checkpointer, registry = MemorySaver(), InMemoryWorkflowRegistry()
+        manager = setup_manager({"type": "manual_approval"}, checkpointer=checkpointer, registry=registry,
+                                wait_store=SQLiteWaitStore(path))
+        approval = run(manager)
+        delayed = run(manager, {"wait_config": {"type": "time_delay", "condition": {"seconds": 0.3}}})
+        manager.close()
+
+        restarted = WorkflowManager(checkpointer=checkpointer, registry=registry, wait_store=SQLiteWaitStore(path))
+        try:
+            restarted.waits.recover()
+            assert restarted.get_run(approval["request_id"])["status"] == "waiting"
+            assert restarted.approve(approval["request_id"])["status"] == "completed"
+            assert wait_for_status(restarted, delayed["request_id"], "completed")["status"] == "completed"
+            # 定时器线程中的恢复可能还未返回
+            deadline = time.monotonic() + 5
+            while calls["after_wait"] < 2 and time.monotonic() < deadline:
+                time.sleep(0.02)
+            assert calls["after_wait"] == 2
+        finally:
+            restarted.close()
+            NODE_MAPPING.pop("after_wait", None)
+
+
+def test_resume_after_restart_with_sqlite_checkpointer(monkeypatch):
+    """测试 DATALAKE_CHECKPOINT_DB 持久化检查点，挂起的执行不留在进程内，重启后仍可审批"""
+    pytest.importorskip("langgraph.checkpoint.sqlite")
+    with tempfile.TemporaryDirectory() as directory:
+        monkeypatch.setenv(CHECKPOINT_ENV, os.path.join(directory, "checkpoints.db"))
+        path, registry = os.path.join(directory, "waits.db"), InMemoryWorkflowRegistry()
+        manager = setup_manager({"type": "manual_approval"}, registry=registry, wait_store=SQLiteWaitStore(path))
+        request_id = run(manager)["request_id"]
+        assert request_id not in manager.runs
+        manager.close()
+
+        restarted = WorkflowManager(registry=registry, wait_store=SQLiteWaitStore(path))
+        try:
+            restarted.recover()
+            assert restarted.get_run(request_id)["status"] == "waiting"
+            assert restarted.approve(request_id, approver="bob")["results"]["wait_gateway"]["approver"] == "bob"
+            assert calls["after_wait"] == 1
+        finally:
+            restarted.close()
+            NODE_MAPPING.pop("after_wait", None)
+
+
+def test_failed_timer_resume_is_retried():
+    """测试定时器触发后恢复执行失败时重新登记定时器，之后仍会恢复"""
+    manager = setup_manager({"type": "time_delay", "condition": {"seconds": 0.1}})
+    resume = manager.waits.resume
+    failures = []
+
+    def flaky(state, value):
+        if not failures:
+            failures.append(state.wait_id)
+            raise RuntimeError("checkpoint unavailable")
+        return resume(state, value)
+
+    manager.waits.resume = flaky
+    manager.waits.retry_delay = 0.1
+    try:
+        request_id = run(manager)["request_id"]
+        assert wait_for_status(manager, request_id, "completed")["status"] == "completed"
+        assert len(failures) == 1
+    finally:
+        manager.close()
+        NODE_MAPPING.pop("after_wait", None)
+
+
+def test_wrong_worker_does_not_strand_the_wait():
+    """测试共享等待记录、检查点各自在进程内的两个管理器，在不持有检查点的一方审批不会结束等待"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "waits.db")
+        registry = InMemoryWorkflowRegistry()
+        owner = setup_manager({"type": "manual_approval"}, registry=registry, wait_store=SQLiteWaitStore(path))
+        other = WorkflowManager(registry=registry, wait_store=SQLiteWaitStore(path))
+        try:
+            request_id = run(owner)["request_id"]
+            try:
+                other.approve(request_id)
+                assert False, "expected ValueError"
+            except ValueError:
+                pass
+            assert owner.waits.store.count() == 1
+            assert owner.approve(request_id)["status"] == "completed"
+            assert calls["after_wait"] == 1
+        finally:
+            owner.close()
+            other.close()
+            NODE_MAPPING.pop("after_wait", None)
+
+
+def test_failed_resume_releases_the_wait():
+    """测试恢复执行失败时等待记录改回 waiting，之后仍可审批"""
+    manager = setup_manager({"type": "manual_approval"})
+    resume = manager.waits.resume
+    try:
+        request_id = run(manager)["request_id"]
+
+        def broken(state, value):
+            raise RuntimeError("checkpoint unavailable")
+
+        manager.waits.resume = broken
+        try:
+            manager.approve(request_id)
+            assert False, "expected RuntimeError"
+        except RuntimeError:
+            pass
+        manager.waits.resume = resume
+        assert manager.waits.store.count() == 1
+        assert manager.approve(request_id)["status"] == "completed"
+    finally:
+        manager.close()
+        NODE_MAPPING.pop("after_wait", None)
+
+
+def test_timers_fire_in_deadline_order():
+    """测试定时器按触发时间依次触发，大量定时器只占用一个线程"""
+    fired = []
+    done = threading.Event()
+    count = 20000
+
+    def fire(wait_id):
+        fired.append(wait_id)
+        if len(fired) == count:
+            done.set()
+
+    timers = WaitTimers(fire, workers=1)
+    try:
+        now = time.time()
+        threads = threading.active_count()
+        for index in reversed(range(count)):
+            timers.schedule(f"w{index}", now + 0.2 + index * 0.00001)
+        assert threading.active_count() == threads + 1
+        assert done.wait(5)
+    finally:
+        timers.close()
+    assert fired == [f"w{index}" for index in range(count)]
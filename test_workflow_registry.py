@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+测试共享工作流注册表：多个管理器（模拟多个 worker 进程）通过同一个SQLite文件共享工作流，
+按修订号发现变更并重新编译
+"""
+
+import os
+import tempfile
+
+from datalake.core.workflow import WorkflowManager, WorkflowConfig, LakeIngestionRequest
+from datalake.core.workflow.registry import SQLiteWorkflowRegistry
+
+
+def _config(nodes):
+    return WorkflowConfig(
+        name="shared_wf",
+        description="shared",
+        nodes=nodes,
+        edges=[{"start": start, "end": end} for start, end in zip(nodes, nodes[1:])],
+        node_configs={}
+    )
+
+
+def _execute(manager):
+    return manager.execute_workflow(LakeIngestionRequest(workflow_name="shared_wf", source_data={}, dedupe=False))
+
+
+def test_workers_share_registry_and_invalidate():
+    """测试一个 worker 注册、更新、删除的工作流对另一个 worker 可见"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "workflows.db")
+        worker_a = WorkflowManager(registry=SQLiteWorkflowRegistry(path))
+        worker_b = WorkflowManager(registry=SQLiteWorkflowRegistry(path))
+
+        worker_a.register_workflow(_config(["page_submit"]))
+        assert [item["name"] for item in worker_b.list_workflows()] == ["shared_wf"]
+        assert list(_execute(worker_b)["results"]) == ["page_submit"]
+        compiled = worker_b.workflows["shared_wf"]
+
+        # 未变更时复用已编译的图
+        _execute(worker_b)
+        assert worker_b.workflows["shared_wf"] is compiled
+
+        worker_a.update_workflow(_config(["page_submit", "db_type_query"]))
+        assert list(_execute(worker_b)["results"]) == ["page_submit", "db_type_query"]
+        assert worker_b.workflows["shared_wf"] is not compiled
+
+        assert worker_a.delete_workflow("shared_wf")
+        try:
+            _execute(worker_b)
+            assert False, "deleted workflow should not be executable"
+        except ValueError:
+            pass
+        assert worker_b.list_workflows() == []
+
+
+def test_registry_revisions():
+    """测试修订号与变更查询"""
+    with tempfile.TemporaryDirectory() as directory:
+        registry = SQLiteWorkflowRegistry(os.path.join(directory, "workflows.db"))
+        first = registry.put(_config(["page_submit"]))
+        second = registry.put(_config(["page_submit", "db_type_query"]))
+        assert second == first + 1 == registry.revision()
+        config, revision = registry.get("shared_wf")
+        assert config.nodes == ["page_submit", "db_type_query"] and revision == second
+
+        assert registry.delete("shared_wf") and not registry.delete("shared_wf")
+        current, changed = registry.changes_since(first)
+        assert current == second + 1
+        assert changed == {"shared_wf": None}
+
+
+if __name__ == "__main__":
+    test_workers_share_registry_and_invalidate()
+    test_registry_revisions()
+    print("All registry tests passed!")
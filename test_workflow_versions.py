@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+测试工作流版本热切换：更新后新执行使用新版本，进行中的执行在原版本上完成，旧版本引用归零后回收，
+请求可以指定执行的版本
+"""
+
+from datalake.core.workflow import WorkflowManager, WorkflowConfig, LakeIngestionRequest
+from datalake.core.workflow.versions import CompiledVersion, WorkflowVersions
+
+
+def _config(nodes):
+    return WorkflowConfig(
+        name="versioned_wf",
+        description="versioned",
+        nodes=nodes,
+        edges=[{"start": start, "end": end} for start, end in zip(nodes, nodes[1:])],
+        node_configs={}
+    )
+
+
+def _execute(manager, version=None):
+    return manager.execute_workflow(LakeIngestionRequest(
+        workflow_name="versioned_wf", source_data={}, dedupe=False, workflow_version=version
+    ))
+
+
+def test_hot_swap_keeps_in_flight_version():
+    """测试更新时进行中的执行继续持有旧版本，释放后旧版本被回收"""
+    manager = WorkflowManager()
+    manager.register_workflow(_config(["page_submit"]))
+    v1 = manager.registry.versions("versioned_wf")[0]
+
+    with manager._use("versioned_wf") as in_flight:
+        manager.update_workflow(_config(["page_submit", "db_type_query"]))
+        v2 = manager.registry.versions("versioned_wf")[-1]
+
+        # 新执行使用新版本，旧版本仍被持有
+        result = _execute(manager)
+        assert result["workflow_version"] == v2
+        assert list(result["results"]) == ["page_submit", "db_type_query"]
+        assert in_flight.version == v1
+        assert manager.versions.loaded("versioned_wf") == [v1, v2]
+
+    # 引用归零后旧版本被回收
+    assert manager.versions.loaded("versioned_wf") == [v2]
+
+
+def test_pinned_version_execution():
+    """测试指定版本执行，且不会改变当前版本"""
+    manager = WorkflowManager()
+    manager.register_workflow(_config(["page_submit"]))
+    manager.update_workflow(_config(["page_submit", "db_type_query"]))
+    v1, v2 = manager.registry.versions("versioned_wf")
+
+    result = _execute(manager, v1)
+    assert result["workflow_version"] == v1
+    assert list(result["results"]) == ["page_submit"]
+    assert _execute(manager)["workflow_version"] == v2
+    assert manager.versions.loaded("versioned_wf") == [v2]
+
+    try:
+        _execute(manager, v2 + 100)
+        assert False, "unknown version should not be executable"
+    except ValueError:
+        pass
+
+
+def test_versions_table_does_not_regress():
+    """测试较旧的版本不会覆盖当前版本指针"""
+    versions = WorkflowVersions()
+    versions.install(CompiledVersion("wf", 3, object(), None))
+    versions.install(CompiledVersion("wf", 2, object(), None))
+    assert versions.current()["wf"].version == 3
+    assert versions.loaded("wf") == [3]
+
+    # 其他进程更新到版本 5 后，本进程迟到的版本 4 不能成为当前版本
+    assert versions.retire("wf", 5)
+    versions.install(CompiledVersion("wf", 4, object(), None))
+    assert "wf" not in versions.current()
+    versions.install(CompiledVersion("wf", 5, object(), None))
+    assert versions.current()["wf"].version == 5
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+测试持久化工作流注册表：重启后工作流与历史版本仍然存在，启动时按使用热度预编译最常用的工作流
+"""
+
+import os
+import sqlite3
+import tempfile
+import time
+
+from datalake.core.workflow import WorkflowManager, WorkflowConfig, LakeIngestionRequest
+from datalake.core.workflow.registry import SQLiteWorkflowRegistry, InMemoryWorkflowRegistry
+
+
+def _config(name, nodes):
+    return WorkflowConfig(
+        name=name,
+        description=name,
+        nodes=nodes,
+        edges=[{"start": start, "end": end} for start, end in zip(nodes, nodes[1:])],
+        node_configs={}
+    )
+
+
+def _execute(manager, name):
+    return manager.execute_workflow(LakeIngestionRequest(workflow_name=name, source_data={}, dedupe=False))
+
+
+def test_workflows_survive_restart_with_versions():
+    """测试重启后工作流、历史版本与使用热度仍然存在"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "workflows.db")
+        before = WorkflowManager(registry=SQLiteWorkflowRegistry(path))
+        before.register_workflow(_config("wf", ["page_submit"]))
+        before.update_workflow(_config("wf", ["page_submit", "db_type_query"]))
+        _execute(before, "wf")
+        before.registry.flush_usage()
+
+        after = WorkflowManager(registry=SQLiteWorkflowRegistry(path))
+        versions = after.list_workflow_versions("wf")
+        assert len(versions) == 2
+        assert after.get_workflow_config("wf").nodes == ["page_submit", "db_type_query"]
+        assert after.get_workflow_config("wf", versions[0]).nodes == ["page_submit"]
+        assert after.registry.hot_workflows(5) == ["wf"]
+
+        # 删除后不再出现在热度排名中
+        after.delete_workflow("wf")
+        assert after.registry.hot_workflows(5) == []
+
+
+def test_warm_up_compiles_hottest_workflows():
+    """测试预编译只编译热度最高的工作流，其余按需编译"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "workflows.db")
+        registry = SQLiteWorkflowRegistry(path)
+        manager = WorkflowManager(registry=registry)
+        for name in ("hot", "warm", "cold"):
+            manager.register_workflow(_config(name, ["page_submit"]))
+        registry.record_usage("hot", 5)
+        registry.record_usage("warm", 2)
+        registry.record_usage("cold", 1)
+        registry.flush_usage()
+
+        restarted = WorkflowManager(registry=SQLiteWorkflowRegistry(path))
+        assert restarted.warm_up(limit=2, background=False) is None
+        assert sorted(restarted.workflows) == ["hot", "warm"]
+
+        _execute(restarted, "cold")
+        assert sorted(restarted.workflows) == ["cold", "hot", "warm"]
+
+
+def test_usage_flush_is_off_the_request_path():
+    """测试注册表被其他连接锁住时执行不受影响，写入失败的使用记录保留，由后台线程稍后写入"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "workflows.db")
+        registry = SQLiteWorkflowRegistry(path, timeout=0.05, usage_flush_interval=0.05)
+        manager = WorkflowManager(registry=registry)
+        manager.register_workflow(_config("wf", ["page_submit"]))
+
+        blocker = sqlite3.connect(path, isolation_level=None)
+        blocker.execute("BEGIN IMMEDIATE")
+        try:
+            started = time.monotonic()
+            assert _execute(manager, "wf")["status"] == "completed"
+            assert _execute(manager, "wf")["status"] == "completed"
+            assert time.monotonic() - started < 5
+            try:
+                registry.flush_usage()
+                assert False, "expected sqlite3.OperationalError"
+            except sqlite3.OperationalError:
+                pass
+        finally:
+            blocker.execute("ROLLBACK")
+            blocker.close()
+
+        reader = sqlite3.connect(path)
+        deadline = time.monotonic() + 5
+        executions = None
+        while executions != 2 and time.monotonic() < deadline:
+            time.sleep(0.02)
+            row = reader.execute("SELECT executions FROM workflow_usage WHERE name = 'wf'").fetchone()
+            executions = row[0] if row else None
+        reader.close()
+        assert executions == 2
+        registry.close()
+
+
+def test_in_memory_registry_usage_ranking():
+    """测试进程内注册表同样按热度排序"""
+    manager = WorkflowManager(registry=InMemoryWorkflowRegistry())
+    manager.register_workflow(_config("a", ["page_submit"]))
+    manager.register_workflow(_config("b", ["page_submit"]))
+    _execute(manager, "b")
+    _execute(manager, "b")
+    _execute(manager, "a")
+    assert manager.registry.hot_workflows(2) == ["b", "a"]
+
+    thread = manager.warm_up(limit=1)
+    thread.join(timeout=10)
+    assert "b" in manager.workflows